@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量写入性能对比
+比较 DataFrame.to_sql、逐行转换的 INSERT OR REPLACE 和 BulkWriter 写入 daily_basic 的速度
+
+用法: python examples/benchmark_bulk_writer.py [行数]
+"""
+
+import sys
+import os
+import time
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.data.database_manager import DatabaseManager
+from src.data.storage.bulk_writer import BulkWriter
+from src.data.providers import ReplayProvider
+
+
+def make_daily(rows):
+    """生成约 rows 行的合成日线"""
+    stock_count = max(1, rows // 240)
+    provider = ReplayProvider(stock_count=stock_count, start_date='20230101', end_date='20231231')
+    return provider.daily().head(rows)
+
+
+def fresh_db():
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "benchmark.db"))
+    db_manager.create_all_tables()
+    return db_manager
+
+
+def write_to_sql(db_manager, df):
+    """改造前：复制并修改DataFrame后经 pandas to_sql 写入"""
+    df = df.copy()
+    df['update_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    conn = db_manager.get_connection()
+    try:
+        df.to_sql('daily_basic', conn, if_exists='append', index=False)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def write_row_objects(db_manager, df):
+    """改造前：整表转为object再逐行拼接，INSERT OR REPLACE"""
+    columns = list(df.columns)
+    update_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    values = df[columns].astype(object).where(df[columns].notna(), None)
+    rows = [row + (update_time,) for row in values.itertuples(index=False, name=None)]
+    conn = db_manager.get_connection()
+    try:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO daily_basic ({', '.join(columns + ['update_time'])}) "
+            f"VALUES ({', '.join(['?'] * (len(columns) + 1))})", rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def write_bulk(db_manager, df):
+    """改造后：BulkWriter"""
+    BulkWriter(db_manager).write('daily_basic', df)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    df = make_daily(rows)
+    print(f"写入 {len(df)} 行 daily_basic")
+    print("=" * 50)
+
+    for name, writer in (('to_sql', write_to_sql),
+                         ('INSERT OR REPLACE (逐行对象)', write_row_objects),
+                         ('BulkWriter', write_bulk)):
+        db_manager = fresh_db()
+        started = time.perf_counter()
+        writer(db_manager, df)
+        elapsed = time.perf_counter() - started
+        count = db_manager.execute_query("SELECT COUNT(*) FROM daily_basic")[0][0]
+        print(f"{name:<28} {elapsed:7.2f} 秒  {count / elapsed:12,.0f} 行/秒")
+
+
+if __name__ == '__main__':
+    main()
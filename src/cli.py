@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令行入口 - 无界面运行数据初始化、增量更新、修复和状态查询（适用于定时任务/服务器）
+
+用法:
+    python -m src.cli init [--batches batch_1 batch_2] [--no-resume] [--no-progressive]
+    python -m src.cli update [--datasets daily adj_factor]
+    python -m src.cli repair [--api daily]
+    python -m src.cli audit [--table daily_basic] [--start 20200101] [--end 20241231] [--json]
+    python -m src.cli check [--tables daily_basic index_daily] [--recent] [--json]
+    python -m src.cli status [--json]
+
+全局选项:
+    --db PATH      数据库路径（默认 database/stock_data.db）
+    --replay       使用本地回放数据源（无需token，用于演练）
+    -v/--verbose   输出详细日志
+"""
+
+import sys
+import os
+import json
+import logging
+import argparse
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data.database_manager import DatabaseManager
+from src.data.ingestion_engine import IngestionEngine
+from src.data.providers import load_token_config
+from src.data.gap_detector import GapDetector, PROBLEM_CONDITIONS
+from src.data.integrity_checker import IntegrityChecker
+from src.data.trade_calendar import get_trade_calendar
+from src.data.api_config import CATCHUP_CONFIG, DATA_INTEGRITY_CONFIG
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m src.cli', description="股票数据接入（无界面）")
+    parser.add_argument('--db', default="database/stock_data.db", help="数据库路径")
+    parser.add_argument('--replay', action='store_true', help="使用本地回放数据源")
+    parser.add_argument('-v', '--verbose', action='store_true', help="输出详细日志")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    init = commands.add_parser('init', help="分批初始化数据")
+    init.add_argument('--batches', nargs='+', default=['batch_1'],
+                      choices=['batch_1', 'batch_2', 'batch_3'], help="要执行的批次")
+    init.add_argument('--no-resume', action='store_true', help="不从断点续传，重新下载")
+    init.add_argument('--no-progressive', action='store_true', help="不先取最近交易日，按原策略一次完成")
+
+    update = commands.add_parser('update', help="增量更新：各行情数据集追平到最新交易日")
+    update.add_argument('--datasets', nargs='+', choices=list(CATCHUP_CONFIG['datasets']),
+                        help="只追平指定数据集")
+
+    repair = commands.add_parser('repair', help="补抓修复队列中失败的分块")
+    repair.add_argument('--api', help="只补抓指定接口")
+
+    audit = commands.add_parser('audit', help="检测区间内缺失和异常的行情数据，输出修复计划")
+    audit.add_argument('--table', default='daily_basic', choices=list(PROBLEM_CONDITIONS), help="检测的表")
+    audit.add_argument('--start', help="起始日期（默认交易日历第一天）")
+    audit.add_argument('--end', help="结束日期（默认最近交易日）")
+    audit.add_argument('--limit', type=int, default=20, help="最多列出的修复分组数")
+    audit.add_argument('--json', action='store_true', help="以JSON输出")
+
+    check = commands.add_parser('check', help="逐日统计各表完整性，写入 data_integrity_log")
+    check.add_argument('--tables', nargs='+', choices=list(DATA_INTEGRITY_CONFIG), help="只检查指定表")
+    check.add_argument('--start', help="起始日期（默认表中最早的交易日）")
+    check.add_argument('--end', help="结束日期（默认最近交易日）")
+    check.add_argument('--recent', action='store_true', help="只检查最近 check_days 个交易日")
+    check.add_argument('--json', action='store_true', help="以JSON输出")
+
+    status = commands.add_parser('status', help="查看数据库状态")
+    status.add_argument('--json', action='store_true', help="以JSON输出")
+    return parser
+
+
+def print_event(event, args):
+    """输出引擎事件"""
+    if event == 'progress':
+        percent, message = args
+        print(f"[{percent:3d}%] {message}" if percent >= 0 else f"       {message}", flush=True)
+    elif event == 'batch_completed':
+        batch_name, success, message = args
+        print(f"{'✅' if success else '❌'} {message}", flush=True)
+    elif event == 'data_available':
+        table, start_date, end_date = args
+        date_range = f" {start_date}~{end_date}" if start_date else ''
+        print(f"       {table} 已可用{date_range}", flush=True)
+
+
+def print_status(status):
+    print(f"数据库: {status['db_path']}")
+    if not status['exists']:
+        print("  数据库不存在，请先执行 init")
+        return
+    if status['progress']:
+        print("\n初始化进度:")
+        for batch_name, api_name, state, records, end_time in status['progress']:
+            print(f"  {batch_name:<8} {api_name:<18} {state:<10} {records or 0:>10} {end_time or ''}")
+    print("\n数据表:")
+    for table_name, info in status['tables'].items():
+        print(f"  {table_name:<18} {info['records']:>10} 条  最新 {info['last_date'] or '-'}")
+    if status['sync_state']:
+        print("\n追平水位: " + ', '.join(f"{name} {last_date}" for name, last_date in status['sync_state'].items()))
+    if status['repair_queue']:
+        print("\n修复队列: " + ', '.join(f"{state} {count}" for state, count in status['repair_queue'].items()))
+    if status.get('quota'):
+        print("\n今日接口用量:")
+        for row in status['quota']:
+            remaining = row['remaining'] if row['remaining'] is not None else '不限'
+            print(f"  {row['token']:<10} {row['api_name']:<18} {row['calls']:>8} 次 {row['rows']:>10} 行  "
+                  f"剩余 {remaining}")
+
+
+def audit_result(report, limit):
+    """缺口检测结果摘要"""
+    summary = report.summary()
+    plan = report.plan()
+    worst = summary[summary['missing'] + summary['problematic'] > 0].sort_values('missing', ascending=False)
+    return {
+        'table': report.table_name,
+        'start_date': report.days[0] if report.days else None,
+        'end_date': report.days[-1] if report.days else None,
+        **report.counts,
+        'incomplete_days': len(worst),
+        'worst_days': [{'trade_date': row.trade_date, 'expected': int(row.expected), 'missing': int(row.missing),
+                        'problematic': int(row.problematic)} for row in worst.head(limit).itertuples()],
+        'plan_groups': len(plan),
+        'plan': [{'start_date': start_date, 'end_date': end_date, 'codes': codes}
+                 for start_date, end_date, codes in plan[:limit]]
+    }
+
+
+def print_audit(result):
+    if not result['days']:
+        print("交易日历为空或区间内没有交易日")
+        return
+    print(f"{result['table']} {result['start_date']}~{result['end_date']}: {result['days']} 个交易日，"
+          f"应有 {result['expected']} 条，缺失 {result['missing']} 条，异常 {result['problematic']} 条")
+    if result['worst_days']:
+        print(f"\n不完整交易日 {result['incomplete_days']} 个，缺失最多的:")
+        for day in result['worst_days']:
+            print(f"  {day['trade_date']}  缺失 {day['missing']:>6}/{day['expected']:<6} 异常 {day['problematic']}")
+    if result['plan']:
+        print(f"\n修复计划 {result['plan_groups']} 组（缺失区间相同的股票合为一组）:")
+        for group in result['plan']:
+            codes = group['codes']
+            names = ', '.join(codes[:5]) + (f" 等 {len(codes)} 只" if len(codes) > 5 else '')
+            print(f"  {group['start_date']}~{group['end_date']}  {names}")
+
+
+def check_result(results):
+    """完整性检查结果摘要：各状态的交易日数和需要修复的交易日"""
+    summary = {}
+    for table_name, result in results.items():
+        incomplete = result[result['status'] != 'complete']
+        summary[table_name] = {
+            'start_date': result['trade_date'].iloc[0] if not result.empty else None,
+            'end_date': result['trade_date'].iloc[-1] if not result.empty else None,
+            'statuses': {status: int(count) for status, count in result['status'].value_counts().items()},
+            'missing': int(result['missing_count'].sum()),
+            'incomplete_days': incomplete['trade_date'].tolist()
+        }
+    return summary
+
+
+def print_check(summary):
+    for table_name, result in summary.items():
+        if not result['start_date']:
+            print(f"{table_name}: 没有数据")
+            continue
+        print(f"{table_name} {result['start_date']}~{result['end_date']}: "
+              + ', '.join(f"{status} {count}" for status, count in result['statuses'].items())
+              + f"，共缺失 {result['missing']} 条")
+        days = result['incomplete_days']
+        if days:
+            print(f"  不完整交易日: {', '.join(days[:10])}" + (f" 等 {len(days)} 个" if len(days) > 10 else ''))
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    token_config = {'token_type': 'replay'} if args.replay else load_token_config()
+    engine = IngestionEngine(
+        batches=getattr(args, 'batches', ['batch_1']),
+        token_config=token_config,
+        resume=not getattr(args, 'no_resume', False),
+        progressive=False if getattr(args, 'no_progressive', False) else None,
+        db_manager=DatabaseManager(args.db)
+    )
+
+    if args.command == 'status':
+        status = engine.status()
+        if args.json:
+            print(json.dumps(status, ensure_ascii=False, indent=2))
+        else:
+            print_status(status)
+        return 0
+
+    if args.command == 'audit':
+        if not engine.db_manager.table_exists('stock_basic'):
+            print("股票列表不存在，请先执行 init", file=sys.stderr)
+            return 1
+        detector = GapDetector(engine.db_manager, get_trade_calendar(engine.db_manager))
+        result = audit_result(detector.detect(args.table, args.start, args.end), args.limit)
+        if args.json:
+            print(json.dumps(result, ensure_ascii=False, indent=2))
+        else:
+            print_audit(result)
+        return 0
+
+    if args.command == 'check':
+        if not engine.db_manager.table_exists('data_integrity_log'):
+            print("数据库不存在，请先执行 init", file=sys.stderr)
+            return 1
+        checker = IntegrityChecker(engine.db_manager, get_trade_calendar(engine.db_manager))
+        summary = check_result(checker.run(args.tables, args.start, args.end, args.recent))
+        if args.json:
+            print(json.dumps(summary, ensure_ascii=False, indent=2))
+        else:
+            print_check(summary)
+        return 0
+
+    if not token_config:
+        print("未找到Token配置，请先在 config/token_config.txt 中设置Token，或使用 --replay", file=sys.stderr)
+        return 1
+
+    action, params = {
+        'init': ('run', {}),
+        'update': ('update', {'datasets': getattr(args, 'datasets', None)}),
+        'repair': ('repair', {'api_name': getattr(args, 'api', None)})
+    }[args.command]
+
+    result = None
+    for event, values in engine.iter_events(action, **params):
+        if event == 'result':
+            result = values[0]
+        else:
+            print_event(event, values)
+
+    success, message = result[0], result[1]
+    print(message)
+    return 0 if success else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,13 +5,21 @@
 """
 
 from .database_manager import DatabaseManager
-from .data_initializer import DataInitializer
+from .ingestion_engine import IngestionEngine
 from .api_config import BATCH_1_APIS, BATCH_2_APIS, BATCH_3_APIS
 
 __all__ = [
     'DatabaseManager',
+    'IngestionEngine',
     'DataInitializer', 
     'BATCH_1_APIS',
     'BATCH_2_APIS',
     'BATCH_3_APIS'
-]
\ No newline at end of file
+]
+
+def __getattr__(name):
+    # DataInitializer 依赖PyQt5，按需导入，命令行和脚本导入本模块时不加载Qt
+    if name == 'DataInitializer':
+        from .data_initializer import DataInitializer
+        return DataInitializer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
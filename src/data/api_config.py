@@ -96,8 +96,8 @@ BATCH_2_APIS = {
             'fields': 'ts_code,trade_date,open,high,low,close,pre_close,change,pct_chg,vol,amount'
         },
         'time_range': 'last_2_years',  # 统一为2年历史数据
-        'strategy': 'multi_stock_multi_date',  # 使用测试成功的策略
-        'batch_size': 50,  # 根据测试结果调整
+        'strategy': 'multi_stock_multi_date',  # 使用测试成功的策略（每次请求的股票数由 CHUNK_CONFIG 自适应决定）
+        'progressive': True,  # 先逐日取最近交易日全市场，历史数据在批次末尾回填
         'description': 'A股日线行情 (测试成功: 5,444行单日全市场 + 738行多股票多日)',
         'required': False,
         'test_status': 'SUCCESS'
@@ -109,8 +109,8 @@ BATCH_2_APIS = {
             'fields': 'ts_code,trade_date,open,high,low,close,pre_close,change,pct_chg,vol,amount'
         },
         'time_range': 'last_2_years',
-        'test_codes': '000001.SZ,600000.SH',  # 使用测试成功的股票代码
-        'description': '周线行情 (测试成功: 112行)',
+        'source': 'resample',  # 由 daily_basic 按交易周在本地生成，不调用接口
+        'description': '周线行情 (由日线本地生成)',
         'required': False,
         'test_status': 'SUCCESS'
     },
@@ -121,8 +121,8 @@ BATCH_2_APIS = {
             'fields': 'ts_code,trade_date,open,high,low,close,pre_close,change,pct_chg,vol,amount'
         },
         'time_range': 'last_2_years',
-        'test_codes': '000001.SZ,600000.SH',  # 使用测试成功的股票代码
-        'description': '月线行情 (测试成功: 44行)',
+        'source': 'resample',  # 由 daily_basic 按自然月在本地生成，不调用接口
+        'description': '月线行情 (由日线本地生成)',
         'required': False,
         'test_status': 'SUCCESS'
     },
@@ -130,11 +130,12 @@ BATCH_2_APIS = {
         'api_name': 'adj_factor',
         'table': 'adj_factor',
         'params': {
-            'ts_code': '000001.SZ,600000.SH',
             'fields': 'ts_code,trade_date,adj_factor'
         },
         'time_range': 'last_2_years',
-        'description': '复权因子 (测试成功: 492行)',
+        'strategy': 'single_date_all',  # 按交易日取全市场复权因子
+        'progressive': True,
+        'description': '复权因子 (全市场)',
         'required': False,
         'test_status': 'SUCCESS'
     },
@@ -173,18 +174,23 @@ BATCH_3_APIS = {
 }
 
 # 数据完整性检测配置
+# universe: listed  按 stock_basic 上市、退市日期确定每日应有的股票
+#           tracked 表中已有的代码，从各自第一条记录起每日都应有数据
+# 缺失率 <= missing_threshold 记为 minor，<= full_update_threshold 记为 partial，更高记为 full
 DATA_INTEGRITY_CONFIG = {
     'daily_basic': {
         'expected_stock_count': 5000,
         'missing_threshold': 0.05,
         'check_days': 30,
-        'full_update_threshold': 0.20
+        'full_update_threshold': 0.20,
+        'universe': 'listed'
     },
     'index_daily': {
         'expected_index_count': 300,
         'missing_threshold': 0.03,
         'check_days': 30,
-        'full_update_threshold': 0.15
+        'full_update_threshold': 0.15,
+        'universe': 'tracked'
     }
 }
 
@@ -227,7 +233,162 @@ RETRY_CONFIG = {
     'retry_delay': [1, 3, 5],  # 缩短重试间隔
     'retry_conditions': ['network_error', 'api_limit', 'timeout', 'permission_denied'],
     'skip_on_permission_error': True,  # 权限错误时直接跳过
-    'api_rate_limit': 0.2  # API调用间隔(秒)
+    'api_rate_limit': 0.2,  # API调用间隔(秒)
+    'jitter': 0.3,            # 重试间隔随机抖动比例，避免多线程同时重试
+    'rate_limit_delay': 15,   # 触发限频后至少等待的秒数
+    'breaker_threshold': 5,   # 连续失败多少次后熔断该API
+    'breaker_reset': 300,     # 熔断后多少秒放行一次试探调用
+    'repair_max_attempts': 5  # 修复队列中的请求最多尝试次数
+}
+
+# 抓取调度配置 - 多线程并发 + 令牌桶限频
+# 单个API可在其配置中用 'api_rate_limit' 覆盖默认调用间隔
+SCHEDULER_CONFIG = {
+    'max_workers': 4,   # 并发请求线程数
+    'max_pending': 8,   # 最大在途任务数(限制内存占用)
+    'burst': 2          # 令牌桶容量(允许的瞬时突发请求数)
+}
+
+# 存储写入配置
+STORAGE_CONFIG = {
+    'write_chunk_size': 50000,  # 批量写入每个分块的行数（独立连接写入时每块一个事务）
+    'cache_size_mb': 64,        # 写入连接的页缓存，减少大批量写入时的索引页换入换出
+    'change_log_tables': ['daily_basic', 'adj_factor'],  # 写入时记录变更区间的源表（周线、月线重采样和复权缓存按此更新）
+    'change_log_max_codes': 500  # 单次写入的股票数超过此值时按全市场记录，不逐只列出
+}
+
+# 入库流水线配置 - 抓取/清洗/写入三段通过有界队列衔接
+PIPELINE_CONFIG = {
+    'transform_workers': 2,  # 清洗线程数
+    'queue_size': 8,         # 每个阶段队列的最大深度
+    'commit_every': 20       # 写入线程每组提交的分块数
+}
+
+# 接口响应缓存配置 - 按API设置有效期
+# 'historical': 请求的日期全部早于今天（已收盘）时永久有效，否则不缓存
+# 'daily': 当天有效，次日零点过期
+# 整数: 有效秒数；未列出的API不缓存
+CACHE_CONFIG = {
+    'enabled': True,
+    'db_path': 'database/api_cache.db',
+    'max_size_mb': 512,  # 超出后按最近最少使用淘汰
+    'api_ttl': {
+        'stock_basic': 'daily',
+        'stock_company': 'daily',
+        'trade_cal': 'daily',
+        'new_share': 'daily',
+        'index_basic': 'daily',
+        'daily': 'historical',
+        'weekly': 'historical',
+        'monthly': 'historical',
+        'adj_factor': 'historical',
+        'daily_basic': 'historical',
+        'index_daily': 'historical',
+        'index_dailybasic': 'historical'
+    }
+}
+
+# 多股票多日请求分块配置 - 按区间交易日数决定每次请求的股票数
+# 响应行数达到 row_limits 视为被截断，会拆分该分块重取
+CHUNK_CONFIG = {
+    'row_limits': {           # 接口单次返回行数上限
+        'daily': 6000,
+        'weekly': 4500,
+        'monthly': 4500,
+        'adj_factor': 6000,   # 单日全市场请求约5400行
+        'daily_basic': 6000,
+        'index_daily': 8000,
+        'index_dailybasic': 3000,
+        'suspend_d': 5000
+    },
+    'default_row_limit': 2000,
+    'fill_ratio': 0.9,        # 每次请求按上限的90%装箱，给停牌等估算误差留余量
+    'max_codes': 500          # 单次请求的股票代码数上限
+}
+
+# 接口额度配置 - 每个token每个接口的调用次数额度（取决于账户积分，按实际权限调整）
+# 用量按 token / 接口 / 分钟累计在 api_quota_usage 表，跨运行、跨进程共享
+QUOTA_CONFIG = {
+    'enabled': True,
+    'per_minute': 500,        # 每分钟调用次数，None 表示不限
+    'per_day': 100000,        # 每天调用次数，None 表示不限
+    'api_limits': {           # 单个接口的额度，覆盖上面的默认值
+        'stock_basic': {'per_minute': 50, 'per_day': 1000},
+        'stock_company': {'per_minute': 50, 'per_day': 1000}
+    },
+    'reserve_ratio': 0.2,     # 当日额度中保留给每日同步的比例，低优先级的历史回填用到此处即让路
+    'flush_interval': 5,      # 用量写入数据库的间隔(秒)，不在每次请求时占用写锁
+    'reload_interval': 10,    # 从数据库重新加载当日用量的间隔(秒)，计入其他进程的调用
+    'retention_days': 30      # 用量记录保留天数
+}
+
+# 停牌数据配置 - 逐日停牌记录合并为停牌区间，缺口检测不把停牌股票算作缺失
+SUSPENSION_CONFIG = {
+    'api_name': 'suspend_d',
+    'params': {'suspend_type': 'S'},  # 只取停牌记录
+    'window_days': 20                 # 每次请求的交易日数
+}
+
+# 修复规划配置 - 成本 = 请求次数 x call_cost + 返回行数 x row_cost，每个交易日选成本最低的方案
+REPAIR_PLAN_CONFIG = {
+    'call_cost': 1.0,      # 一次请求的成本（限频下的等待为主）
+    'row_cost': 0.0002,    # 每返回一行的成本（传输和解析），约5000行折合一次请求
+    'full_market_apis': ['daily', 'adj_factor', 'daily_basic', 'index_dailybasic']  # 支持按交易日取全市场的接口
+}
+
+# 渐进式初始化配置 - 先取最近 recent_days 个交易日的全市场数据（每日一次请求），
+# 界面即可使用最新数据；更早的历史数据在批次其余接口完成后回填
+PROGRESSIVE_CONFIG = {
+    'enabled': True,
+    'recent_days': 20
+}
+
+# 每日追平同步配置 - 从各数据集上次同步的交易日之后，逐日取全市场数据补齐到最新交易日
+# mode 'per_day': 每个交易日一次全市场请求（trade_date=当日）
+# mode 'per_code': 接口必须指定代码时，每个代码一次请求覆盖整个缺失区间
+# watermark_column: 与其他数据集共用一张表时，以该列非空的最新日期作为已同步日期
+CATCHUP_CONFIG = {
+    'initial_days': 20,  # 数据集从未同步过且表为空时，补齐最近多少个交易日
+    'datasets': {
+        'daily': {
+            'api_name': 'daily',
+            'table': 'daily_basic',
+            'mode': 'per_day',
+            'params': {'fields': 'ts_code,trade_date,open,high,low,close,pre_close,change,pct_chg,vol,amount'},
+            'description': 'A股日线行情'
+        },
+        'daily_indicator': {
+            'api_name': 'daily_basic',
+            'table': 'daily_basic',
+            'mode': 'per_day',
+            'params': {'fields': 'ts_code,trade_date,turnover_rate,volume_ratio,pe,pb'},
+            'watermark_column': 'turnover_rate',
+            'description': '每日指标（换手率、量比、市盈率、市净率）'
+        },
+        'adj_factor': {
+            'api_name': 'adj_factor',
+            'table': 'adj_factor',
+            'mode': 'per_day',
+            'params': {'fields': 'ts_code,trade_date,adj_factor'},
+            'description': '复权因子'
+        },
+        'index_daily': {
+            'api_name': 'index_daily',
+            'table': 'index_daily',
+            'mode': 'per_code',
+            'codes': ['000001.SH', '399001.SZ', '399006.SZ', '000300.SH', '000905.SH'],
+            'params': {'fields': 'ts_code,trade_date,open,high,low,close,pre_close,change,pct_chg,vol,amount'},
+            'description': '主要指数日线'
+        },
+        'index_dailybasic': {
+            'api_name': 'index_dailybasic',
+            'table': 'index_dailybasic',
+            'mode': 'per_day',
+            'params': {'fields': 'ts_code,trade_date,total_mv,float_mv,total_share,float_share,free_share,'
+                                 'turnover_rate,turnover_rate_f,pe,pe_ttm,pb'},
+            'description': '大盘指数每日指标'
+        }
+    }
 }
 
 # 测试报告统计信息
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分块规划器 - 按交易日数和单次行数上限自适应决定每次请求的股票数
+"""
+
+import logging
+from datetime import datetime
+
+import pandas as pd
+
+from .api_config import CHUNK_CONFIG
+from .trade_calendar import to_date_str
+
+
+class ChunkPlanner:
+    """多股票多日请求的分块规划
+
+    每只股票在区间内的预计行数 = max(开始日期, 上市日期) 到结束日期的交易日数，
+    按预计行数贪心装箱，使每次请求接近（但不超过）接口的单次行数上限；
+    响应行数达到上限视为被截断，只对该分块拆分重取。
+    """
+
+    def __init__(self, calendar=None, row_limits=None, fill_ratio=None, max_codes=None):
+        self.calendar = calendar
+        self.row_limits = dict(CHUNK_CONFIG['row_limits'])
+        if row_limits:
+            self.row_limits.update(row_limits)
+        self.fill_ratio = fill_ratio or CHUNK_CONFIG['fill_ratio']
+        self.max_codes = max_codes or CHUNK_CONFIG['max_codes']
+        self.logger = logging.getLogger('StockSystem.ChunkPlanner')
+        self.stats = {'chunks': 0, 'truncated': 0, 'splits': 0}
+
+    def row_limit(self, api_name):
+        """接口单次返回行数上限"""
+        return self.row_limits.get(api_name, CHUNK_CONFIG['default_row_limit'])
+
+    def count_days(self, start_date, end_date):
+        """区间交易日数；日历未覆盖时按自然日估算"""
+        start_date, end_date = to_date_str(start_date), to_date_str(end_date)
+        if start_date > end_date:
+            return 0
+        if self.calendar is not None and self.calendar.covers(start_date, end_date):
+            return self.calendar.count_open_days(start_date, end_date)
+        days = (datetime.strptime(end_date, '%Y%m%d') - datetime.strptime(start_date, '%Y%m%d')).days + 1
+        # A股每年约245个交易日，向上取整保证不低估
+        return int(days * 250 / 365) + 1
+
+    def plan(self, api_name, codes, start_date, end_date, list_dates=None):
+        """
+        规划分块
+
+        Args:
+            api_name: 接口名
+            codes: 股票代码列表
+            start_date, end_date: 请求区间
+            list_dates: {ts_code: list_date}，用于估算次新股的行数
+
+        Returns:
+            [[ts_code, ...], ...]
+        """
+        budget = max(1, int(self.row_limit(api_name) * self.fill_ratio))
+        full_days = self.count_days(start_date, end_date)
+        list_dates = list_dates or {}
+
+        # 按上市日期分组计数，避免逐只股票查询日历
+        day_cache = {}
+
+        def expected_rows(code):
+            list_date = list_dates.get(code)
+            if not list_date or pd.isna(list_date) or str(list_date) <= str(start_date):
+                return full_days
+            list_date = str(list_date)
+            if list_date not in day_cache:
+                day_cache[list_date] = self.count_days(list_date, end_date)
+            return day_cache[list_date]
+
+        chunks, current, rows = [], [], 0
+        for code in codes:
+            code_rows = expected_rows(code)
+            if current and (rows + code_rows > budget or len(current) >= self.max_codes):
+                chunks.append(current)
+                current, rows = [], 0
+            current.append(code)
+            rows += code_rows
+        if current:
+            chunks.append(current)
+
+        self.stats['chunks'] += len(chunks)
+        self.logger.info(f"{api_name}: {len(codes)} 只股票 x {full_days} 个交易日 -> {len(chunks)} 次请求 "
+                         f"(单次上限 {self.row_limit(api_name)} 行)")
+        return chunks
+
+    def is_truncated(self, api_name, df):
+        """返回行数达到单次上限即视为被截断"""
+        return df is not None and len(df) >= self.row_limit(api_name)
+
+    def split_range(self, start_date, end_date):
+        """把日期区间按交易日对半拆分，无法再拆返回None"""
+        start_date, end_date = to_date_str(start_date), to_date_str(end_date)
+        if self.calendar is not None and self.calendar.covers(start_date, end_date):
+            days = self.calendar.open_days(start_date, end_date)
+            if len(days) < 2:
+                return None
+            mid = len(days) // 2
+            return (start_date, days[mid - 1]), (days[mid], end_date)
+
+        dates = pd.date_range(start_date, end_date, freq='D')
+        if len(dates) < 2:
+            return None
+        mid = len(dates) // 2
+        return ((start_date, dates[mid - 1].strftime('%Y%m%d')),
+                (dates[mid].strftime('%Y%m%d'), end_date))
+
+    def fetch_market_day(self, api_name, fetch, trade_date, codes):
+        """
+        单日全市场查询，响应被截断时按股票分块重取当日数据
+
+        Args:
+            fetch: fetch(codes, start_date, end_date) -> DataFrame，codes 为 None 时请求全市场
+            codes: codes() -> 当日应有数据的股票代码，只在响应被截断时调用
+        """
+        df = fetch(None, trade_date, trade_date)
+        if not self.is_truncated(api_name, df):
+            return df
+
+        self.stats['truncated'] += 1
+        # 截断的响应里出现的代码也要重取（如股票列表中没有的已退市股票）
+        all_codes = sorted(set(codes()) | set(df['ts_code'] if 'ts_code' in df.columns else []))
+        if not all_codes:
+            self.logger.warning(f"{api_name} {trade_date} 全市场数据达到行数上限，没有股票列表，无法按股票拆分")
+            return df
+
+        self.stats['splits'] += 1
+        chunks = self.plan(api_name, all_codes, trade_date, trade_date)
+        self.logger.info(f"{api_name} {trade_date} 全市场返回 {len(df)} 行达到上限，按股票拆分为 {len(chunks)} 次请求")
+        frames = [self.fetch_complete(api_name, fetch, chunk, trade_date, trade_date) for chunk in chunks]
+        frames = [frame for frame in frames if frame is not None and not frame.empty]
+        if not frames:
+            return df.iloc[0:0]
+        return pd.concat(frames, ignore_index=True)
+
+    def fetch_complete(self, api_name, fetch, codes, start_date, end_date):
+        """
+        获取分块数据，响应被截断时只拆分该分块重取
+
+        多只股票按股票对半拆分，单只股票按日期区间对半拆分。
+
+        Args:
+            fetch: fetch(codes, start_date, end_date) -> DataFrame
+        """
+        df = fetch(codes, start_date, end_date)
+        if not self.is_truncated(api_name, df):
+            return df
+
+        self.stats['truncated'] += 1
+        if len(codes) > 1:
+            mid = len(codes) // 2
+            parts = [(codes[:mid], start_date, end_date), (codes[mid:], start_date, end_date)]
+        else:
+            ranges = self.split_range(start_date, end_date)
+            if ranges is None:
+                self.logger.warning(f"{api_name} {codes[0]} {start_date} 单日数据仍达到行数上限，无法再拆分")
+                return df
+            parts = [(codes, sub_start, sub_end) for sub_start, sub_end in ranges]
+
+        self.stats['splits'] += 1
+        self.logger.info(f"{api_name} 返回 {len(df)} 行达到上限，拆分为 {len(parts)} 个子分块重取")
+        frames = [self.fetch_complete(api_name, fetch, *part) for part in parts]
+        frames = [frame for frame in frames if frame is not None and not frame.empty]
+        if not frames:
+            return df.iloc[0:0]
+        return pd.concat(frames, ignore_index=True)
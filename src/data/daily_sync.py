@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+每日追平同步 - 找出各数据集上次同步之后的全部交易日，逐日取全市场数据并在一条流水线中入库
+"""
+
+import logging
+from datetime import datetime
+
+from .api_config import CATCHUP_CONFIG
+from .chunk_planner import ChunkPlanner
+from .processors import clean_frame
+from .trade_calendar import get_trade_calendar, shift_date
+from .providers import classify_error
+from .providers.retry_provider import PERMISSION_DENIED
+from .quota_ledger import QUOTA_EXCEEDED
+
+
+class DailySync:
+    """每日追平同步
+
+    每个数据集的水位（已连续同步到的交易日）记录在 sync_state 表；没有记录时取表中
+    最新的交易日。水位之后直到 end_date 的每个交易日生成一个全市场请求，所有数据集
+    的请求交错放入同一条入库流水线，由调度器按各接口限频并发抓取。
+
+    某日返回空数据（如当天尚未收盘更新）或失败时，水位停在该日之前，下次同步重新请求。
+    """
+
+    def __init__(self, db_manager, pipeline, fetch, calendar=None, ledger=None):
+        """
+        Args:
+            pipeline: IngestPipeline
+            fetch: fetch(api_name, **params) -> DataFrame，应经过调度器限频
+            ledger: 额度台账，提供时请求总数超出当日剩余额度则不开始同步
+        """
+        self.db_manager = db_manager
+        self.pipeline = pipeline
+        self.fetch = fetch
+        self.calendar = calendar or get_trade_calendar(db_manager)
+        self.ledger = ledger
+        self.chunk_planner = ChunkPlanner(self.calendar)
+        self.datasets = CATCHUP_CONFIG['datasets']
+        self.logger = logging.getLogger('StockSystem.DailySync')
+
+    def get_watermark(self, name):
+        """数据集已同步到的交易日，从未同步且表为空时返回None"""
+        rows = self.db_manager.execute_query("SELECT last_date FROM sync_state WHERE dataset = ?", (name,))
+        if rows and rows[0][0]:
+            return rows[0][0]
+
+        config = self.datasets[name]
+        if not self.db_manager.table_exists(config['table']):
+            return None
+        condition = f" WHERE {config['watermark_column']} IS NOT NULL" if config.get('watermark_column') else ''
+        return self.db_manager.execute_query(f"SELECT MAX(trade_date) FROM {config['table']}{condition}")[0][0]
+
+    def plan(self, datasets=None, end_date=None):
+        """
+        生成追平请求
+
+        Returns:
+            dict: {数据集: [交易日, ...]}，只包含需要同步的数据集
+        """
+        if not self.calendar.last_date:
+            self.logger.warning("交易日历为空，请先更新交易日历")
+            return {}
+        end_date = min(end_date or datetime.now().strftime('%Y%m%d'), self.calendar.last_date)
+        end_date = self.calendar.latest_open(end_date)
+        if end_date is None:
+            return {}
+
+        plans = {}
+        for name in datasets or self.datasets:
+            watermark = self.get_watermark(name)
+            if watermark:
+                days = self.calendar.open_days(shift_date(watermark, 1), end_date)
+            else:
+                days = self.calendar.open_days(self.calendar.first_date, end_date)
+                days = days[-CATCHUP_CONFIG['initial_days']:]
+            if days:
+                plans[name] = days
+        return plans
+
+    def _tasks(self, plans):
+        """按交易日交错排列各数据集的请求，最新交易日优先"""
+        tasks = []
+        for name, days in plans.items():
+            config = self.datasets[name]
+            if config['mode'] == 'per_code':
+                tasks.extend((name, code, days[0], days[-1]) for code in config['codes'])
+            else:
+                tasks.extend((name, day, day, day) for day in days)
+        return sorted(tasks, key=lambda task: task[3], reverse=True)
+
+    def run(self, datasets=None, end_date=None, progress=None):
+        """
+        执行追平同步
+
+        Args:
+            datasets: 要同步的数据集，默认 CATCHUP_CONFIG 中的全部
+            progress: progress(message) 进度回调
+
+        Returns:
+            tuple: (成功与否, 写入记录数, 消息, {数据集: 结果})
+        """
+        plans = self.plan(datasets, end_date)
+        if not plans:
+            return True, 0, "各数据集已同步到最新交易日", {}
+
+        tasks = self._tasks(plans)
+        if self.ledger is not None:
+            calls = {}
+            for task in tasks:
+                api_name = self.datasets[task[0]]['api_name']
+                calls[api_name] = calls.get(api_name, 0) + 1
+            affordable, message = self.ledger.afford(calls)
+            if not affordable:
+                self.logger.warning(message)
+                return False, 0, f"{message}，本次不追平", {}
+        if progress:
+            progress(f"追平 {len(plans)} 个数据集，共 {len(tasks)} 个请求")
+
+        def fetch(task):
+            name, key, start_date, end_date = task
+            config = self.datasets[name]
+            if config['mode'] == 'per_code':
+                return self.fetch(config['api_name'], ts_code=key, start_date=start_date,
+                                  end_date=end_date, **config['params'])
+
+            def fetch_codes(codes, trade_date, _end_date):
+                if codes is None:
+                    return self.fetch(config['api_name'], trade_date=trade_date, **config['params'])
+                return self.fetch(config['api_name'], ts_code=','.join(codes), trade_date=trade_date,
+                                  **config['params'])
+
+            # 全市场响应达到行数上限时按股票拆分重取
+            return self.chunk_planner.fetch_market_day(config['api_name'], fetch_codes, key,
+                                                       lambda: self.db_manager.listed_codes(key))
+
+        def transform(task, df):
+            return clean_frame(self.datasets[task[0]]['api_name'], df)
+
+        def write(conn, task, df):
+            return self.db_manager.upsert_dataframe(conn, self.datasets[task[0]]['table'], df)
+
+        outcomes = {name: {} for name in plans}  # 数据集 -> {交易日或代码: (记录数, 错误)}
+        denied = set()
+        finished = 0
+        for task, records, error in self.pipeline.run(
+                (task for task in tasks if task[0] not in denied), fetch, write, transform):
+            finished += 1
+            name = task[0]
+            if error is not None:
+                self.logger.warning(f"{name} {task[1]} 同步失败: {error}")
+                if classify_error(error) in (PERMISSION_DENIED, QUOTA_EXCEEDED):
+                    # 没有权限或额度用完时该数据集后续请求也会失败，不再请求
+                    denied.add(name)
+            outcomes[name][task[1]] = (records, error)
+            if progress and finished % 20 == 0:
+                progress(f"已完成 {finished}/{len(tasks)} 个请求")
+
+        results = {name: self._finish(name, plans[name], outcomes[name], name in denied) for name in plans}
+        total_records = sum(result['records'] for result in results.values())
+        failed = [name for name, result in results.items() if result['failed']]
+        message = f"追平同步写入 {total_records} 条记录" + \
+            (f"，{len(failed)} 个数据集未完成: {', '.join(failed)}" if failed else '')
+        self.logger.info(message)
+        return not failed, total_records, message, results
+
+    def _finish(self, name, days, outcomes, denied):
+        """推进数据集水位：从水位之后连续成功且有数据的交易日"""
+        config = self.datasets[name]
+        records = sum(result[0] for result in outcomes.values())
+        errors = [str(result[1]) for result in outcomes.values() if result[1] is not None]
+
+        last_date = None
+        if config['mode'] == 'per_code':
+            if not errors and len(outcomes) == len(config['codes']) and records:
+                last_date = self.db_manager.execute_query(
+                    f"SELECT MAX(trade_date) FROM {config['table']} WHERE trade_date <= ?", (days[-1],))[0][0]
+        else:
+            for day in days:
+                result = outcomes.get(day)
+                if result is None or result[1] is not None or not result[0]:
+                    break
+                last_date = day
+
+        if last_date:
+            conn = self.db_manager.get_connection()
+            try:
+                conn.execute("INSERT OR REPLACE INTO sync_state (dataset, last_date, records, update_time) "
+                             "VALUES (?, ?, ?, ?)",
+                             (name, last_date, records, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+                conn.commit()
+            finally:
+                conn.close()
+
+        result = {
+            'days': len(days),
+            'start_date': days[0],
+            'records': records,
+            'last_date': last_date,
+            'failed': bool(errors) or denied,
+            'message': f"{config['description']}: {days[0]}~{days[-1]} 写入 {records} 条" +
+                       (f"，{len(errors)} 个请求失败" if errors else '')
+        }
+        self.logger.info(result['message'])
+        return result
@@ -1,502 +1,30 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-数据初始化器 - 负责执行分批数据初始化
+数据初始化器 - 在Qt线程中运行数据接入引擎，把引擎事件转为Qt信号
 """
 
-import os
-import time
-import logging
-import pandas as pd
-from datetime import datetime
 from PyQt5.QtCore import QThread, pyqtSignal
 
-from .database_manager import DatabaseManager
-from .api_config import BATCH_1_APIS, BATCH_2_APIS, BATCH_3_APIS, get_time_range, DATA_SOURCE_MAPPING
+from .ingestion_engine import IngestionEngine
 
-class DataInitializer(QThread):
-    """数据初始化器"""
+class DataInitializer(QThread, IngestionEngine):
+    """数据初始化器（IngestionEngine 的Qt适配层）"""
     
     progress_updated = pyqtSignal(int, str)
     batch_completed = pyqtSignal(str, bool, str)
     finished_signal = pyqtSignal(bool, str, dict)
+    data_available = pyqtSignal(str, str, str)  # 表名, 起始日期, 截止日期
     
-    def __init__(self, batches=['batch_1'], token_config=None):
-        super().__init__()
-        self.batches = batches
-        self.token_config = token_config
-        self.db_manager = DatabaseManager()
-        self.pro = None
-        self.results = {}
-        self.logger = logging.getLogger('StockSystem.DataInitializer')
+    def __init__(self, batches=['batch_1'], token_config=None, resume=True, progressive=None):
+        # QThread 按协作式多继承把关键字参数传给 IngestionEngine.__init__
+        super().__init__(batches=batches, token_config=token_config, resume=resume,
+                         progressive=progressive)
+        self.subscribe('progress', self.progress_updated.emit)
+        self.subscribe('batch_completed', self.batch_completed.emit)
+        self.subscribe('finished', self.finished_signal.emit)
+        self.subscribe('data_available', self.data_available.emit)
         
     def run(self):
         """执行数据初始化"""
-        try:
-            self.logger.info("开始数据初始化")
-            # 1. 初始化API连接
-            self.logger.info("初始化API连接...")
-            if not self._init_api_connection():
-                self.logger.error("API连接初始化失败")
-                self.finished_signal.emit(False, "API连接初始化失败", {})
-                return
-                
-            # 2. 创建数据库表
-            self.logger.info("创建数据库表...")
-            self.progress_updated.emit(5, "创建数据库表...")
-            self.db_manager.create_all_tables()
-            self.logger.info("数据库表创建完成")
-            
-            # 3. 执行各批次初始化
-            total_progress = 0
-            batch_configs = self._get_batch_configs()
-            
-            for i, (batch_name, apis) in enumerate(batch_configs.items()):
-                if batch_name not in self.batches:
-                    continue
-                    
-                self.logger.info(f"开始执行 {batch_name}...")
-                self.progress_updated.emit(10 + i * 30, f"开始执行 {batch_name}...")
-                
-                success, message, batch_results = self._execute_batch(batch_name, apis)
-                self.results[batch_name] = batch_results
-                
-                self.logger.info(f"{batch_name} 执行结果: {message}")
-                self.batch_completed.emit(batch_name, success, message)
-                
-                if not success and batch_name == 'batch_1':
-                    # 第1批失败则终止
-                    self.finished_signal.emit(False, f"关键批次失败: {message}", self.results)
-                    return
-                    
-            self.progress_updated.emit(100, "数据初始化完成")
-            self.finished_signal.emit(True, "数据初始化成功完成", self.results)
-            
-        except Exception as e:
-            self.finished_signal.emit(False, f"初始化过程出错: {str(e)}", self.results)
-            
-    def _init_api_connection(self):
-        """初始化API连接"""
-        try:
-            if not self.token_config:
-                self.logger.error("未找到token配置")
-                return False
-                
-            self.logger.info(f"Token类型: {self.token_config.get('token_type', 'tushare')}")
-            
-            if self.token_config.get('token_type') == 'tudata':
-                try:
-                    import tudata as ts
-                    self.logger.info("使用tudata库")
-                except ImportError:
-                    self.logger.warning("tudata库未安装，使用tushare库")
-                    import tushare as ts
-            else:
-                import tushare as ts
-                self.logger.info("使用tushare库")
-                
-            ts.set_token(self.token_config['token'])
-            self.pro = ts.pro_api()
-            self.logger.info("API连接初始化完成")
-            
-            # 测试连接
-            self.logger.info("测试API连接...")
-            test_df = self.pro.stock_basic(exchange='', list_status='L', limit=1)
-            if len(test_df) > 0:
-                self.logger.info("API连接测试成功")
-                return True
-            else:
-                self.logger.error("API返回空数据")
-                return False
-            
-        except Exception as e:
-            self.logger.error(f"API连接失败: {e}")
-            return False
-            
-    def _get_batch_configs(self):
-        """获取批次配置"""
-        return {
-            'batch_1': BATCH_1_APIS,
-            'batch_2': BATCH_2_APIS, 
-            'batch_3': BATCH_3_APIS
-        }
-        
-    def _execute_batch(self, batch_name, apis):
-        """执行单个批次"""
-        # 初始化时清空相关表数据
-        if batch_name == 'batch_1':
-            self.progress_updated.emit(-1, "清空旧数据...")
-            self._clear_batch_tables(batch_name, apis)
-        elif batch_name == 'batch_2':
-            self.progress_updated.emit(-1, "清空行情数据...")
-            self._clear_batch_tables(batch_name, apis)
-            
-        batch_results = {
-            'total_apis': len(apis),
-            'completed_apis': 0,
-            'failed_apis': 0,
-            'total_records': 0,
-            'api_details': {}
-        }
-        
-        for api_key, config in apis.items():
-            self.progress_updated.emit(-1, f"正在处理 {config['description']}...")
-            
-            # 记录开始时间
-            start_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            self._update_progress_db(batch_name, api_key, 'running', start_time)
-            
-            try:
-                success, records, message = self._execute_single_api(api_key, config)
-                
-                end_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                
-                if success:
-                    batch_results['completed_apis'] += 1
-                    batch_results['total_records'] += records
-                    self._update_progress_db(batch_name, api_key, 'completed', start_time, end_time, records)
-                else:
-                    batch_results['failed_apis'] += 1
-                    self._update_progress_db(batch_name, api_key, 'failed', start_time, end_time, 0, message)
-                
-                batch_results['api_details'][api_key] = {
-                    'success': success,
-                    'records': records,
-                    'message': message
-                }
-                
-            except Exception as e:
-                batch_results['failed_apis'] += 1
-                error_msg = f"API执行异常: {str(e)}"
-                batch_results['api_details'][api_key] = {
-                    'success': False,
-                    'records': 0,
-                    'message': error_msg
-                }
-                self._update_progress_db(batch_name, api_key, 'failed', start_time, 
-                                       datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 0, error_msg)
-        
-        # 判断批次是否成功
-        success_rate = batch_results['completed_apis'] / batch_results['total_apis']
-        batch_success = success_rate >= 0.8  # 80%成功率
-        
-        message = f"{batch_name} 完成: {batch_results['completed_apis']}/{batch_results['total_apis']} APIs, {batch_results['total_records']} 条记录"
-        
-        return batch_success, message, batch_results
-        
-    def _execute_single_api(self, api_key, config):
-        """执行单个API - 基于测试报告中成功的API"""
-        try:
-            api_name = config['api_name']
-            table_name = config['table']
-            params = config['params'].copy()
-            
-            # 处理时间范围
-            if 'time_range' in config:
-                start_date, end_date = get_time_range(config['time_range'])
-                params['start_date'] = start_date
-                params['end_date'] = end_date
-            
-            # 根据测试报告，只调用成功的API
-            if api_name == 'stock_basic':
-                # ✅ 测试成功: 5,453行数据
-                df = self.pro.stock_basic(**params)
-            elif api_name == 'stock_company':
-                # ✅ 测试成功: 2,431行数据
-                df = self.pro.stock_company(**params)
-            elif api_name == 'trade_cal':
-                # ✅ 测试成功: 370行数据
-                df = self.pro.trade_cal(**params)
-            elif api_name == 'new_share':
-                # ✅ 测试成功: 112行数据
-                df = self.pro.new_share(**params)
-            elif api_name == 'daily':
-                # ✅ 测试成功: 支持单日全市场和多股票多日查询
-                return self._execute_daily_data(config)
-            elif api_name == 'weekly':
-                # ✅ 测试成功: 112行数据
-                return self._execute_period_data('weekly', config)
-            elif api_name == 'monthly':
-                # ✅ 测试成功: 44行数据
-                return self._execute_period_data('monthly', config)
-            elif api_name == 'adj_factor':
-                # ✅ 测试成功: 492行数据
-                df = self.pro.adj_factor(**params)
-            elif api_name == 'index_dailybasic':
-                # ✅ 测试成功: 1行数据
-                df = self.pro.index_dailybasic(**params)
-            elif api_name == 'stk_mins':
-                # ❌ 测试失败: 需要单独权限，跳过此API
-                self.logger.warning(f"跳过 {api_name}: 需要单独申请分钟数据权限")
-                return False, 0, "需要单独申请分钟数据权限，已跳过"
-            else:
-                # 对于其他API，先检查是否在成功列表中
-                successful_apis = [
-                    'stock_basic', 'stock_company', 'trade_cal', 'new_share',
-                    'daily', 'weekly', 'monthly', 'adj_factor', 'index_dailybasic'
-                ]
-                if api_name not in successful_apis:
-                    self.logger.warning(f"API {api_name} 未在测试成功列表中，尝试调用")
-                
-                # 尝试通用调用
-                try:
-                    api_func = getattr(self.pro, api_name)
-                    df = api_func(**params)
-                except AttributeError:
-                    return False, 0, f"API {api_name} 不存在或权限不足"
-            
-            if df.empty:
-                return False, 0, f"API {api_name} 返回空数据"
-            
-            # 添加数据源标识
-            if 'src' in config:
-                df['src'] = config['src']
-            
-            # 添加索引类型（用于成分股数据）
-            if 'index_type' in config:
-                df['index_type'] = config['index_type']
-            
-            # 检查是否已有update_time列
-            if 'update_time' in df.columns:
-                df = df.drop('update_time', axis=1)
-                
-            # 处理数据类型问题
-            if api_name == 'index_basic' and 'base_point' in df.columns:
-                df['base_point'] = pd.to_numeric(df['base_point'], errors='coerce')
-            
-            # 修复index_dailybasic数据类型问题
-            if api_name == 'index_dailybasic':
-                # 处理字典对象问题，将所有列转换为字符串后再转数值
-                for col in df.columns:
-                    if col not in ['ts_code', 'trade_date']:
-                        # 先转为字符串，处理字典对象
-                        df[col] = df[col].astype(str)
-                        # 将空字典和无效值替换为NaN
-                        df[col] = df[col].replace(['{}',' {}', 'nan', 'None', ''], None)
-                        # 转换为数值类型
-                        df[col] = pd.to_numeric(df[col], errors='coerce')
-                        # 替换无穷大值
-                        df[col] = df[col].replace([float('inf'), float('-inf')], None)
-            
-            # 保存到数据库（使用replace模式避免重复）
-            try:
-                records = self.db_manager.execute_insert(table_name, df, mode='replace')
-            except Exception as insert_error:
-                self.logger.error(f"数据插入失败: {insert_error}")
-                
-                # 尝试更彻底的数据清理
-                try:
-                    df_clean = df.copy()
-                    for col in df_clean.columns:
-                        if col not in ['ts_code', 'trade_date', 'update_time']:
-                            # 先转为字符串处理字典对象
-                            df_clean[col] = df_clean[col].astype(str)
-                            df_clean[col] = df_clean[col].replace(['{}',' {}', 'nan', 'None', ''], None)
-                            # 再转换为数值
-                            df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
-                            df_clean[col] = df_clean[col].replace([float('inf'), float('-inf')], None)
-                        elif df_clean[col].dtype == 'object' and col != 'update_time':
-                            df_clean[col] = df_clean[col].astype(str).replace(['{}', 'nan', 'None'], None)
-                    
-                    self.db_manager.clear_table_data(table_name)
-                    records = self.db_manager.execute_insert(table_name, df_clean, mode='append')
-                    
-                except Exception as retry_error:
-                    self.logger.error(f"重试插入失败: {retry_error}")
-                    return False, 0, f"数据插入失败: {str(insert_error)}"
-            
-            return True, records, f"成功获取 {records} 条记录"
-            
-        except Exception as e:
-            self.logger.error(f"API {api_key} 调用失败: {str(e)}")
-            return False, 0, f"API调用失败: {str(e)}"
-            
-    def _execute_daily_data(self, config):
-        """执行日线数据获取 - 基于测试报告优化策略"""
-        try:
-            start_date, end_date = get_time_range(config['time_range'])
-            
-            # 根据测试报告，优先使用批量查询方式
-            strategy = config.get('strategy', 'batch_query')
-            
-            if strategy == 'single_date_all':
-                # 策略1: 单日全市场查询 (测试成功: 5,444行/1.14秒)
-                self.progress_updated.emit(-1, "使用单日全市场查询策略...")
-                return self._execute_single_date_all_market(config, start_date, end_date)
-            
-            elif strategy == 'multi_stock_multi_date':
-                # 策略2: 多股票多日查询 (测试成功: 738行/0.23秒)
-                self.progress_updated.emit(-1, "使用多股票多日查询策略...")
-                return self._execute_multi_stock_multi_date(config, start_date, end_date)
-            
-            else:
-                # 默认策略: 混合模式
-                self.progress_updated.emit(-1, "使用混合查询策略...")
-                return self._execute_hybrid_daily_strategy(config, start_date, end_date)
-            
-        except Exception as e:
-            return False, 0, f"日线数据获取失败: {str(e)}"
-    
-    def _execute_single_date_all_market(self, config, start_date, end_date):
-        """单日全市场查询策略"""
-        try:
-            from datetime import datetime, timedelta
-            
-            total_records = 0
-            current_date = datetime.strptime(start_date, '%Y%m%d')
-            end_date_obj = datetime.strptime(end_date, '%Y%m%d')
-            
-            while current_date <= end_date_obj:
-                date_str = current_date.strftime('%Y%m%d')
-                
-                try:
-                    # 单日全市场查询
-                    df = self.pro.daily(trade_date=date_str)
-                    if not df.empty:
-                        records = self.db_manager.execute_insert(config['table'], df, mode='append')
-                        total_records += records
-                        self.logger.info(f"获取 {date_str} 数据: {records} 条")
-                    
-                    time.sleep(0.2)  # API限频
-                    
-                except Exception as e:
-                    self.logger.warning(f"获取 {date_str} 数据失败: {e}")
-                
-                current_date += timedelta(days=1)
-            
-            return True, total_records, f"成功获取 {total_records} 条日线记录"
-            
-        except Exception as e:
-            return False, 0, f"单日全市场查询失败: {str(e)}"
-    
-    def _execute_multi_stock_multi_date(self, config, start_date, end_date):
-        """多股票多日查询策略"""
-        try:
-            # 获取股票列表
-            stocks_df = self.pro.stock_basic(exchange='', list_status='L', fields='ts_code')
-            stock_codes = stocks_df['ts_code'].tolist()
-            
-            batch_size = config.get('batch_size', 50)  # 根据测试结果调整批次大小
-            total_records = 0
-            
-            for i in range(0, len(stock_codes), batch_size):
-                batch_codes = stock_codes[i:i+batch_size]
-                codes_str = ','.join(batch_codes)
-                
-                self.progress_updated.emit(-1, f"处理批次 {i//batch_size + 1}/{len(stock_codes)//batch_size + 1}...")
-                
-                try:
-                    # 多股票多日查询
-                    df = self.pro.daily(ts_code=codes_str, start_date=start_date, end_date=end_date)
-                    if not df.empty:
-                        records = self.db_manager.execute_insert(config['table'], df, mode='append')
-                        total_records += records
-                        self.logger.info(f"批次 {i//batch_size + 1} 获取数据: {records} 条")
-                    
-                    time.sleep(0.3)  # API限频
-                    
-                except Exception as e:
-                    self.logger.warning(f"批次 {i//batch_size + 1} 获取失败: {e}")
-                    continue
-            
-            return True, total_records, f"成功获取 {total_records} 条日线记录"
-            
-        except Exception as e:
-            return False, 0, f"多股票多日查询失败: {str(e)}"
-    
-    def _execute_hybrid_daily_strategy(self, config, start_date, end_date):
-        """混合查询策略 - 结合两种方式的优势"""
-        try:
-            # 先尝试多股票多日查询（效率更高）
-            success, records, message = self._execute_multi_stock_multi_date(config, start_date, end_date)
-            
-            if success and records > 0:
-                return True, records, f"混合策略成功: {message}"
-            
-            # 如果失败，回退到单日全市场查询
-            self.logger.info("多股票查询失败，回退到单日查询")
-            return self._execute_single_date_all_market(config, start_date, end_date)
-            
-        except Exception as e:
-            return False, 0, f"混合策略失败: {str(e)}"
-            
-    def _execute_period_data(self, period_type, config):
-        """执行周线/月线数据获取 - 基于测试报告优化"""
-        try:
-            start_date, end_date = get_time_range(config['time_range'])
-            
-            # 根据测试报告，使用多股票查询方式
-            # 周线测试成功: 112行/0.16秒, 月线测试成功: 44行/0.13秒
-            
-            # 获取主要股票代码进行测试
-            test_codes = config.get('test_codes', '000001.SZ,600000.SH')
-            
-            if period_type == 'weekly':
-                df = self.pro.weekly(ts_code=test_codes, start_date=start_date, end_date=end_date)
-            else:  # monthly
-                df = self.pro.monthly(ts_code=test_codes, start_date=start_date, end_date=end_date)
-            
-            if df.empty:
-                return False, 0, f"{period_type} 数据为空"
-            
-            records = self.db_manager.execute_insert(config['table'], df)
-            
-            # 记录成功信息
-            self.logger.info(f"{period_type} 数据获取成功: {records} 条记录")
-            
-            return True, records, f"成功获取 {records} 条{period_type}记录"
-            
-        except Exception as e:
-            self.logger.error(f"{period_type}数据获取失败: {str(e)}")
-            return False, 0, f"{period_type}数据获取失败: {str(e)}"
-            
-    def _update_progress_db(self, batch_name, api_name, status, start_time, end_time=None, records=0, error_msg=None):
-        """更新进度数据库"""
-        try:
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO init_progress 
-                (batch_name, api_name, status, start_time, end_time, progress, total_records, error_msg)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (batch_name, api_name, status, start_time, end_time, 100 if status == 'completed' else 0, records, error_msg))
-            
-            conn.commit()
-            conn.close()
-            
-        except Exception as e:
-            print(f"更新进度失败: {e}")
-            
-    def load_token_config(self):
-        """加载token配置"""
-        try:
-            config_file = "config/token_config.txt"
-            if not os.path.exists(config_file):
-                self.logger.error(f"Token配置文件不存在: {config_file}")
-                return None
-                
-            config = {}
-            with open(config_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if '=' in line and not line.startswith('#'):
-                        key, value = line.split('=', 1)
-                        config[key.strip()] = value.strip()
-            
-            self.logger.info(f"加载到token配置: {list(config.keys())}")
-            return config
-        except Exception as e:
-            self.logger.error(f"加载token配置失败: {e}")
-            return None
-            
-    def _clear_batch_tables(self, batch_name, apis):
-        """清空批次相关表数据"""
-        try:
-            for api_key, config in apis.items():
-                table_name = config.get('table')
-                if table_name:
-                    self.logger.info(f"清空表 {table_name} 的数据")
-                    self.db_manager.clear_table_data(table_name)
-        except Exception as e:
-            self.logger.warning(f"清空表数据失败: {e}")
\ No newline at end of file
+        IngestionEngine.run(self)
@@ -6,7 +6,9 @@
 
 import os
 import sqlite3
-from datetime import datetime
+
+from .storage.schema_registry import get_schema_registry
+from .storage.bulk_writer import get_bulk_writer
 
 class DatabaseManager:
     """数据库管理器"""
@@ -38,6 +40,12 @@ class DatabaseManager:
         # 系统表
         self._create_system_tables(cursor)
         
+        # 修复曾被整表替换而丢失主键/索引的表
+        registry = get_schema_registry(self)
+        for table_name in registry.tables:
+            if not registry.matches(conn, table_name):
+                registry.rebuild(conn, table_name)
+        
         # 创建索引
         self._create_indexes(cursor)
         
@@ -63,6 +71,50 @@ class DatabaseManager:
             )
         ''')
         
+        # 上市公司基本信息表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stock_company (
+                ts_code TEXT PRIMARY KEY,
+                com_name TEXT,
+                com_id TEXT,
+                exchange TEXT,
+                chairman TEXT,
+                manager TEXT,
+                secretary TEXT,
+                reg_capital REAL,
+                setup_date TEXT,
+                province TEXT,
+                city TEXT,
+                introduction TEXT,
+                website TEXT,
+                email TEXT,
+                office TEXT,
+                employees INTEGER,
+                main_business TEXT,
+                business_scope TEXT,
+                update_time TEXT
+            )
+        ''')
+        
+        # IPO新股列表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS new_share (
+                ts_code TEXT PRIMARY KEY,
+                sub_code TEXT,
+                name TEXT,
+                ipo_date TEXT,
+                issue_date TEXT,
+                amount REAL,
+                market_amount REAL,
+                price REAL,
+                pe REAL,
+                limit_amount REAL,
+                funds REAL,
+                ballot REAL,
+                update_time TEXT
+            )
+        ''')
+        
         # 交易日历表
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS trade_calendar (
@@ -197,6 +249,53 @@ class DatabaseManager:
             )
         ''')
         
+        # 复权因子表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS adj_factor (
+                ts_code TEXT,
+                trade_date TEXT,
+                adj_factor REAL,
+                update_time TEXT,
+                PRIMARY KEY (ts_code, trade_date)
+            )
+        ''')
+        
+        # 大盘指数每日指标表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS index_dailybasic (
+                ts_code TEXT,
+                trade_date TEXT,
+                total_mv REAL,
+                float_mv REAL,
+                total_share REAL,
+                float_share REAL,
+                free_share REAL,
+                turnover_rate REAL,
+                turnover_rate_f REAL,
+                pe REAL,
+                pe_ttm REAL,
+                pb REAL,
+                update_time TEXT,
+                PRIMARY KEY (ts_code, trade_date)
+            )
+        ''')
+        
+        # 分钟行情表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stock_mins (
+                ts_code TEXT,
+                trade_time TEXT,
+                open REAL,
+                close REAL,
+                high REAL,
+                low REAL,
+                vol REAL,
+                amount REAL,
+                update_time TEXT,
+                PRIMARY KEY (ts_code, trade_time)
+            )
+        ''')
+        
     def _create_extended_tables(self, cursor):
         """创建扩展数据表"""
         
@@ -248,6 +347,94 @@ class DatabaseManager:
             )
         ''')
         
+        # 初始化分块检查点表（断点续传）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS init_chunk_progress (
+                batch_name TEXT,
+                api_name TEXT,
+                chunk_key TEXT,
+                start_date TEXT,
+                end_date TEXT,
+                status TEXT,
+                records INTEGER,
+                update_time TEXT,
+                PRIMARY KEY (batch_name, api_name, chunk_key, start_date, end_date)
+            )
+        ''')
+        
+        # 修复队列表（重试后仍失败的分块，等待补抓）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS repair_queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT,
+                api_name TEXT,
+                params TEXT,
+                error_type TEXT,
+                error_msg TEXT,
+                attempts INTEGER DEFAULT 1,
+                status TEXT DEFAULT 'pending',
+                create_time TEXT,
+                update_time TEXT,
+                UNIQUE (api_name, params)
+            )
+        ''')
+        
+        # 本地重采样水位表（周线/月线等派生表已处理到的日线变更记录id）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS resample_state (
+                table_name TEXT PRIMARY KEY,
+                watermark TEXT,
+                update_time TEXT
+            )
+        ''')
+        
+        # 数据变更记录（每次写入日线等源表时记录涉及的交易日区间和股票，供派生表只重算受影响的周期）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS data_change_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT,
+                start_date TEXT,
+                end_date TEXT,
+                ts_codes TEXT,
+                update_time TEXT
+            )
+        ''')
+        
+        # 每日追平同步水位表（各数据集已连续同步到的交易日）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sync_state (
+                dataset TEXT PRIMARY KEY,
+                last_date TEXT,
+                records INTEGER,
+                update_time TEXT
+            )
+        ''')
+        
+        # 停牌区间表（每行为一只股票连续停牌的交易日区间，含两端）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS stock_suspension (
+                ts_code TEXT,
+                start_date TEXT,
+                end_date TEXT,
+                update_time TEXT,
+                PRIMARY KEY (ts_code, start_date)
+            )
+        ''')
+        
+        # 接口额度用量表（每个 token 每个接口每分钟一行）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS api_quota_usage (
+                minute TEXT,
+                token TEXT,
+                api_name TEXT,
+                calls INTEGER,
+                row_count INTEGER,
+                errors INTEGER,
+                update_time TEXT,
+                PRIMARY KEY (minute, token, api_name)
+            )
+        ''')
+        
         # 数据完整性日志表
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS data_integrity_log (
@@ -269,9 +456,11 @@ class DatabaseManager:
             "CREATE INDEX IF NOT EXISTS idx_daily_code_date ON daily_basic(ts_code, trade_date)",
             "CREATE INDEX IF NOT EXISTS idx_daily_date ON daily_basic(trade_date)",
             "CREATE INDEX IF NOT EXISTS idx_index_daily_code_date ON index_daily(ts_code, trade_date)",
+            "CREATE INDEX IF NOT EXISTS idx_adj_factor_date ON adj_factor(trade_date)",
             "CREATE INDEX IF NOT EXISTS idx_stock_basic_market ON stock_basic(market)",
             "CREATE INDEX IF NOT EXISTS idx_stock_basic_industry ON stock_basic(industry)",
             "CREATE INDEX IF NOT EXISTS idx_trade_calendar_date ON trade_calendar(cal_date)",
+            "CREATE INDEX IF NOT EXISTS idx_integrity_table_date ON data_integrity_log(table_name, trade_date)",
             "CREATE INDEX IF NOT EXISTS idx_industry_src ON industry_classify(src)",
             "CREATE INDEX IF NOT EXISTS idx_concept_src ON concept_classify(src)",
         ]
@@ -297,18 +486,49 @@ class DatabaseManager:
         conn.close()
         return results
         
-    def execute_insert(self, table_name, data_df, mode='append'):
-        """批量插入数据"""
-        conn = self.get_connection()
-        
-        # 添加更新时间
-        data_df['update_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    def table_exists(self, table_name):
+        """表是否已创建"""
+        return bool(self.execute_query(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)))
         
-        # 插入数据
-        data_df.to_sql(table_name, conn, if_exists=mode, index=False)
+    def listed_codes(self, trade_date):
+        """指定交易日已上市、未退市的股票代码（股票列表未加载时为空）"""
+        if not self.table_exists('stock_basic'):
+            return []
+        return [row[0] for row in self.execute_query(
+            "SELECT ts_code FROM stock_basic WHERE (list_date IS NULL OR list_date <= ?) "
+            "AND (delist_date IS NULL OR delist_date > ?) ORDER BY ts_code", (trade_date, trade_date))]
         
-        conn.close()
-        return len(data_df)
+    def execute_insert(self, table_name, data_df, mode='append'):
+        """
+        批量写入数据到已定义的表
+        
+        Args:
+            mode: 'append' 按主键覆盖写入；'replace' 先清空表数据再写入
+                  （只删除数据，表结构、主键和索引保持不变）
+        """
+        if table_name not in get_schema_registry(self):
+            raise ValueError(f"表 {table_name} 未在DatabaseManager中定义")
+        if not self.table_exists(table_name):
+            self.create_all_tables()
+            
+        if mode != 'replace':
+            # 追加写入按分块提交
+            return get_bulk_writer(self).write(table_name, data_df)
+            
+        # 清空与写入在同一事务中完成，失败时保留原数据
+        conn = self.get_connection()
+        try:
+            conn.execute(f"DELETE FROM {table_name}")
+            records = self.upsert_dataframe(conn, table_name, data_df)
+            conn.commit()
+        finally:
+            conn.close()
+        return records
+        
+    def upsert_dataframe(self, conn, table_name, data_df):
+        """在给定连接上按主键写入（冲突时更新写入的列），不提交事务"""
+        return get_bulk_writer(self).write(table_name, data_df, conn)
         
     def clear_table_data(self, table_name, condition=None):
         """清空表数据"""
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抓取调度器 - 令牌桶限频 + 多线程并发请求
+"""
+
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from .api_config import (BATCH_1_APIS, BATCH_2_APIS, BATCH_3_APIS,
+                         RETRY_CONFIG, SCHEDULER_CONFIG)
+
+
+class TokenBucket:
+    """线程安全的令牌桶"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)  # 每秒补充的令牌数
+        self.capacity = float(max(1, capacity))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """按流逝时间补充令牌"""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self, tokens=1):
+        """尝试取令牌，成功返回0，否则返回还需等待的秒数"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        """阻塞直到取得令牌，返回实际等待秒数"""
+        waited = 0.0
+        while True:
+            wait_time = self.try_acquire(tokens)
+            if wait_time <= 0:
+                return waited
+            time.sleep(wait_time)
+            waited += wait_time
+
+
+class FetchScheduler:
+    """抓取调度器
+
+    每个API一个令牌桶（由所有工作线程共享），限频间隔取自API配置中的
+    api_rate_limit，未配置时使用 RETRY_CONFIG['api_rate_limit']。
+    提供额度台账时，本分钟额度用完则等到下一分钟，当日额度不足时调用抛出 QuotaExceeded；
+    low_priority=True 的调用（如历史数据回填）不使用为每日同步保留的额度。优先级按调用传入，
+    同一调度器上并发的前台调用不受影响。
+    """
+
+    def __init__(self, max_workers=None, rate_limit=None, ledger=None):
+        self.max_workers = max_workers or SCHEDULER_CONFIG['max_workers']
+        self.max_pending = max(self.max_workers, SCHEDULER_CONFIG['max_pending'])
+        self.default_interval = rate_limit if rate_limit is not None else RETRY_CONFIG['api_rate_limit']
+        self.burst = SCHEDULER_CONFIG['burst']
+        self.ledger = ledger
+        self.logger = logging.getLogger('StockSystem.FetchScheduler')
+
+        self._api_intervals = {}
+        for apis in (BATCH_1_APIS, BATCH_2_APIS, BATCH_3_APIS):
+            for config in apis.values():
+                if 'api_rate_limit' in config:
+                    self._api_intervals[config['api_name']] = config['api_rate_limit']
+
+        self._buckets = {}
+        self._scale = 1  # 吞吐倍数（token池中可用的token数）
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'wait_time': 0.0}
+
+    def scale(self, factor):
+        """按可用token数放大吞吐：各API调用间隔按倍数缩短，并发线程数同比增加"""
+        factor = max(1, int(factor))
+        with self._lock:
+            self.max_workers = self.max_workers // self._scale * factor
+            self.max_pending = self.max_pending // self._scale * factor
+            self._scale = factor
+            self._buckets.clear()
+
+    def set_api_limit(self, api_name, interval):
+        """设置单个API的调用间隔(秒)"""
+        with self._lock:
+            self._api_intervals[api_name] = interval
+            self._buckets.pop(api_name, None)
+
+    def get_bucket(self, api_name):
+        """获取API对应的令牌桶"""
+        with self._lock:
+            bucket = self._buckets.get(api_name)
+            if bucket is None:
+                interval = self._api_intervals.get(api_name, self.default_interval)
+                bucket = TokenBucket(self._scale / interval, self.burst * self._scale)
+                self._buckets[api_name] = bucket
+            return bucket
+
+    def _wait_quota(self, api_name, low_priority=False):
+        """等待本分钟额度，返回等待秒数"""
+        waited = 0.0
+        while self.ledger is not None:
+            wait_time = self.ledger.check(api_name, keep_reserve=low_priority)
+            if wait_time <= 0:
+                break
+            time.sleep(wait_time)
+            waited += wait_time
+        return waited
+
+    def call(self, api_name, func, *args, low_priority=False, **kwargs):
+        """
+        限频执行单次API调用
+
+        Args:
+            low_priority: 低优先级调用，额度接近保留线时让路给每日同步（抛出 QuotaExceeded）
+        """
+        waited = self._wait_quota(api_name, low_priority)
+        waited += self.get_bucket(api_name).acquire()
+        with self._lock:
+            self.stats['calls'] += 1
+            self.stats['wait_time'] += waited
+        return func(*args, **kwargs)
+
+    def run(self, tasks, fetch):
+        """
+        并发执行任务，按完成顺序产出结果
+
+        Args:
+            tasks: 任务序列
+            fetch: 单个任务的执行函数 fetch(task) -> result，内部应通过 call() 限频
+
+        Yields:
+            tuple: (task, result, error)，失败时 result 为 None
+        """
+        task_iter = iter(tasks)
+        pending = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            def submit_next():
+                for task in task_iter:
+                    pending[executor.submit(fetch, task)] = task
+                    return True
+                return False
+
+            # 在途任务数不超过 max_pending，内存不随任务总数增长
+            while len(pending) < self.max_pending and submit_next():
+                pass
+
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = pending.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        yield task, None, error
+                    else:
+                        yield task, future.result(), None
+                    submit_next()
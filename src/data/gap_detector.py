@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缺口检测 - 由上市/退市日期、停牌区间和交易日历得到应有的 (股票, 交易日) 集合，
+一次读取行情表做反连接，得到整段历史的缺失和异常数据及修复计划
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .trade_calendar import get_trade_calendar
+from .suspension import SuspensionStore
+
+# 各表的异常数据条件（需要重新获取）
+PROBLEM_CONDITIONS = {
+    'daily_basic': "close <= 0 OR vol < 0 OR amount < 0 OR close IS NULL",
+    'adj_factor': "adj_factor <= 0 OR adj_factor IS NULL"
+}
+
+# 检测区间超过该交易日数时顺序扫描整表：区间覆盖表的大部分行时，
+# 经 trade_date 索引逐行回表比顺序扫描慢
+SCAN_DAYS = 20
+
+
+class GapReport:
+    """缺口检测结果"""
+
+    def __init__(self, table_name, days, expected_counts, actual_counts, missing, problematic, suspended=0):
+        self.table_name = table_name
+        self.days = days                        # 检测的交易日
+        self.expected_counts = expected_counts  # 每个交易日应有的股票数
+        self.actual_counts = actual_counts      # 每个交易日已有的记录数
+        self.missing = missing                  # DataFrame: ts_code, trade_date, day_index
+        self.problematic = problematic          # DataFrame: ts_code, trade_date, day_index
+        self.suspended = suspended              # 因停牌不计入应有集合的 (股票, 交易日) 数
+
+    @property
+    def empty(self):
+        return self.missing.empty and self.problematic.empty
+
+    @property
+    def counts(self):
+        return {'days': len(self.days), 'expected': int(self.expected_counts.sum()),
+                'missing': len(self.missing), 'problematic': len(self.problematic),
+                'suspended': self.suspended}
+
+    def summary(self):
+        """按交易日汇总：应有、已有、缺失、异常记录数和缺失率"""
+        n = len(self.days)
+        missing = np.bincount(self.missing['day_index'].to_numpy(), minlength=n) if n else np.zeros(0)
+        problematic = np.bincount(self.problematic['day_index'].to_numpy(), minlength=n) if n else np.zeros(0)
+        summary = pd.DataFrame({
+            'trade_date': self.days,
+            'expected': self.expected_counts,
+            'actual': self.actual_counts,
+            'missing': missing.astype('int64'),
+            'problematic': problematic.astype('int64')
+        })
+        expected = summary['expected'].where(summary['expected'] > 0)
+        summary['missing_rate'] = (summary['missing'] / expected).fillna(0.0)
+        summary['problem_rate'] = (summary['problematic'] / expected).fillna(0.0)
+        return summary
+
+    def needs(self, include_problematic=True):
+        """需要修复的 {trade_date: [ts_code, ...]}"""
+        frames = [self.missing, self.problematic] if include_problematic else [self.missing]
+        targets = pd.concat(frames, ignore_index=True).drop_duplicates(['ts_code', 'trade_date'])
+        if targets.empty:
+            return {}
+        targets = targets.sort_values(['trade_date', 'ts_code'])
+        return {trade_date: group.tolist() for trade_date, group in targets.groupby('trade_date')['ts_code']}
+
+    def ranges(self):
+        """
+        每只股票连续缺失的交易日区间
+
+        Returns:
+            DataFrame: ts_code, start_date, end_date, days
+        """
+        if self.missing.empty:
+            return pd.DataFrame(columns=['ts_code', 'start_date', 'end_date', 'days'])
+        gaps = self.missing.sort_values(['ts_code', 'day_index'])
+        day_index = gaps['day_index'].to_numpy()
+        codes = gaps['ts_code'].to_numpy()
+        # 股票变化或交易日不连续时开始新区间
+        new_run = np.ones(len(gaps), dtype=bool)
+        new_run[1:] = (codes[1:] != codes[:-1]) | (day_index[1:] != day_index[:-1] + 1)
+        run_id = np.cumsum(new_run)
+        runs = gaps.assign(run_id=run_id).groupby('run_id').agg(
+            ts_code=('ts_code', 'first'),
+            start_date=('trade_date', 'first'),
+            end_date=('trade_date', 'last'),
+            days=('trade_date', 'size'))
+        return runs.reset_index(drop=True)
+
+    def plan(self):
+        """
+        修复计划：缺失区间相同的股票合为一组
+
+        Returns:
+            list: [(start_date, end_date, [ts_code, ...]), ...]，按区间起始日期排序
+        """
+        ranges = self.ranges()
+        if ranges.empty:
+            return []
+        groups = ranges.groupby(['start_date', 'end_date'], sort=True)['ts_code']
+        return [(start_date, end_date, sorted(codes.tolist())) for (start_date, end_date), codes in groups]
+
+
+class GapDetector:
+    """缺口检测
+
+    应有集合：每只股票在 [上市日期, 退市日期) 内除停牌区间外的每个交易日。
+    股票与交易日编码为整数键（股票序号 x 交易日数 + 交易日序号），
+    与行情表中已有记录的键做集合差，得到缺失的 (股票, 交易日)。
+    """
+
+    def __init__(self, db_manager, calendar=None):
+        self.db_manager = db_manager
+        self.calendar = calendar or get_trade_calendar(db_manager)
+        self.suspensions = SuspensionStore(db_manager, self.calendar)
+        self.logger = logging.getLogger('StockSystem.GapDetector')
+
+    def _days(self, start_date, end_date):
+        """检测区间内的交易日，默认从交易日历第一天到最近交易日"""
+        end_date = end_date or self.calendar.latest_open()
+        if not end_date:
+            return np.array([], dtype=object)
+        return np.array(self.calendar.open_days(start_date or self.calendar.first_date, end_date), dtype=object)
+
+    def _listed(self):
+        """股票列表及上市、退市日期"""
+        rows = self.db_manager.execute_query("SELECT ts_code, list_date, delist_date FROM stock_basic")
+        listed = pd.DataFrame(rows, columns=['ts_code', 'list_date', 'delist_date'])
+        return listed.drop_duplicates('ts_code').sort_values('ts_code', ignore_index=True)
+
+    def _spans(self, listed, days):
+        """每只股票应有数据的交易日序号区间 [lo, hi)"""
+        n = len(days)
+        day_values = days.astype(str)
+        list_dates = listed['list_date'].fillna('').astype(str).to_numpy()
+        delist_dates = listed['delist_date'].fillna('').astype(str).to_numpy()
+        lo = np.searchsorted(day_values, list_dates, side='left')
+        hi = np.where(delist_dates == '', n, np.searchsorted(day_values, delist_dates, side='left'))
+        return lo, np.maximum(hi, lo)
+
+    def _suspended_spans(self, codes, days):
+        """停牌区间对应的 (股票序号, 交易日序号区间 [lo, hi))"""
+        intervals = self.suspensions.intervals(days[0], days[-1])
+        code_index = codes.get_indexer(intervals['ts_code'])
+        known = code_index >= 0
+        day_values = days.astype(str)
+        lo = np.searchsorted(day_values, intervals['start_date'].astype(str).to_numpy()[known], side='left')
+        hi = np.searchsorted(day_values, intervals['end_date'].astype(str).to_numpy()[known], side='right')
+        return code_index[known], lo, hi
+
+    def _expand(self, code_index, lo, hi, n):
+        """向量化展开每个 [lo, hi) 区间为 (股票序号 x n + 交易日序号) 键"""
+        lengths = np.maximum(hi - lo, 0)
+        total = int(lengths.sum())
+        starts = np.repeat(lo - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        day_index = np.arange(total) + starts
+        return np.repeat(code_index, lengths).astype('int64') * n + day_index
+
+    def expected_keys(self, listed, days):
+        """应有的 (股票, 交易日) 键（未排除停牌），按股票序号、交易日序号升序"""
+        lo, hi = self._spans(listed, days)
+        return self._expand(np.arange(len(listed)), lo, hi, len(days))
+
+    def suspended_keys(self, codes, days):
+        """停牌的 (股票, 交易日) 键，升序去重"""
+        return np.unique(self._expand(*self._suspended_spans(codes, days), len(days)))
+
+    def expected_counts(self, days):
+        """每个交易日应有数据的股票数（不展开 (股票, 交易日) 键）"""
+        days = np.asarray(days, dtype=object)
+        n = len(days)
+        listed = self._listed()
+        lo, hi = self._spans(listed, days)
+        # 差分：区间起点 +1，终点 -1，累加得到每日在市股票数
+        delta = np.bincount(lo, minlength=n + 1) - np.bincount(hi, minlength=n + 1)
+
+        # 停牌区间限制在上市期间内后扣除（同一股票的停牌区间互不重叠）
+        code_index, suspend_lo, suspend_hi = self._suspended_spans(pd.Index(listed['ts_code']), days)
+        suspend_lo = np.maximum(suspend_lo, lo[code_index])
+        suspend_hi = np.maximum(np.minimum(suspend_hi, hi[code_index]), suspend_lo)
+        delta -= np.bincount(suspend_lo, minlength=n + 1) - np.bincount(suspend_hi, minlength=n + 1)
+        return np.cumsum(delta)[:n]
+
+    def detect(self, table_name='daily_basic', start_date=None, end_date=None):
+        """
+        检测区间内的缺失和异常数据
+
+        Args:
+            start_date, end_date: 默认从交易日历第一天到最近交易日
+
+        Returns:
+            GapReport
+        """
+        days = self._days(start_date, end_date)
+        n = len(days)
+        empty = pd.DataFrame(columns=['ts_code', 'trade_date', 'day_index'])
+        if n == 0:
+            return GapReport(table_name, [], np.zeros(0, dtype='int64'), np.zeros(0, dtype='int64'),
+                             empty, empty)
+
+        listed = self._listed()
+        codes = pd.Index(listed['ts_code'])
+        listed_keys = self.expected_keys(listed, days)
+        expected = np.setdiff1d(listed_keys, self.suspended_keys(codes, days), assume_unique=True)
+
+        condition = PROBLEM_CONDITIONS.get(table_name, '0')
+        access = ' NOT INDEXED' if n > SCAN_DAYS else ''
+        rows = self.db_manager.execute_query(
+            f"SELECT ts_code, trade_date, ({condition}) FROM {table_name}{access} WHERE trade_date BETWEEN ? AND ?",
+            (days[0], days[-1]))
+        present = pd.DataFrame(rows, columns=['ts_code', 'trade_date', 'bad'])
+        day_index = np.searchsorted(days.astype(str), present['trade_date'].astype(str).to_numpy())
+        day_index = np.minimum(day_index, n - 1)
+        on_calendar = days[day_index] == present['trade_date'].to_numpy()
+        code_index = codes.get_indexer(present['ts_code'])
+        known = on_calendar & (code_index >= 0)
+        present_keys = code_index[known].astype('int64') * n + day_index[known]
+
+        missing_keys = np.setdiff1d(expected, present_keys, assume_unique=True)
+        bad = known & (present['bad'].fillna(0).to_numpy().astype(bool))
+        problem_keys = code_index[bad].astype('int64') * n + day_index[bad]
+
+        def to_frame(keys):
+            day = keys % n
+            return pd.DataFrame({'ts_code': codes.to_numpy()[keys // n], 'trade_date': days[day],
+                                 'day_index': day})
+
+        report = GapReport(table_name, days.tolist(),
+                           np.bincount(expected % n, minlength=n),
+                           np.bincount(day_index[on_calendar], minlength=n),
+                           to_frame(missing_keys), to_frame(problem_keys),
+                           suspended=len(listed_keys) - len(expected))
+        self.logger.info(f"{table_name} {days[0]}~{days[-1]}: 应有 {len(expected)} 条，"
+                         f"缺失 {len(missing_keys)} 条，异常 {len(problem_keys)} 条，停牌 {report.suspended} 条")
+        return report
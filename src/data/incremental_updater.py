@@ -6,16 +6,38 @@
 
 import sqlite3
 import pandas as pd
-import tushare as ts
-from datetime import datetime, timedelta
 from .database_manager import DatabaseManager
+from .trade_calendar import get_trade_calendar, to_date_str
+from .providers import create_provider, load_token_config
+from .processors import PeriodResampler, clean_frame
+from .chunk_planner import ChunkPlanner
+from .repair_planner import RepairPlanner
+from .gap_detector import GapDetector, PROBLEM_CONDITIONS
+from .integrity_checker import IntegrityChecker, COMPLETE
+from .quota_ledger import QuotaLedger, QuotaExceeded
+from .api_config import DATA_INTEGRITY_CONFIG, QUOTA_CONFIG
+
+# 表 -> 行情接口
+TABLE_APIS = {
+    'daily_basic': 'daily',
+    'index_daily': 'index_daily'
+}
 
 class IncrementalUpdater:
     """智能增量更新器"""
     
-    def __init__(self):
+    def __init__(self, provider=None):
         self.db_manager = DatabaseManager()
-        self.pro = ts.pro_api()  # 初始化tushare pro接口
+        # 额度台账：默认数据源的调用计入用量，大批修复开始前检查当日剩余额度
+        self.quota_ledger = QuotaLedger(self.db_manager) if QUOTA_CONFIG['enabled'] else None
+        # 默认按token配置创建数据源；已收盘日期的行情走本地缓存，重复修复只请求新数据
+        self.pro = provider or create_provider(load_token_config() or {'token_type': 'tushare'},
+                                               ledger=self.quota_ledger)
+        self.calendar = get_trade_calendar(self.db_manager)
+        self.resampler = PeriodResampler(self.db_manager, self.calendar)
+        self.repair_planner = RepairPlanner(ChunkPlanner(self.calendar))
+        self.gap_detector = GapDetector(self.db_manager, self.calendar)
+        self.integrity_checker = IntegrityChecker(self.db_manager, self.calendar, self.gap_detector)
         
     def update_date_data_with_override(self, table_name, trade_date, update_type='full'):
         """
@@ -40,62 +62,49 @@ class IncrementalUpdater:
     def _full_date_override(self, table_name, trade_date):
         """
         全量覆盖指定日期的数据
-        策略：DELETE + INSERT，确保数据完全覆盖
+        策略：先获取并校验整日数据，再在一个短事务内 upsert 并删除当日已不存在的旧数据
         """
-        conn = None
         try:
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            # 1. 开始事务
-            conn.execute("BEGIN TRANSACTION")
-            
-            # 2. 删除该日期的所有数据
-            delete_sql = f"DELETE FROM {table_name} WHERE trade_date = ?"
-            cursor.execute(delete_sql, (trade_date,))
-            deleted_count = cursor.rowcount
-            print(f"🗑️ 删除 {table_name} {trade_date} 的 {deleted_count} 条旧数据")
-            
-            # 3. 获取新数据
-            if table_name == 'daily_basic':
-                df = self.pro.daily(trade_date=trade_date)
-            elif table_name == 'index_daily':
-                df = self.pro.index_daily(trade_date=trade_date)
-            else:
+            api_name = TABLE_APIS.get(table_name)
+            if api_name is None:
                 raise ValueError(f"不支持的表名: {table_name}")
             
-            # 4. 插入新数据
-            if not df.empty:
-                df['update_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                df['src'] = 'incremental_override'  # 标记数据源
-                
-                # 使用to_sql直接插入，确保完全覆盖
-                df.to_sql(table_name, conn, if_exists='append', index=False)
-                records = len(df)
-                
-                # 5. 提交事务
-                conn.commit()
-                print(f"✅ 全量覆盖成功：删除{deleted_count}条，新增{records}条")
-                return True, records, f"全量覆盖成功：删除{deleted_count}条，新增{records}条"
-            else:
-                conn.rollback()
-                return False, 0, "API返回空数据，回滚事务"
+            # 1. 获取新数据（不持有数据库写锁）；响应被截断时按股票拆分重取，否则截掉的行会在替换时被删除
+            df = self._validate(api_name, self._fetch_market_day(table_name, api_name, trade_date), [trade_date])
+            if df.empty:
+                return False, 0, "API返回空数据，未修改已有数据"
+            
+            # 2. 原子替换
+            records, deleted_count = self._swap(table_name, df, {trade_date: None})
+            print(f"✅ 全量覆盖成功：删除{deleted_count}条，新增{records}条")
+            return True, records, f"全量覆盖成功：删除{deleted_count}条，新增{records}条"
                 
         except Exception as e:
-            if conn:
-                conn.rollback()
-                print(f"❌ 全量覆盖失败，已回滚: {str(e)}")
+            print(f"❌ 全量覆盖失败，未修改已有数据: {str(e)}")
             return False, 0, f"全量覆盖失败: {str(e)}"
-        finally:
-            if conn:
-                conn.close()
+    
+    def _fetch_market_day(self, table_name, api_name, trade_date):
+        """单日全市场数据，达到行数上限时按当日应有的股票拆分重取"""
+        fetch = getattr(self.pro, api_name)
+        
+        def fetch_codes(codes, start_date, end_date):
+            if codes is None:
+                return fetch(trade_date=start_date)
+            return fetch(ts_code=','.join(codes), trade_date=start_date)
+        
+        def codes():
+            if table_name == 'daily_basic':
+                return self.db_manager.listed_codes(trade_date)
+            # 指数等按表中已有的代码
+            return [row[0] for row in self.db_manager.execute_query(f"SELECT DISTINCT ts_code FROM {table_name}")]
+        
+        return self.repair_planner.chunk_planner.fetch_market_day(api_name, fetch_codes, trade_date, codes)
     
     def _partial_date_override(self, table_name, trade_date, target_stocks=None):
         """
         部分覆盖指定股票的数据
-        策略：DELETE WHERE + INSERT，只覆盖指定股票
+        策略：先获取指定股票的数据，再在一个短事务内 upsert 并删除这些股票没有返回的旧数据
         """
-        conn = None
         try:
             if target_stocks is None:
                 # 如果未指定股票，则找出需要更新的股票
@@ -104,60 +113,25 @@ class IncrementalUpdater:
             if not target_stocks:
                 return True, 0, "无需更新的股票"
             
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            # 1. 开始事务
-            conn.execute("BEGIN TRANSACTION")
-            
-            # 2. 删除指定股票在该日期的数据
-            placeholders = ','.join(['?' for _ in target_stocks])
-            delete_sql = f"DELETE FROM {table_name} WHERE trade_date = ? AND ts_code IN ({placeholders})"
-            cursor.execute(delete_sql, [trade_date] + target_stocks)
-            deleted_count = cursor.rowcount
-            print(f"🗑️ 删除 {len(target_stocks)} 只股票在 {trade_date} 的 {deleted_count} 条数据")
-            
-            # 3. 批量获取新数据
-            all_new_data = []
-            for ts_code in target_stocks:
-                if table_name == 'daily_basic':
-                    df = self.pro.daily(ts_code=ts_code, trade_date=trade_date)
-                elif table_name == 'index_daily':
-                    df = self.pro.index_daily(ts_code=ts_code, trade_date=trade_date)
-                
-                if not df.empty:
-                    df['update_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    df['src'] = 'incremental_partial'
-                    all_new_data.append(df)
+            # 1. 按成本最低的方案批量获取新数据（单日多股票或全市场请求，本地过滤）
+            combined_df = self._fetch_targets(table_name, {trade_date: target_stocks})
+            if combined_df.empty:
+                return False, 0, "未获取到新数据，未修改已有数据"
             
-            # 4. 批量插入新数据
-            if all_new_data:
-                combined_df = pd.concat(all_new_data, ignore_index=True)
-                combined_df.to_sql(table_name, conn, if_exists='append', index=False)
-                updated_records = len(combined_df)
-                
-                conn.commit()
-                print(f"✅ 部分覆盖成功：删除{deleted_count}条，新增{updated_records}条")
-                return True, updated_records, f"部分覆盖成功：删除{deleted_count}条，新增{updated_records}条"
-            else:
-                conn.rollback()
-                return False, 0, "未获取到新数据，回滚事务"
+            # 2. 原子替换
+            updated_records, deleted_count = self._swap(table_name, combined_df, {trade_date: target_stocks})
+            print(f"✅ 部分覆盖成功：删除{deleted_count}条，新增{updated_records}条")
+            return True, updated_records, f"部分覆盖成功：删除{deleted_count}条，新增{updated_records}条"
             
         except Exception as e:
-            if conn:
-                conn.rollback()
-                print(f"❌ 部分覆盖失败，已回滚: {str(e)}")
+            print(f"❌ 部分覆盖失败，未修改已有数据: {str(e)}")
             return False, 0, f"部分覆盖失败: {str(e)}"
-        finally:
-            if conn:
-                conn.close()
     
     def _missing_only_update(self, table_name, trade_date):
         """
         只补充缺失的股票数据
-        策略：INSERT OR IGNORE，保留已有数据，只添加缺失数据
+        策略：只获取缺失股票的数据并写入，不影响已有数据
         """
-        conn = None
         try:
             # 1. 找出缺失的股票
             missing_stocks = self._find_missing_stocks(table_name, trade_date)
@@ -167,72 +141,160 @@ class IncrementalUpdater:
             
             print(f"📝 需要补充 {len(missing_stocks)} 只股票的数据")
             
-            conn = self.db_manager.get_connection()
-            conn.execute("BEGIN TRANSACTION")
-            
-            # 2. 批量获取缺失股票的数据
-            all_new_data = []
-            for ts_code in missing_stocks:
-                if table_name == 'daily_basic':
-                    df = self.pro.daily(ts_code=ts_code, trade_date=trade_date)
-                elif table_name == 'index_daily':
-                    df = self.pro.index_daily(ts_code=ts_code, trade_date=trade_date)
-                
-                if not df.empty:
-                    df['update_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    df['src'] = 'incremental_missing'
-                    all_new_data.append(df)
-            
-            # 3. 批量插入新数据（使用INSERT OR IGNORE避免冲突）
-            if all_new_data:
-                combined_df = pd.concat(all_new_data, ignore_index=True)
-                # 使用INSERT OR IGNORE策略
-                combined_df.to_sql(f"{table_name}_temp", conn, if_exists='replace', index=False)
-                
-                # 执行INSERT OR IGNORE
-                columns = ', '.join(combined_df.columns)
-                placeholders = ', '.join(['?' for _ in combined_df.columns])
-                insert_sql = f"""
-                    INSERT OR IGNORE INTO {table_name} ({columns})
-                    SELECT {columns} FROM {table_name}_temp
-                """
-                cursor = conn.cursor()
-                cursor.execute(insert_sql)
-                updated_records = cursor.rowcount
-                
-                # 清理临时表
-                cursor.execute(f"DROP TABLE {table_name}_temp")
-                
-                conn.commit()
-                print(f"✅ 补充缺失数据成功：新增{updated_records}条")
-                return True, updated_records, f"补充缺失数据成功：新增{updated_records}条"
-            else:
-                conn.rollback()
+            # 2. 按成本最低的方案批量获取缺失股票的数据
+            combined_df = self._fetch_targets(table_name, {trade_date: missing_stocks})
+            if combined_df.empty:
                 return True, 0, "未获取到新数据"
             
+            # 3. 写入新数据（只含缺失的股票，不删除任何已有数据）
+            updated_records = self._swap(table_name, combined_df, {})[0]
+            print(f"✅ 补充缺失数据成功：新增{updated_records}条")
+            return True, updated_records, f"补充缺失数据成功：新增{updated_records}条"
+            
         except Exception as e:
-            if conn:
-                conn.rollback()
-                print(f"❌ 补充数据失败，已回滚: {str(e)}")
+            print(f"❌ 补充数据失败，未修改已有数据: {str(e)}")
             return False, 0, f"补充数据失败: {str(e)}"
+    
+    def _validate(self, api_name, df, trade_dates):
+        """清洗并校验获取的数据：主键完整、交易日在请求范围内，主键重复时保留最后一条"""
+        if df is None or df.empty:
+            return pd.DataFrame()
+        df = clean_frame(api_name, df)
+        missing_columns = {'ts_code', 'trade_date'} - set(df.columns)
+        if missing_columns:
+            raise ValueError(f"{api_name} 返回数据缺少字段: {', '.join(sorted(missing_columns))}")
+        df = df.dropna(subset=['ts_code', 'trade_date'])
+        df = df[df['trade_date'].astype(str).isin(trade_dates)]
+        return df.drop_duplicates(['ts_code', 'trade_date'], keep='last')
+    
+    def _swap(self, table_name, df, scope):
+        """
+        在一个短事务内写入已获取的数据：按主键 upsert，再删除范围内本次没有返回的旧数据
+        
+        网络请求都在调用前完成，写锁只在本地写入期间持有。
+        
+        Args:
+            df: 已获取并校验的数据
+            scope: {trade_date: [ts_code, ...]，None 表示整日}，范围内没有返回的旧行被删除
+        
+        Returns:
+            tuple: (写入记录数, 删除记录数)
+        """
+        conn = self.db_manager.get_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            records = self.db_manager.upsert_dataframe(conn, table_name, df) if not df.empty else 0
+            
+            deleted_count = 0
+            if scope:
+                # 本次返回的主键和替换范围放入临时表，按主键删除范围内已不存在的行
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS swap_keys "
+                             "(ts_code TEXT, trade_date TEXT, PRIMARY KEY (ts_code, trade_date))")
+                conn.execute("CREATE TEMP TABLE IF NOT EXISTS swap_scope "
+                             "(ts_code TEXT, trade_date TEXT, PRIMARY KEY (ts_code, trade_date))")
+                conn.execute("DELETE FROM swap_keys")
+                conn.execute("DELETE FROM swap_scope")
+                if not df.empty:
+                    conn.executemany("INSERT OR IGNORE INTO swap_keys VALUES (?, ?)",
+                                     df[['ts_code', 'trade_date']].astype(str).itertuples(index=False, name=None))
+                conn.executemany("INSERT OR IGNORE INTO swap_scope VALUES (?, ?)",
+                                 [(code, trade_date) for trade_date, codes in scope.items() if codes
+                                  for code in codes])
+                
+                not_returned = (f"NOT EXISTS (SELECT 1 FROM swap_keys k WHERE k.ts_code = {table_name}.ts_code "
+                                f"AND k.trade_date = {table_name}.trade_date)")
+                full_dates = [trade_date for trade_date, codes in scope.items() if codes is None]
+                if full_dates:
+                    cursor = conn.execute(
+                        f"DELETE FROM {table_name} WHERE trade_date IN ({','.join('?' * len(full_dates))}) "
+                        f"AND {not_returned}", full_dates)
+                    deleted_count += cursor.rowcount
+                cursor = conn.execute(
+                    f"DELETE FROM {table_name} WHERE EXISTS (SELECT 1 FROM swap_scope s "
+                    f"WHERE s.ts_code = {table_name}.ts_code AND s.trade_date = {table_name}.trade_date) "
+                    f"AND {not_returned}")
+                deleted_count += cursor.rowcount
+            
+            conn.commit()
+            return records, deleted_count
+        except Exception:
+            conn.rollback()
+            raise
         finally:
-            if conn:
-                conn.close()
+            conn.close()
+    
+    def _fetch_targets(self, table_name, needs):
+        """
+        按修复规划器选出的方案获取需要修复的数据
+        
+        Args:
+            needs: {trade_date: [ts_code, ...]}
+        
+        Returns:
+            DataFrame: 只含需要修复的 (股票, 交易日)
+        """
+        api_name = TABLE_APIS.get(table_name)
+        if api_name is None:
+            raise ValueError(f"不支持的表名: {table_name}")
+        plans = self.repair_planner.plan(api_name, needs, self._market_sizes(needs))
+        for plan in plans:
+            print(f"📦 {plan}")
+        affordable, message = self._afford(api_name, sum(plan.calls for plan in plans))
+        if not affordable:
+            raise QuotaExceeded(message, api_name)
+        df = self.repair_planner.fetch(api_name, plans, lambda api, **params: getattr(self.pro, api)(**params))
+        return clean_frame(api_name, df) if not df.empty else df
+    
+    def _afford(self, api_name, calls):
+        """预计请求次数是否在当日剩余额度内，返回 (是否足够, 消息)"""
+        if self.quota_ledger is None or api_name is None or not calls:
+            return True, ''
+        return self.quota_ledger.afford({api_name: calls})
+    
+    def _market_sizes(self, needs):
+        """各交易日应有行情的股票数（全市场请求的预计行数），已排除停牌股票"""
+        if not needs:
+            return {}
+        dates = sorted(needs)
+        return {trade_date: int(count) for trade_date, count in
+                zip(dates, self.gap_detector.expected_counts(dates)) if count}
+    
+    def repair_dates(self, table_name, needs):
+        """
+        一次修复多个交易日的指定股票：相邻交易日的零散修复合并为多日多股票请求
+        
+        Args:
+            needs: {trade_date: [ts_code, ...]}
+        
+        Returns:
+            dict: {trade_date: (success, records, message)}
+        """
+        needs = {trade_date: list(codes) for trade_date, codes in needs.items() if codes}
+        if not needs:
+            return {}
+        try:
+            combined_df = self._fetch_targets(table_name, needs)
+            records, deleted_count = self._swap(table_name, combined_df, needs)
+            
+            counts = combined_df['trade_date'].value_counts().to_dict() if not combined_df.empty else {}
+            print(f"✅ 合并修复 {len(needs)} 个交易日：删除{deleted_count}条，新增{records}条")
+            return {trade_date: (True, int(counts.get(trade_date, 0)),
+                                 f"部分覆盖成功：新增{int(counts.get(trade_date, 0))}条")
+                    for trade_date in needs}
+            
+        except Exception as e:
+            print(f"❌ 合并修复失败，未修改已有数据: {str(e)}")
+            return {trade_date: (False, 0, f"部分覆盖失败: {str(e)}") for trade_date in needs}
     
     def _find_missing_stocks(self, table_name, trade_date):
         """找出指定日期缺失数据的股票"""
         try:
+            # 获取所有活跃股票（停牌的股票当日没有行情，不算缺失）
+            all_stocks = self._get_active_stocks(trade_date)
+            
             conn = self.db_manager.get_connection()
             cursor = conn.cursor()
             
-            # 获取所有活跃股票
-            cursor.execute("""
-                SELECT ts_code FROM stock_basic 
-                WHERE list_date <= ? 
-                AND (delist_date IS NULL OR delist_date > ?)
-            """, (trade_date, trade_date))
-            all_stocks = [row[0] for row in cursor.fetchall()]
-            
             # 获取已有数据的股票
             cursor.execute(f"""
                 SELECT DISTINCT ts_code FROM {table_name} 
@@ -283,42 +345,90 @@ class IncrementalUpdater:
                 conn.close()
             return []
 
-    def smart_update_decision(self, table_name, trade_date):
-        """
-        智能决策更新策略
-        """
-        # 1. 检查数据完整性
-        missing_stocks = self._find_missing_stocks(table_name, trade_date)
-        problematic_stocks = self._find_problematic_stocks(table_name, trade_date)
-        
-        # 2. 计算缺失率
-        total_expected = len(self._get_active_stocks(trade_date))
-        missing_rate = len(missing_stocks) / total_expected if total_expected > 0 else 0
-        problem_rate = len(problematic_stocks) / total_expected if total_expected > 0 else 0
+    def _find_target_stocks(self, table_name, trade_date):
+        """需要部分覆盖的股票：缺失的和数据有问题的"""
+        return sorted(set(self._find_missing_stocks(table_name, trade_date)
+                          + self._find_problematic_stocks(table_name, trade_date)))
+
+    def _decide(self, missing, problematic, expected, targets):
+        """按缺失率和问题率决定更新策略，targets 为需要部分更新的股票数"""
+        missing_rate = missing / expected if expected > 0 else 0
+        problem_rate = problematic / expected if expected > 0 else 0
         
-        # 3. 决策更新策略
         if missing_rate > 0.2 or problem_rate > 0.1:
             # 缺失率或问题率过高，全量更新
             return 'full', f"缺失率{missing_rate:.1%}，问题率{problem_rate:.1%}，建议全量更新"
-        elif missing_stocks or problematic_stocks:
+        elif targets:
             # 有缺失或问题数据，部分更新
-            target_stocks = list(set(missing_stocks + problematic_stocks))
-            return 'partial', f"需要更新{len(target_stocks)}只股票"
+            return 'partial', f"需要更新{targets}只股票"
         else:
             # 数据完整，无需更新
             return 'none', "数据完整，无需更新"
     
+    def audit(self, table_name='daily_basic', start_date=None, end_date=None):
+        """一次检测区间内全部交易日的缺失和异常数据，返回 GapReport"""
+        return self.gap_detector.detect(table_name, start_date, end_date)
+    
+    def _scan_decisions(self, table_name, trade_dates):
+        """
+        一次检测决定区间内各交易日的更新策略
+        
+        Returns:
+            dict: {trade_date: (update_type, reason, target_stocks)}
+        """
+        report = self.audit(table_name, trade_dates[0], trade_dates[-1])
+        needs = report.needs()
+        decisions = {}
+        for row in report.summary().itertuples(index=False):
+            targets = needs.get(row.trade_date, [])
+            update_type, reason = self._decide(row.missing, row.problematic, row.expected, len(targets))
+            decisions[row.trade_date] = (update_type, reason, targets)
+        return decisions
+    
+    def smart_update_decision(self, table_name, trade_date):
+        """
+        智能决策更新策略
+        """
+        # 0. 非交易日没有行情数据
+        if self.calendar.covers(trade_date) and not self.calendar.is_open(trade_date):
+            return 'none', f"{trade_date} 非交易日，无需更新"
+        
+        # 股票行情表按上市、退市日期和交易日历一次检测
+        if table_name in PROBLEM_CONDITIONS and self.calendar.covers(trade_date):
+            decision = self._scan_decisions(table_name, [trade_date]).get(trade_date)
+            if decision:
+                return decision[:2]
+        
+        # 1. 检查数据完整性
+        missing_stocks = self._find_missing_stocks(table_name, trade_date)
+        problematic_stocks = self._find_problematic_stocks(table_name, trade_date)
+        
+        # 2. 决策更新策略
+        return self._decide(len(missing_stocks), len(problematic_stocks),
+                            len(self._get_active_stocks(trade_date)),
+                            len(set(missing_stocks + problematic_stocks)))
+    
     def _get_active_stocks(self, trade_date):
-        """获取指定日期的活跃股票列表"""
+        """获取指定日期的活跃股票列表（不含停牌股票）"""
         try:
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            sql = """
                 SELECT ts_code FROM stock_basic 
                 WHERE list_date <= ? 
                 AND (delist_date IS NULL OR delist_date > ?)
-            """, (trade_date, trade_date))
+            """
+            params = (trade_date, trade_date)
+            # 旧版本建的库还没有停牌表时不排除停牌股票
+            if self.db_manager.table_exists('stock_suspension'):
+                sql += """
+                AND ts_code NOT IN (
+                    SELECT ts_code FROM stock_suspension WHERE start_date <= ? AND end_date >= ?)
+                """
+                params += (trade_date, trade_date)
+            
+            conn = self.db_manager.get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute(sql, params)
             
             stocks = [row[0] for row in cursor.fetchall()]
             conn.close()
@@ -342,6 +452,9 @@ class IncrementalUpdater:
         """
         print(f"🔍 检查 {table_name} {trade_date} 的数据覆盖需求...")
         
+        if self.calendar.covers(trade_date) and not self.calendar.is_open(trade_date):
+            return True, 0, f"{trade_date} 非交易日，跳过"
+        
         if force_override:
             print("⚠️ 强制覆盖模式，将全量更新数据")
             return self._full_date_override(table_name, trade_date)
@@ -353,8 +466,80 @@ class IncrementalUpdater:
         if update_type == 'full':
             return self._full_date_override(table_name, trade_date)
         elif update_type == 'partial':
-            return self._partial_date_override(table_name, trade_date)
+            return self._partial_date_override(table_name, trade_date,
+                                               self._find_target_stocks(table_name, trade_date))
         elif update_type == 'none':
             return True, 0, reason
         else:
-            return self._missing_only_update(table_name, trade_date)
\ No newline at end of file
+            return self._missing_only_update(table_name, trade_date)
+    
+    def get_trade_dates(self, start_date, end_date=None):
+        """获取区间内的交易日(默认截止到最近交易日)"""
+        end_date = to_date_str(end_date) if end_date else self.calendar.latest_open()
+        if not end_date:
+            return []
+        return self.calendar.open_days(start_date, end_date)
+    
+    def ensure_range_override(self, table_name, start_date, end_date=None, force_override=False):
+        """
+        按交易日逐日确保区间内数据可被覆盖
+        
+        Returns:
+            dict: {trade_date: (success, records, message)}
+        """
+        results = {}
+        partial_needs = {}
+        trade_dates = self.get_trade_dates(start_date, end_date)
+        decisions = {}
+        if force_override:
+            for trade_date in trade_dates:
+                results[trade_date] = self.ensure_data_override(table_name, trade_date, force_override)
+        else:
+            # 完整性日志中已完整的交易日不再检测
+            logged = self.integrity_checker.statuses(table_name, trade_dates)
+            for trade_date in trade_dates:
+                if logged.get(trade_date) == COMPLETE:
+                    results[trade_date] = (True, 0, "完整性日志显示数据完整，无需更新")
+            pending = [trade_date for trade_date in trade_dates if trade_date not in results]
+            if table_name in PROBLEM_CONDITIONS and pending:
+                # 整个区间一次检测，不再逐日查询
+                scanned = self._scan_decisions(table_name, pending)
+                decisions = {trade_date: scanned[trade_date] for trade_date in pending if trade_date in scanned}
+            else:
+                decisions = {trade_date: self.smart_update_decision(table_name, trade_date) + (None,)
+                             for trade_date in pending}
+        
+        # 整日重新获取的交易日每日一次请求，超出当日剩余额度时整批不开始
+        full_dates = [trade_date for trade_date, decision in decisions.items() if decision[0] == 'full']
+        affordable, quota_message = self._afford(TABLE_APIS.get(table_name), len(full_dates))
+        for trade_date, (update_type, reason, targets) in decisions.items():
+            if update_type == 'full' and not affordable:
+                results[trade_date] = (False, 0, quota_message)
+            elif update_type == 'partial':
+                # 部分修复留到最后合并规划，相邻交易日的请求可合并
+                partial_needs[trade_date] = targets if targets is not None else \
+                    self._find_target_stocks(table_name, trade_date)
+            elif update_type == 'full':
+                results[trade_date] = self._full_date_override(table_name, trade_date)
+            else:
+                results[trade_date] = (True, 0, reason)
+        results.update(self.repair_dates(table_name, partial_needs))
+        results = dict(sorted(results.items()))
+        if table_name in DATA_INTEGRITY_CONFIG and trade_dates:
+            # 修复后刷新完整性日志
+            self.integrity_checker.run([table_name], trade_dates[0], trade_dates[-1])
+        if table_name == 'daily_basic' and results:
+            # 周线、月线由日线派生，日线更新后重算受影响的周期
+            self.update_period_bars()
+        if self.quota_ledger is not None:
+            self.quota_ledger.flush()
+        return results
+    
+    def update_period_bars(self, full=False):
+        """
+        由 daily_basic 重新生成周线、月线
+        
+        Returns:
+            dict: {period: (success, records, message)}
+        """
+        return self.resampler.update_all(full)
\ No newline at end of file
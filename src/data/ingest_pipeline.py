@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据入库流水线 - 抓取 / 清洗 / 写入三段并行
+"""
+
+import queue
+import logging
+import threading
+
+from .api_config import PIPELINE_CONFIG
+
+_DONE = object()  # 阶段结束标记
+
+
+class IngestPipeline:
+    """三段式入库流水线
+
+    抓取线程 -> [有界队列] -> 清洗线程 -> [有界队列] -> 单写入线程
+
+    写入线程持有一个长连接，按 commit_every 分组提交；网络等待与磁盘写入
+    相互重叠，内存占用由队列深度决定而不随结果集增长。
+    """
+
+    def __init__(self, db_manager, scheduler, transform_workers=None,
+                 queue_size=None, commit_every=None):
+        self.db_manager = db_manager
+        self.scheduler = scheduler
+        self.fetch_workers = scheduler.max_workers
+        self.transform_workers = transform_workers or PIPELINE_CONFIG['transform_workers']
+        self.queue_size = queue_size or PIPELINE_CONFIG['queue_size']
+        self.commit_every = commit_every or PIPELINE_CONFIG['commit_every']
+        self.logger = logging.getLogger('StockSystem.IngestPipeline')
+
+    def run(self, tasks, fetch, write, transform=None):
+        """
+        执行流水线，按提交顺序产出结果
+
+        Args:
+            tasks: 任务序列
+            fetch: fetch(task) -> DataFrame，在抓取线程中执行（内部应通过调度器限频）
+            write: write(conn, task, df) -> 记录数，在写入线程中执行，不得自行提交
+            transform: transform(task, df) -> DataFrame，在清洗线程中执行
+
+        Yields:
+            tuple: (task, records, error)，数据已提交后才会产出
+        """
+        stop = threading.Event()
+        task_iter = iter(tasks)
+        task_lock = threading.Lock()
+        fetched = queue.Queue(maxsize=self.queue_size)
+        cleaned = queue.Queue(maxsize=self.queue_size)
+        results = queue.Queue()
+        dropped = []  # 停止后未能交给下一阶段的 (task, df, error)
+
+        def put(q, item):
+            # 队列满时阻塞，调用方提前退出时放弃
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.2)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(q):
+            # 调用方提前退出时返回结束标记
+            while True:
+                try:
+                    return q.get(timeout=0.2)
+                except queue.Empty:
+                    if stop.is_set():
+                        return _DONE
+
+        def next_task():
+            with task_lock:
+                return next(task_iter, _DONE)
+
+        def drain():
+            # 写入线程异常退出后剩余的全部任务
+            remaining = [item[0] for item in dropped]
+            for q in (fetched, cleaned):
+                while True:
+                    try:
+                        item = q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _DONE:
+                        remaining.append(item[0])
+            while True:
+                task = next_task()
+                if task is _DONE:
+                    return remaining
+                remaining.append(task)
+
+        def fetch_worker():
+            while not stop.is_set():
+                task = next_task()
+                if task is _DONE:
+                    break
+                try:
+                    item = (task, fetch(task), None)
+                except Exception as e:
+                    item = (task, None, e)
+                if not put(fetched, item):
+                    dropped.append(item)
+                    break
+
+        def transform_worker():
+            while True:
+                item = get(fetched)
+                if item is _DONE:
+                    break
+                task, df, error = item
+                if error is None and transform is not None:
+                    try:
+                        df = transform(task, df)
+                    except Exception as e:
+                        df, error = None, e
+                if not put(cleaned, (task, df, error)):
+                    dropped.append((task, df, error))
+                    break
+
+        def writer():
+            conn = self.db_manager.get_connection()
+            conn.isolation_level = None  # 手动控制事务
+            pending = []
+            writing = None  # 正在写入的任务
+            try:
+                while True:
+                    item = get(cleaned)
+                    if item is _DONE:
+                        break
+                    task, df, error = item
+                    if error is not None:
+                        results.put((task, 0, error))
+                        continue
+
+                    writing = task
+                    # 组内首个分块失败时事务仍处于打开状态，不能重复BEGIN
+                    if not conn.in_transaction:
+                        conn.execute("BEGIN")
+                    conn.execute("SAVEPOINT chunk")
+                    try:
+                        records = write(conn, task, df)
+                        conn.execute("RELEASE chunk")
+                        pending.append((task, records, None))
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO chunk")
+                        conn.execute("RELEASE chunk")
+                        results.put((task, 0, e))
+                    writing = None
+
+                    # 攒够一组或上游暂时无数据时提交（组内分块都失败时同样结束事务）
+                    if conn.in_transaction and (len(pending) >= self.commit_every or cleaned.empty()):
+                        conn.execute("COMMIT")
+                        for result in pending:
+                            results.put(result)
+                        pending = []
+
+                if conn.in_transaction:
+                    conn.execute("COMMIT")
+                    for result in pending:
+                        results.put(result)
+            except Exception as e:
+                self.logger.error(f"写入线程异常: {e}")
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                failed = [writing] if writing is not None else []
+                for task in failed + [result[0] for result in pending]:
+                    results.put((task, 0, e))
+                # 停止各阶段，尚在队列中、线程手中和未开始的任务同样报告失败，由调用方记入修复队列
+                stop.set()
+                for thread in fetchers + cleaners:
+                    thread.join()
+                for task in drain():
+                    results.put((task, 0, e))
+            finally:
+                conn.close()
+                results.put(_DONE)
+
+        fetchers = [threading.Thread(target=fetch_worker, daemon=True) for _ in range(self.fetch_workers)]
+        cleaners = [threading.Thread(target=transform_worker, daemon=True) for _ in range(self.transform_workers)]
+        write_thread = threading.Thread(target=writer, daemon=True)
+
+        def close_stages():
+            # 抓取全部结束后通知清洗线程，清洗全部结束后通知写入线程
+            for thread in fetchers:
+                thread.join()
+            for _ in cleaners:
+                put(fetched, _DONE)
+            for thread in cleaners:
+                thread.join()
+            put(cleaned, _DONE)
+
+        for thread in fetchers + cleaners + [write_thread]:
+            thread.start()
+        closer = threading.Thread(target=close_stages, daemon=True)
+        closer.start()
+
+        try:
+            while True:
+                result = results.get()
+                if result is _DONE:
+                    break
+                yield result
+        finally:
+            # 正常结束时各线程均已退出；提前退出时通知各阶段停止，写入线程提交已写数据
+            stop.set()
+            write_thread.join(timeout=5)
@@ -0,0 +1,973 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据接入引擎 - 不依赖Qt的初始化、增量更新、修复和状态查询
+
+进度通过回调（subscribe）或迭代器（iter_events）获取，可在命令行、定时任务或
+服务器上运行；界面中的 DataInitializer 只是把回调转为Qt信号的适配层。
+"""
+
+import os
+import queue
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from .database_manager import DatabaseManager
+from .fetch_scheduler import FetchScheduler
+from .ingest_pipeline import IngestPipeline
+from .chunk_planner import ChunkPlanner
+from .repair_queue import RepairQueue
+from .processors import clean_frame, PeriodResampler
+from .trade_calendar import get_trade_calendar, shift_date
+from .daily_sync import DailySync
+from .integrity_checker import IntegrityChecker
+from .suspension import SuspensionStore
+from .quota_ledger import QuotaLedger, QUOTA_EXCEEDED
+from .storage import sync_reference_table
+from .providers import create_provider, load_token_config, classify_error
+from .providers.retry_provider import PERMISSION_DENIED
+from .api_config import (BATCH_1_APIS, BATCH_2_APIS, BATCH_3_APIS,
+                         PROGRESSIVE_CONFIG, CATCHUP_CONFIG, QUOTA_CONFIG, get_time_range)
+
+# 事件及回调参数
+EVENTS = {
+    'progress': ('percent', 'message'),                   # percent 为 -1 表示只更新消息
+    'batch_completed': ('batch_name', 'success', 'message'),
+    'finished': ('success', 'message', 'results'),
+    'data_available': ('table', 'start_date', 'end_date'),
+}
+
+class IngestionEngine:
+    """数据接入引擎"""
+    
+    def __init__(self, batches=['batch_1'], token_config=None, resume=True, progressive=None,
+                 db_manager=None):
+        self.batches = batches
+        self.token_config = token_config
+        self.resume = resume
+        # 渐进式初始化：先取最近交易日全市场数据，界面可立即使用，历史数据随后回填
+        self.progressive = PROGRESSIVE_CONFIG['enabled'] if progressive is None else progressive
+        self.db_manager = db_manager or DatabaseManager()
+        self.pro = None
+        # 额度台账：记录各token的调用用量，调度器据此限流，历史回填在额度接近保留线时让路
+        self.quota_ledger = QuotaLedger(self.db_manager) if QUOTA_CONFIG['enabled'] else None
+        self.scheduler = FetchScheduler(ledger=self.quota_ledger)
+        self.pipeline = IngestPipeline(self.db_manager, self.scheduler)
+        self.chunk_planner = ChunkPlanner(get_trade_calendar(self.db_manager))
+        self.repair_queue = RepairQueue(self.db_manager)
+        self.resampler = PeriodResampler(self.db_manager)
+        self.results = {}
+        self._checkpoint_scope = None  # 当前执行的 (batch_name, api_key)
+        self._callbacks = {event: [] for event in EVENTS}
+        self.logger = logging.getLogger('StockSystem.IngestionEngine')
+        
+    def subscribe(self, event, callback):
+        """注册事件回调，参数见 EVENTS"""
+        if event not in self._callbacks:
+            raise ValueError(f"未知事件: {event}")
+        self._callbacks[event].append(callback)
+        
+    def _notify(self, event, *args):
+        """通知事件回调，回调异常不影响数据接入"""
+        for callback in self._callbacks[event]:
+            try:
+                callback(*args)
+            except Exception as e:
+                self.logger.warning(f"{event} 回调处理失败: {e}")
+        
+    def iter_events(self, action='run', *args, **kwargs):
+        """
+        在后台线程执行 action，逐个产出事件
+        
+        Yields:
+            tuple: (事件名, 参数元组)；最后一个事件为 ('result', (返回值,))，
+                   action 抛出异常时返回值为 (False, 错误消息)
+        """
+        events = queue.Queue()
+        for event in EVENTS:
+            self.subscribe(event, lambda *values, event=event: events.put((event, values)))
+        outcome = {}
+        
+        def target():
+            try:
+                outcome['result'] = getattr(self, action)(*args, **kwargs)
+            except Exception as e:
+                self.logger.error(f"{action} 执行失败: {e}")
+                outcome['result'] = (False, f"{action} 执行失败: {str(e)}")
+            finally:
+                events.put(None)
+        
+        worker = threading.Thread(target=target, name=f"IngestionEngine-{action}", daemon=True)
+        worker.start()
+        while True:
+            item = events.get()
+            if item is None:
+                break
+            yield item
+        worker.join()
+        yield 'result', (outcome.get('result'),)
+        
+    def run(self):
+        """
+        执行数据初始化
+        
+        Returns:
+            tuple: (成功与否, 消息, 各批次结果)
+        """
+        try:
+            self.logger.info("开始数据初始化")
+            # 1. 初始化API连接
+            self.logger.info("初始化API连接...")
+            if not self._init_api_connection():
+                self.logger.error("API连接初始化失败")
+                return self._finish(False, "API连接初始化失败", {})
+                
+            # 2. 创建数据库表
+            self.logger.info("创建数据库表...")
+            self._notify('progress', 5, "创建数据库表...")
+            self.db_manager.create_all_tables()
+            self.logger.info("数据库表创建完成")
+            
+            # 3. 执行各批次初始化
+            batch_configs = self._get_batch_configs()
+            
+            for i, (batch_name, apis) in enumerate(batch_configs.items()):
+                if batch_name not in self.batches:
+                    continue
+                    
+                self.logger.info(f"开始执行 {batch_name}...")
+                self._notify('progress', 10 + i * 30, f"开始执行 {batch_name}...")
+                
+                success, message, batch_results = self._execute_batch(batch_name, apis)
+                self.results[batch_name] = batch_results
+                
+                self.logger.info(f"{batch_name} 执行结果: {message}")
+                self._notify('batch_completed', batch_name, success, message)
+                
+                if not success and batch_name == 'batch_1':
+                    # 第1批失败则终止
+                    return self._finish(False, f"关键批次失败: {message}", self.results)
+                    
+            # 同步行情覆盖范围内的停牌区间，初始化后的缺口检测同样不把停牌股票算作缺失
+            if self.db_manager.execute_query("SELECT COUNT(*) FROM daily_basic")[0][0]:
+                self._notify('progress', -1, "同步停牌数据...")
+                calendar = get_trade_calendar(self.db_manager, reload=True)
+                self._notify('progress', -1, SuspensionStore(self.db_manager, calendar).sync(self._fetch)[2])
+                
+            self._notify('progress', 100, "数据初始化完成")
+            return self._finish(True, "数据初始化成功完成", self.results)
+            
+        except Exception as e:
+            return self._finish(False, f"初始化过程出错: {str(e)}", self.results)
+            
+    def _finish(self, success, message, results):
+        self._flush_quota()
+        self._notify('finished', success, message, results)
+        return success, message, results
+        
+    def update(self, datasets=None):
+        """
+        增量更新：补充交易日历、按差异同步股票列表，再把各行情数据集追平到最新交易日，
+        最后由日线重新生成有变化的周线、月线
+        
+        Args:
+            datasets: 要追平的数据集（见 CATCHUP_CONFIG），默认全部
+        
+        Returns:
+            tuple: (成功与否, 消息)
+        """
+        try:
+            self._notify('progress', 10, "检查数据库状态...")
+            
+            if not self._database_ready():
+                return False, "数据库不存在，请先进行数据初始化"
+            
+            # 旧版本建的库缺少追平水位、停牌区间、接口用量等新表，先补建（已有的表不变）
+            self.db_manager.create_all_tables()
+            
+            if self.pro is None:
+                if not self.token_config:
+                    return False, "未找到Token配置"
+                # 更新需要拿到最新的日历和股票列表，不走响应缓存
+                self.pro = create_provider(self.token_config, use_cache=False, ledger=self.quota_ledger)
+                self.scheduler.scale(self.pro.token_count)
+                self.pipeline.fetch_workers = self.scheduler.max_workers
+            
+            self._notify('progress', 20, "更新交易日历...")
+            
+            # 从本地交易日历的最后一天之后开始补充日历（按主键写入，重复的日期直接覆盖）
+            calendar = get_trade_calendar(self.db_manager, reload=True)
+            end_date = datetime.now().strftime('%Y%m%d')
+            if calendar.last_date:
+                start_date = shift_date(calendar.last_date, 1)
+            else:
+                start_date = (datetime.now() - timedelta(days=30)).strftime('%Y%m%d')
+            
+            if start_date <= end_date:
+                trade_cal = self._fetch('trade_cal', exchange='SSE', start_date=start_date, end_date=end_date,
+                                        fields='cal_date,is_open,pretrade_date')
+                if not trade_cal.empty:
+                    self.db_manager.execute_insert('trade_calendar', clean_frame('trade_cal', trade_cal))
+                    calendar.load()
+            
+            self._notify('progress', 30, "检查股票列表更新...")
+            
+            # 按主键比较每只股票的记录，只写入新增、变化（更名、行业调整等）和退市的股票；
+            # 同时取退市和暂停上市的股票，只取上市股票时退市股票会被删除，丢失缺口检测需要的退市日期
+            params = BATCH_1_APIS['stock_basic']['params']
+            stock_basic = pd.concat([self._fetch('stock_basic', **dict(params, list_status=status))
+                                     for status in ('L', 'D', 'P')], ignore_index=True)
+            delta = sync_reference_table(self.db_manager, 'stock_basic', stock_basic)
+            messages = [delta.summary()] if not delta.empty else []
+            
+            # 停牌区间用于缺口检测，停牌股票不算缺失（没有权限时不影响行情追平）
+            suspend_success, suspend_records, suspend_message = SuspensionStore(
+                self.db_manager, calendar).sync(self._fetch, end_date)
+            if suspend_records or not suspend_success:
+                messages.append(suspend_message)
+            
+            self._notify('progress', 40, "追平行情数据...")
+            
+            sync = DailySync(self.db_manager, self.pipeline, self._fetch, calendar, self.quota_ledger)
+            success, records, message, results = sync.run(
+                datasets, end_date, progress=lambda text: self._notify('progress', -1, text))
+            for name, result in results.items():
+                self._notify('progress', -1, result['message'])
+                if result['last_date']:
+                    table_name = CATCHUP_CONFIG['datasets'][name]['table']
+                    self._notify('data_available', table_name, result['start_date'], result['last_date'])
+            if records or not success:
+                messages.append(message)
+            
+            if any(CATCHUP_CONFIG['datasets'][name]['table'] == 'daily_basic' and result['records']
+                   for name, result in results.items()):
+                self._notify('progress', 90, "由日线生成周线、月线...")
+                for period, (period_success, period_records, period_message) in self.resampler.update_all().items():
+                    if period_records:
+                        messages.append(period_message)
+                    success = success and period_success
+            
+            # 刷新最近交易日的完整性日志，供修复时直接读取
+            IntegrityChecker(self.db_manager, calendar).run(recent=True)
+            
+            self._notify('progress', 100, "数据更新完成")
+            
+            if messages:
+                return success, f"更新完成，{'；'.join(messages)}"
+            return True, "数据已是最新，无需更新"
+            
+        except Exception as e:
+            return False, f"数据更新失败: {str(e)}"
+        finally:
+            self._flush_quota()
+            
+    def repair(self, api_name=None):
+        """
+        补抓修复队列中的分块
+        
+        Returns:
+            tuple: (成功与否, 消息)
+        """
+        if self.pro is None and not self._init_api_connection():
+            return False, "API连接初始化失败"
+        self._notify('progress', -1, "补抓修复队列中的分块...")
+        repaired, failed, records = self.repair_failed_chunks(api_name)
+        return failed == 0, f"修复 {repaired} 个分块（{records} 条记录），{failed} 个仍失败"
+        
+    def status(self):
+        """
+        数据库状态：初始化进度、各表记录数和最新日期、追平水位、修复队列、当日接口用量
+        
+        Returns:
+            dict
+        """
+        status = {'db_path': self.db_manager.db_path,
+                  'exists': self._database_ready(),
+                  'progress': [], 'tables': {}, 'sync_state': {}, 'repair_queue': {}, 'quota': []}
+        if not status['exists']:
+            return status
+        
+        status['progress'] = self.db_manager.execute_query(
+            "SELECT batch_name, api_name, status, total_records, end_time FROM init_progress "
+            "ORDER BY batch_name, api_name")
+        configs = [config for batch in self._get_batch_configs().values() for config in batch.values()]
+        for config in configs + list(CATCHUP_CONFIG['datasets'].values()):
+            table_name = config.get('table')
+            if not table_name or table_name in status['tables'] or not self.db_manager.table_exists(table_name):
+                continue
+            has_date = any(row[1] == 'trade_date' for row in self.db_manager.execute_query(
+                f"PRAGMA table_info({table_name})"))
+            count, last_date = self.db_manager.execute_query(
+                f"SELECT COUNT(*), {'MAX(trade_date)' if has_date else 'NULL'} FROM {table_name}")[0]
+            status['tables'][table_name] = {'records': count, 'last_date': last_date}
+        if self.db_manager.table_exists('sync_state'):
+            status['sync_state'] = dict(self.db_manager.execute_query("SELECT dataset, last_date FROM sync_state"))
+        status['repair_queue'] = self.repair_queue.counts()
+        if self.quota_ledger is not None:
+            usage = self.quota_ledger.usage()
+            status['quota'] = usage.astype(object).where(usage.notna(), None).to_dict('records')
+        return status
+        
+    def _database_ready(self):
+        """数据库是否已建表（连接数据库会创建空文件，不能只看文件是否存在）"""
+        return os.path.exists(self.db_manager.db_path) and self.db_manager.table_exists('init_progress')
+        
+    def _init_api_connection(self):
+        """初始化API连接"""
+        try:
+            if not self.token_config:
+                self.logger.error("未找到token配置")
+                return False
+                
+            self.logger.info(f"Token类型: {self.token_config.get('token_type', 'tushare')}")
+            
+            provider = create_provider(self.token_config, ledger=self.quota_ledger)
+            self.logger.info("API连接初始化完成")
+            
+            # 测试连接（直接访问接口，不经过缓存）
+            self.logger.info("测试API连接...")
+            if provider.ping():
+                self.logger.info("API连接测试成功")
+                self.pro = provider
+                # 多token时按可用token数放大限频额度和并发数
+                self.scheduler.scale(provider.token_count)
+                self.pipeline.fetch_workers = self.scheduler.max_workers
+                return True
+            else:
+                self.logger.error("API返回空数据")
+                return False
+            
+        except Exception as e:
+            self.logger.error(f"API连接失败: {e}")
+            return False
+            
+    def _fetch(self, api_name, low_priority=False, **params):
+        """通过调度器限频调用API，低优先级调用不使用为每日同步保留的额度"""
+        api_func = getattr(self.pro, api_name)
+        return self.scheduler.call(api_name, api_func, low_priority=low_priority, **params)
+            
+    def _get_batch_configs(self):
+        """获取批次配置"""
+        return {
+            'batch_1': BATCH_1_APIS,
+            'batch_2': BATCH_2_APIS, 
+            'batch_3': BATCH_3_APIS
+        }
+        
+    def _execute_batch(self, batch_name, apis):
+        """执行单个批次"""
+        # 上次运行被中断（存在running状态）时进入续传模式，已完成的分块不再下载
+        progress = self._load_progress_status(batch_name)
+        resuming = self.resume and 'running' in progress.values()
+        if resuming:
+            self.logger.info(f"{batch_name} 检测到未完成的初始化，从断点继续")
+            self._notify('progress', -1, "检测到未完成的初始化，从断点继续...")
+        
+        # 初始化时清空相关表数据（续传时保留已完成的数据）
+        if batch_name in ('batch_1', 'batch_2'):
+            self._notify('progress', -1, "清空旧数据...")
+            for api_key, config in apis.items():
+                if resuming and (progress.get(api_key) == 'completed'
+                                 or self._has_checkpoints(batch_name, api_key)):
+                    continue
+                self._clear_batch_tables(batch_name, {api_key: config})
+                self._clear_checkpoints(batch_name, api_key)
+            
+        batch_results = {
+            'total_apis': len(apis),
+            'completed_apis': 0,
+            'failed_apis': 0,
+            'total_records': 0,
+            'api_details': {}
+        }
+        deferred = []  # 先取最近交易日、历史数据留到批次末尾回填的API
+        
+        for api_key, config in apis.items():
+            if resuming and progress.get(api_key) == 'completed':
+                self._notify('progress', -1, f"跳过已完成的 {config['description']}")
+                batch_results['completed_apis'] += 1
+                batch_results['api_details'][api_key] = {
+                    'success': True,
+                    'records': 0,
+                    'message': "上次运行已完成，跳过"
+                }
+                continue
+            
+            self._notify('progress', -1, f"正在处理 {config['description']}...")
+            self._checkpoint_scope = (batch_name, api_key)
+            
+            # 记录开始时间
+            start_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self._update_progress_db(batch_name, api_key, 'running', start_time)
+            
+            phases = self._split_progressive(config)
+            try:
+                success, records, message = self._execute_single_api(api_key, phases[0] if phases else config)
+            except Exception as e:
+                success, records, message = False, 0, f"API执行异常: {str(e)}"
+            
+            if success:
+                self._emit_data_available(phases[0] if phases else config)
+            if success and phases:
+                # 最近交易日已可用，状态保持running，回填完成后再标记完成（中断后可续传）
+                recent_start, recent_end = phases[0]['date_range']
+                self._notify('progress', -1, f"{config['description']} {recent_start}~{recent_end} 已可用，"
+                                             f"历史数据稍后回填")
+                deferred.append((api_key, phases[1], start_time, records))
+                continue
+            
+            self._record_api_result(batch_results, batch_name, api_key, start_time, success, records, message)
+        
+        # 低优先级：其余API都完成后再按日期倒序回填历史数据
+        for api_key, config, start_time, recent_records in deferred:
+            # 预计请求次数超出当日可用额度（扣除为每日同步保留的部分）时不开始
+            affordable, quota_message = self._afford_backfill(config)
+            if not affordable:
+                self._defer_backfill(batch_results, api_key, recent_records, quota_message)
+                continue
+            
+            self._notify('progress', -1, f"回填历史 {config['description']}...")
+            self._checkpoint_scope = (batch_name, api_key)
+            try:
+                success, records, message = self._execute_single_api(api_key, config)
+            except Exception as e:
+                success, records, message = False, 0, f"API执行异常: {str(e)}"
+            
+            if not success and not self._afford_backfill(config, calls=1)[0]:
+                # 回填中途额度用到保留线：已完成的分块有检查点，下次运行续传
+                self._defer_backfill(batch_results, api_key, recent_records + records, message)
+                continue
+            if success:
+                self._emit_data_available(config)
+            else:
+                message = f"历史数据回填失败: {message}"
+            self._record_api_result(batch_results, batch_name, api_key, start_time,
+                                    success, recent_records + records, message)
+        
+        if any(config['table'] == 'daily_basic' for _, config, _, _ in deferred):
+            # 日线回填后重新生成周线、月线（只重算有新日线的周期）
+            for api_key, config in apis.items():
+                if config.get('source') == 'resample':
+                    success, records, message = self._execute_single_api(api_key, config)
+                    if success:
+                        self._emit_data_available(config)
+        
+        # 判断批次是否成功
+        success_rate = batch_results['completed_apis'] / batch_results['total_apis']
+        batch_success = success_rate >= 0.8  # 80%成功率
+        
+        message = f"{batch_name} 完成: {batch_results['completed_apis']}/{batch_results['total_apis']} APIs, {batch_results['total_records']} 条记录"
+        
+        return batch_success, message, batch_results
+        
+    def _record_api_result(self, batch_results, batch_name, api_key, start_time, success, records, message):
+        """记录单个API的执行结果"""
+        end_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if success:
+            batch_results['completed_apis'] += 1
+            batch_results['total_records'] += records
+            self._update_progress_db(batch_name, api_key, 'completed', start_time, end_time, records)
+        else:
+            batch_results['failed_apis'] += 1
+            self._update_progress_db(batch_name, api_key, 'failed', start_time, end_time, 0, message)
+        
+        batch_results['api_details'][api_key] = {
+            'success': success,
+            'records': records,
+            'message': message
+        }
+        
+    def _afford_backfill(self, config, calls=None):
+        """历史回填的预计请求次数是否在低优先级可用额度内"""
+        if self.quota_ledger is None:
+            return True, ''
+        calls = calls or self._estimate_calls(config)
+        if not calls:
+            return True, ''
+        return self.quota_ledger.afford({config['api_name']: calls}, keep_reserve=True)
+        
+    def _estimate_calls(self, config):
+        """
+        预计请求次数：逐日全市场为交易日数，多股票多日为分块数
+        
+        Returns:
+            int: 无法估计时返回None
+        """
+        if 'date_range' not in config:
+            return None
+        start_date, end_date = config['date_range']
+        if config.get('strategy') == 'single_date_all':
+            return len(get_trade_calendar(self.db_manager).open_days(start_date, end_date))
+        stocks = self.db_manager.execute_query("SELECT ts_code, list_date FROM stock_basic")
+        if not stocks:
+            return None
+        return len(self.chunk_planner.plan(config['api_name'], [code for code, _ in stocks],
+                                           start_date, end_date, dict(stocks)))
+        
+    def _defer_backfill(self, batch_results, api_key, records, message):
+        """额度不足时推迟回填：状态保持running，下次运行从检查点继续，已有数据不清空"""
+        message = f"{message}，历史数据回填推迟到下次运行"
+        self.logger.warning(f"{api_key} {message}")
+        self._notify('progress', -1, message)
+        batch_results['failed_apis'] += 1
+        batch_results['api_details'][api_key] = {
+            'success': False,
+            'records': records,
+            'message': message
+        }
+        
+    def _flush_quota(self):
+        """把额度用量写入数据库"""
+        if self.quota_ledger is not None:
+            self.quota_ledger.flush()
+        
+    def _split_progressive(self, config):
+        """
+        渐进式初始化：拆分为最近N个交易日（逐日全市场）和更早的历史两段
+        
+        Returns:
+            tuple: (最近交易日配置, 历史数据配置)，不需要拆分时返回None
+        """
+        if not (self.progressive and config.get('progressive')):
+            return None
+        
+        start_date, end_date = config.get('date_range') or get_time_range(config['time_range'])
+        calendar = get_trade_calendar(self.db_manager)
+        if not calendar.covers(start_date, end_date):
+            # 没有交易日历时无法确定最近N个交易日，按原策略一次完成
+            return None
+        days = calendar.open_days(start_date, end_date)
+        recent_days = PROGRESSIVE_CONFIG['recent_days']
+        if len(days) <= recent_days:
+            return None
+        
+        recent_start = days[-recent_days]
+        recent = dict(config, strategy='single_date_all', date_range=(recent_start, days[-1]))
+        # 历史回填为低优先级，额度接近保留线时让路给每日同步
+        history = dict(config, date_range=(days[0], days[-recent_days - 1]), low_priority=True)
+        return recent, history
+        
+    def _emit_data_available(self, config):
+        """通知界面该表已有可用数据"""
+        if 'date_range' in config:
+            start_date, end_date = config['date_range']
+        elif 'time_range' in config:
+            start_date, end_date = get_time_range(config['time_range'])
+        else:
+            start_date = end_date = ''
+        self._notify('data_available', config['table'], start_date, end_date)
+        
+    def _execute_single_api(self, api_key, config):
+        """执行单个API - 基于测试报告中成功的API"""
+        try:
+            api_name = config['api_name']
+            table_name = config['table']
+            params = config['params'].copy()
+            
+            # 处理时间范围
+            if 'time_range' in config:
+                start_date, end_date = get_time_range(config['time_range'])
+                params['start_date'] = start_date
+                params['end_date'] = end_date
+            
+            # 根据测试报告，只调用成功的API
+            if api_name == 'stock_basic':
+                # ✅ 测试成功: 5,453行数据
+                df = self._fetch('stock_basic', **params)
+            elif api_name == 'stock_company':
+                # ✅ 测试成功: 2,431行数据
+                df = self._fetch('stock_company', **params)
+            elif api_name == 'trade_cal':
+                # ✅ 测试成功: 370行数据
+                df = self._fetch('trade_cal', **params)
+            elif api_name == 'new_share':
+                # ✅ 测试成功: 112行数据
+                df = self._fetch('new_share', **params)
+            elif api_name == 'daily':
+                # ✅ 测试成功: 支持单日全市场和多股票多日查询
+                return self._execute_daily_data(config)
+            elif api_name == 'weekly':
+                # ✅ 测试成功: 112行数据
+                return self._execute_period_data('weekly', config)
+            elif api_name == 'monthly':
+                # ✅ 测试成功: 44行数据
+                return self._execute_period_data('monthly', config)
+            elif api_name == 'adj_factor':
+                # ✅ 测试成功: 492行数据；与日线相同按交易日取全市场
+                return self._execute_daily_data(config)
+            elif api_name == 'index_dailybasic':
+                # ✅ 测试成功: 1行数据
+                df = self._fetch('index_dailybasic', **params)
+            elif api_name == 'stk_mins':
+                # ❌ 测试失败: 需要单独权限，跳过此API
+                self.logger.warning(f"跳过 {api_name}: 需要单独申请分钟数据权限")
+                return False, 0, "需要单独申请分钟数据权限，已跳过"
+            else:
+                # 对于其他API，先检查是否在成功列表中
+                successful_apis = [
+                    'stock_basic', 'stock_company', 'trade_cal', 'new_share',
+                    'daily', 'weekly', 'monthly', 'adj_factor', 'index_dailybasic'
+                ]
+                if api_name not in successful_apis:
+                    self.logger.warning(f"API {api_name} 未在测试成功列表中，尝试调用")
+                
+                # 尝试通用调用
+                try:
+                    df = self._fetch(api_name, **params)
+                except AttributeError:
+                    return False, 0, f"API {api_name} 不存在或权限不足"
+            
+            if df.empty:
+                return False, 0, f"API {api_name} 返回空数据"
+            
+            # 添加数据源标识
+            if 'src' in config:
+                df['src'] = config['src']
+            
+            # 添加索引类型（用于成分股数据）
+            if 'index_type' in config:
+                df['index_type'] = config['index_type']
+            
+            # 检查是否已有update_time列
+            if 'update_time' in df.columns:
+                df = df.drop('update_time', axis=1)
+                
+            # 按接口字段类型清洗（字典/空值转为NaN、压缩数值类型），写入前一次完成
+            df = self._clean_frame(api_name, df)
+            
+            # 保存到数据库（替换表中数据，表结构、主键和索引保持不变）
+            try:
+                records = self.db_manager.execute_insert(table_name, df, mode='replace')
+            except Exception as insert_error:
+                self.logger.error(f"数据插入失败: {insert_error}")
+                return False, 0, f"数据插入失败: {str(insert_error)}"
+            
+            # 交易日历更新后刷新共享的日历索引
+            if table_name == 'trade_calendar':
+                get_trade_calendar(self.db_manager, reload=True)
+            
+            return True, records, f"成功获取 {records} 条记录"
+            
+        except Exception as e:
+            self.logger.error(f"API {api_key} 调用失败: {str(e)}")
+            return False, 0, f"API调用失败: {str(e)}"
+            
+    def _clean_frame(self, api_name, df):
+        """清洗API返回的数据"""
+        return clean_frame(api_name, df)
+        
+    def _execute_daily_data(self, config):
+        """执行日线数据获取 - 基于测试报告优化策略"""
+        try:
+            start_date, end_date = config.get('date_range') or get_time_range(config['time_range'])
+            
+            # 根据测试报告，优先使用批量查询方式
+            strategy = config.get('strategy', 'batch_query')
+            
+            if strategy == 'single_date_all':
+                # 策略1: 单日全市场查询 (测试成功: 5,444行/1.14秒)
+                self._notify('progress', -1, "使用单日全市场查询策略...")
+                return self._execute_single_date_all_market(config, start_date, end_date)
+            
+            elif strategy == 'multi_stock_multi_date':
+                # 策略2: 多股票多日查询 (测试成功: 738行/0.23秒)
+                self._notify('progress', -1, "使用多股票多日查询策略...")
+                return self._execute_multi_stock_multi_date(config, start_date, end_date)
+            
+            else:
+                # 默认策略: 混合模式
+                self._notify('progress', -1, "使用混合查询策略...")
+                return self._execute_hybrid_daily_strategy(config, start_date, end_date)
+            
+        except Exception as e:
+            return False, 0, f"日线数据获取失败: {str(e)}"
+    
+    def _execute_single_date_all_market(self, config, start_date, end_date):
+        """单日全市场查询策略"""
+        low_priority = config.get('low_priority', False)
+        try:
+            calendar = get_trade_calendar(self.db_manager)
+            if calendar.covers(start_date, end_date):
+                # 只请求交易日，跳过周末和节假日
+                dates = calendar.open_days(start_date, end_date)
+            else:
+                from datetime import datetime, timedelta
+                
+                self.logger.warning("交易日历未覆盖请求区间，按自然日逐日查询")
+                dates = []
+                current_date = datetime.strptime(start_date, '%Y%m%d')
+                end_date_obj = datetime.strptime(end_date, '%Y%m%d')
+                while current_date <= end_date_obj:
+                    dates.append(current_date.strftime('%Y%m%d'))
+                    current_date += timedelta(days=1)
+            
+            # 跳过已完成检查点的日期
+            done_dates = {start for chunk_key, start, end in self._load_checkpoints() if chunk_key == '*'}
+            if done_dates:
+                self.logger.info(f"续传: 跳过已完成的 {len(done_dates)} 个交易日")
+            # 最新交易日优先，中断时已入库的是最近的数据
+            dates = sorted((date_str for date_str in dates if date_str not in done_dates), reverse=True)
+            
+            def fetch_codes(codes, trade_date, _end_date):
+                if codes is None:
+                    return self._fetch(config['api_name'], low_priority=low_priority, trade_date=trade_date)
+                return self._fetch(config['api_name'], low_priority=low_priority, ts_code=','.join(codes),
+                                   trade_date=trade_date)
+            
+            def fetch(date_str):
+                # 单日全市场查询（由调度器限频，多线程并发），达到行数上限时按股票拆分重取
+                return self.chunk_planner.fetch_market_day(
+                    config['api_name'], fetch_codes, date_str, lambda: self.db_manager.listed_codes(date_str))
+            
+            def transform(date_str, df):
+                return self._clean_frame(config['api_name'], df)
+            
+            def write(conn, date_str, df):
+                return self._write_chunk(conn, config['table'], df, '*', date_str, date_str)
+            
+            total_records = 0
+            failed = []
+            for date_str, records, error in self.pipeline.run(dates, fetch, write, transform):
+                if error is not None:
+                    self.logger.warning(f"获取 {date_str} 数据失败: {error}")
+                    if classify_error(error) == PERMISSION_DENIED:
+                        return False, total_records, f"没有接口权限: {error}"
+                    if classify_error(error) == QUOTA_EXCEEDED:
+                        return False, total_records, f"接口额度不足: {error}"
+                    failed.append(({'trade_date': date_str}, error))
+                    continue
+                
+                total_records += records
+                self.logger.info(f"获取 {date_str} 数据: {records} 条")
+            
+            return True, total_records, self._enqueue_failed(
+                config, failed, f"成功获取 {total_records} 条{config['api_name']}记录")
+            
+        except Exception as e:
+            return False, 0, f"单日全市场查询失败: {str(e)}"
+    
+    def _execute_multi_stock_multi_date(self, config, start_date, end_date):
+        """多股票多日查询策略"""
+        low_priority = config.get('low_priority', False)
+        try:
+            # 获取股票列表
+            stocks_df = self._fetch('stock_basic', low_priority=low_priority, exchange='', list_status='L',
+                                    fields='ts_code,list_date')
+            stock_codes = stocks_df['ts_code'].tolist()
+            list_dates = dict(zip(stocks_df['ts_code'], stocks_df['list_date'])) if 'list_date' in stocks_df else {}
+            
+            # 续传时沿用上次的日期区间，并跳过已完成分块中的股票
+            checkpoints = [cp for cp in self._load_checkpoints() if cp[0] != '*']
+            if checkpoints:
+                _, start_date, end_date = checkpoints[0]
+                done_codes = {code for chunk_key, _, _ in checkpoints for code in chunk_key.split(',')}
+                stock_codes = [code for code in stock_codes if code not in done_codes]
+                self.logger.info(f"续传: 跳过已完成的 {len(done_codes)} 只股票，区间 {start_date}~{end_date}")
+            
+            # 按区间交易日数和单次行数上限决定每次请求的股票数
+            chunks = self.chunk_planner.plan(config['api_name'], stock_codes, start_date, end_date, list_dates)
+            
+            def fetch_range(codes, chunk_start, chunk_end):
+                return self._fetch(config['api_name'], low_priority=low_priority, ts_code=','.join(codes),
+                                   start_date=chunk_start, end_date=chunk_end)
+            
+            def fetch(batch_codes):
+                # 多股票多日查询（由调度器限频，多线程并发），响应被截断时拆分重取
+                return self.chunk_planner.fetch_complete(config['api_name'], fetch_range,
+                                                         batch_codes, start_date, end_date)
+            
+            def transform(batch_codes, df):
+                return self._clean_frame(config['api_name'], df)
+            
+            def write(conn, batch_codes, df):
+                return self._write_chunk(conn, config['table'], df, ','.join(batch_codes), start_date, end_date)
+            
+            total_records = 0
+            finished = 0
+            failed = []
+            for batch_codes, records, error in self.pipeline.run(chunks, fetch, write, transform):
+                finished += 1
+                self._notify('progress', -1, f"处理批次 {finished}/{len(chunks)}...")
+                
+                if error is not None:
+                    self.logger.warning(f"批次 {batch_codes[0]} 等 {len(batch_codes)} 只股票获取失败: {error}")
+                    if classify_error(error) == PERMISSION_DENIED:
+                        # 没有权限时后续分块也会失败，停止请求以免消耗额度
+                        return False, total_records, f"没有接口权限: {error}"
+                    if classify_error(error) == QUOTA_EXCEEDED:
+                        return False, total_records, f"接口额度不足: {error}"
+                    failed.append(({'ts_code': ','.join(batch_codes), 'start_date': start_date,
+                                    'end_date': end_date}, error))
+                    continue
+                
+                total_records += records
+                self.logger.info(f"批次 {finished}/{len(chunks)} 获取数据: {records} 条")
+            
+            return True, total_records, self._enqueue_failed(
+                config, failed, f"成功获取 {total_records} 条日线记录")
+            
+        except Exception as e:
+            return False, 0, f"多股票多日查询失败: {str(e)}"
+    
+    def _execute_hybrid_daily_strategy(self, config, start_date, end_date):
+        """混合查询策略 - 结合两种方式的优势"""
+        try:
+            # 先尝试多股票多日查询（效率更高）
+            success, records, message = self._execute_multi_stock_multi_date(config, start_date, end_date)
+            
+            if success and records > 0:
+                return True, records, f"混合策略成功: {message}"
+            
+            # 如果失败，回退到单日全市场查询
+            self.logger.info("多股票查询失败，回退到单日查询")
+            return self._execute_single_date_all_market(config, start_date, end_date)
+            
+        except Exception as e:
+            return False, 0, f"混合策略失败: {str(e)}"
+            
+    def _execute_period_data(self, period_type, config):
+        """执行周线/月线数据获取"""
+        if config.get('source') == 'resample':
+            # 由已入库的日线按交易日历的周/月边界在本地生成，覆盖全市场且不消耗接口调用
+            self._notify('progress', -1, f"由日线生成{config['description']}...")
+            return self.resampler.update('W' if period_type == 'weekly' else 'M')
+        
+        try:
+            start_date, end_date = get_time_range(config['time_range'])
+            test_codes = config.get('test_codes', '000001.SZ,600000.SH')
+            df = self._fetch(period_type, ts_code=test_codes, start_date=start_date, end_date=end_date)
+            
+            if df.empty:
+                return False, 0, f"{period_type} 数据为空"
+            
+            records = self.db_manager.execute_insert(config['table'], self._clean_frame(period_type, df))
+            
+            # 记录成功信息
+            self.logger.info(f"{period_type} 数据获取成功: {records} 条记录")
+            
+            return True, records, f"成功获取 {records} 条{period_type}记录"
+            
+        except Exception as e:
+            self.logger.error(f"{period_type}数据获取失败: {str(e)}")
+            return False, 0, f"{period_type}数据获取失败: {str(e)}"
+            
+    def _enqueue_failed(self, config, failed, message):
+        """把重试后仍失败的分块加入修复队列，返回补充说明后的结果消息"""
+        if not failed:
+            return message
+        for params, error in failed:
+            self.repair_queue.add(config['table'], config['api_name'], params, error)
+        self.logger.warning(f"{config['api_name']} 有 {len(failed)} 个分块失败，已加入修复队列")
+        return f"{message}，{len(failed)} 个分块失败已加入修复队列"
+        
+    def repair_failed_chunks(self, api_name=None):
+        """
+        补抓修复队列中的分块
+        
+        Returns:
+            tuple: (修复数, 失败数, 写入记录数)
+        """
+        def fetch(queued_api, params):
+            if 'ts_code' in params and 'start_date' in params and 'end_date' in params:
+                # 多股票多日请求同样需要处理截断
+                params = dict(params)
+                codes = params.pop('ts_code').split(',')
+                start_date, end_date = params.pop('start_date'), params.pop('end_date')
+                return self.chunk_planner.fetch_complete(
+                    queued_api,
+                    lambda chunk_codes, chunk_start, chunk_end: self._fetch(
+                        queued_api, ts_code=','.join(chunk_codes), start_date=chunk_start,
+                        end_date=chunk_end, **params),
+                    codes, start_date, end_date)
+            return self._fetch(queued_api, **params)
+        
+        return self.repair_queue.process(fetch, self._clean_frame, api_name)
+        
+    def _update_progress_db(self, batch_name, api_name, status, start_time, end_time=None, records=0, error_msg=None):
+        """更新进度数据库"""
+        try:
+            conn = self.db_manager.get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT OR REPLACE INTO init_progress 
+                (batch_name, api_name, status, start_time, end_time, progress, total_records, error_msg)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (batch_name, api_name, status, start_time, end_time, 100 if status == 'completed' else 0, records, error_msg))
+            
+            conn.commit()
+            conn.close()
+            
+        except Exception as e:
+            print(f"更新进度失败: {e}")
+            
+    def _load_progress_status(self, batch_name):
+        """读取批次内各API上次的执行状态"""
+        try:
+            rows = self.db_manager.execute_query(
+                "SELECT api_name, status FROM init_progress WHERE batch_name = ?", (batch_name,)
+            )
+            return dict(rows)
+        except Exception as e:
+            self.logger.warning(f"读取初始化进度失败: {e}")
+            return {}
+            
+    def _has_checkpoints(self, batch_name, api_key):
+        """API是否存在分块检查点"""
+        rows = self.db_manager.execute_query(
+            "SELECT 1 FROM init_chunk_progress WHERE batch_name = ? AND api_name = ? LIMIT 1",
+            (batch_name, api_key)
+        )
+        return bool(rows)
+        
+    def _clear_checkpoints(self, batch_name, api_key):
+        """清除API的分块检查点"""
+        conn = self.db_manager.get_connection()
+        try:
+            conn.execute("DELETE FROM init_chunk_progress WHERE batch_name = ? AND api_name = ?",
+                         (batch_name, api_key))
+            conn.commit()
+        finally:
+            conn.close()
+        
+    def _load_checkpoints(self):
+        """读取当前API已完成的分块 [(chunk_key, start_date, end_date)]"""
+        if not self._checkpoint_scope:
+            return []
+        batch_name, api_key = self._checkpoint_scope
+        return self.db_manager.execute_query(
+            """SELECT chunk_key, start_date, end_date FROM init_chunk_progress
+               WHERE batch_name = ? AND api_name = ? AND status = 'completed'""",
+            (batch_name, api_key)
+        )
+        
+    def _write_chunk(self, conn, table_name, df, chunk_key, start_date, end_date):
+        """在写入线程的连接上写入分块数据，并在同一事务中记录检查点"""
+        records = self.db_manager.upsert_dataframe(conn, table_name, df)
+        if self._checkpoint_scope:
+            batch_name, api_key = self._checkpoint_scope
+            conn.execute('''
+                INSERT OR REPLACE INTO init_chunk_progress
+                (batch_name, api_name, chunk_key, start_date, end_date, status, records, update_time)
+                VALUES (?, ?, ?, ?, ?, 'completed', ?, ?)
+            ''', (batch_name, api_key, chunk_key, start_date, end_date, records,
+                  datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        return records
+        
+    def load_token_config(self):
+        """加载token配置"""
+        return load_token_config()
+            
+    def _clear_batch_tables(self, batch_name, apis):
+        """清空批次相关表数据"""
+        try:
+            for api_key, config in apis.items():
+                table_name = config.get('table')
+                if table_name:
+                    self.logger.info(f"清空表 {table_name} 的数据")
+                    self.db_manager.clear_table_data(table_name)
+        except Exception as e:
+            self.logger.warning(f"清空表数据失败: {e}")
\ No newline at end of file
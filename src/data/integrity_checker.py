@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据完整性检查 - 每张表一次 GROUP BY 统计逐日记录数，与应有数量比较，
+按 DATA_INTEGRITY_CONFIG 的阈值分级后批量写入 data_integrity_log
+"""
+
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .api_config import DATA_INTEGRITY_CONFIG
+from .gap_detector import GapDetector, PROBLEM_CONDITIONS, SCAN_DAYS
+from .trade_calendar import get_trade_calendar
+
+# 完整性状态
+COMPLETE = 'complete'  # 没有缺失
+MINOR = 'minor'        # 缺失率不超过 missing_threshold
+PARTIAL = 'partial'    # 缺失率不超过 full_update_threshold，按股票补抓
+FULL = 'full'          # 缺失率过高，整日重新获取
+
+LOG_COLUMNS = ['table_name', 'trade_date', 'expected_count', 'actual_count', 'missing_count',
+               'missing_rate', 'check_time', 'status']
+
+
+class IntegrityChecker:
+    """完整性检查
+
+    实际数量只统计有效记录（不满足 PROBLEM_CONDITIONS 的行），异常数据与缺失同样需要重新获取。
+    """
+
+    def __init__(self, db_manager, calendar=None, gap_detector=None):
+        self.db_manager = db_manager
+        self.calendar = calendar or get_trade_calendar(db_manager)
+        self.gap_detector = gap_detector or GapDetector(db_manager, self.calendar)
+        self.logger = logging.getLogger('StockSystem.IntegrityChecker')
+
+    def _default_range(self, table_name, recent):
+        """默认检查区间：表中已有的全部历史，recent 时为最近 check_days 个交易日"""
+        end_date = self.calendar.latest_open()
+        if not end_date:
+            return None, None
+        if recent:
+            days = self.calendar.open_days(self.calendar.first_date, end_date)
+            return days[-DATA_INTEGRITY_CONFIG[table_name]['check_days']:][0], end_date
+        return self.db_manager.execute_query(f"SELECT MIN(trade_date) FROM {table_name}")[0][0], end_date
+
+    def _expected(self, table_name, days):
+        """每个交易日应有的记录数"""
+        if DATA_INTEGRITY_CONFIG[table_name].get('universe', 'listed') == 'listed':
+            return self.gap_detector.expected_counts(days)
+
+        # tracked: 各代码从第一条记录起每日应有数据
+        first_dates = [row[0] for row in self.db_manager.execute_query(
+            f"SELECT MIN(trade_date) FROM {table_name} GROUP BY ts_code")]
+        lo = np.searchsorted(np.asarray(days, dtype=str), np.asarray(first_dates, dtype=str), side='left')
+        return np.cumsum(np.bincount(lo, minlength=len(days) + 1))[:len(days)]
+
+    def _universe_filter(self, table_name):
+        """
+        只统计应有集合内的记录：listed 时与 _expected 一致，限定在上市期间且不在停牌区间内，
+        已退市（不在股票列表中）的股票的历史记录不抵消真正缺失的股票
+        """
+        where = " WHERE t.trade_date BETWEEN ? AND ?"
+        if DATA_INTEGRITY_CONFIG[table_name].get('universe', 'listed') != 'listed':
+            return where
+        sql = (" JOIN stock_basic b ON b.ts_code = t.ts_code"
+               " AND (b.list_date IS NULL OR b.list_date <= t.trade_date)"
+               " AND (b.delist_date IS NULL OR b.delist_date = '' OR t.trade_date < b.delist_date)" + where)
+        if self.db_manager.table_exists('stock_suspension'):
+            sql += (" AND NOT EXISTS (SELECT 1 FROM stock_suspension s WHERE s.ts_code = t.ts_code"
+                    " AND s.start_date <= t.trade_date AND s.end_date >= t.trade_date)")
+        return sql
+
+    def check(self, table_name, start_date=None, end_date=None, recent=False):
+        """
+        检查一张表
+
+        Returns:
+            DataFrame: 列同 data_integrity_log，每个交易日一行
+        """
+        if start_date is None or end_date is None:
+            default_start, default_end = self._default_range(table_name, recent)
+            start_date, end_date = start_date or default_start, end_date or default_end
+        days = self.calendar.open_days(start_date, end_date) if start_date and end_date else []
+        if not days:
+            return pd.DataFrame(columns=LOG_COLUMNS)
+
+        # 一次分组统计区间内每日的记录数和异常记录数
+        # 指数等未单独配置的行情表只检查收盘价
+        condition = PROBLEM_CONDITIONS.get(table_name, 'close <= 0 OR close IS NULL')
+        access = ' NOT INDEXED' if len(days) > SCAN_DAYS else ''
+        counts = pd.DataFrame(self.db_manager.execute_query(
+            f"SELECT t.trade_date, COUNT(*), SUM({condition}) FROM {table_name} t{access}"
+            f"{self._universe_filter(table_name)} GROUP BY t.trade_date", (days[0], days[-1])),
+            columns=['trade_date', 'rows', 'bad']).set_index('trade_date')
+        counts = counts.reindex(days, fill_value=0).fillna(0)
+
+        config = DATA_INTEGRITY_CONFIG[table_name]
+        expected = self._expected(table_name, days)
+        actual = (counts['rows'] - counts['bad']).to_numpy().astype('int64')
+        missing = np.maximum(expected - actual, 0)
+        rate = np.divide(missing, expected, out=np.zeros(len(days)), where=expected > 0)
+        status = np.select([missing == 0, rate <= config['missing_threshold'],
+                            rate <= config['full_update_threshold']],
+                           [COMPLETE, MINOR, PARTIAL], default=FULL)
+
+        return pd.DataFrame({
+            'table_name': table_name,
+            'trade_date': days,
+            'expected_count': expected.astype('int64'),
+            'actual_count': actual,
+            'missing_count': missing.astype('int64'),
+            'missing_rate': rate.round(6),
+            'check_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'status': status
+        }, columns=LOG_COLUMNS)
+
+    def write_log(self, result):
+        """替换区间内的检查记录，一个事务内批量写入"""
+        if result.empty:
+            return 0
+        table_name = result['table_name'].iloc[0]
+        conn = self.db_manager.get_connection()
+        try:
+            conn.execute("DELETE FROM data_integrity_log WHERE table_name = ? AND trade_date BETWEEN ? AND ?",
+                         (table_name, result['trade_date'].iloc[0], result['trade_date'].iloc[-1]))
+            conn.executemany(
+                f"INSERT INTO data_integrity_log ({', '.join(LOG_COLUMNS)}) VALUES ({', '.join('?' * len(LOG_COLUMNS))})",
+                result.astype(object).itertuples(index=False, name=None))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return len(result)
+
+    def run(self, tables=None, start_date=None, end_date=None, recent=False):
+        """
+        检查各表并写入日志
+
+        Args:
+            tables: 默认 DATA_INTEGRITY_CONFIG 中的全部表
+            recent: 未指定区间时只检查最近 check_days 个交易日
+
+        Returns:
+            dict: {表名: 检查结果 DataFrame}
+        """
+        results = {}
+        for table_name in tables or DATA_INTEGRITY_CONFIG:
+            if not self.db_manager.table_exists(table_name):
+                continue
+            result = self.check(table_name, start_date, end_date, recent)
+            self.write_log(result)
+            if not result.empty:
+                counts = result['status'].value_counts()
+                self.logger.info(f"{table_name} {result['trade_date'].iloc[0]}~{result['trade_date'].iloc[-1]}: "
+                                 + ', '.join(f"{status} {count}" for status, count in counts.items()))
+            results[table_name] = result
+        return results
+
+    def statuses(self, table_name, trade_dates):
+        """
+        读取已记录的完整性状态
+
+        Returns:
+            dict: {trade_date: status}，未检查过的交易日不在其中
+        """
+        if not trade_dates:
+            return {}
+        return dict(self.db_manager.execute_query(
+            "SELECT trade_date, status FROM data_integrity_log WHERE table_name = ? AND trade_date BETWEEN ? AND ?",
+            (table_name, min(trade_dates), max(trade_dates))))
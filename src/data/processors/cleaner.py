@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据清洗 - 按接口字段类型对整列做向量化转换
+"""
+
+import numpy as np
+import pandas as pd
+
+from .schemas import get_api_schema
+
+# 接口返回中表示空值的文本
+NULL_TOKENS = ['', ' ', '{}', ' {}', '[]', 'nan', 'NaN', 'None', 'null', 'NULL']
+
+
+def _to_float(series):
+    # 字典、空串等无法解析的值变为NaN，正负无穷同样视为空值
+    values = pd.to_numeric(series, errors='coerce')
+    if values.dtype.kind != 'f':
+        values = values.astype('float64')
+    array = values.to_numpy()
+    infinite = np.isinf(array)
+    if infinite.any():
+        values = values.mask(infinite)
+    return values
+
+
+def _to_int(series):
+    values = _to_float(series)
+    if values.isna().any():
+        # 有空值时保留浮点类型，写入INTEGER列时SQLite会自动转换
+        return values
+    return pd.to_numeric(values.astype('int64'), downcast='integer')
+
+
+def _cell_to_text(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        return str(value)
+    if isinstance(value, (float, np.floating)) and np.isfinite(value) and value == int(value):
+        return str(int(value))
+    return None
+
+
+def _to_text(series):
+    if series.dtype.kind in 'iuf':
+        # 数值形式的日期/代码（如 20240102.0）转为文本
+        valid = series.notna()
+        text = pd.Series(None, index=series.index, dtype=object)
+        text[valid] = series[valid].astype('int64').astype(str)
+        return text
+    if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) not in ('string', 'empty'):
+        # 混合类型列：整数值转为文本，字典、列表等统一为空值
+        series = pd.Series([_cell_to_text(value) for value in series.to_numpy()],
+                           index=series.index, dtype=object)
+    if pd.api.types.is_string_dtype(series.dtype):
+        series = series.mask(series.isin(NULL_TOKENS))
+    return series
+
+
+_CONVERTERS = {
+    'float': _to_float,
+    'int': _to_int,
+    'str': _to_text,
+    'date': _to_text,
+    'category': lambda series: _to_text(series).astype('category')
+}
+
+
+def normalize_column(series, kind):
+    """按字段类型转换单列，kind 为空时原样返回"""
+    return _CONVERTERS[kind](series) if kind else series
+
+
+def normalize_frame(df, schema):
+    """
+    按字段类型定义转换DataFrame，每列只处理一次，不修改调用方的数据
+
+    Args:
+        df: 原始数据
+        schema: {列名: 类型}，未定义的列原样保留
+    """
+    if df is None or df.empty or not schema:
+        return df
+
+    columns = {col: normalize_column(df[col], schema.get(col)) for col in df.columns}
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def clean_frame(api_name, df):
+    """按接口的字段类型定义清洗数据"""
+    return normalize_frame(df, get_api_schema(api_name))
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+复权价格计算 - 由 daily_basic 与 adj_factor 生成前复权/后复权行情
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'pre_close']
+
+ADJUST_TYPES = ('qfq', 'hfq', 'none')
+
+# 单次 IN 查询的股票代码数，低于 SQLite 的变量个数上限
+_QUERY_CODES = 500
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class PriceAdjuster:
+    """复权价格引擎
+
+    按股票缓存完整的日线与复权因子（已对齐到每个交易日），复权时整列相乘。
+    每次取数前读取 data_change_log 中新增的日线、复权因子写入记录，只清除写入涉及的股票
+    （全市场写入时清除全部）；没有新写入时只读 sqlite_sequence 一行，不扫描行情表。
+    不经 BulkWriter 直接修改行情表后需调用 invalidate()。
+
+    前复权以该股票最新的复权因子为基准，最新价格与实际行情一致；
+    后复权价格为 价格 × 复权因子。
+    """
+
+    def __init__(self, db_manager, cache_size=1000):
+        self.db_manager = db_manager
+        self.cache_size = cache_size  # 缓存的股票数上限，超出后按最近最少使用淘汰
+        self._cache = OrderedDict()  # ts_code -> DataFrame
+        self._change_id = None  # 已处理到的 data_change_log 记录id
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+        self.logger = logging.getLogger('StockSystem.PriceAdjuster')
+
+    # ------------------------------------------------------------------
+    # 缓存
+    # ------------------------------------------------------------------
+    def _query(self, query, params=()):
+        conn = self.db_manager.get_connection()
+        try:
+            return pd.read_sql_query(query, conn, params=list(params))
+        finally:
+            conn.close()
+
+    def _all_codes(self):
+        return [row[0] for row in self.db_manager.execute_query(
+            "SELECT DISTINCT ts_code FROM daily_basic ORDER BY ts_code")]
+
+    def _sync_changes(self):
+        """按上次检查之后的写入记录清除缓存"""
+        if not self.db_manager.table_exists('data_change_log'):
+            # 旧版本建的库没有变更记录表，无法判断是否有写入
+            self.invalidate()
+            return
+        rows = self.db_manager.execute_query("SELECT seq FROM sqlite_sequence WHERE name = 'data_change_log'")
+        last_id = rows[0][0] if rows else 0
+        with self._lock:
+            since = self._change_id
+            self._change_id = last_id
+        if since is None or last_id == since:
+            return
+
+        changes = self.db_manager.execute_query(
+            "SELECT table_name, ts_codes FROM data_change_log WHERE id > ? AND id <= ?", (since, last_id))
+        # 记录已被清理（编号不连续）或有全市场写入时清除全部
+        touched = [codes for table_name, codes in changes if table_name in ('daily_basic', 'adj_factor')]
+        if len(changes) < last_id - since or any(codes is None for codes in touched):
+            self.invalidate()
+        else:
+            self.invalidate({code for codes in touched for code in codes.split(',')})
+
+    def _load(self, ts_codes):
+        """读取日线并把复权因子对齐到每个交易日"""
+        frames = []
+        for chunk in _chunks(ts_codes, _QUERY_CODES):
+            placeholders = ', '.join(['?'] * len(chunk))
+            frames.append(self._query(
+                "SELECT d.ts_code, d.trade_date, d.open, d.high, d.low, d.close, d.pre_close, "
+                "d.vol, d.amount, a.adj_factor "
+                "FROM daily_basic d LEFT JOIN adj_factor a "
+                "ON a.ts_code = d.ts_code AND a.trade_date = d.trade_date "
+                f"WHERE d.ts_code IN ({placeholders}) ORDER BY d.ts_code, d.trade_date", chunk))
+        df = pd.concat(frames, ignore_index=True)
+
+        # 缺少因子的交易日沿用前一个因子，首个因子之前的日期取首个因子，没有因子的股票不复权
+        factors = df.groupby('ts_code', sort=False)['adj_factor'].ffill()
+        df['adj_factor'] = factors.groupby(df['ts_code'], sort=False).bfill().fillna(1.0)
+        return df
+
+    def _frames(self, ts_codes):
+        """取各股票的对齐数据：没有新写入的用缓存，其余一次性重新加载"""
+        self._sync_changes()
+        with self._lock:
+            cached, stale = {}, []
+            for code in ts_codes:
+                entry = self._cache.get(code)
+                if entry is not None:
+                    self._cache.move_to_end(code)
+                    cached[code] = entry
+                else:
+                    stale.append(code)
+            self.stats['hits'] += len(cached)
+            self.stats['misses'] += len(stale)
+
+        if stale:
+            loaded = self._load(stale)
+            with self._lock:
+                for code, frame in loaded.groupby('ts_code', sort=False):
+                    cached[code] = frame
+                    self._cache[code] = frame
+                    self._cache.move_to_end(code)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            self.logger.debug(f"复权数据重新加载 {len(stale)} 只股票")
+
+        frames = [cached[code] for code in ts_codes if code in cached]
+        if not frames:
+            return pd.DataFrame(columns=['ts_code', 'trade_date'] + PRICE_COLUMNS + ['vol', 'amount', 'adj_factor'])
+        return pd.concat(frames, ignore_index=True)
+
+    def invalidate(self, ts_codes=None):
+        """清除指定股票（为空时全部）的缓存"""
+        with self._lock:
+            if ts_codes is None:
+                self._cache.clear()
+            else:
+                for code in ts_codes:
+                    self._cache.pop(code, None)
+
+    def on_reference_delta(self, delta):
+        """股票列表变化（新上市、更名、退市）时清除涉及股票的缓存，代码被复用时不沿用旧数据"""
+        if delta.table_name == 'stock_basic' and delta.db_path == self.db_manager.db_path:
+            self.invalidate(delta.affected_codes())
+
+    # ------------------------------------------------------------------
+    # 复权
+    # ------------------------------------------------------------------
+    def adjust(self, ts_codes=None, start_date=None, end_date=None, adjust='qfq'):
+        """
+        复权行情
+
+        Args:
+            ts_codes: 股票代码列表或逗号分隔的字符串，为空时取全部股票
+            start_date/end_date: 日期区间（YYYYMMDD），为空时不限
+            adjust: 'qfq' 前复权、'hfq' 后复权、'none' 不复权
+
+        Returns:
+            DataFrame: ts_code, trade_date, open, high, low, close, pre_close,
+                       change, pct_chg, vol, amount, adj_factor，按股票、日期升序
+        """
+        if adjust not in ADJUST_TYPES:
+            raise ValueError(f"不支持的复权方式: {adjust}")
+        if isinstance(ts_codes, str):
+            ts_codes = [code for code in ts_codes.split(',') if code]
+        ts_codes = list(dict.fromkeys(ts_codes)) if ts_codes else self._all_codes()
+
+        df = self._frames(ts_codes)
+        if adjust == 'qfq':
+            ratio = df['adj_factor'] / df.groupby('ts_code', sort=False)['adj_factor'].transform('last')
+        elif adjust == 'hfq':
+            ratio = df['adj_factor']
+        else:
+            ratio = None
+
+        if start_date or end_date:
+            mask = pd.Series(True, index=df.index)
+            if start_date:
+                mask &= df['trade_date'] >= start_date
+            if end_date:
+                mask &= df['trade_date'] <= end_date
+            df = df[mask]
+            ratio = ratio[mask] if ratio is not None else None
+
+        result = df.copy()
+        if ratio is not None:
+            result[PRICE_COLUMNS] = df[PRICE_COLUMNS].mul(ratio, axis=0)
+        result['change'] = result['close'] - result['pre_close']
+        result['pct_chg'] = result['change'] / result['pre_close'] * 100
+        return result[['ts_code', 'trade_date'] + PRICE_COLUMNS +
+                      ['change', 'pct_chg', 'vol', 'amount', 'adj_factor']].reset_index(drop=True)
+
+    def close_series(self, ts_code, start_date=None, end_date=None, adjust='qfq'):
+        """单只股票的复权收盘价序列（以交易日为索引）"""
+        df = self.adjust([ts_code], start_date, end_date, adjust)
+        return df.set_index('trade_date')['close']
+
+
+_adjuster_cache = {}
+_adjuster_lock = threading.Lock()
+
+
+def get_price_adjuster(db_manager):
+    """获取共享的复权引擎（按数据库路径缓存，各使用方共用同一份复权缓存）"""
+    from ..storage import add_delta_listener  # storage 导入时依赖 processors，延迟导入避免循环
+    with _adjuster_lock:
+        adjuster = _adjuster_cache.get(db_manager.db_path)
+        if adjuster is None:
+            adjuster = PriceAdjuster(db_manager)
+            add_delta_listener(adjuster.on_reference_delta)
+            _adjuster_cache[db_manager.db_path] = adjuster
+        return adjuster
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+周期K线重采样 - 由 daily_basic 在本地生成周线、月线及自定义周期K线
+"""
+
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# 周期 -> 存储表
+PERIOD_TABLES = {
+    'W': 'weekly_basic',
+    'M': 'monthly_basic'
+}
+
+# 日历周期 -> pandas Period 频率（周线以周日结束，即周一至周日为一周）
+_CALENDAR_FREQS = {
+    'W': 'W-SUN',
+    'M': 'M',
+    'Q': 'Q',
+    'Y': 'Y'
+}
+
+BAR_COLUMNS = ['ts_code', 'trade_date', 'open', 'high', 'low', 'close', 'pre_close',
+               'change', 'pct_chg', 'vol', 'amount']
+
+# 每次重算的最大交易日跨度，限制单次读入的日线数据量
+_SLICE_DAYS = 120
+
+
+class PeriodResampler:
+    """周期K线重采样
+
+    周期边界取自交易日历：每根K线包含同一自然周/月（或N个交易日）内的交易日，
+    trade_date 为该周期内最后一个有日线的交易日。增量更新时只重算日线有变化的周期。
+
+    支持的周期：'W' 周、'M' 月、'Q' 季、'Y' 年，以及 'ND'（每N个交易日，如 '10D'）；
+    其中周线、月线写入 weekly_basic / monthly_basic，其余周期通过 compute() 直接返回。
+    """
+
+    def __init__(self, db_manager, calendar=None):
+        self.db_manager = db_manager
+        if calendar is None:
+            # 延迟导入：database_manager 经由存储模块引用本包
+            from ..trade_calendar import get_trade_calendar
+            calendar = get_trade_calendar(db_manager)
+        self.calendar = calendar
+        self.logger = logging.getLogger('StockSystem.PeriodResampler')
+
+    # ------------------------------------------------------------------
+    # 周期划分
+    # ------------------------------------------------------------------
+    def _trading_days(self, start_date, end_date):
+        """区间内的交易日；日历未覆盖时使用日线表中出现过的日期"""
+        if self.calendar.covers(start_date, end_date):
+            return self.calendar.open_days(start_date, end_date)
+        rows = self.db_manager.execute_query(
+            "SELECT DISTINCT trade_date FROM daily_basic WHERE trade_date BETWEEN ? AND ? ORDER BY trade_date",
+            (start_date, end_date))
+        return [row[0] for row in rows]
+
+    def period_frame(self, days, period):
+        """
+        交易日 -> 所属周期
+
+        Returns:
+            DataFrame: trade_date, period_key, period_start, period_end
+        """
+        days = pd.Index(sorted(days))
+        if period in _CALENDAR_FREQS:
+            keys = pd.to_datetime(days, format='%Y%m%d').to_period(_CALENDAR_FREQS[period]).astype(str)
+        elif period.endswith('D') and period[:-1].isdigit():
+            # 按交易日序号分段，序号取自日历以保证分段位置与区间起点无关
+            size = int(period[:-1])
+            ordinals = [self.calendar.to_ordinal(day) for day in days]
+            if any(ordinal is None for ordinal in ordinals):
+                ordinals = range(len(days))
+            keys = pd.Index([ordinal // size for ordinal in ordinals]).astype(str)
+        else:
+            raise ValueError(f"不支持的周期: {period}")
+
+        frame = pd.DataFrame({'trade_date': days, 'period_key': keys})
+        grouped = frame.groupby('period_key', sort=False)['trade_date']
+        frame['period_start'] = grouped.transform('min')
+        frame['period_end'] = grouped.transform('max')
+        return frame
+
+    def _expand_to_periods(self, start_date, end_date, period):
+        """把区间扩展到完整周期的边界"""
+        if period in _CALENDAR_FREQS:
+            freq = _CALENDAR_FREQS[period]
+            start = pd.Timestamp(start_date).to_period(freq).start_time.strftime('%Y%m%d')
+            end = pd.Timestamp(end_date).to_period(freq).end_time.strftime('%Y%m%d')
+            return start, end
+        size = int(period[:-1])
+        start_ordinal = self.calendar.to_ordinal(start_date)
+        end_ordinal = self.calendar.to_ordinal(end_date)
+        if start_ordinal is None or end_ordinal is None:
+            return start_date, end_date
+        start = self.calendar.from_ordinal(start_ordinal // size * size)
+        end = self.calendar.from_ordinal(min(len(self.calendar) - 1, (end_ordinal // size + 1) * size - 1))
+        return start or start_date, end or end_date
+
+    # ------------------------------------------------------------------
+    # K线计算
+    # ------------------------------------------------------------------
+    def build_bars(self, daily_df, period, periods=None, period_ends=None):
+        """
+        由日线数据生成周期K线（向量化分组聚合）
+
+        Args:
+            daily_df: 日线数据，需包含 BAR_COLUMNS 中的行情列
+            period: 周期
+            periods: period_frame() 的结果，为空时按日线中的日期计算
+            period_ends: {period_key: K线日期}，只重算部分股票时取全市场的日期，为空时按 daily_df 计算
+        """
+        if daily_df.empty:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+
+        if periods is None:
+            periods = self.period_frame(daily_df['trade_date'].unique(), period)
+        df = daily_df.merge(periods[['trade_date', 'period_key']], on='trade_date', how='inner')
+        # K线日期取周期内已有日线的最后一个交易日，未结束的周期随日线推进
+        df['period_end'] = df.groupby('period_key', sort=False)['trade_date'].transform('max')
+        if period_ends:
+            df['period_end'] = df['period_key'].map(period_ends).fillna(df['period_end'])
+        df = df.sort_values(['ts_code', 'trade_date'], kind='mergesort')
+
+        bars = df.groupby(['ts_code', 'period_key'], sort=False).agg(
+            trade_date=('period_end', 'first'),
+            open=('open', 'first'),
+            high=('high', 'max'),
+            low=('low', 'min'),
+            close=('close', 'last'),
+            pre_close=('pre_close', 'first'),
+            vol=('vol', 'sum'),
+            amount=('amount', 'sum')
+        ).reset_index()
+
+        # 日线缺少昨收时用上一根K线的收盘价
+        bars = bars.sort_values(['ts_code', 'trade_date'], kind='mergesort', ignore_index=True)
+        previous_close = bars.groupby('ts_code', sort=False)['close'].shift(1)
+        bars['pre_close'] = bars['pre_close'].fillna(previous_close)
+        bars['change'] = bars['close'] - bars['pre_close']
+        bars['pct_chg'] = np.round(bars['change'] / bars['pre_close'] * 100, 4)
+        bars['change'] = np.round(bars['change'], 4)
+        return bars[BAR_COLUMNS]
+
+    def _load_daily(self, start_date, end_date, ts_codes=None):
+        """读取区间内的日线数据"""
+        query = (f"SELECT {', '.join(BAR_COLUMNS)} FROM daily_basic "
+                 "WHERE trade_date BETWEEN ? AND ?")
+        params = [start_date, end_date]
+        if ts_codes:
+            query += f" AND ts_code IN ({', '.join(['?'] * len(ts_codes))})"
+            params.extend(ts_codes)
+        conn = self.db_manager.get_connection()
+        try:
+            return pd.read_sql_query(query, conn, params=params)
+        finally:
+            conn.close()
+
+    def compute(self, period, start_date, end_date, ts_codes=None):
+        """
+        计算任意周期的K线（不写库），区间会扩展到完整周期
+
+        Returns:
+            DataFrame: BAR_COLUMNS
+        """
+        start_date, end_date = self._expand_to_periods(start_date, end_date, period)
+        days = self._trading_days(start_date, end_date)
+        if not days:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        daily = self._load_daily(days[0], days[-1], ts_codes)
+        return self.build_bars(daily, period, self.period_frame(days, period))
+
+    # ------------------------------------------------------------------
+    # 增量更新
+    # ------------------------------------------------------------------
+    def _get_watermark(self, table_name):
+        """已处理到的日线变更记录id，需要全量重建时返回None"""
+        rows = self.db_manager.execute_query(
+            "SELECT watermark FROM resample_state WHERE table_name = ?", (table_name,))
+        if not rows or not self.db_manager.execute_query(f"SELECT 1 FROM {table_name} LIMIT 1"):
+            # 从未生成过或表被清空时全量重建
+            return None
+        if not str(rows[0][0]).isdigit():
+            # 旧版本按 update_time 记录的水位，全量重建一次
+            return None
+        return int(rows[0][0])
+
+    def _changes(self, watermark):
+        """
+        水位之后的日线变更
+
+        Returns:
+            tuple: (最新变更id, [(start_date, end_date, [ts_code, ...] 或 None 表示全市场), ...])
+        """
+        if not self.db_manager.table_exists('data_change_log'):
+            return None, []
+        rows = self.db_manager.execute_query(
+            "SELECT id, start_date, end_date, ts_codes FROM data_change_log "
+            "WHERE table_name = 'daily_basic' AND id > ? ORDER BY id", (watermark or 0,))
+        last_id = rows[-1][0] if rows else watermark
+        return last_id, [(start, end, codes.split(',') if codes else None) for _, start, end, codes in rows]
+
+    def _dirty_periods(self, table_name, changes, periods):
+        """
+        受变更影响的周期
+
+        Returns:
+            tuple: (整个周期重算的 period_key 集合, {period_key: 只重算的股票集合})
+        """
+        bounds = periods.groupby('period_key', sort=False)['trade_date'].agg(['min', 'max'])
+        full, partial = set(), {}
+        for start_date, end_date, codes in changes:
+            keys = bounds.index[(bounds['min'] <= end_date) & (bounds['max'] >= start_date)]
+            if codes is None:
+                full.update(keys)
+            else:
+                for key in keys:
+                    partial.setdefault(key, set()).update(codes)
+
+        partial = {key: codes for key, codes in partial.items() if key not in full}
+        if partial:
+            # 周期内最后一个有日线的交易日变化时，所有股票的K线日期随之变化，整个周期重算
+            market_ends = self._period_ends(periods, 'daily_basic')
+            bar_ends = self._period_ends(periods, table_name)
+            for key in list(partial):
+                if market_ends.get(key) != bar_ends.get(key):
+                    full.add(key)
+                    del partial[key]
+        return full, partial
+
+    def _period_ends(self, periods, table_name):
+        """表中各周期出现的最后一个交易日"""
+        rows = self.db_manager.execute_query(
+            f"SELECT DISTINCT trade_date FROM {table_name} WHERE trade_date BETWEEN ? AND ?",
+            (periods['trade_date'].min(), periods['trade_date'].max()))
+        present = periods[periods['trade_date'].isin([row[0] for row in rows])]
+        return present.groupby('period_key', sort=False)['trade_date'].max().to_dict()
+
+    def _rebuild(self, conn, table_name, period, periods, codes=None, period_ends=None):
+        """重算给定周期（可只重算部分股票）：先删除这些周期内的旧K线再写入"""
+        records = 0
+        code_sql = f" AND ts_code IN ({', '.join(['?'] * len(codes))})" if codes else ''
+        for slice_start, slice_end in self._slices(periods):
+            slice_periods = periods[(periods['trade_date'] >= slice_start) & (periods['trade_date'] <= slice_end)]
+            bars = self.build_bars(self._load_daily(slice_start, slice_end, codes), period, slice_periods,
+                                   period_ends)
+            bounds = slice_periods.groupby('period_key', sort=False)['trade_date'].agg(['min', 'max'])
+            conn.executemany(f"DELETE FROM {table_name} WHERE trade_date BETWEEN ? AND ?{code_sql}",
+                             [(start, end, *(codes or [])) for start, end in bounds.itertuples(index=False)])
+            records += self.db_manager.upsert_dataframe(conn, table_name, bars)
+            conn.commit()
+        return records
+
+    def update(self, period, full=False):
+        """
+        增量更新周期K线表
+
+        日线每次写入都在 data_change_log 中记录交易日区间和股票（股票多时记为全市场），
+        只重算水位之后有变更的周期：全市场变更重算整个周期，部分股票的变更只重算这些股票；
+        重算时先删除旧K线再写入，周期结束日变化（如本周尚未结束）时不会残留旧记录。
+
+        Returns:
+            tuple: (success, records, message)
+        """
+        table_name = PERIOD_TABLES[period]
+        try:
+            watermark = None if full else self._get_watermark(table_name)
+            last_id, changes = self._changes(watermark)
+
+            if watermark is None:
+                first_date, last_date = self.db_manager.execute_query(
+                    "SELECT MIN(trade_date), MAX(trade_date) FROM daily_basic")[0]
+                if first_date is None:
+                    return True, 0, "日线数据为空，无需生成"
+            elif not changes:
+                return True, 0, f"{table_name} 已是最新"
+            else:
+                first_date = min(start for start, _, _ in changes)
+                last_date = max(end for _, end, _ in changes)
+
+            start_date, end_date = self._expand_to_periods(first_date, last_date, period)
+            days = self._trading_days(start_date, end_date)
+            periods = self.period_frame(days, period)
+            total_records = 0
+            conn = self.db_manager.get_connection()
+            try:
+                if watermark is None:
+                    total_records += self._rebuild(conn, table_name, period, periods)
+                else:
+                    full_keys, partial = self._dirty_periods(table_name, changes, periods)
+                    if full_keys:
+                        total_records += self._rebuild(conn, table_name, period,
+                                                       periods[periods['period_key'].isin(full_keys)])
+                    # 股票相同的周期一起重算（如一次多股票多日写入涉及的所有周期）
+                    groups = {}
+                    for key, codes in partial.items():
+                        groups.setdefault(tuple(sorted(codes)), []).append(key)
+                    if groups:
+                        period_ends = self._period_ends(periods, 'daily_basic')
+                        for codes, keys in groups.items():
+                            total_records += self._rebuild(conn, table_name, period,
+                                                           periods[periods['period_key'].isin(keys)],
+                                                           list(codes), period_ends)
+                    days = sorted(periods.loc[periods['period_key'].isin(full_keys | set(partial)), 'trade_date'])
+
+                conn.execute("INSERT OR REPLACE INTO resample_state (table_name, watermark, update_time) "
+                             "VALUES (?, ?, ?)",
+                             (table_name, str(last_id or 0), datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+                conn.commit()
+            finally:
+                conn.close()
+            self._prune_changes()
+
+            message = f"本地生成 {table_name} {total_records} 条 ({days[0]}~{days[-1]})" if days else \
+                f"{table_name} 无需更新"
+            self.logger.info(message)
+            return True, total_records, message
+
+        except Exception as e:
+            self.logger.error(f"{table_name} 重采样失败: {e}")
+            return False, 0, f"{table_name} 重采样失败: {str(e)}"
+
+    def _prune_changes(self):
+        """删除所有周期表都已处理的变更记录（其他源表的记录只供复权缓存失效，一并清理）"""
+        rows = self.db_manager.execute_query(
+            f"SELECT watermark FROM resample_state WHERE table_name IN ({', '.join(['?'] * len(PERIOD_TABLES))})",
+            tuple(PERIOD_TABLES.values()))
+        watermarks = [row[0] for row in rows]
+        if len(watermarks) < len(PERIOD_TABLES) or not all(str(value).isdigit() for value in watermarks):
+            return
+        conn = self.db_manager.get_connection()
+        try:
+            conn.execute("DELETE FROM data_change_log WHERE id <= ?",
+                         (min(int(value) for value in watermarks),))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _slices(self, periods):
+        """按完整周期切分重算区间，每段不超过 _SLICE_DAYS 个交易日"""
+        bounds = periods.groupby('period_key', sort=False).agg(
+            period_start=('trade_date', 'min'),
+            period_end=('trade_date', 'max'),
+            days=('trade_date', 'size')
+        ).sort_values('period_start')
+
+        slices, current_start, previous_end, count = [], None, None, 0
+        for period_start, period_end, days in bounds.itertuples(index=False, name=None):
+            if current_start is not None and count + days > _SLICE_DAYS:
+                slices.append((current_start, previous_end))
+                current_start, count = None, 0
+            if current_start is None:
+                current_start = period_start
+            count += days
+            previous_end = period_end
+        if current_start is not None:
+            slices.append((current_start, previous_end))
+        return slices
+
+    def update_all(self, full=False):
+        """更新所有周期K线表"""
+        return {period: self.update(period, full) for period in PERIOD_TABLES}
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接口字段类型定义 - 清洗阶段按此统一转换每一列
+
+类型说明：
+    str      文本（字典、空串、'None'、'nan' 视为空值）
+    category 取值较少的文本，清洗后转为分类类型以节省内存
+    date     YYYYMMDD 日期文本，数值形式的日期会转为文本
+    float    浮点数（无法解析的值和正负无穷视为空值）
+    int      整数，无空值时按取值范围压缩为最小的整数类型
+"""
+
+_PRICE_FIELDS = {
+    'ts_code': 'str',
+    'trade_date': 'date',
+    'open': 'float',
+    'high': 'float',
+    'low': 'float',
+    'close': 'float',
+    'pre_close': 'float',
+    'change': 'float',
+    'pct_chg': 'float',
+    'vol': 'float',
+    'amount': 'float'
+}
+
+API_SCHEMAS = {
+    'stock_basic': {
+        'ts_code': 'str',
+        'symbol': 'str',
+        'name': 'str',
+        'area': 'category',
+        'industry': 'category',
+        'fullname': 'str',
+        'enname': 'str',
+        'cnspell': 'str',
+        'market': 'category',
+        'exchange': 'category',
+        'curr_type': 'category',
+        'list_status': 'category',
+        'list_date': 'date',
+        'delist_date': 'date',
+        'is_hs': 'category',
+        'act_name': 'str',
+        'act_ent_type': 'category'
+    },
+    'stock_company': {
+        'ts_code': 'str',
+        'com_name': 'str',
+        'com_id': 'str',
+        'exchange': 'category',
+        'chairman': 'str',
+        'manager': 'str',
+        'secretary': 'str',
+        'reg_capital': 'float',
+        'setup_date': 'date',
+        'province': 'category',
+        'city': 'category',
+        'introduction': 'str',
+        'website': 'str',
+        'email': 'str',
+        'office': 'str',
+        'employees': 'int',
+        'main_business': 'str',
+        'business_scope': 'str'
+    },
+    'trade_cal': {
+        'exchange': 'category',
+        'cal_date': 'date',
+        'is_open': 'int',
+        'pretrade_date': 'date'
+    },
+    'new_share': {
+        'ts_code': 'str',
+        'sub_code': 'str',
+        'name': 'str',
+        'ipo_date': 'date',
+        'issue_date': 'date',
+        'amount': 'float',
+        'market_amount': 'float',
+        'price': 'float',
+        'pe': 'float',
+        'limit_amount': 'float',
+        'funds': 'float',
+        'ballot': 'float'
+    },
+    'daily': dict(_PRICE_FIELDS),
+    'weekly': dict(_PRICE_FIELDS),
+    'monthly': dict(_PRICE_FIELDS),
+    'index_daily': dict(_PRICE_FIELDS),
+    'adj_factor': {
+        'ts_code': 'str',
+        'trade_date': 'date',
+        'adj_factor': 'float'
+    },
+    'daily_basic': {
+        'ts_code': 'str',
+        'trade_date': 'date',
+        'close': 'float',
+        'turnover_rate': 'float',
+        'turnover_rate_f': 'float',
+        'volume_ratio': 'float',
+        'pe': 'float',
+        'pe_ttm': 'float',
+        'pb': 'float',
+        'ps': 'float',
+        'ps_ttm': 'float',
+        'dv_ratio': 'float',
+        'dv_ttm': 'float',
+        'total_share': 'float',
+        'float_share': 'float',
+        'free_share': 'float',
+        'total_mv': 'float',
+        'circ_mv': 'float'
+    },
+    'index_dailybasic': {
+        'ts_code': 'str',
+        'trade_date': 'date',
+        'total_mv': 'float',
+        'float_mv': 'float',
+        'total_share': 'float',
+        'float_share': 'float',
+        'free_share': 'float',
+        'turnover_rate': 'float',
+        'turnover_rate_f': 'float',
+        'pe': 'float',
+        'pe_ttm': 'float',
+        'pb': 'float'
+    },
+    'index_basic': {
+        'ts_code': 'str',
+        'name': 'str',
+        'fullname': 'str',
+        'market': 'category',
+        'publisher': 'category',
+        'index_type': 'category',
+        'category': 'category',
+        'base_date': 'date',
+        'base_point': 'float',
+        'list_date': 'date',
+        'weight_rule': 'str',
+        'desc': 'str',
+        'exp_date': 'date'
+    },
+    'suspend_d': {
+        'ts_code': 'str',
+        'trade_date': 'date',
+        'suspend_timing': 'str',
+        'suspend_type': 'category'
+    },
+    'moneyflow_hsgt': {
+        'trade_date': 'date',
+        'ggt_ss': 'float',
+        'ggt_sz': 'float',
+        'hgt': 'float',
+        'sgt': 'float',
+        'north_money': 'float',
+        'south_money': 'float'
+    },
+    'stk_mins': {
+        'ts_code': 'str',
+        'trade_time': 'str',
+        'open': 'float',
+        'close': 'float',
+        'high': 'float',
+        'low': 'float',
+        'vol': 'float',
+        'amount': 'float'
+    }
+}
+
+
+def get_api_schema(api_name):
+    """接口的字段类型定义，未定义返回空字典"""
+    return API_SCHEMAS.get(api_name, {})
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据源基类 - 统一的数据接口定义
+"""
+
+import functools
+
+
+class BaseProvider:
+    """数据源基类
+
+    子类实现 query(api_name, **params) -> DataFrame；
+    provider.daily(...) 等属性调用等价于 provider.query('daily', ...)，
+    与 tushare/tudata 的 pro 对象调用方式保持一致。
+    """
+
+    name = 'base'
+    token_count = 1  # 可并行使用的token数，调度器据此放大吞吐
+
+    def query(self, api_name, **params):
+        """调用指定接口"""
+        raise NotImplementedError
+
+    def supports(self, api_name):
+        """是否支持指定接口"""
+        return True
+
+    def ping(self):
+        """测试连接（绕过缓存等包装层）"""
+        df = self.query('stock_basic', exchange='', list_status='L', limit=1)
+        return df is not None and len(df) > 0
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if not self.supports(name):
+            raise AttributeError(f"数据源 {self.name} 不支持接口 {name}")
+        return functools.partial(self.query, name)
+
+
+class ProviderWrapper(BaseProvider):
+    """数据源包装基类 - 缓存、重试等功能以包装层叠加"""
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    @property
+    def name(self):
+        return self.inner.name
+
+    @property
+    def token_count(self):
+        return self.inner.token_count
+
+    def query(self, api_name, **params):
+        return self.inner.query(api_name, **params)
+
+    def supports(self, api_name):
+        return self.inner.supports(api_name)
+
+    def ping(self):
+        return self.inner.ping()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据源工厂 - 根据token配置创建数据源
+"""
+
+import os
+import logging
+
+from ..api_config import CACHE_CONFIG
+from .tushare_provider import TushareProvider
+from .replay_provider import ReplayProvider
+from .retry_provider import RetryProvider
+from .token_pool import TokenPool, PooledToken
+from .response_cache import CachedProvider
+from .single_flight import shared_flight
+from .metered_provider import MeteredProvider
+
+logger = logging.getLogger('StockSystem.ProviderFactory')
+
+TOKEN_CONFIG_FILE = "config/token_config.txt"
+
+
+def load_token_config(config_file=TOKEN_CONFIG_FILE):
+    """加载token配置，文件不存在或读取失败返回None"""
+    try:
+        if not os.path.exists(config_file):
+            logger.error(f"Token配置文件不存在: {config_file}")
+            return None
+
+        config = {}
+        with open(config_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if '=' in line and not line.startswith('#'):
+                    key, value = line.split('=', 1)
+                    config[key.strip()] = value.strip()
+
+        logger.info(f"加载到token配置: {list(config.keys())}")
+        return config
+    except Exception as e:
+        logger.error(f"加载token配置失败: {e}")
+        return None
+
+
+def parse_tokens(token_config):
+    """
+    解析配置中的全部token
+
+    token、token_2、token_3 ... 各为一个token，每个token可用同名前缀的键单独配置：
+    <name>_type 库类型（默认取 token_type）、<name>_rate 每分钟调用次数、
+    <name>_apis 有权限的接口（逗号分隔，缺省表示不限）。
+
+    Returns:
+        list: [{'name', 'token', 'token_type', 'rate_limit', 'apis'}, ...]
+    """
+    token_config = token_config or {}
+    default_type = token_config.get('token_type', 'tushare')
+    names = ['token'] + sorted((key for key in token_config
+                                if key.startswith('token_') and key[6:].isdigit()),
+                               key=lambda key: int(key[6:]))
+
+    tokens = []
+    for name in names:
+        value = token_config.get(name)
+        if not value:
+            continue
+        rate = token_config.get(f"{name}_rate")
+        apis = token_config.get(f"{name}_apis")
+        tokens.append({
+            'name': name,
+            'token': value,
+            'token_type': token_config.get(f"{name}_type") or default_type,
+            'rate_limit': 60.0 / float(rate) if rate else None,  # 转为调用间隔(秒)
+            'apis': [api.strip() for api in apis.split(',') if api.strip()] if apis else None
+        })
+    return tokens
+
+
+def create_provider(token_config, use_cache=None, ledger=None):
+    """
+    创建数据源
+
+    token_type 为 replay 时使用本地回放数据源（无需token），可选配置：
+    replay_dir、replay_latency、replay_rate_limit、replay_error_rate、replay_row_limit；
+    其余类型使用 tushare/tudata，配置了多个token时组成token池（见 parse_tokens）。
+
+    Args:
+        token_config: token配置字典
+        use_cache: 是否叠加响应缓存，None 表示按 CACHE_CONFIG
+        ledger: 额度台账（QuotaLedger），提供时每个token的实际调用计入用量
+    """
+    def metered(provider, token):
+        return MeteredProvider(provider, ledger, token) if ledger is not None else provider
+
+    token_config = token_config or {}
+    token_type = token_config.get('token_type', 'tushare')
+
+    if token_type == 'replay':
+        provider = metered(ReplayProvider(
+            data_dir=token_config.get('replay_dir') or None,
+            latency=float(token_config.get('replay_latency', 0) or 0),
+            rate_limit_per_minute=int(token_config.get('replay_rate_limit', 0) or 0),
+            error_rate=float(token_config.get('replay_error_rate', 0) or 0),
+            row_limit=int(token_config['replay_row_limit']) if token_config.get('replay_row_limit') else None
+        ), 'replay')
+        # 回放数据本身就在本地，默认不再缓存
+        if use_cache is None:
+            use_cache = False
+    else:
+        tokens = parse_tokens(token_config)
+        if len(tokens) > 1:
+            # 多个token组成token池，各自限频，吞吐随token数增长
+            provider = TokenPool([
+                PooledToken(item['name'],
+                            metered(TushareProvider(item['token'], item['token_type']), item['name']),
+                            item['rate_limit'], item['apis'])
+                for item in tokens
+            ])
+        else:
+            provider = metered(TushareProvider(token_config.get('token'), token_type), 'token')
+
+    # 重试层在缓存层之内：缓存命中不经过重试，失败的调用按 RETRY_CONFIG 重试；
+    # 未命中的相同请求在进程内共享的去重组中合并，多个窗口同时请求同一数据只发出一次
+    provider = RetryProvider(provider, flight=shared_flight)
+
+    if use_cache is None:
+        use_cache = CACHE_CONFIG['enabled']
+    if use_cache:
+        provider = CachedProvider(provider)
+
+    logger.info(f"数据源: {provider.name} x{provider.token_count}{' (缓存)' if use_cache else ''}")
+    return provider
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用量计量层 - 把每次实际发出的接口调用按 token 记入额度台账
+"""
+
+from .base_provider import ProviderWrapper
+
+
+class MeteredProvider(ProviderWrapper):
+    """用量计量包装层
+
+    包在单个 token 的数据源外（token池中每个token各包一层），位于重试层之内，
+    重试和失败的调用同样计入用量。
+    """
+
+    def __init__(self, inner, ledger, token='token'):
+        super().__init__(inner)
+        self.ledger = ledger
+        self.token = token
+        ledger.register(token)
+
+    def query(self, api_name, **params):
+        try:
+            df = self.inner.query(api_name, **params)
+        except Exception:
+            self.ledger.record(self.token, api_name, error=True)
+            raise
+        self.ledger.record(self.token, api_name, rows=len(df) if df is not None else 0)
+        return df
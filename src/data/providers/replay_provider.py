@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地回放数据源 - 无网络、无token时回放录制数据或生成合成数据
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .base_provider import BaseProvider, ProviderWrapper
+
+# 与tushare一致的限频错误提示，便于重试层识别
+RATE_LIMIT_MESSAGE = "抱歉，您每分钟最多访问该接口{limit}次，权限的具体详情访问：https://tushare.pro/document/1?doc_id=108。"
+
+
+def save_frame(data_dir, api_name, df):
+    """把接口返回的数据追加到录制文件 <data_dir>/<api_name>.pkl"""
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir)
+    path = os.path.join(data_dir, f"{api_name}.pkl")
+    if os.path.exists(path):
+        df = pd.concat([pd.read_pickle(path), df], ignore_index=True).drop_duplicates()
+    df.to_pickle(path)
+
+
+class ReplayProvider(BaseProvider):
+    """本地回放数据源
+
+    数据来源按优先级：
+    1. data_dir 下录制的 <api_name>.pkl / <api_name>.csv
+    2. synthetic=True 时按参数生成的确定性合成数据
+
+    可配置每次调用的延迟、每分钟调用上限（超出时抛出与tushare相同的限频错误）、
+    随机网络错误率以及单次返回行数上限，用于离线压测和调优入库吞吐。
+    """
+
+    name = 'replay'
+
+    def __init__(self, data_dir=None, latency=0.0, rate_limit_per_minute=0, error_rate=0.0,
+                 row_limit=None, synthetic=True, stock_count=300,
+                 start_date='20230101', end_date=None, seed=0):
+        self.data_dir = data_dir
+        self.latency = latency  # 秒，或 (最小, 最大) 区间
+        self.rate_limit_per_minute = rate_limit_per_minute
+        self.error_rate = error_rate
+        self.row_limit = row_limit  # 整数或 {api_name: 行数}
+        self.synthetic = synthetic
+        self.stock_count = stock_count
+        self.start_date = start_date
+        self.end_date = end_date or datetime.now().strftime('%Y%m%d')
+        self.seed = seed
+        self.logger = logging.getLogger('StockSystem.ReplayProvider')
+
+        self._frames = {}
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self.stats = {'calls': 0, 'rows': 0, 'rate_limited': 0, 'errors': 0}
+
+    # ------------------------------------------------------------------
+    # 接口调用
+    # ------------------------------------------------------------------
+    def query(self, api_name, **params):
+        """回放指定接口"""
+        self._check_rate_limit(api_name)
+        self._simulate_latency()
+
+        with self._lock:
+            self.stats['calls'] += 1
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.stats['errors'] += 1
+                raise ConnectionError(f"模拟网络错误: {api_name}")
+
+        frame = self._get_frame(api_name)
+        if frame is None:
+            raise AttributeError(f"回放数据源没有接口 {api_name} 的数据")
+
+        df = self._filter(frame, params)
+        limit = self.row_limit.get(api_name) if isinstance(self.row_limit, dict) else self.row_limit
+        if limit:
+            df = df.head(limit)
+        with self._lock:
+            self.stats['rows'] += len(df)
+        return df.reset_index(drop=True)
+
+    def supports(self, api_name):
+        return self._get_frame(api_name) is not None
+
+    def _check_rate_limit(self, api_name):
+        """滑动窗口限频"""
+        if not self.rate_limit_per_minute:
+            return
+        now = time.monotonic()
+        with self._lock:
+            calls = self._calls.setdefault(api_name, deque())
+            while calls and now - calls[0] >= 60:
+                calls.popleft()
+            if len(calls) >= self.rate_limit_per_minute:
+                self.stats['rate_limited'] += 1
+                raise Exception(RATE_LIMIT_MESSAGE.format(limit=self.rate_limit_per_minute))
+            calls.append(now)
+
+    def _simulate_latency(self):
+        if isinstance(self.latency, (tuple, list)):
+            with self._lock:
+                delay = self._random.uniform(*self.latency)
+        else:
+            delay = self.latency
+        if delay > 0:
+            time.sleep(delay)
+
+    def _filter(self, df, params):
+        """按常用参数过滤"""
+        mask = np.ones(len(df), dtype=bool)
+        date_col = 'cal_date' if 'cal_date' in df.columns else ('trade_date' if 'trade_date' in df.columns else None)
+
+        if params.get('ts_code') and 'ts_code' in df.columns:
+            codes = [code.strip() for code in str(params['ts_code']).split(',')]
+            mask &= df['ts_code'].isin(codes).to_numpy()
+        if date_col:
+            if params.get('trade_date'):
+                mask &= (df[date_col] == str(params['trade_date'])).to_numpy()
+            if params.get('start_date'):
+                mask &= (df[date_col] >= str(params['start_date'])).to_numpy()
+            if params.get('end_date'):
+                mask &= (df[date_col] <= str(params['end_date'])).to_numpy()
+        for key in ('list_status', 'is_open', 'suspend_type', 'exchange'):
+            if params.get(key) not in (None, '') and key in df.columns:
+                mask &= (df[key].astype(str) == str(params[key])).to_numpy()
+
+        result = df[mask]
+        if params.get('fields'):
+            columns = [col.strip() for col in params['fields'].split(',') if col.strip() in df.columns]
+            result = result[columns]
+        if params.get('limit'):
+            result = result.head(int(params['limit']))
+        return result
+
+    # ------------------------------------------------------------------
+    # 数据来源
+    # ------------------------------------------------------------------
+    def _get_frame(self, api_name):
+        with self._lock:
+            if api_name in self._frames:
+                return self._frames[api_name]
+
+        frame = self._load_recorded(api_name)
+        if frame is None and self.synthetic:
+            builder = getattr(self, f"_synthetic_{api_name}", None)
+            frame = builder() if builder else None
+
+        with self._lock:
+            self._frames[api_name] = frame
+        return frame
+
+    def _load_recorded(self, api_name):
+        """读取录制文件"""
+        if not self.data_dir:
+            return None
+        for ext, reader in (('.pkl', pd.read_pickle), ('.csv', lambda p: pd.read_csv(p, dtype=str))):
+            path = os.path.join(self.data_dir, api_name + ext)
+            if os.path.exists(path):
+                self.logger.info(f"回放录制数据: {path}")
+                return reader(path)
+        return None
+
+    def _open_days(self):
+        """合成日历的交易日（工作日）"""
+        days = pd.date_range(self.start_date, self.end_date, freq='D')
+        return [day.strftime('%Y%m%d') for day in days if day.weekday() < 5]
+
+    def _codes(self):
+        codes = []
+        for i in range(self.stock_count):
+            if i % 2 == 0:
+                codes.append(f"{600000 + i:06d}.SH")
+            else:
+                codes.append(f"{i:06d}.SZ")
+        return codes
+
+    def _synthetic_trade_cal(self):
+        days = pd.date_range(self.start_date, self.end_date, freq='D')
+        cal_dates = [day.strftime('%Y%m%d') for day in days]
+        is_open = [1 if day.weekday() < 5 else 0 for day in days]
+        pretrade, last_open = [], None
+        for date_str, flag in zip(cal_dates, is_open):
+            pretrade.append(last_open)
+            if flag:
+                last_open = date_str
+        return pd.DataFrame({'exchange': 'SSE', 'cal_date': cal_dates,
+                             'is_open': is_open, 'pretrade_date': pretrade})
+
+    def _synthetic_stock_basic(self):
+        codes = self._codes()
+        open_days = self._open_days()
+        # 少量股票在区间内上市，便于测试上市日期相关逻辑
+        list_dates = ['20000101' if i % 10 else open_days[min(len(open_days) - 1, i * 7 % len(open_days))]
+                      for i in range(len(codes))]
+        return pd.DataFrame({
+            'ts_code': codes,
+            'symbol': [code[:6] for code in codes],
+            'name': [f"合成股票{i}" for i in range(len(codes))],
+            'area': '深圳',
+            'industry': [f"行业{i % 20}" for i in range(len(codes))],
+            'market': '主板',
+            'list_date': list_dates,
+            'delist_date': None,
+            'is_hs': 'N',
+            'list_status': 'L'
+        })
+
+    def _synthetic_stock_company(self):
+        """上市公司基本信息：每只股票一条"""
+        codes = self._codes()
+        return pd.DataFrame({
+            'ts_code': codes,
+            'com_name': [f"合成股份有限公司{i}" for i in range(len(codes))],
+            'exchange': ['SSE' if code.endswith('.SH') else 'SZSE' for code in codes],
+            'chairman': [f"董事长{i}" for i in range(len(codes))],
+            'manager': [f"总经理{i}" for i in range(len(codes))],
+            'secretary': [f"董秘{i}" for i in range(len(codes))],
+            'reg_capital': [float(10000 + i * 100) for i in range(len(codes))],
+            'setup_date': '19990101',
+            'province': '广东',
+            'city': '深圳市',
+            'website': [f"www.company{i}.com" for i in range(len(codes))],
+            'email': [f"ir@company{i}.com" for i in range(len(codes))],
+            'employees': [1000 + i for i in range(len(codes))],
+            'main_business': [f"行业{i % 20}相关业务" for i in range(len(codes))]
+        })
+
+    def _synthetic_new_share(self):
+        """新股列表：区间内上市的股票，上市前5个交易日申购"""
+        stock_basic = self._get_frame('stock_basic')
+        open_days = self._open_days()
+        listed = stock_basic[stock_basic['list_date'] >= open_days[0]]
+        positions = np.searchsorted(open_days, listed['list_date'].to_numpy())
+        price = np.round(10 + np.arange(len(listed)) % 30, 2)
+        return pd.DataFrame({
+            'ts_code': listed['ts_code'].to_numpy(),
+            'sub_code': listed['symbol'].to_numpy(),
+            'name': listed['name'].to_numpy(),
+            'ipo_date': [open_days[max(0, pos - 5)] for pos in positions],
+            'issue_date': listed['list_date'].to_numpy(),
+            'amount': 4000.0,
+            'market_amount': 1200.0,
+            'price': price,
+            'pe': 22.99,
+            'limit_amount': 1.2,
+            'funds': np.round(price * 4000 / 1e4, 2),
+            'ballot': 0.03
+        }).sort_values('ipo_date', ascending=False, ignore_index=True)
+
+    def _suspended_days(self, i, open_days):
+        """第 i 只股票停牌的交易日：每10只中的第6只在区间内停牌5个交易日"""
+        if i % 10 != 5 or len(open_days) < 10:
+            return open_days[:0]
+        start = (len(open_days) // 3 + i) % (len(open_days) - 5)
+        return open_days[start:start + 5]
+
+    def _synthetic_suspend_d(self):
+        """停复牌记录：停牌期间每日一条 S，复牌日一条 R"""
+        basic = self._get_frame('stock_basic')
+        open_days = np.array(self._open_days())
+        rows = []
+        for i, code in enumerate(basic['ts_code']):
+            days = self._suspended_days(i, open_days)
+            rows.extend((code, day, None, 'S') for day in days)
+            resume = np.searchsorted(open_days, days[-1], side='right') if len(days) else len(open_days)
+            if resume < len(open_days):
+                rows.append((code, open_days[resume], None, 'R'))
+        return pd.DataFrame(rows, columns=['ts_code', 'trade_date', 'suspend_timing', 'suspend_type']).sort_values(
+            ['trade_date', 'ts_code'], ascending=[False, True], ignore_index=True)
+
+    def _synthetic_daily(self):
+        """按股票生成确定性的随机游走日线（停牌日没有行情）"""
+        basic = self._get_frame('stock_basic')
+        open_days = np.array(self._open_days())
+        frames = []
+        for i, (code, list_date) in enumerate(zip(basic['ts_code'], basic['list_date'])):
+            days = open_days[open_days >= list_date]
+            days = days[~np.isin(days, self._suspended_days(i, open_days))]
+            if len(days) == 0:
+                continue
+            rng = np.random.RandomState(self.seed * 100003 + i)
+            returns = rng.normal(0, 0.02, len(days))
+            close = np.round((5 + i % 50) * np.exp(np.cumsum(returns)), 2)
+            pre_close = np.concatenate([[close[0]], close[:-1]])
+            open_ = np.round(pre_close * (1 + rng.normal(0, 0.005, len(days))), 2)
+            high = np.round(np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, len(days)))), 2)
+            low = np.round(np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, len(days)))), 2)
+            vol = np.round(rng.uniform(1e4, 1e6, len(days)), 2)
+            frames.append(pd.DataFrame({
+                'ts_code': code,
+                'trade_date': days,
+                'open': open_,
+                'high': high,
+                'low': low,
+                'close': close,
+                'pre_close': pre_close,
+                'change': np.round(close - pre_close, 2),
+                'pct_chg': np.round((close / pre_close - 1) * 100, 4),
+                'vol': vol,
+                'amount': np.round(vol * close / 10, 3)
+            }))
+        daily = pd.concat(frames, ignore_index=True)
+        # 与tushare一致：按日期倒序
+        return daily.sort_values(['trade_date', 'ts_code'], ascending=[False, True], ignore_index=True)
+
+    def _synthetic_adj_factor(self):
+        daily = self._get_frame('daily')
+        # 每只股票在区间中点做一次除权
+        mid = self._open_days()[len(self._open_days()) // 2]
+        factor = np.where(daily['trade_date'].to_numpy() >= mid, 1.1, 1.0)
+        return pd.DataFrame({'ts_code': daily['ts_code'], 'trade_date': daily['trade_date'],
+                             'adj_factor': factor})
+
+    def _synthetic_daily_basic(self):
+        """每日指标：由日线推算的确定性换手率、量比和估值"""
+        daily = self._get_frame('daily')
+        codes = daily['ts_code'].str[:6].astype(int).to_numpy()
+        return pd.DataFrame({
+            'ts_code': daily['ts_code'],
+            'trade_date': daily['trade_date'],
+            'close': daily['close'],
+            'turnover_rate': np.round(daily['vol'].to_numpy() / 1e5, 4),
+            'volume_ratio': 1.0,
+            'pe': np.round(daily['close'].to_numpy() * (1 + codes % 7), 2),
+            'pb': np.round(daily['close'].to_numpy() / 10, 2)
+        })
+
+    def _synthetic_index_daily(self):
+        open_days = np.array(self._open_days())
+        frames = []
+        for i, (code, base) in enumerate((('000001.SH', 3000.0), ('399001.SZ', 10000.0),
+                                          ('399006.SZ', 2000.0), ('000300.SH', 3500.0),
+                                          ('000905.SH', 5500.0))):
+            rng = np.random.RandomState(self.seed * 100003 + 90000 + i)
+            close = np.round(base * np.exp(np.cumsum(rng.normal(0, 0.01, len(open_days)))), 2)
+            pre_close = np.concatenate([[close[0]], close[:-1]])
+            frames.append(pd.DataFrame({
+                'ts_code': code,
+                'trade_date': open_days,
+                'open': pre_close,
+                'high': np.maximum(pre_close, close),
+                'low': np.minimum(pre_close, close),
+                'close': close,
+                'pre_close': pre_close,
+                'change': np.round(close - pre_close, 2),
+                'pct_chg': np.round((close / pre_close - 1) * 100, 4),
+                'vol': 1e8,
+                'amount': 1e9
+            }))
+        return pd.concat(frames, ignore_index=True).sort_values(
+            ['trade_date', 'ts_code'], ascending=[False, True], ignore_index=True)
+
+    def _synthetic_index_dailybasic(self):
+        open_days = self._open_days()
+        frames = []
+        for code, base in (('000001.SH', 4.5e13), ('399001.SZ', 3.2e13)):
+            frames.append(pd.DataFrame({
+                'ts_code': code,
+                'trade_date': open_days,
+                'total_mv': base,
+                'float_mv': base * 0.8,
+                'turnover_rate': 1.0,
+                'pe': 13.5,
+                'pb': 1.3
+            }))
+        return pd.concat(frames, ignore_index=True)
+
+
+class RecordingProvider(ProviderWrapper):
+    """录制包装层 - 把真实接口的返回写入回放目录"""
+
+    def __init__(self, inner, data_dir):
+        super().__init__(inner)
+        self.data_dir = data_dir
+        self._lock = threading.Lock()
+
+    def query(self, api_name, **params):
+        df = self.inner.query(api_name, **params)
+        if df is not None and not df.empty:
+            with self._lock:
+                save_frame(self.data_dir, api_name, df)
+        return df
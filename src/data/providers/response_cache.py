@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接口响应缓存 - 按API有效期持久化到本地磁盘
+"""
+
+import os
+import json
+import time
+import zlib
+import pickle
+import hashlib
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from ..api_config import CACHE_CONFIG
+from .base_provider import ProviderWrapper
+
+# 参与“是否已收盘”判断的日期参数
+DATE_PARAMS = ('trade_date', 'start_date', 'end_date', 'cal_date')
+
+
+def normalize_params(params):
+    """规范化请求参数：去掉None，值转字符串，多代码参数排序"""
+    normalized = {}
+    for key, value in params.items():
+        if value is None:
+            continue
+        value = str(value).strip()
+        if key == 'ts_code' and ',' in value:
+            value = ','.join(sorted(code.strip() for code in value.split(',')))
+        normalized[key] = value
+    return normalized
+
+
+def make_cache_key(api_name, params):
+    """由 api_name + 规范化参数生成缓存键"""
+    payload = json.dumps([api_name, sorted(normalize_params(params).items())], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def encode_frame(df):
+    """DataFrame -> 压缩的列式二进制"""
+    columns = {
+        'columns': list(df.columns),
+        'data': [df[col].to_numpy() for col in df.columns]
+    }
+    return zlib.compress(pickle.dumps(columns, protocol=pickle.HIGHEST_PROTOCOL), 6)
+
+
+def decode_frame(blob):
+    """压缩的列式二进制 -> DataFrame"""
+    columns = pickle.loads(zlib.decompress(blob))
+    return pd.DataFrame(dict(zip(columns['columns'], columns['data'])), columns=columns['columns'])
+
+
+class ResponseCache:
+    """接口响应磁盘缓存
+
+    存储于独立的SQLite文件，每条记录为一个压缩的列式DataFrame；
+    按API配置有效期，总大小超过上限时按最近访问时间淘汰。
+    """
+
+    def __init__(self, db_path=None, max_size_mb=None, api_ttl=None):
+        self.db_path = db_path or CACHE_CONFIG['db_path']
+        self.max_size = int((max_size_mb or CACHE_CONFIG['max_size_mb']) * 1024 * 1024)
+        self.api_ttl = api_ttl if api_ttl is not None else CACHE_CONFIG['api_ttl']
+        self.logger = logging.getLogger('StockSystem.ResponseCache')
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS response_cache (
+                cache_key TEXT PRIMARY KEY,
+                api_name TEXT,
+                params TEXT,
+                payload BLOB,
+                size INTEGER,
+                created REAL,
+                expires REAL,
+                last_access REAL
+            )
+        ''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_access ON response_cache(last_access)")
+        self._conn.commit()
+        self._total_size = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM response_cache").fetchone()[0]
+
+    def get_expiry(self, api_name, params, now=None):
+        """
+        计算缓存过期时间
+
+        Returns:
+            (cacheable, expires)：expires 为 None 表示永不过期
+        """
+        ttl = self.api_ttl.get(api_name)
+        if ttl is None:
+            return False, None
+
+        now = now or datetime.now()
+        if ttl == 'historical':
+            today = now.strftime('%Y%m%d')
+            dates = [str(params[key]) for key in DATE_PARAMS if params.get(key)]
+            if not dates or max(dates) >= today:
+                return False, None
+            return True, None
+        if ttl == 'daily':
+            tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            return True, tomorrow.timestamp()
+        return True, now.timestamp() + float(ttl)
+
+    def get(self, api_name, params):
+        """读取缓存，未命中或已过期返回None"""
+        cacheable, _ = self.get_expiry(api_name, params)
+        if not cacheable:
+            return None
+
+        key = make_cache_key(api_name, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires FROM response_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self.stats['misses'] += 1
+                return None
+            self._conn.execute("UPDATE response_cache SET last_access = ? WHERE cache_key = ?", (now, key))
+            self._conn.commit()
+            self.stats['hits'] += 1
+
+        try:
+            return decode_frame(row[0])
+        except Exception as e:
+            self.logger.warning(f"缓存数据损坏，忽略: {api_name} {e}")
+            self.invalidate(api_name, params)
+            return None
+
+    def put(self, api_name, params, df):
+        """写入缓存（空结果不缓存）"""
+        cacheable, expires = self.get_expiry(api_name, params)
+        if not cacheable or df is None or df.empty:
+            return False
+
+        key = make_cache_key(api_name, params)
+        blob = encode_frame(df)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM response_cache WHERE cache_key = ?", (key,)).fetchone()
+            self._conn.execute('''
+                INSERT OR REPLACE INTO response_cache
+                (cache_key, api_name, params, payload, size, created, expires, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (key, api_name, json.dumps(normalize_params(params), ensure_ascii=False),
+                  sqlite3.Binary(blob), len(blob), now, expires, now))
+            self._total_size += len(blob) - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+            self.stats['stores'] += 1
+        return True
+
+    def _evict(self):
+        """清理过期记录，超出容量时按最近最少使用淘汰（调用方持有锁）"""
+        if self._total_size <= self.max_size:
+            return
+
+        self._conn.execute("DELETE FROM response_cache WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+        self._total_size = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM response_cache").fetchone()[0]
+
+        # 淘汰到上限的90%，避免每次写入都触发淘汰
+        target = self.max_size * 0.9
+        while self._total_size > target:
+            rows = self._conn.execute(
+                "SELECT cache_key, size FROM response_cache ORDER BY last_access LIMIT 100").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self._total_size <= target:
+                    break
+                self._conn.execute("DELETE FROM response_cache WHERE cache_key = ?", (key,))
+                self._total_size -= size
+                self.stats['evictions'] += 1
+
+    def invalidate(self, api_name, params=None):
+        """删除指定请求或整个API的缓存"""
+        with self._lock:
+            if params is None:
+                self._conn.execute("DELETE FROM response_cache WHERE api_name = ?", (api_name,))
+            else:
+                self._conn.execute("DELETE FROM response_cache WHERE cache_key = ?",
+                                   (make_cache_key(api_name, params),))
+            self._conn.commit()
+            self._total_size = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM response_cache").fetchone()[0]
+
+    def close(self):
+        """关闭缓存数据库"""
+        with self._lock:
+            self._conn.close()
+
+
+class CachedProvider(ProviderWrapper):
+    """带响应缓存的数据源包装层，调用方式与原pro对象一致"""
+
+    def __init__(self, inner, cache=None):
+        super().__init__(inner)
+        self.cache = cache or ResponseCache()
+
+    def query(self, api_name, **params):
+        """按API名调用，优先读取缓存"""
+        df = self.cache.get(api_name, params)
+        if df is not None:
+            return df
+        df = self.inner.query(api_name, **params)
+        self.cache.put(api_name, params, df)
+        return df
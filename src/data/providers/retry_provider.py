@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重试包装层 - 错误分类、带抖动的退避重试和按API熔断
+"""
+
+import time
+import random
+import logging
+import threading
+
+from ..api_config import RETRY_CONFIG
+from .base_provider import ProviderWrapper
+from .single_flight import SingleFlight, request_key
+
+# 错误类别（与 RETRY_CONFIG['retry_conditions'] 对应）
+NETWORK_ERROR = 'network_error'
+API_LIMIT = 'api_limit'
+TIMEOUT = 'timeout'
+PERMISSION_DENIED = 'permission_denied'
+OTHER = 'other'
+
+_PERMISSION_KEYWORDS = ('没有接口访问权限', '权限', '积分', 'permission', 'token不对', '您的token')
+_LIMIT_KEYWORDS = ('每分钟最多访问', '每天最多访问', '访问频率', 'rate limit', 'too many requests')
+_TIMEOUT_KEYWORDS = ('timed out', 'timeout', '超时')
+_NETWORK_KEYWORDS = ('connection', 'network', 'remote end closed', 'max retries exceeded',
+                     'name or service not known', '连接')
+
+
+def classify_error(error):
+    """把接口异常归类为 network_error / api_limit / timeout / permission_denied / other"""
+    if isinstance(error, ProviderError):
+        return error.category
+
+    message = str(error).lower()
+    if any(keyword in message for keyword in _LIMIT_KEYWORDS):
+        return API_LIMIT
+    if any(keyword in message for keyword in _PERMISSION_KEYWORDS):
+        return PERMISSION_DENIED
+    if isinstance(error, TimeoutError) or any(keyword in message for keyword in _TIMEOUT_KEYWORDS):
+        return TIMEOUT
+    if isinstance(error, (ConnectionError, OSError)) or any(keyword in message for keyword in _NETWORK_KEYWORDS):
+        return NETWORK_ERROR
+    # requests/urllib3 的异常类名即可说明类别
+    name = type(error).__name__.lower()
+    if 'timeout' in name:
+        return TIMEOUT
+    if 'connection' in name or 'protocol' in name:
+        return NETWORK_ERROR
+    return OTHER
+
+
+class ProviderError(Exception):
+    """已分类的接口错误"""
+
+    def __init__(self, message, category=OTHER, api_name=None):
+        super().__init__(message)
+        self.category = category
+        self.api_name = api_name
+
+
+class CircuitOpenError(ProviderError):
+    """接口已熔断，调用未发出"""
+
+
+class CircuitBreaker:
+    """单个API的熔断器
+
+    closed: 正常调用；连续失败达到阈值（或权限错误）后 open：直接拒绝调用；
+    open 持续 reset_timeout 秒后 half_open：放行一次试探调用，成功则恢复。
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.category = None  # 触发熔断的错误类别
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """是否允许发出调用"""
+        with self._lock:
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                return True
+            return self.state == 'closed'
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.category = None
+
+    def record_failure(self, category, trip=False):
+        with self._lock:
+            self.failures += 1
+            if trip or self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.category = category
+                self.opened_at = time.monotonic()
+
+
+class RetryProvider(ProviderWrapper):
+    """重试包装层
+
+    按 RETRY_CONFIG 对网络错误、限频、超时进行带抖动的退避重试；
+    权限错误（skip_on_permission_error）不重试并立即熔断该API，避免继续消耗额度；
+    其他API不受影响。
+    相同请求的并发调用经 flight 合并，只发出一次（含其重试），等待者共享结果或异常。
+    """
+
+    def __init__(self, inner, max_retries=None, retry_delay=None, jitter=None,
+                 rate_limit_delay=None, breaker_threshold=None, breaker_reset=None, sleep=None,
+                 flight=None):
+        super().__init__(inner)
+        self.flight = flight if flight is not None else SingleFlight()
+        self.max_retries = max_retries if max_retries is not None else RETRY_CONFIG['max_retries']
+        self.retry_delay = retry_delay if retry_delay is not None else RETRY_CONFIG['retry_delay']
+        self.jitter = jitter if jitter is not None else RETRY_CONFIG['jitter']
+        self.rate_limit_delay = (rate_limit_delay if rate_limit_delay is not None
+                                 else RETRY_CONFIG['rate_limit_delay'])
+        self.breaker_threshold = breaker_threshold or RETRY_CONFIG['breaker_threshold']
+        self.breaker_reset = breaker_reset if breaker_reset is not None else RETRY_CONFIG['breaker_reset']
+        self.retry_conditions = set(RETRY_CONFIG['retry_conditions'])
+        if RETRY_CONFIG['skip_on_permission_error']:
+            self.retry_conditions.discard(PERMISSION_DENIED)
+        self._sleep = sleep or time.sleep
+        self._random = random.Random()
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger('StockSystem.RetryProvider')
+        self.stats = {'calls': 0, 'retries': 0, 'failures': 0, 'rejected': 0}
+
+    def get_breaker(self, api_name):
+        """获取API的熔断器"""
+        with self._lock:
+            breaker = self._breakers.get(api_name)
+            if breaker is None:
+                breaker = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+                self._breakers[api_name] = breaker
+            return breaker
+
+    def backoff(self, attempt, category):
+        """第 attempt 次重试前的等待秒数"""
+        delays = self.retry_delay if isinstance(self.retry_delay, (list, tuple)) else [self.retry_delay]
+        delay = delays[min(attempt, len(delays) - 1)] if delays else 0
+        if category == API_LIMIT:
+            delay = max(delay, self.rate_limit_delay)
+        with self._lock:
+            factor = self._random.uniform(1 - self.jitter, 1 + self.jitter)
+        return max(0.0, delay * factor)
+
+    def query(self, api_name, **params):
+        """带重试和熔断的接口调用，相同请求进行中时等待其结果"""
+        return self.flight.do(request_key(self.inner.name, api_name, params),
+                              lambda: self._query(api_name, **params))
+
+    def _query(self, api_name, **params):
+        breaker = self.get_breaker(api_name)
+        attempt = 0
+        while True:
+            # 熔断只在首次调用前检查，半开状态下的试探调用可以完成自身的重试
+            if attempt == 0 and not breaker.allow():
+                with self._lock:
+                    self.stats['rejected'] += 1
+                raise CircuitOpenError(f"接口 {api_name} 已熔断({breaker.category})，跳过调用",
+                                       breaker.category, api_name)
+
+            with self._lock:
+                self.stats['calls'] += 1
+            try:
+                df = self.inner.query(api_name, **params)
+                breaker.record_success()
+                return df
+            except Exception as e:
+                category = classify_error(e)
+                retryable = category in self.retry_conditions and attempt < self.max_retries
+                if not retryable:
+                    breaker.record_failure(category, trip=(category == PERMISSION_DENIED))
+                    with self._lock:
+                        self.stats['failures'] += 1
+                    self.logger.warning(f"接口 {api_name} 调用失败({category}): {e}")
+                    raise ProviderError(str(e), category, api_name) from e
+
+                delay = self.backoff(attempt, category)
+                attempt += 1
+                with self._lock:
+                    self.stats['retries'] += 1
+                self.logger.info(f"接口 {api_name} {category}，{delay:.1f}秒后第{attempt}次重试: {e}")
+                self._sleep(delay)
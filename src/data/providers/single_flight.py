@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求合并 - 相同 (数据源, 接口, 参数) 的并发请求只发出一次，等待者共享同一结果
+"""
+
+import threading
+
+from .response_cache import make_cache_key
+
+
+class _Call:
+    """一次进行中的请求"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """进行中请求的去重组
+
+    第一个调用者执行请求，同键的后来者等待并拿到同一结果（有等待者时各方拿到副本，
+    修改互不影响）或同一异常。请求结束即从组中移除，不缓存结果。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {'calls': 0, 'shared': 0}
+
+    def do(self, key, fn):
+        """
+        执行或加入 key 对应的请求
+
+        Args:
+            key: 可哈希的请求键
+            fn: 无参函数，只由第一个调用者执行
+
+        Returns:
+            fn 的返回值
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.stats['calls'] += 1
+            else:
+                call.waiters += 1
+                self.stats['shared'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result.copy() if hasattr(call.result, 'copy') else call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # 先移除再唤醒，之后到达的调用者发起新的请求
+            with self._lock:
+                del self._calls[key]
+                shared = call.waiters > 0
+            call.done.set()
+        # 有等待者时同样返回副本，原结果只供等待者复制
+        result = call.result
+        return result.copy() if shared and hasattr(result, 'copy') else result
+
+    def in_flight(self):
+        """进行中的请求数"""
+        with self._lock:
+            return len(self._calls)
+
+
+def request_key(provider_name, api_name, params):
+    """请求键：数据源名 + 规范化参数（与缓存键相同的规范化规则）"""
+    return provider_name, make_cache_key(api_name, params)
+
+
+# 进程内共享的去重组，不同窗口各自创建的数据源之间也能合并相同请求
+shared_flight = SingleFlight()
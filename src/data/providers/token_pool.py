@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多token池 - 每个token独立限频和权限，请求分派给有余量且有权限的token
+"""
+
+import time
+import logging
+import threading
+
+from ..api_config import RETRY_CONFIG
+from ..fetch_scheduler import FetchScheduler
+from .base_provider import BaseProvider
+from .retry_provider import ProviderError, classify_error, PERMISSION_DENIED, API_LIMIT
+
+
+class PooledToken:
+    """池中的单个token"""
+
+    def __init__(self, name, provider, rate_limit=None, apis=None):
+        self.name = name
+        self.provider = provider
+        # 每个token按API独立的令牌桶，间隔规则与全局调度器相同
+        self.limiter = FetchScheduler(max_workers=1, rate_limit=rate_limit)
+        self.apis = set(apis) if apis else None  # 配置的可用接口，None 表示不限
+        self.denied = set()  # 运行中确认没有权限的接口
+        self.cooldown = {}  # 接口 -> 触发限频后的冷却截止时间
+        self.enabled = True
+        self.calls = 0
+
+    def allows(self, api_name):
+        """是否可以用该token调用接口"""
+        return (self.enabled and api_name not in self.denied
+                and (self.apis is None or api_name in self.apis)
+                and self.provider.supports(api_name))
+
+    def try_acquire(self, api_name):
+        """尝试占用一次调用额度，成功返回0，否则返回需等待的秒数"""
+        remaining = self.cooldown.get(api_name, 0) - time.monotonic()
+        if remaining > 0:
+            return remaining
+        return self.limiter.get_bucket(api_name).try_acquire()
+
+
+class TokenPool(BaseProvider):
+    """多token数据源
+
+    每次请求从有权限的token中选择当前有调用额度的一个（轮转起点，负载均摊），
+    都没有额度时等待最早可用的token。某个token返回权限错误时记录下来，
+    改用其他token；触发限频时该token冷却 rate_limit_delay 秒，其他token继续服务。
+    总吞吐随token数线性增长。
+    """
+
+    def __init__(self, tokens):
+        if not tokens:
+            raise ValueError("token池为空")
+        self.tokens = list(tokens)
+        self.name = self.tokens[0].provider.name
+        self.cooldown_seconds = RETRY_CONFIG['rate_limit_delay']
+        self._next = 0
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger('StockSystem.TokenPool')
+
+    @property
+    def token_count(self):
+        return sum(1 for token in self.tokens if token.enabled)
+
+    @property
+    def stats(self):
+        """各token的调用次数"""
+        return {token.name: token.calls for token in self.tokens}
+
+    def supports(self, api_name):
+        return any(token.allows(api_name) for token in self.tokens)
+
+    def ping(self):
+        """逐个测试token，连接失败的token不再使用"""
+        for token in self.tokens:
+            try:
+                token.enabled = bool(token.provider.ping())
+            except Exception as e:
+                self.logger.warning(f"token {token.name} 连接失败: {e}")
+                token.enabled = False
+            if not token.enabled:
+                self.logger.warning(f"token {token.name} 已停用")
+        return self.token_count > 0
+
+    def _acquire(self, api_name, exclude):
+        """选出一个有权限且有调用额度的token，没有额度时等待"""
+        while True:
+            with self._lock:
+                candidates = [token for token in self.tokens
+                              if token.allows(api_name) and token.name not in exclude]
+                if not candidates:
+                    return None
+                start = self._next % len(candidates)
+                self._next += 1
+                wait_time = None
+                for token in candidates[start:] + candidates[:start]:
+                    waited = token.try_acquire(api_name)
+                    if waited <= 0:
+                        return token
+                    wait_time = waited if wait_time is None else min(wait_time, waited)
+            time.sleep(wait_time)
+
+    def query(self, api_name, **params):
+        """调用指定接口"""
+        exclude = set()
+        last_error = None
+        while True:
+            token = self._acquire(api_name, exclude)
+            if token is None:
+                if last_error is not None:
+                    raise last_error
+                raise ProviderError(f"没有可用token具备接口 {api_name} 的权限", PERMISSION_DENIED, api_name)
+
+            try:
+                df = token.provider.query(api_name, **params)
+            except Exception as e:
+                category = classify_error(e)
+                if category == PERMISSION_DENIED:
+                    # 该token没有此接口权限，之后不再分派给它
+                    self.logger.warning(f"token {token.name} 没有接口 {api_name} 的权限: {e}")
+                    token.denied.add(api_name)
+                elif category == API_LIMIT:
+                    self.logger.info(f"token {token.name} 接口 {api_name} 触发限频，冷却 {self.cooldown_seconds} 秒")
+                    token.cooldown[api_name] = time.monotonic() + self.cooldown_seconds
+                    exclude.add(token.name)
+                else:
+                    raise
+                last_error = e
+                continue
+
+            with self._lock:
+                token.calls += 1
+            return df
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tushare / Tudata 数据源
+"""
+
+import logging
+
+from .base_provider import BaseProvider
+
+
+class TushareProvider(BaseProvider):
+    """Tushare / Tudata 数据源"""
+
+    def __init__(self, token=None, token_type='tushare'):
+        self.logger = logging.getLogger('StockSystem.TushareProvider')
+
+        if token_type == 'tudata':
+            try:
+                import tudata as ts
+                self.logger.info("使用tudata库")
+            except ImportError:
+                self.logger.warning("tudata库未安装，使用tushare库")
+                import tushare as ts
+        else:
+            import tushare as ts
+            self.logger.info("使用tushare库")
+
+        self.name = token_type
+        # token 直接传给客户端，多个token可在同一进程中并存
+        self._pro = ts.pro_api(token) if token else ts.pro_api()
+
+    def query(self, api_name, **params):
+        """调用指定接口"""
+        return getattr(self._pro, api_name)(**params)
+
+    def supports(self, api_name):
+        """是否支持指定接口"""
+        try:
+            getattr(self._pro, api_name)
+            return True
+        except AttributeError:
+            return False
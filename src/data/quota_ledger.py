@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接口额度台账 - 按 token / 接口 / 分钟累计调用次数和返回行数，持久化到 api_quota_usage 表，
+供调度器限流、大任务开始前估算，以及界面显示当日用量
+"""
+
+import time
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from .api_config import QUOTA_CONFIG
+from .providers.retry_provider import ProviderError
+
+QUOTA_EXCEEDED = 'quota_exceeded'
+
+USAGE_COLUMNS = ['token', 'api_name', 'calls', 'rows', 'errors', 'per_day', 'remaining']
+
+
+class QuotaExceeded(ProviderError):
+    """接口当日额度不足，调用未发出"""
+
+    def __init__(self, message, api_name=None):
+        super().__init__(message, QUOTA_EXCEEDED, api_name)
+
+
+class QuotaLedger:
+    """接口额度台账
+
+    每次实际发出的调用（含失败和重试）先累计在内存，每 flush_interval 秒合并写入数据库；
+    当日和当前分钟的用量在内存中维护，跨天或距上次加载超过 reload_interval 秒时从数据库
+    重新加载，其他进程（如同时运行的命令行和界面）写入的用量随之计入。
+    """
+
+    def __init__(self, db_manager, config=None, clock=None):
+        self.db_manager = db_manager
+        self.config = config or QUOTA_CONFIG
+        self._clock = clock or datetime.now
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # 同一时间只有一个线程写入数据库
+        self._pending = {}  # (minute, token, api_name) -> [calls, rows, errors]，尚未写入数据库
+        self._flushing = {}  # 正在写入数据库、尚未提交的部分，重新加载时同样计入
+        self._day = None
+        self._minute = None
+        self._used_day = {}  # (token, api_name) -> 当日调用次数
+        self._used_minute = {}  # (token, api_name) -> 当前分钟调用次数
+        self._last_flush = time.monotonic()
+        self._last_load = None
+        self.tokens = set()
+        self.logger = logging.getLogger('StockSystem.QuotaLedger')
+
+    def register(self, token):
+        """登记参与计量的 token，剩余额度按已登记的 token 合计"""
+        with self._lock:
+            self.tokens.add(token)
+
+    def limits(self, api_name):
+        """
+        单个 token 的额度
+
+        Returns:
+            tuple: (每分钟调用次数, 每天调用次数)，None 表示不限
+        """
+        limits = self.config.get('api_limits', {}).get(api_name, {})
+        return limits.get('per_minute', self.config['per_minute']), limits.get('per_day', self.config['per_day'])
+
+    def _load(self, day, minute):
+        """数据库中当日和当前分钟的用量，加上尚未写入的部分"""
+        rows = []
+        if self.db_manager.table_exists('api_quota_usage'):
+            rows = self.db_manager.execute_query(
+                "SELECT minute, token, api_name, calls FROM api_quota_usage WHERE minute BETWEEN ? AND ?",
+                (day + '0000', day + '2359'))
+        pending = [(key[0], key[1], key[2], counts[0])
+                   for unsaved in (self._flushing, self._pending) for key, counts in unsaved.items()
+                   if key[0].startswith(day)]
+        used_day, used_minute = {}, {}
+        for row_minute, token, api_name, calls in list(rows) + pending:
+            key = (token, api_name)
+            used_day[key] = used_day.get(key, 0) + calls
+            if row_minute == minute:
+                used_minute[key] = used_minute.get(key, 0) + calls
+        return used_day, used_minute
+
+    def _roll(self):
+        """切换到当前的分钟和日期（调用方持有锁）"""
+        now = self._clock()
+        day, minute = now.strftime('%Y%m%d'), now.strftime('%Y%m%d%H%M')
+        stale = self._last_load is None or time.monotonic() - self._last_load >= self.config['reload_interval']
+        if day != self._day or stale:
+            self._used_day, self._used_minute = self._load(day, minute)
+            self._day, self._minute = day, minute
+            self._last_load = time.monotonic()
+        elif minute != self._minute:
+            self._used_minute = {}
+            self._minute = minute
+        return now
+
+    def reload(self):
+        """从数据库重新加载当日用量，计入其他进程的调用"""
+        with self._lock:
+            self._day = None
+            self._roll()
+
+    def record(self, token, api_name, rows=0, error=False):
+        """记录一次实际发出的调用，失败的调用同样消耗额度"""
+        with self._lock:
+            self._roll()
+            key = (token, api_name)
+            self._used_day[key] = self._used_day.get(key, 0) + 1
+            self._used_minute[key] = self._used_minute.get(key, 0) + 1
+            counts = self._pending.setdefault((self._minute, token, api_name), [0, 0, 0])
+            counts[0] += 1
+            counts[1] += rows
+            counts[2] += int(error)
+            due = time.monotonic() - self._last_flush >= self.config['flush_interval']
+        if due:
+            self.flush()
+
+    def _tokens(self, api_name):
+        """参与合计的 token：已登记的和当日用过该接口的，都没有时按一个 token 计"""
+        tokens = set(self.tokens) | {token for token, name in self._used_day if name == api_name}
+        return sorted(tokens) or [None]
+
+    def reserve(self, api_name, keep_reserve=True):
+        """为每日同步保留的当日调用次数"""
+        per_day = self.limits(api_name)[1]
+        if not keep_reserve or per_day is None:
+            return 0
+        with self._lock:
+            return int(per_day * len(self._tokens(api_name)) * self.config['reserve_ratio'])
+
+    def remaining(self, api_name, token=None):
+        """
+        剩余额度，未指定 token 时为各 token 之和
+
+        Returns:
+            tuple: (本分钟剩余次数, 当日剩余次数)，不限时为 None
+        """
+        per_minute, per_day = self.limits(api_name)
+        with self._lock:
+            self._roll()
+            tokens = [token] if token else self._tokens(api_name)
+            minute_left = None if per_minute is None else sum(
+                max(0, per_minute - self._used_minute.get((name, api_name), 0)) for name in tokens)
+            day_left = None if per_day is None else sum(
+                max(0, per_day - self._used_day.get((name, api_name), 0)) for name in tokens)
+        return minute_left, day_left
+
+    def check(self, api_name, calls=1, keep_reserve=False):
+        """
+        调用前检查额度
+
+        Args:
+            keep_reserve: 低优先级任务不使用为每日同步保留的额度
+
+        Returns:
+            float: 本分钟额度已用完时距下一分钟的秒数，否则为0
+
+        Raises:
+            QuotaExceeded: 当日可用额度不足
+        """
+        minute_left, day_left = self.remaining(api_name)
+        if day_left is not None:
+            available = day_left - self.reserve(api_name, keep_reserve)
+            if available < calls:
+                reason = "已达保留给每日同步的额度" if keep_reserve and day_left >= calls else "当日额度已用完"
+                raise QuotaExceeded(f"接口 {api_name} {reason}（剩余 {day_left} 次）", api_name)
+        if minute_left is not None and minute_left < calls:
+            now = self._clock()
+            return 60 - now.second - now.microsecond / 1e6
+        return 0.0
+
+    def afford(self, calls, keep_reserve=False):
+        """
+        大任务开始前检查预计调用次数是否在当日可用额度内
+
+        Args:
+            calls: {api_name: 预计调用次数}
+
+        Returns:
+            tuple: (是否足够, 消息)
+        """
+        short = []
+        for api_name, count in calls.items():
+            day_left = self.remaining(api_name)[1]
+            if day_left is None:
+                continue
+            available = max(0, day_left - self.reserve(api_name, keep_reserve))
+            if count > available:
+                short.append(f"{api_name} 预计 {count} 次，可用 {available} 次")
+        if short:
+            return False, f"接口当日额度不足: {'；'.join(short)}"
+        return True, "接口额度充足"
+
+    def flush(self):
+        """
+        把内存中的用量累加写入数据库，写入失败时保留到下次
+
+        Returns:
+            int: 写入的行数
+        """
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushing = pending
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        now = self._clock()
+        cutoff = (now - timedelta(days=self.config['retention_days'])).strftime('%Y%m%d') + '0000'
+        update_time = now.strftime('%Y-%m-%d %H:%M:%S')
+        conn = self.db_manager.get_connection()
+        try:
+            conn.executemany('''
+                INSERT INTO api_quota_usage (minute, token, api_name, calls, row_count, errors, update_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (minute, token, api_name) DO UPDATE SET
+                    calls = calls + excluded.calls,
+                    row_count = row_count + excluded.row_count,
+                    errors = errors + excluded.errors,
+                    update_time = excluded.update_time
+            ''', [key + tuple(counts) + (update_time,) for key, counts in pending.items()])
+            conn.execute("DELETE FROM api_quota_usage WHERE minute < ?", (cutoff,))
+            # 提交与清空在同一把锁内，重新加载不会把刚写入的用量再计一次
+            with self._lock:
+                conn.commit()
+                self._flushing = {}
+        except sqlite3.Error as e:
+            conn.rollback()
+            self.logger.warning(f"额度用量写入失败，稍后重试: {e}")
+            with self._lock:
+                self._flushing = {}
+                for key, counts in pending.items():
+                    merged = self._pending.setdefault(key, [0, 0, 0])
+                    for i, value in enumerate(counts):
+                        merged[i] += value
+            return 0
+        finally:
+            conn.close()
+        return len(pending)
+
+    def usage(self, day=None):
+        """
+        各 token、各接口的当日用量（含尚未写入数据库的部分）
+
+        Returns:
+            DataFrame: 列见 USAGE_COLUMNS，remaining 为该 token 当日剩余次数
+        """
+        day = day or self._clock().strftime('%Y%m%d')
+        rows = []
+        if self.db_manager.table_exists('api_quota_usage'):
+            rows = self.db_manager.execute_query(
+                "SELECT token, api_name, SUM(calls), SUM(row_count), SUM(errors) FROM api_quota_usage "
+                "WHERE minute BETWEEN ? AND ? GROUP BY token, api_name", (day + '0000', day + '2359'))
+        with self._lock:
+            pending = [(key[1], key[2]) + tuple(counts)
+                       for unsaved in (self._flushing, self._pending) for key, counts in unsaved.items()
+                       if key[0].startswith(day)]
+        usage = pd.DataFrame(list(rows) + pending, columns=USAGE_COLUMNS[:5])
+        if usage.empty:
+            return pd.DataFrame(columns=USAGE_COLUMNS)
+        usage = usage.groupby(['token', 'api_name'], as_index=False).sum()
+        usage['per_day'] = pd.array([self.limits(api_name)[1] for api_name in usage['api_name']], dtype='Int64')
+        usage['remaining'] = (usage['per_day'] - usage['calls']).clip(lower=0)
+        return usage.sort_values('calls', ascending=False, ignore_index=True)[USAGE_COLUMNS]
+
+    def summary(self, day=None):
+        """一行用量摘要：当日调用次数、返回行数和用量比例最高的接口"""
+        usage = self.usage(day)
+        if usage.empty:
+            return "接口额度: 今日未调用"
+        text = f"接口调用 今日 {int(usage['calls'].sum())} 次 / {int(usage['rows'].sum())} 行"
+        limited = usage.dropna(subset=['per_day'])
+        if not limited.empty:
+            ratio = limited['calls'] / limited['per_day']
+            tightest = limited.loc[ratio.idxmax()]
+            text += f"，{tightest['api_name']} 已用 {ratio.max():.0%}"
+        return text
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+修复规划器 - 按请求次数和返回行数估算各补数策略的成本，为每个交易日选最便宜的方案，
+并把相邻交易日的零散修复合并为多日多股票请求
+"""
+
+import math
+import logging
+
+import pandas as pd
+
+from .api_config import REPAIR_PLAN_CONFIG
+
+
+class RepairPlan:
+    """一组修复请求
+
+    strategy:
+        per_code     每只股票每日一次请求
+        multi_code   单日多只股票一次请求
+        full_market  单日全市场一次请求，本地过滤出需要的股票（只在全市场行数不超过单次上限时选用）
+        multi_date   多只股票多个交易日一次请求（区间内多取的行在本地过滤）
+    """
+
+    def __init__(self, strategy, needs, requests, calls, rows, cost):
+        self.strategy = strategy
+        self.needs = needs        # 需要修复的 {trade_date: [ts_code, ...]}
+        self.requests = requests  # 请求参数 [{...}, ...]
+        self.calls = calls        # 预计请求次数
+        self.rows = rows          # 预计返回行数
+        self.cost = cost
+
+    @property
+    def dates(self):
+        return sorted(self.needs)
+
+    @property
+    def codes(self):
+        return sorted(set(code for codes in self.needs.values() for code in codes))
+
+    def __repr__(self):
+        span = self.dates[0] if len(self.dates) == 1 else f"{self.dates[0]}~{self.dates[-1]}"
+        return (f"RepairPlan({self.strategy}, {span}, {len(self.codes)} 只, "
+                f"{self.calls} 次请求, {self.rows} 行)")
+
+
+class RepairPlanner:
+    """修复规划
+
+    成本 = 请求次数 x call_cost + 返回行数 x row_cost。请求次数受限频约束，是主要成本；
+    行数成本使全市场请求在只缺少几只股票时不被选中。
+    """
+
+    def __init__(self, chunk_planner, call_cost=None, row_cost=None, full_market_apis=None):
+        self.chunk_planner = chunk_planner
+        self.call_cost = REPAIR_PLAN_CONFIG['call_cost'] if call_cost is None else call_cost
+        self.row_cost = REPAIR_PLAN_CONFIG['row_cost'] if row_cost is None else row_cost
+        self.full_market_apis = set(full_market_apis if full_market_apis is not None
+                                    else REPAIR_PLAN_CONFIG['full_market_apis'])
+        self.logger = logging.getLogger('StockSystem.RepairPlanner')
+
+    def cost(self, calls, rows):
+        return calls * self.call_cost + rows * self.row_cost
+
+    def _codes_per_call(self, api_name, days):
+        """days 个交易日的请求每次可装入的股票数"""
+        budget = max(1, int(self.chunk_planner.row_limit(api_name) * self.chunk_planner.fill_ratio))
+        return max(1, min(self.chunk_planner.max_codes, budget // max(1, days)))
+
+    def _chunks(self, codes, size):
+        return [codes[i:i + size] for i in range(0, len(codes), size)]
+
+    def plan_date(self, api_name, trade_date, codes, market_size=None):
+        """
+        单个交易日的最便宜方案
+
+        Args:
+            codes: 需要修复的股票
+            market_size: 当日全市场行数（上市股票数），未知时不考虑全市场请求
+        """
+        codes = sorted(codes)
+        needs = {trade_date: codes}
+        n = len(codes)
+        size = self._codes_per_call(api_name, 1)
+        chunks = self._chunks(codes, size)
+        options = [
+            RepairPlan('per_code', needs,
+                       [{'ts_code': code, 'trade_date': trade_date} for code in codes],
+                       n, n, self.cost(n, n)),
+            RepairPlan('multi_code', needs,
+                       [{'ts_code': ','.join(chunk), 'trade_date': trade_date} for chunk in chunks],
+                       len(chunks), n, self.cost(len(chunks), n))
+        ]
+        # 全市场请求只发一次；全市场行数超过单次上限时响应会被截断，不如按股票请求，不考虑
+        if market_size and api_name in self.full_market_apis and \
+                max(market_size, n) < self.chunk_planner.row_limit(api_name):
+            rows = max(market_size, n)
+            options.append(RepairPlan('full_market', needs, [{'trade_date': trade_date}],
+                                      1, rows, self.cost(1, rows)))
+        # 成本相同时取请求次数少的
+        return min(options, key=lambda option: (option.cost, option.calls))
+
+    def plan_window(self, api_name, date_plans):
+        """把相邻交易日的方案合并为一个多日多股票方案"""
+        needs = {date: codes for plan in date_plans for date, codes in plan.needs.items()}
+        dates = sorted(needs)
+        codes = sorted(set(code for plan_codes in needs.values() for code in plan_codes))
+        start_date, end_date = dates[0], dates[-1]
+        days = self.chunk_planner.count_days(start_date, end_date)
+        size = self._codes_per_call(api_name, days)
+        budget = max(1, int(self.chunk_planner.row_limit(api_name) * self.chunk_planner.fill_ratio))
+        chunks = self._chunks(codes, size)
+        calls = len(chunks) * max(1, math.ceil(days / budget))
+        rows = len(codes) * days
+        requests = [{'ts_code': ','.join(chunk), 'start_date': start_date, 'end_date': end_date}
+                    for chunk in chunks]
+        return RepairPlan('multi_date', needs, requests, calls, rows, self.cost(calls, rows))
+
+    def plan(self, api_name, needs, market_sizes=None):
+        """
+        规划多个交易日的修复
+
+        逐日选最便宜的方案；再按日期顺序贪心地把相邻的非全市场方案合并，
+        合并后的成本不高于分开执行时才合并。
+
+        Args:
+            needs: {trade_date: [ts_code, ...]}
+            market_sizes: {trade_date: 当日全市场行数}
+
+        Returns:
+            list[RepairPlan]
+        """
+        market_sizes = market_sizes or {}
+        date_plans = [self.plan_date(api_name, trade_date, codes, market_sizes.get(trade_date))
+                      for trade_date, codes in sorted(needs.items()) if codes]
+
+        plans, window, window_plan = [], [], None
+
+        def flush():
+            if not window:
+                return
+            if window_plan is not None:
+                plans.append(window_plan)
+            else:
+                plans.extend(window)
+
+        for date_plan in date_plans:
+            if date_plan.strategy == 'full_market':
+                flush()
+                window, window_plan = [], None
+                plans.append(date_plan)
+                continue
+            if window:
+                candidate = self.plan_window(api_name, window + [date_plan])
+                separate = (window_plan.cost if window_plan else sum(plan.cost for plan in window)) + date_plan.cost
+                if candidate.cost <= separate:
+                    window.append(date_plan)
+                    window_plan = candidate
+                    continue
+                flush()
+            window, window_plan = [date_plan], None
+        flush()
+
+        pairs = sum(len(codes) for codes in needs.values())
+        calls = sum(plan.calls for plan in plans)
+        self.logger.info(f"{api_name}: {len(needs)} 个交易日 {pairs} 条待修复 -> {len(plans)} 组 {calls} 次请求 "
+                         f"(逐只逐日需 {pairs} 次)")
+        return plans
+
+    def fetch(self, api_name, plans, fetch):
+        """
+        执行修复方案，只保留需要修复的 (股票, 交易日)
+
+        Args:
+            fetch: fetch(api_name, **params) -> DataFrame
+
+        Returns:
+            DataFrame
+        """
+        def fetch_codes(codes, start_date, end_date):
+            return fetch(api_name, ts_code=','.join(codes), start_date=start_date, end_date=end_date)
+
+        frames, wanted = [], []
+        for plan in plans:
+            for params in plan.requests:
+                if plan.strategy == 'multi_date':
+                    # 多日请求可能超过单次行数上限，截断时拆分重取
+                    df = self.chunk_planner.fetch_complete(
+                        api_name, fetch_codes, params['ts_code'].split(','), params['start_date'], params['end_date'])
+                else:
+                    df = fetch(api_name, **params)
+                    if plan.strategy == 'full_market' and self.chunk_planner.is_truncated(api_name, df):
+                        # 全市场行数超出预计而被截断，只对需要修复的股票分块重取
+                        trade_date = params['trade_date']
+                        self.logger.info(f"{api_name} {trade_date} 全市场返回 {len(df)} 行达到上限，按需要修复的股票重取")
+                        chunks = self._chunks(plan.needs[trade_date], self._codes_per_call(api_name, 1))
+                        df = pd.concat([self.chunk_planner.fetch_complete(api_name, fetch_codes, chunk,
+                                                                          trade_date, trade_date)
+                                        for chunk in chunks], ignore_index=True)
+                if df is not None and not df.empty:
+                    frames.append(df)
+            wanted.extend((code, trade_date) for trade_date, codes in plan.needs.items() for code in codes)
+
+        if not frames:
+            return pd.DataFrame()
+        combined = pd.concat(frames, ignore_index=True)
+        keys = pd.DataFrame(wanted, columns=['ts_code', 'trade_date']).drop_duplicates()
+        combined['trade_date'] = combined['trade_date'].astype(str)
+        # 全市场和多日请求会多取数据，只保留需要修复的组合
+        return combined.merge(keys, on=['ts_code', 'trade_date'], how='inner')
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+修复队列 - 记录重试后仍失败的请求，供之后补抓，避免数据留下空洞
+"""
+
+import json
+import logging
+from datetime import datetime
+
+from .api_config import RETRY_CONFIG
+from .providers.retry_provider import classify_error
+
+
+class RepairQueue:
+    """持久化的修复队列（repair_queue 表）
+
+    同一接口、同一参数的请求只保留一条记录，重复失败时累加 attempts；
+    超过 max_attempts 仍失败的记录标记为 failed，不再自动处理。
+    """
+
+    def __init__(self, db_manager, max_attempts=None):
+        self.db_manager = db_manager
+        self.max_attempts = max_attempts or RETRY_CONFIG['repair_max_attempts']
+        self.logger = logging.getLogger('StockSystem.RepairQueue')
+
+    @staticmethod
+    def _dump_params(params):
+        return json.dumps({key: value for key, value in params.items() if value is not None},
+                          sort_keys=True, ensure_ascii=False)
+
+    def add(self, table_name, api_name, params, error, conn=None):
+        """加入修复队列，conn 为空时使用独立连接并提交"""
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        own_conn = conn is None
+        conn = conn or self.db_manager.get_connection()
+        try:
+            conn.execute('''
+                INSERT INTO repair_queue
+                (table_name, api_name, params, error_type, error_msg, attempts, status, create_time, update_time)
+                VALUES (?, ?, ?, ?, ?, 1, 'pending', ?, ?)
+                ON CONFLICT (api_name, params) DO UPDATE SET
+                    attempts = attempts + 1,
+                    status = 'pending',
+                    error_type = excluded.error_type,
+                    error_msg = excluded.error_msg,
+                    update_time = excluded.update_time
+            ''', (table_name, api_name, self._dump_params(params), classify_error(error),
+                  str(error)[:500], now, now))
+            if own_conn:
+                conn.commit()
+        finally:
+            if own_conn:
+                conn.close()
+
+    def pending(self, api_name=None, limit=None):
+        """待修复的记录列表"""
+        query = ("SELECT id, table_name, api_name, params, error_type, attempts "
+                 "FROM repair_queue WHERE status = 'pending'")
+        params = []
+        if api_name:
+            query += " AND api_name = ?"
+            params.append(api_name)
+        query += " ORDER BY id"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+
+        rows = self.db_manager.execute_query(query, tuple(params))
+        return [{
+            'id': row[0],
+            'table_name': row[1],
+            'api_name': row[2],
+            'params': json.loads(row[3]),
+            'error_type': row[4],
+            'attempts': row[5]
+        } for row in rows]
+
+    def counts(self):
+        """各状态的记录数"""
+        return dict(self.db_manager.execute_query(
+            "SELECT status, COUNT(*) FROM repair_queue GROUP BY status"))
+
+    def _set_status(self, conn, entry_id, status, error=None):
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if error is None:
+            conn.execute("UPDATE repair_queue SET status = ?, update_time = ? WHERE id = ?",
+                         (status, now, entry_id))
+        else:
+            conn.execute('''
+                UPDATE repair_queue SET status = ?, attempts = attempts + 1,
+                    error_type = ?, error_msg = ?, update_time = ?
+                WHERE id = ?
+            ''', (status, classify_error(error), str(error)[:500], now, entry_id))
+
+    def process(self, fetch, transform=None, api_name=None, limit=None):
+        """
+        依次补抓队列中的请求，数据写入与出队在同一事务中完成
+
+        Args:
+            fetch: fetch(api_name, params) -> DataFrame
+            transform: transform(api_name, df) -> DataFrame
+
+        Returns:
+            tuple: (修复数, 失败数, 写入记录数)
+        """
+        repaired = failed = total_records = 0
+        for entry in self.pending(api_name, limit):
+            try:
+                df = fetch(entry['api_name'], entry['params'])
+                if transform is not None and df is not None:
+                    df = transform(entry['api_name'], df)
+            except Exception as e:
+                failed += 1
+                status = 'failed' if entry['attempts'] + 1 >= self.max_attempts else 'pending'
+                conn = self.db_manager.get_connection()
+                try:
+                    self._set_status(conn, entry['id'], status, e)
+                    conn.commit()
+                finally:
+                    conn.close()
+                self.logger.warning(f"修复 {entry['api_name']} {entry['params']} 失败: {e}")
+                continue
+
+            conn = self.db_manager.get_connection()
+            try:
+                records = 0
+                if df is not None and not df.empty:
+                    records = self.db_manager.upsert_dataframe(conn, entry['table_name'], df)
+                self._set_status(conn, entry['id'], 'done')
+                conn.commit()
+            finally:
+                conn.close()
+            repaired += 1
+            total_records += records
+
+        if repaired or failed:
+            self.logger.info(f"修复队列: 修复 {repaired} 条，失败 {failed} 条，写入 {total_records} 条记录")
+        return repaired, failed, total_records
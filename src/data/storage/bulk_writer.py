@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量写入 - 按列取出数据，分块以 executemany 执行预编译的 INSERT ... ON CONFLICT
+"""
+
+import logging
+import threading
+from datetime import datetime
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from ..api_config import STORAGE_CONFIG
+from ..processors.cleaner import normalize_column
+from .schema_registry import get_schema_registry
+
+
+def _column_values(series):
+    """单列转为可直接绑定的Python值列表，空值为None（不经过逐行的DataFrame转换）"""
+    if series.dtype.kind in 'iub':
+        return series.to_numpy().tolist()
+    if series.dtype.kind == 'f':
+        array = series.to_numpy()
+        values = array.tolist()
+        mask = series.isna().to_numpy()
+        if mask.any():
+            for i in mask.nonzero()[0].tolist():
+                values[i] = None
+        return values
+    return series.to_numpy(dtype=object, na_value=None).tolist()
+
+
+class BulkWriter:
+    """批量写入器
+
+    按表结构选取列后按主键顺序分块，每个分块直接从调用方DataFrame的列中取值，
+    按列的声明类型转换后转为Python列表再按行拼接，不复制整个DataFrame、不经过 to_sql；
+    主键冲突时只更新写入的列，
+    未写入的列保持原值。使用独立连接时每个分块一个事务。
+    """
+
+    def __init__(self, db_manager, chunk_size=None):
+        self.db_manager = db_manager
+        self.chunk_size = chunk_size or STORAGE_CONFIG['write_chunk_size']
+        self.cache_kb = STORAGE_CONFIG['cache_size_mb'] * 1024
+        self.registry = get_schema_registry(db_manager)
+        self.change_log_tables = set(STORAGE_CONFIG['change_log_tables'])
+        self.change_log_max_codes = STORAGE_CONFIG['change_log_max_codes']
+        self._change_log_ready = False
+        self._statements = {}
+        self.logger = logging.getLogger('StockSystem.BulkWriter')
+
+    def statement(self, table_name, columns):
+        """预编译语句（按表和列缓存）"""
+        cache_key = (table_name, tuple(columns))
+        sql = self._statements.get(cache_key)
+        if sql is None:
+            schema = self.registry.get(table_name)
+            key_columns = schema.key_columns if schema else []
+            all_columns = list(columns) + ['update_time']
+            sql = (f"INSERT INTO {table_name} ({', '.join(all_columns)}) "
+                   f"VALUES ({', '.join(['?'] * len(all_columns))})")
+            if key_columns and all(col in columns for col in key_columns):
+                updates = ', '.join(f"{col} = excluded.{col}" for col in all_columns if col not in key_columns)
+                sql += f" ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {updates}"
+            self._statements[cache_key] = sql
+        return sql
+
+    @staticmethod
+    def _key_order(df, key_columns):
+        """按主键排序的行位置：有序插入减少B树页分裂"""
+        codes = [pd.factorize(df[col], sort=True)[0] for col in reversed(key_columns)]
+        return np.lexsort(codes)
+
+    def write(self, table_name, df, conn=None):
+        """
+        写入DataFrame
+
+        Args:
+            conn: 给定连接时在调用方的事务中写入且不提交；为空时使用独立连接，每个分块提交一次
+
+        Returns:
+            int: 写入的记录数
+        """
+        if df is None or df.empty:
+            return 0
+
+        columns = self.registry.write_columns(table_name, df)
+        sql = self.statement(table_name, columns)
+        update_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        schema = self.registry.get(table_name)
+        kinds = schema.kinds if schema else {}
+        key_columns = [col for col in (schema.key_columns if schema else []) if col in columns]
+        order = self._key_order(df, key_columns) if key_columns and len(df) > 1 else None
+
+        own_conn = conn is None
+        if own_conn:
+            conn = self.db_manager.get_connection()
+        try:
+            conn.execute(f"PRAGMA cache_size = -{self.cache_kb}")
+            if table_name in self.change_log_tables:
+                # 与数据在同一事务中提交（独立连接时随第一个分块提交）
+                self._log_change(conn, table_name, df, kinds, update_time)
+            for start in range(0, len(df), self.chunk_size):
+                rows = (order[start:start + self.chunk_size] if order is not None
+                        else slice(start, start + self.chunk_size))
+                values = [_column_values(normalize_column(df[col].iloc[rows], kinds.get(col))) for col in columns]
+                conn.executemany(sql, zip(*values, repeat(update_time)))
+                if own_conn:
+                    conn.commit()
+        finally:
+            if own_conn:
+                conn.close()
+        return len(df)
+
+    def _log_change(self, conn, table_name, df, kinds, update_time):
+        """记录本次写入涉及的交易日区间和股票（股票过多时记为全市场）"""
+        if 'trade_date' not in df.columns:
+            return
+        if not self._change_log_ready:
+            # 旧版本建的库没有变更记录表时补建
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'data_change_log'"
+                            ).fetchone() is None:
+                conn.execute(self.registry.get('data_change_log').sql)
+            self._change_log_ready = True
+        codes = normalize_column(df['ts_code'], kinds.get('ts_code')).dropna().unique() \
+            if 'ts_code' in df.columns else []
+        ts_codes = ','.join(sorted(codes)) if 0 < len(codes) <= self.change_log_max_codes else None
+        dates = normalize_column(df['trade_date'], kinds.get('trade_date'))
+        conn.execute("INSERT INTO data_change_log (table_name, start_date, end_date, ts_codes, update_time) "
+                     "VALUES (?, ?, ?, ?, ?)",
+                     (table_name, dates.min(), dates.max(), ts_codes, update_time))
+
+
+_writer_cache = {}
+_writer_lock = threading.Lock()
+
+
+def get_bulk_writer(db_manager):
+    """按数据库路径共享批量写入器（预编译语句随之复用）"""
+    with _writer_lock:
+        writer = _writer_cache.get(db_manager.db_path)
+        if writer is None:
+            writer = BulkWriter(db_manager)
+            _writer_cache[db_manager.db_path] = writer
+        return writer
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+参考表差异同步 - 按主键比较行哈希，只写入新增、变化和删除的记录
+"""
+
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .schema_registry import get_schema_registry
+
+logger = logging.getLogger('StockSystem.ReferenceDiff')
+
+_listeners = []
+_listeners_lock = threading.Lock()
+
+
+def add_delta_listener(callback):
+    """注册变更监听：callback(delta) 在差异写入提交后调用，用于按股票失效缓存"""
+    with _listeners_lock:
+        if callback not in _listeners:
+            _listeners.append(callback)
+
+
+def remove_delta_listener(callback):
+    with _listeners_lock:
+        if callback in _listeners:
+            _listeners.remove(callback)
+
+
+class TableDelta:
+    """一次同步的差异：新增、更新、删除记录的主键"""
+
+    def __init__(self, table_name, key_columns, inserted, updated, deleted, db_path=None):
+        self.table_name = table_name
+        self.db_path = db_path  # 所属数据库，监听方据此忽略其他数据库的变更
+        self.key_columns = key_columns
+        self.inserted = inserted  # DataFrame，只含主键列
+        self.updated = updated
+        self.deleted = deleted
+
+    @property
+    def empty(self):
+        return self.inserted.empty and self.updated.empty and self.deleted.empty
+
+    @property
+    def counts(self):
+        return {'inserted': len(self.inserted), 'updated': len(self.updated), 'deleted': len(self.deleted)}
+
+    def affected_codes(self):
+        """受影响的股票代码"""
+        if 'ts_code' not in self.key_columns:
+            return set()
+        return set(pd.concat([self.inserted['ts_code'], self.updated['ts_code'],
+                              self.deleted['ts_code']]).dropna())
+
+    def summary(self):
+        counts = self.counts
+        return (f"{self.table_name}: 新增 {counts['inserted']} 条，"
+                f"更新 {counts['updated']} 条，删除 {counts['deleted']} 条")
+
+
+def _canonical(df, columns, kinds):
+    """转为统一的表示（数值为float64，文本为Python字符串/None），使数据库和接口数据的哈希可比"""
+    result = {}
+    for col in columns:
+        series = df[col]
+        if kinds.get(col) in ('float', 'int'):
+            result[col] = pd.to_numeric(series, errors='coerce').astype('float64')
+        else:
+            values = series.astype(object)
+            result[col] = values.where(series.notna(), None)
+    return pd.DataFrame(result, index=df.index)
+
+
+def hash_rows(df, columns, kinds):
+    """逐行哈希（向量化），返回 uint64 数组"""
+    if not columns:
+        return np.zeros(len(df), dtype='uint64')
+    return pd.util.hash_pandas_object(_canonical(df, columns, kinds), index=False).to_numpy()
+
+
+def diff_frames(current, incoming, key_columns, columns, kinds):
+    """
+    比较数据库中的记录与新数据
+
+    Args:
+        current: 数据库中的记录（含主键列和 columns）
+        incoming: 新数据（主键已去重）
+        columns: 参与比较的非主键列
+
+    Returns:
+        tuple: (inserted, updated, deleted) 主键DataFrame，以及需要写入的新数据行位置
+    """
+    left = _canonical(current, key_columns, kinds)
+    left['_old_hash'] = hash_rows(current, columns, kinds)
+    right = _canonical(incoming, key_columns, kinds)
+    right['_new_hash'] = hash_rows(incoming, columns, kinds)
+    right['_pos'] = np.arange(len(incoming))
+
+    merged = left.merge(right, on=key_columns, how='outer', indicator=True)
+    inserted = merged['_merge'] == 'right_only'
+    deleted = merged['_merge'] == 'left_only'
+    updated = (merged['_merge'] == 'both') & (merged['_old_hash'] != merged['_new_hash'])
+
+    changed_positions = merged.loc[inserted | updated, '_pos'].astype('int64').to_numpy()
+    return (merged.loc[inserted, key_columns].reset_index(drop=True),
+            merged.loc[updated, key_columns].reset_index(drop=True),
+            merged.loc[deleted, key_columns].reset_index(drop=True),
+            np.sort(changed_positions))
+
+
+def sync_reference_table(db_manager, table_name, df, delete_missing=True):
+    """
+    按差异同步参考表：一次事务内删除消失的记录、写入新增和变化的记录
+
+    只比较新数据中包含的列；表结构、主键和索引保持不变。新数据为空时不做任何修改，
+    避免接口异常返回空表时清空本地数据。
+
+    Args:
+        delete_missing: 是否删除新数据中不存在的记录（如已退市股票）
+
+    Returns:
+        TableDelta: 本次写入的差异
+    """
+    registry = get_schema_registry(db_manager)
+    schema = registry.get(table_name)
+    if schema is None:
+        raise ValueError(f"表 {table_name} 未在DatabaseManager中定义")
+    key_columns = schema.key_columns
+    if not key_columns:
+        raise ValueError(f"表 {table_name} 没有主键，无法按差异同步")
+
+    empty_keys = pd.DataFrame(columns=key_columns)
+    if df is None or df.empty:
+        logger.warning(f"{table_name} 新数据为空，跳过同步")
+        return TableDelta(table_name, key_columns, empty_keys, empty_keys, empty_keys)
+
+    incoming = registry.align(table_name, df)
+    missing_keys = [col for col in key_columns if col not in incoming.columns]
+    if missing_keys:
+        raise ValueError(f"{table_name} 新数据缺少主键列 {missing_keys}")
+    incoming = incoming.dropna(subset=key_columns).drop_duplicates(key_columns, keep='last')
+    columns = [col for col in incoming.columns if col not in key_columns]
+
+    if not db_manager.table_exists(table_name):
+        db_manager.create_all_tables()
+    conn = db_manager.get_connection()
+    try:
+        current = pd.read_sql_query(f"SELECT {', '.join(key_columns + columns)} FROM {table_name}", conn)
+        inserted, updated, deleted, positions = diff_frames(current, incoming, key_columns,
+                                                            columns, schema.kinds)
+        if not delete_missing:
+            deleted = empty_keys
+
+        if not deleted.empty:
+            condition = ' AND '.join(f"{col} = ?" for col in key_columns)
+            conn.executemany(f"DELETE FROM {table_name} WHERE {condition}",
+                             deleted.itertuples(index=False, name=None))
+        db_manager.upsert_dataframe(conn, table_name, incoming.iloc[positions])
+        conn.commit()
+    finally:
+        conn.close()
+
+    delta = TableDelta(table_name, key_columns, inserted, updated, deleted, db_manager.db_path)
+    logger.info(delta.summary())
+    if not delta.empty:
+        with _listeners_lock:
+            listeners = list(_listeners)
+        for callback in listeners:
+            try:
+                callback(delta)
+            except Exception as e:
+                logger.warning(f"变更监听处理失败: {e}")
+    return delta
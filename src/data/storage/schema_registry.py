@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+表结构注册表 - 由 DatabaseManager 的建表语句生成每张表的列、类型和主键
+"""
+
+import sqlite3
+import logging
+import threading
+
+from ..processors.cleaner import normalize_frame
+
+# SQLite 声明类型 -> 清洗类型
+AFFINITY_KINDS = {
+    'TEXT': 'str',
+    'INTEGER': 'int',
+    'REAL': 'float'
+}
+
+
+class TableSchema:
+    """单张表的结构"""
+
+    def __init__(self, name, sql, columns, types, primary_key, unique_keys):
+        self.name = name
+        self.sql = sql  # 建表语句
+        self.columns = columns  # 按定义顺序的列名
+        self.types = types  # {列名: 声明类型}
+        self.primary_key = primary_key  # 主键列
+        self.unique_keys = unique_keys  # [(列, ...), ...]
+        self.kinds = {col: AFFINITY_KINDS.get(decl.upper(), 'str')
+                      for col, decl in types.items() if col != 'update_time'}
+
+    @property
+    def key_columns(self):
+        """判定记录唯一性的列：主键（自增id除外），否则取第一个唯一约束"""
+        if self.primary_key and self.primary_key != ['id']:
+            return list(self.primary_key)
+        if self.unique_keys:
+            return list(self.unique_keys[0])
+        return []
+
+
+def read_table_schema(conn, table_name, sql=None):
+    """从数据库读取表结构，表不存在返回None"""
+    rows = conn.execute(f"PRAGMA table_info({table_name})").fetchall()
+    if not rows:
+        return None
+
+    columns = [row[1] for row in rows]
+    types = {row[1]: row[2] or 'TEXT' for row in rows}
+    primary_key = [row[1] for row in sorted((row for row in rows if row[5]), key=lambda row: row[5])]
+
+    unique_keys = []
+    for index in conn.execute(f"PRAGMA index_list({table_name})").fetchall():
+        # (seq, name, unique, origin, partial)：只取建表语句中的 UNIQUE 约束
+        if index[2] and index[3] == 'u':
+            key = tuple(row[2] for row in conn.execute(f"PRAGMA index_info('{index[1]}')").fetchall())
+            unique_keys.append(key)
+
+    if sql is None:
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                           (table_name,)).fetchone()
+        sql = row[0] if row else None
+    return TableSchema(table_name, sql, columns, types, primary_key, unique_keys)
+
+
+class SchemaRegistry:
+    """表结构注册表
+
+    在内存数据库中执行 DatabaseManager 的建表语句得到各表结构，
+    写入前按表结构对齐DataFrame（列顺序、类型、紧凑数值类型），
+    数据只写入已建好的表，不再由 to_sql 推断类型或重建表。
+    """
+
+    def __init__(self, db_manager):
+        self.logger = logging.getLogger('StockSystem.SchemaRegistry')
+        self.tables = {}
+        self._warned = set()
+
+        conn = sqlite3.connect(':memory:')
+        try:
+            cursor = conn.cursor()
+            db_manager._create_basic_tables(cursor)
+            db_manager._create_market_tables(cursor)
+            db_manager._create_extended_tables(cursor)
+            db_manager._create_system_tables(cursor)
+            names = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+            for name in names:
+                self.tables[name] = read_table_schema(conn, name)
+        finally:
+            conn.close()
+
+    def __contains__(self, table_name):
+        return table_name in self.tables
+
+    def get(self, table_name):
+        """表结构，未定义返回None"""
+        return self.tables.get(table_name)
+
+    def write_columns(self, table_name, df):
+        """DataFrame 中可写入表的列，按建表顺序排列；update_time 由写入方统一填写"""
+        schema = self.tables.get(table_name)
+        if schema is None:
+            return [col for col in df.columns if col != 'update_time']
+
+        columns = [col for col in schema.columns if col in df.columns and col != 'update_time']
+        extra = [col for col in df.columns if col not in schema.columns and col != 'update_time']
+        if extra and (table_name, tuple(extra)) not in self._warned:
+            self._warned.add((table_name, tuple(extra)))
+            self.logger.info(f"表 {table_name} 没有列 {extra}，写入时忽略")
+        return columns
+
+    def align(self, table_name, df):
+        """
+        按表结构对齐DataFrame：只保留表中存在的列并按建表顺序排列，
+        按列的声明类型转换；update_time 由写入方统一填写
+        """
+        schema = self.tables.get(table_name)
+        if schema is None or df is None:
+            return df
+        return normalize_frame(df[self.write_columns(table_name, df)], schema.kinds)
+
+    def matches(self, conn, table_name):
+        """数据库中的表是否与定义一致（列和主键）"""
+        expected = self.tables[table_name]
+        actual = read_table_schema(conn, table_name)
+        if actual is None:
+            return True  # 尚未创建，由建表语句创建
+        return (set(expected.columns) <= set(actual.columns)
+                and expected.primary_key == actual.primary_key
+                and set(expected.unique_keys) <= set(actual.unique_keys))
+
+    def rebuild(self, conn, table_name):
+        """
+        按定义重建表（例如曾被 to_sql(if_exists='replace') 覆盖而丢失主键的表），
+        保留表中已有的数据，重复主键的记录以后写入的为准
+        """
+        expected = self.tables[table_name]
+        actual = read_table_schema(conn, table_name)
+        common = [col for col in expected.columns if col in actual.columns]
+        backup = f"{table_name}__rebuild"
+
+        self.logger.warning(f"表 {table_name} 结构与定义不一致，按建表语句重建")
+        conn.execute(f"DROP TABLE IF EXISTS {backup}")
+        conn.execute(f"ALTER TABLE {table_name} RENAME TO {backup}")
+        conn.execute(expected.sql)
+        if common:
+            column_sql = ', '.join(common)
+            conn.execute(f"INSERT OR REPLACE INTO {table_name} ({column_sql}) "
+                         f"SELECT {column_sql} FROM {backup}")
+        conn.execute(f"DROP TABLE {backup}")
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_schema_registry(db_manager):
+    """获取表结构注册表（建表语句对所有数据库相同，全局共享一份）"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SchemaRegistry(db_manager)
+        return _registry
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+停牌区间 - 把逐日停牌记录合并为每只股票的停牌交易日区间，供缺口检测排除停牌股票
+"""
+
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .api_config import SUSPENSION_CONFIG
+from .chunk_planner import ChunkPlanner
+from .processors import clean_frame
+from .trade_calendar import get_trade_calendar, shift_date
+
+
+class SuspensionStore:
+    """停牌区间存储
+
+    stock_suspension 表每行是一只股票连续停牌的交易日区间 [start_date, end_date]（含两端）。
+    新的停牌记录与已有区间相交或首尾相邻（按交易日）时合并，同一股票的区间互不重叠。
+    """
+
+    def __init__(self, db_manager, calendar=None):
+        self.db_manager = db_manager
+        self.calendar = calendar or get_trade_calendar(db_manager)
+        self.chunk_planner = ChunkPlanner(self.calendar)
+        self.logger = logging.getLogger('StockSystem.SuspensionStore')
+
+    def intervals(self, start_date=None, end_date=None, codes=None):
+        """
+        与区间相交的停牌区间
+
+        Returns:
+            DataFrame: ts_code, start_date, end_date
+        """
+        conditions, params = [], []
+        if end_date:
+            conditions.append("start_date <= ?")
+            params.append(end_date)
+        if start_date:
+            conditions.append("end_date >= ?")
+            params.append(start_date)
+        if codes is not None:
+            conditions.append(f"ts_code IN ({','.join('?' * len(codes))})")
+            params.extend(codes)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        if not self.db_manager.table_exists('stock_suspension'):
+            # 旧版本建的库还没有停牌表，按没有停牌记录处理
+            return pd.DataFrame(columns=['ts_code', 'start_date', 'end_date'])
+        rows = self.db_manager.execute_query(
+            f"SELECT ts_code, start_date, end_date FROM stock_suspension{where} ORDER BY ts_code, start_date",
+            tuple(params) or None)
+        return pd.DataFrame(rows, columns=['ts_code', 'start_date', 'end_date'])
+
+    def _ordinals(self, dates):
+        """日期 -> 交易日序号（非交易日取之后的第一个交易日）"""
+        open_days = np.asarray(self.calendar.open_days(self.calendar.first_date, self.calendar.last_date),
+                               dtype=str)
+        return np.searchsorted(open_days, np.asarray(dates, dtype=str), side='left'), open_days
+
+    def merge(self, df):
+        """
+        合并逐日停牌记录
+
+        Args:
+            df: suspend_d 返回的数据（ts_code, trade_date[, suspend_type]），只取停牌(S)记录
+
+        Returns:
+            int: 合并后受影响股票的停牌区间数
+        """
+        if df is None or df.empty:
+            return 0
+        if 'suspend_type' in df.columns:
+            df = df[df['suspend_type'].astype(str) == 'S']
+        days = df[['ts_code', 'trade_date']].dropna().astype(str).drop_duplicates()
+        if days.empty:
+            return 0
+
+        codes = sorted(days['ts_code'].unique())
+        existing = self.intervals(codes=codes)
+        spans = pd.concat([
+            pd.DataFrame({'ts_code': days['ts_code'], 'start_date': days['trade_date'],
+                          'end_date': days['trade_date']}),
+            existing
+        ], ignore_index=True)
+
+        lo, open_days = self._ordinals(spans['start_date'])
+        hi = self._ordinals(spans['end_date'])[0]
+        spans = spans.assign(lo=lo, hi=hi).sort_values(['ts_code', 'lo'], ignore_index=True)
+        # 起点超过同一股票之前区间的最远终点+1时开始新区间
+        reach = spans.groupby('ts_code')['hi'].cummax()
+        previous = reach.groupby(spans['ts_code']).shift()
+        new_span = previous.isna() | (spans['lo'] > previous + 1)
+        merged = spans.groupby(new_span.cumsum()).agg(ts_code=('ts_code', 'first'), lo=('lo', 'min'),
+                                                       hi=('hi', 'max'))
+        last = len(open_days) - 1
+        merged['start_date'] = open_days[np.minimum(merged['lo'].to_numpy(), last)]
+        merged['end_date'] = open_days[np.minimum(merged['hi'].to_numpy(), last)]
+
+        update_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        conn = self.db_manager.get_connection()
+        try:
+            conn.executemany("DELETE FROM stock_suspension WHERE ts_code = ?", [(code,) for code in codes])
+            conn.executemany(
+                "INSERT INTO stock_suspension (ts_code, start_date, end_date, update_time) VALUES (?, ?, ?, ?)",
+                [(code, start, end, update_time) for code, start, end in
+                 merged[['ts_code', 'start_date', 'end_date']].itertuples(index=False, name=None)])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return len(merged)
+
+    def _get_state(self, dataset):
+        rows = self.db_manager.execute_query("SELECT last_date FROM sync_state WHERE dataset = ?", (dataset,))
+        return rows[0][0] if rows else None
+
+    def _set_state(self, dataset, last_date, records):
+        conn = self.db_manager.get_connection()
+        try:
+            conn.execute("INSERT OR REPLACE INTO sync_state (dataset, last_date, records, update_time) "
+                         "VALUES (?, ?, ?, ?)",
+                         (dataset, last_date, records, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_watermark(self):
+        """已同步到的最后一个交易日"""
+        return self._get_state('suspend_d')
+
+    def get_start(self):
+        """已同步的第一个交易日（旧版本同步过的库没有记录，按已覆盖处理）"""
+        return self._get_state('suspend_d_start')
+
+    def sync(self, fetch, end_date=None):
+        """
+        同步停牌记录，覆盖行情数据最早的交易日到 end_date：水位之后的新交易日向后追平，
+        行情历史回填到已同步范围之前时，同时补齐之前的停牌记录
+
+        Args:
+            fetch: fetch(api_name, **params) -> DataFrame
+
+        Returns:
+            tuple: (成功与否, 停牌记录数, 消息)
+        """
+        end_date = self.calendar.latest_open(end_date) if self.calendar.last_date else None
+        if not end_date:
+            return True, 0, "交易日历为空，跳过停牌同步"
+        first_date = self.db_manager.execute_query("SELECT MIN(trade_date) FROM daily_basic")[0][0] or end_date
+        watermark = self.get_watermark()
+        synced_start = self.get_start() or (first_date if watermark else None)
+
+        # (交易日, 同步完每个窗口后更新的状态)：先补之前的历史，再向后追平
+        ranges = []
+        if watermark:
+            if first_date < synced_start:
+                ranges.append((self.calendar.open_days(first_date, shift_date(synced_start, -1)), 'suspend_d_start'))
+            ranges.append((self.calendar.open_days(shift_date(watermark, 1), end_date), 'suspend_d'))
+        else:
+            ranges.append((self.calendar.open_days(min(first_date, end_date), end_date), 'suspend_d'))
+        ranges = [(days, dataset) for days, dataset in ranges if days]
+        if not ranges:
+            return True, 0, "停牌数据已是最新"
+
+        api_name = SUSPENSION_CONFIG['api_name']
+        window = SUSPENSION_CONFIG['window_days']
+        records = 0
+        for days, dataset in ranges:
+            for i in range(0, len(days), window):
+                window_start, window_end = days[i], days[min(i + window, len(days)) - 1]
+                try:
+                    # 响应达到行数上限时按日期拆分重取
+                    df = self.chunk_planner.fetch_complete(
+                        api_name,
+                        lambda codes, sub_start, sub_end: fetch(api_name, start_date=sub_start, end_date=sub_end,
+                                                                **SUSPENSION_CONFIG['params']),
+                        [''], window_start, window_end)
+                except Exception as e:
+                    message = f"停牌数据同步到 {window_start} 失败: {e}"
+                    self.logger.warning(message)
+                    return False, records, message
+                df = clean_frame(api_name, df)
+                records += len(df)
+                self.merge(df)
+                if dataset == 'suspend_d':
+                    self._set_state('suspend_d', window_end, records)
+            if dataset == 'suspend_d_start':
+                # 之前的历史整段补齐后才前移起点，中途失败下次从头重取（合并是幂等的）
+                self._set_state('suspend_d_start', days[0], records)
+        if not self.get_start():
+            self._set_state('suspend_d_start', synced_start or ranges[0][0][0], records)
+
+        message = f"停牌数据 {ranges[0][0][0]}~{ranges[-1][0][-1]}: {records} 条停牌记录"
+        self.logger.info(message)
+        return True, records, message
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+交易日历服务 - 基于 trade_calendar 表的交易日索引
+"""
+
+import bisect
+import logging
+import threading
+from datetime import datetime, date, timedelta
+
+from .database_manager import DatabaseManager
+
+
+def to_date_str(value):
+    """统一日期格式为 YYYYMMDD 字符串"""
+    if isinstance(value, (datetime, date)):
+        return value.strftime('%Y%m%d')
+    return str(value).replace('-', '')[:8]
+
+
+def shift_date(date_str, days):
+    """自然日偏移"""
+    return (datetime.strptime(date_str, '%Y%m%d') + timedelta(days=days)).strftime('%Y%m%d')
+
+
+class TradeCalendar:
+    """交易日历
+
+    一次性把 trade_calendar 读入两个升序数组：
+    - _days: 日历覆盖的全部日期
+    - _open_days: 交易日，序号即数组下标
+    查询均为 O(log n) 二分或 O(1) 字典查找。
+    """
+
+    def __init__(self, db_manager=None):
+        self.db_manager = db_manager or DatabaseManager()
+        self.logger = logging.getLogger('StockSystem.TradeCalendar')
+        self._days = []
+        self._open_days = []
+        self._ordinals = {}
+        self.load()
+
+    def load(self):
+        """从数据库加载交易日历"""
+        try:
+            rows = self.db_manager.execute_query(
+                "SELECT cal_date, is_open FROM trade_calendar ORDER BY cal_date"
+            )
+        except Exception as e:
+            self.logger.warning(f"加载交易日历失败: {e}")
+            rows = []
+
+        self._days = [row[0] for row in rows]
+        self._open_days = [row[0] for row in rows if int(row[1] or 0) == 1]
+        self._ordinals = {day: i for i, day in enumerate(self._open_days)}
+        self.logger.info(f"交易日历已加载: {len(self._days)} 天, 其中交易日 {len(self._open_days)} 天")
+
+    def __len__(self):
+        return len(self._open_days)
+
+    @property
+    def first_date(self):
+        """日历覆盖的第一天"""
+        return self._days[0] if self._days else None
+
+    @property
+    def last_date(self):
+        """日历覆盖的最后一天"""
+        return self._days[-1] if self._days else None
+
+    def covers(self, start_date, end_date=None):
+        """日历是否覆盖指定日期(区间)"""
+        if not self._days:
+            return False
+        start_date = to_date_str(start_date)
+        end_date = to_date_str(end_date) if end_date else start_date
+        return self._days[0] <= start_date and end_date <= self._days[-1]
+
+    def is_open(self, trade_date):
+        """是否交易日"""
+        return to_date_str(trade_date) in self._ordinals
+
+    def prev_open(self, trade_date):
+        """严格早于指定日期的上一个交易日"""
+        i = bisect.bisect_left(self._open_days, to_date_str(trade_date))
+        return self._open_days[i - 1] if i > 0 else None
+
+    def next_open(self, trade_date):
+        """严格晚于指定日期的下一个交易日"""
+        i = bisect.bisect_right(self._open_days, to_date_str(trade_date))
+        return self._open_days[i] if i < len(self._open_days) else None
+
+    def latest_open(self, trade_date=None):
+        """不晚于指定日期(默认今天)的最近交易日"""
+        trade_date = to_date_str(trade_date or datetime.now())
+        i = bisect.bisect_right(self._open_days, trade_date)
+        return self._open_days[i - 1] if i > 0 else None
+
+    def open_days(self, start_date, end_date):
+        """区间内的交易日列表(含两端)"""
+        lo = bisect.bisect_left(self._open_days, to_date_str(start_date))
+        hi = bisect.bisect_right(self._open_days, to_date_str(end_date))
+        return self._open_days[lo:hi]
+
+    def count_open_days(self, start_date, end_date):
+        """区间内交易日数量"""
+        lo = bisect.bisect_left(self._open_days, to_date_str(start_date))
+        hi = bisect.bisect_right(self._open_days, to_date_str(end_date))
+        return max(0, hi - lo)
+
+    def to_ordinal(self, trade_date):
+        """交易日 -> 序号，非交易日返回None"""
+        return self._ordinals.get(to_date_str(trade_date))
+
+    def from_ordinal(self, ordinal):
+        """序号 -> 交易日"""
+        if 0 <= ordinal < len(self._open_days):
+            return self._open_days[ordinal]
+        return None
+
+
+_calendar_cache = {}
+_calendar_lock = threading.Lock()
+
+
+def get_trade_calendar(db_manager=None, reload=False):
+    """获取共享的交易日历实例(按数据库路径缓存)"""
+    db_manager = db_manager or DatabaseManager()
+    with _calendar_lock:
+        calendar = _calendar_cache.get(db_manager.db_path)
+        if calendar is None:
+            calendar = TradeCalendar(db_manager)
+            _calendar_cache[db_manager.db_path] = calendar
+        elif reload:
+            calendar.load()
+        return calendar
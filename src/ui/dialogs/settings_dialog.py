@@ -12,6 +12,8 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTabWidget,
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QFont
 
+from ...data.providers import TushareProvider
+
 class TokenValidator(QThread):
     """Token验证线程"""
     validation_finished = pyqtSignal(bool, str, dict)  # 成功/失败, 消息, 详细结果
@@ -24,14 +26,8 @@ class TokenValidator(QThread):
     def run(self):
         """执行token验证"""
         try:
-            if self.token_type == "tudata":
-                import tudata as ts
-            else:
-                import tushare as ts
-                
-            # 设置token
-            ts.set_token(self.token)
-            pro = ts.pro_api()
+            # 验证真实接口权限，不经过缓存
+            pro = TushareProvider(self.token, self.token_type)
             
             # 测试基础API
             test_results = {}
@@ -256,9 +252,16 @@ class SettingsDialog(QDialog):
                 os.makedirs(config_dir)
                 
             config_file = os.path.join(config_dir, "token_config.txt")
+            # 保留其他配置（如 token_2 等token池配置），只替换主token
+            other_lines = []
+            if os.path.exists(config_file):
+                with open(config_file, 'r', encoding='utf-8') as f:
+                    other_lines = [line for line in f
+                                   if line.split('=', 1)[0].strip() not in ('token', 'token_type')]
             with open(config_file, 'w', encoding='utf-8') as f:
                 f.write(f"token={token}\n")
                 f.write(f"token_type={token_type}\n")
+                f.writelines(other_lines)
                 
             self.result_text.append("\nToken配置已保存到 config/token_config.txt")
             
@@ -4,12 +4,13 @@
 主窗口 - 股票分析系统主界面
 """
 
+import os
 import sys
 import logging
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QTabWidget, QMenuBar, QStatusBar,
-                             QAction, QMessageBox, QToolBar)
-from PyQt5.QtCore import Qt, pyqtSignal
+                             QAction, QMessageBox, QToolBar, QLabel)
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer
 from PyQt5.QtGui import QIcon, QFont
 
 from .windows.stock_list_window import StockListWindow
@@ -17,6 +18,8 @@ from .windows.stock_filter_window import StockFilterWindow
 from .windows.stock_detail_window import StockDetailWindow
 from .windows.monitor_window import MonitorWindow
 from .dialogs.settings_dialog import SettingsDialog
+from ..data.database_manager import DatabaseManager
+from ..data.quota_ledger import QuotaLedger
 
 class MainWindow(QMainWindow):
     """主窗口类"""
@@ -161,11 +164,34 @@ class MainWindow(QMainWindow):
         self.setStatusBar(self.status_bar)
         self.status_bar.showMessage("就绪")
         
+        # 右侧常驻显示当日接口用量，定时从额度台账刷新
+        self.quota_label = QLabel()
+        self.status_bar.addPermanentWidget(self.quota_label)
+        self.quota_timer = QTimer(self)
+        self.quota_timer.timeout.connect(self.refresh_quota_usage)
+        self.quota_timer.start(30000)
+        self.refresh_quota_usage()
+        
+    def refresh_quota_usage(self):
+        """刷新状态栏中的当日接口用量"""
+        db_manager = DatabaseManager()
+        # 数据库尚未创建时不显示（连接数据库会创建空文件）
+        if not os.path.exists(db_manager.db_path):
+            self.quota_label.clear()
+            return
+        try:
+            self.quota_label.setText(QuotaLedger(db_manager).summary())
+        except Exception as e:
+            self.logger.warning(f"读取接口用量失败: {e}")
+        
     def init_connections(self):
         """初始化信号连接"""
         # 股票列表选择信号
         self.stock_list_window.stock_selected.connect(self.on_stock_selected)
         
+        # 初始化过程中的数据可用信号
+        self.stock_list_window.data_available.connect(self.on_data_available)
+        
         # 选项卡切换信号
         self.tab_widget.currentChanged.connect(self.on_tab_changed)
         
@@ -179,6 +205,14 @@ class MainWindow(QMainWindow):
         self.stock_detail_window.update_stock_info(stock_code)
         self.logger.info(f"已切换到股票详情页面，显示 {stock_code} 信息")
         
+    def on_data_available(self, table_name, start_date, end_date):
+        """部分数据已可用时通知各页面刷新"""
+        self.logger.info(f"数据可用: {table_name} {start_date}~{end_date}")
+        if end_date:
+            self.status_bar.showMessage(f"{table_name} 数据已可用至 {end_date}", 5000)
+        self.stock_filter_window.on_data_available(table_name, start_date, end_date)
+        self.stock_detail_window.on_data_available(table_name, start_date, end_date)
+        
     def on_tab_changed(self, index):
         """处理选项卡切换事件"""
         tab_names = ["股票列表", "股票筛选", "股票详情", "实时监控"]
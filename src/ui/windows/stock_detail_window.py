@@ -372,6 +372,11 @@ BOLL（布林带）：
         
         return widget
         
+    def on_data_available(self, table_name, start_date, end_date):
+        """行情数据入库后刷新当前显示的股票"""
+        if self.current_stock_code and table_name == 'daily_basic':
+            self.update_stock_info(self.current_stock_code)
+            
     def update_stock_info(self, stock_code):
         """更新股票信息"""
         self.current_stock_code = stock_code
@@ -4,6 +4,9 @@
 股票筛选窗口 - 多维度股票筛选功能
 """
 
+import os
+import logging
+import pandas as pd
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                              QTableWidget, QTableWidgetItem, QHeaderView,
                              QLabel, QLineEdit, QComboBox, QGroupBox,
@@ -12,6 +15,21 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
 from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont
 
+from ...data.database_manager import DatabaseManager
+from ...data.processors import get_price_adjuster
+
+# 按区间筛选的行情条件: (列, 最小值控件属性, 最大值控件属性, 界面单位换算到库中单位的倍数)
+DAILY_RANGE_CONDITIONS = [
+    ('d.close', 'min_price', 'max_price', 1),
+    ('d.vol', 'min_volume', 'max_volume', 10000),  # 界面为万手，库中为手
+    ('d.pct_chg', 'min_change', 'max_change', 1),
+    ('d.pe', 'min_pe', 'max_pe', 1),
+    ('d.pb', 'min_pb', 'max_pb', 1),
+]
+
+# 均线条件: (复选框属性, 均线交易日数)
+MA_CONDITIONS = [('ma5_check', 5), ('ma10_check', 10), ('ma20_check', 20)]
+
 class StockFilterWindow(QWidget):
     """股票筛选窗口"""
     
@@ -19,7 +37,11 @@ class StockFilterWindow(QWidget):
     
     def __init__(self):
         super().__init__()
+        self.data_ranges = {}  # 已有数据的表名 -> (起始日期, 截止日期)，初始化过程中逐步扩大
+        self.condition_widgets = {}  # 数据来源表名 -> 筛选条件控件，None 表示本地尚无该数据
+        self.logger = logging.getLogger('StockSystem.StockFilterWindow')
         self.init_ui()
+        self.load_data_ranges()
         
     def init_ui(self):
         """初始化界面"""
@@ -107,6 +129,7 @@ class StockFilterWindow(QWidget):
         self.area_combo = QComboBox()
         self.area_combo.addItems(["全部", "北京", "上海", "深圳", "广东", "浙江"])
         market_layout.addRow("所属地区:", self.area_combo)
+        self.bind_condition('stock_basic', self.market_combo, self.industry_combo, self.area_combo)
         
         layout.addWidget(market_group)
         
@@ -158,6 +181,8 @@ class StockFilterWindow(QWidget):
         volume_layout.addWidget(QLabel("至"))
         volume_layout.addWidget(self.max_volume)
         basic_layout.addRow("成交量:", volume_layout)
+        self.bind_condition('daily_basic', self.min_price, self.max_price, self.min_volume, self.max_volume)
+        self.bind_condition(None, self.min_market_cap, self.max_market_cap)
         
         layout.addWidget(basic_group)
         
@@ -198,6 +223,8 @@ class StockFilterWindow(QWidget):
         change_layout.addWidget(QLabel("至"))
         change_layout.addWidget(self.max_change)
         trend_layout.addRow("涨跌幅:", change_layout)
+        self.bind_condition('daily_basic', self.min_change, self.max_change)
+        self.bind_condition('daily_basic', self.ma5_check, self.ma10_check, self.ma20_check)
         
         layout.addWidget(trend_group)
         
@@ -224,6 +251,7 @@ class StockFilterWindow(QWidget):
         
         self.macd_above_zero = QCheckBox("MACD在零轴上方")
         momentum_layout.addRow("", self.macd_above_zero)
+        self.bind_condition(None, self.min_rsi, self.max_rsi, self.macd_golden_check, self.macd_above_zero)
         
         layout.addWidget(momentum_group)
         
@@ -268,6 +296,7 @@ class StockFilterWindow(QWidget):
         growth_layout.addWidget(QLabel("至"))
         growth_layout.addWidget(self.max_growth)
         profit_layout.addRow("净利润增长率:", growth_layout)
+        self.bind_condition(None, self.min_roe, self.max_roe, self.min_growth, self.max_growth)
         
         layout.addWidget(profit_group)
         
@@ -300,6 +329,7 @@ class StockFilterWindow(QWidget):
         pb_layout.addWidget(QLabel("至"))
         pb_layout.addWidget(self.max_pb)
         valuation_layout.addRow("PB:", pb_layout)
+        self.bind_condition('daily_basic', self.min_pe, self.max_pe, self.min_pb, self.max_pb)
         
         layout.addWidget(valuation_group)
         
@@ -321,6 +351,7 @@ class StockFilterWindow(QWidget):
         debt_layout.addWidget(QLabel("至"))
         debt_layout.addWidget(self.max_debt_ratio)
         health_layout.addRow("资产负债率:", debt_layout)
+        self.bind_condition(None, self.min_debt_ratio, self.max_debt_ratio)
         
         layout.addWidget(health_group)
         
@@ -365,28 +396,132 @@ class StockFilterWindow(QWidget):
         
         return panel
         
-    def start_filter(self):
-        """开始筛选"""
-        # TODO: 实现筛选逻辑
-        # 这里应该根据设置的条件查询数据库
-        
-        # 模拟数据
-        sample_data = [
-            ["000001.SZ", "平安银行", "12.50", "2.45", "15000", "2420", "6.8", "0.85"],
-            ["000002.SZ", "万科A", "18.30", "-1.20", "8500", "2010", "8.2", "1.12"],
-            ["600036.SH", "招商银行", "42.80", "1.85", "12000", "11500", "5.9", "1.05"],
-        ]
+    def bind_condition(self, table_name, *widgets):
+        """登记筛选条件的数据来源表"""
+        self.condition_widgets.setdefault(table_name, []).extend(widgets)
+        
+    def load_data_ranges(self):
+        """读取数据库中已有数据的日期范围"""
+        db_manager = DatabaseManager()
+        # 数据库尚未创建时不连接（连接数据库会创建空文件）
+        if os.path.exists(db_manager.db_path):
+            try:
+                for table_name in self.condition_widgets:
+                    if table_name is None or not db_manager.table_exists(table_name):
+                        continue
+                    if table_name == 'stock_basic':
+                        if db_manager.execute_query("SELECT 1 FROM stock_basic LIMIT 1"):
+                            self.data_ranges[table_name] = ('', '')
+                        continue
+                    start_date, end_date = db_manager.execute_query(
+                        f"SELECT MIN(trade_date), MAX(trade_date) FROM {table_name}")[0]
+                    if start_date:
+                        self.data_ranges[table_name] = (start_date, end_date)
+            except Exception as e:
+                self.logger.warning(f"读取数据范围失败: {e}")
+        self.update_conditions()
+        
+    def update_conditions(self):
+        """数据来源表未加载的筛选条件不可用"""
+        for table_name, widgets in self.condition_widgets.items():
+            available = table_name in self.data_ranges
+            if available:
+                tip = ""
+            elif table_name is None:
+                tip = "本地暂无该数据，条件不可用"
+            else:
+                tip = f"{table_name} 数据尚未加载，条件不可用"
+            for widget in widgets:
+                widget.setEnabled(available)
+                widget.setToolTip(tip)
+        self.filter_button.setEnabled('stock_basic' in self.data_ranges)
         
-        # 更新表格
-        self.result_table.setRowCount(len(sample_data))
-        
-        for i, row_data in enumerate(sample_data):
+    def start_filter(self):
+        """开始筛选：按已加载的股票列表和最新交易日行情筛选"""
+        if 'stock_basic' not in self.data_ranges:
+            self.result_stats_label.setText("股票列表尚未加载")
+            return
+        db_manager = DatabaseManager()
+        try:
+            columns = "NULL, NULL, NULL, NULL, NULL, NULL"
+            join, clauses, params, trade_date = "", [], [], None
+            if 'daily_basic' in self.data_ranges:
+                trade_date = db_manager.execute_query(
+                    "SELECT MAX(trade_date) FROM daily_basic WHERE trade_date <= ?",
+                    (self.data_ranges['daily_basic'][1],))[0][0]
+                if trade_date:
+                    columns = "d.close, d.pct_chg, d.vol / 10000, NULL, d.pe, d.pb"
+                    join = "JOIN daily_basic d ON d.ts_code = b.ts_code AND d.trade_date = ?"
+                    params.append(trade_date)
+                    for column, min_name, max_name, scale in DAILY_RANGE_CONDITIONS:
+                        min_box, max_box = getattr(self, min_name), getattr(self, max_name)
+                        # 保持默认边界时不限制（如亏损股的 PE 为空）
+                        if min_box.value() > min_box.minimum():
+                            clauses.append(f"{column} >= ?")
+                            params.append(min_box.value() * scale)
+                        if max_box.value() < max_box.maximum():
+                            clauses.append(f"{column} <= ?")
+                            params.append(max_box.value() * scale)
+                            
+            for combo, column in ((self.market_combo, 'b.market'), (self.industry_combo, 'b.industry'),
+                                  (self.area_combo, 'b.area')):
+                if combo.currentIndex() > 0:
+                    clauses.append(f"{column} = ?")
+                    params.append(combo.currentText())
+                    
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            rows = db_manager.execute_query(
+                f"SELECT b.ts_code, b.name, {columns} FROM stock_basic b {join} {where} ORDER BY b.ts_code",
+                tuple(params))
+            windows = [days for name, days in MA_CONDITIONS if getattr(self, name).isChecked()]
+            if windows and trade_date and rows:
+                above = self.above_moving_averages(db_manager, [row[0] for row in rows], trade_date, windows)
+                rows = [row for row in rows if row[0] in above]
+        except Exception as e:
+            self.logger.warning(f"股票筛选失败: {e}")
+            self.result_stats_label.setText(f"筛选失败: {e}")
+            return
+            
+        # 更新表格（填充时关闭排序，避免行顺序在填充过程中变化）
+        self.result_table.setSortingEnabled(False)
+        self.result_table.setRowCount(len(rows))
+        
+        for i, row_data in enumerate(rows):
             for j, value in enumerate(row_data):
-                item = QTableWidgetItem(str(value))
-                self.result_table.setItem(i, j, item)
+                text = f"{value:.2f}" if isinstance(value, float) else ("" if value is None else str(value))
+                self.result_table.setItem(i, j, QTableWidgetItem(text))
+        self.result_table.setSortingEnabled(True)
                 
         # 更新统计信息
-        self.result_stats_label.setText(f"筛选结果: {len(sample_data)} 只股票")
+        self.result_stats_label.setText(f"筛选结果: {len(rows)} 只股票")
+        
+    def above_moving_averages(self, db_manager, ts_codes, trade_date, windows):
+        """
+        收盘价在各均线上方的股票（前复权价格计算，除权缺口不影响均线）
+
+        Returns:
+            set: 满足全部均线条件的股票代码，历史交易日不足的股票不满足
+        """
+        prices = get_price_adjuster(db_manager).adjust(ts_codes, end_date=trade_date, adjust='qfq')
+        recent = prices.groupby('ts_code', sort=False).tail(max(windows)).copy()
+        recent['age'] = recent.groupby('ts_code', sort=False).cumcount(ascending=False)  # 0 为最新交易日
+        latest = recent[(recent['age'] == 0) & (recent['trade_date'] == trade_date)].set_index('ts_code')['close']
+        keep = pd.Series(True, index=latest.index)
+        for days in windows:
+            ma = recent[recent['age'] < days].groupby('ts_code')['close'].agg(['mean', 'size'])
+            ma = ma.reindex(latest.index)
+            keep &= (ma['size'] == days) & (latest > ma['mean'])
+        return set(keep.index[keep])
+        
+    def on_data_available(self, table_name, start_date, end_date):
+        """记录已入库数据的日期范围，数据来源表可用后启用对应的筛选条件"""
+        old_start, old_end = self.data_ranges.get(table_name, ('', ''))
+        if old_start and start_date:
+            start_date, end_date = min(old_start, start_date), max(old_end, end_date)
+        elif old_start:
+            start_date, end_date = old_start, old_end
+        self.data_ranges[table_name] = (start_date, end_date)
+        self.update_conditions()
         
     def reset_filters(self):
         """重置筛选条件"""
@@ -6,7 +6,6 @@
 
 import os
 import sqlite3
-from datetime import datetime, timedelta
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
                              QTableWidget, QTableWidgetItem, QHeaderView,
                              QProgressBar, QLabel, QLineEdit, QComboBox,
@@ -17,12 +16,15 @@ from PyQt5.QtGui import QFont
 
 # 导入数据初始化器
 from ...data.data_initializer import DataInitializer
+from ...data.ingestion_engine import IngestionEngine
+from ...data.providers import load_token_config
 
 class DataInitThread(QThread):
     """数据初始化线程"""
     progress_updated = pyqtSignal(int, str)  # 进度, 消息
     batch_completed = pyqtSignal(str, bool, str)  # 批次名, 成功/失败, 消息
     finished_signal = pyqtSignal(bool, str, dict)  # 成功/失败, 消息, 详细结果
+    data_available = pyqtSignal(str, str, str)  # 表名, 起始日期, 截止日期
     
     def __init__(self, batches=['batch_1']):
         super().__init__()
@@ -44,6 +46,7 @@ class DataInitThread(QThread):
             initializer.progress_updated.connect(self.progress_updated)
             initializer.batch_completed.connect(self.batch_completed)
             initializer.finished_signal.connect(self.finished_signal)
+            initializer.data_available.connect(self.data_available)
             
             # 执行初始化
             initializer.run()
@@ -53,21 +56,7 @@ class DataInitThread(QThread):
             
     def load_token_config(self):
         """加载token配置"""
-        try:
-            config_file = "config/token_config.txt"
-            if not os.path.exists(config_file):
-                return None
-                
-            config = {}
-            with open(config_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if '=' in line and not line.startswith('#'):
-                        key, value = line.split('=', 1)
-                        config[key.strip()] = value.strip()
-            return config
-        except:
-            return None
+        return load_token_config()
 
 class DataUpdateThread(QThread):
     """数据更新线程"""
@@ -80,93 +69,23 @@ class DataUpdateThread(QThread):
     def run(self):
         """执行数据更新"""
         try:
-            self.progress_updated.emit(10, "检查数据库状态...")
-            
-            # 检查数据库是否存在
-            if not os.path.exists("database/stock_data.db"):
-                self.finished_signal.emit(False, "数据库不存在，请先进行数据初始化")
-                return
-                
-            # 加载token配置
-            token_config = self.load_token_config()
-            if not token_config:
-                self.finished_signal.emit(False, "未找到Token配置")
-                return
-                
-            if token_config['token_type'] == 'tudata':
-                import tudata as ts
-            else:
-                import tushare as ts
-                
-            ts.set_token(token_config['token'])
-            pro = ts.pro_api()
-            
-            self.progress_updated.emit(30, "检查缺失的交易日...")
-            
-            # 获取最新的交易日历
-            end_date = datetime.now().strftime('%Y%m%d')
-            start_date = (datetime.now() - timedelta(days=30)).strftime('%Y%m%d')
-            
-            trade_cal = pro.trade_cal(exchange='', start_date=start_date, end_date=end_date)
-            
-            self.progress_updated.emit(60, "更新交易日历...")
-            
-            # 更新交易日历
-            conn = sqlite3.connect("database/stock_data.db")
-            trade_cal.to_sql('trade_calendar', conn, if_exists='append', index=False)
-            
-            self.progress_updated.emit(80, "检查股票列表更新...")
-            
-            # 检查是否有新股上市
-            stock_basic = pro.stock_basic(exchange='', list_status='L',
-                                        fields='ts_code,symbol,name,area,industry,market,list_date')
-            
-            # 获取数据库中的股票数量
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM stock_basic")
-            db_count = cursor.fetchone()[0]
-            
-            new_stocks = len(stock_basic) - db_count
-            
-            if new_stocks > 0:
-                self.progress_updated.emit(90, f"发现 {new_stocks} 只新股，正在更新...")
-                stock_basic['update_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                stock_basic.to_sql('stock_basic', conn, if_exists='replace', index=False)
-            
-            conn.close()
-            
-            self.progress_updated.emit(100, "数据更新完成")
-            
-            if new_stocks > 0:
-                self.finished_signal.emit(True, f"更新完成，新增 {new_stocks} 只股票")
-            else:
-                self.finished_signal.emit(True, "数据已是最新，无需更新")
+            engine = IngestionEngine(token_config=self.load_token_config())
+            engine.subscribe('progress', self.progress_updated.emit)
+            success, message = engine.update()
+            self.finished_signal.emit(success, message)
                 
         except Exception as e:
             self.finished_signal.emit(False, f"数据更新失败: {str(e)}")
             
     def load_token_config(self):
         """加载token配置"""
-        try:
-            config_file = "config/token_config.txt"
-            if not os.path.exists(config_file):
-                return None
-                
-            config = {}
-            with open(config_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if '=' in line:
-                        key, value = line.split('=', 1)
-                        config[key] = value
-            return config
-        except:
-            return None
+        return load_token_config()
 
 class StockListWindow(QWidget):
     """股票列表窗口"""
     
     stock_selected = pyqtSignal(str)  # 股票选择信号
+    data_available = pyqtSignal(str, str, str)  # 初始化过程中某表已有可用数据: 表名, 起始日期, 截止日期
     
     def __init__(self):
         super().__init__()
@@ -353,6 +272,7 @@ class StockListWindow(QWidget):
         self.init_thread.progress_updated.connect(self.on_progress_updated)
         self.init_thread.batch_completed.connect(self.on_batch_completed)
         self.init_thread.finished_signal.connect(self.on_init_finished)
+        self.init_thread.data_available.connect(self.on_data_available)
         self.init_thread.start()
         
     def update_data(self):
@@ -385,6 +305,14 @@ class StockListWindow(QWidget):
         status_icon = "✅" if success else "❌"
         self.status_text.append(f"{status_icon} {batch_name}: {message}")
         
+    def on_data_available(self, table_name, start_date, end_date):
+        """初始化过程中部分数据已入库，无需等待整个初始化完成即可使用"""
+        date_range = f" {start_date}~{end_date}" if start_date else ""
+        self.status_text.append(f"📊 {table_name}{date_range} 数据已可用")
+        if table_name == 'stock_basic':
+            self.load_stock_data()
+        self.data_available.emit(table_name, start_date, end_date)
+        
     def on_init_finished(self, success, message, results):
         """初始化完成"""
         self.progress_bar.setVisible(False)
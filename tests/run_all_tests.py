@@ -44,7 +44,31 @@ def main():
     test_files = [
         'tests/test_database.py',
         'tests/test_api_config.py', 
-        'tests/test_data_init.py'
+        'tests/test_data_init.py',
+        'tests/test_fetch_scheduler.py',
+        'tests/test_trade_calendar.py',
+        'tests/test_init_resume.py',
+        'tests/test_ingest_pipeline.py',
+        'tests/test_response_cache.py',
+        'tests/test_providers.py',
+        'tests/test_chunk_planner.py',
+        'tests/test_retry_repair.py',
+        'tests/test_data_cleaning.py',
+        'tests/test_schema_registry.py',
+        'tests/test_resampler.py',
+        'tests/test_price_adjuster.py',
+        'tests/test_progressive_init.py',
+        'tests/test_token_pool.py',
+        'tests/test_reference_diff.py',
+        'tests/test_bulk_writer.py',
+        'tests/test_ingestion_engine.py',
+        'tests/test_daily_sync.py',
+        'tests/test_repair_planner.py',
+        'tests/test_gap_detector.py',
+        'tests/test_integrity_checker.py',
+        'tests/test_suspension.py',
+        'tests/test_incremental_updater.py',
+        'tests/test_quota_ledger.py'
     ]
     
     results = []
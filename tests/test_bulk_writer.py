@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量写入测试
+"""
+
+import sys
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.storage.bulk_writer import BulkWriter
+
+def create_db():
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_bulk.db"))
+    db_manager.create_all_tables()
+    return db_manager
+
+def test_values_and_types():
+    """测试空值、紧凑整数、类别和文本列的写入，调用方的数据不被修改"""
+    print("Testing bulk writer values...")
+
+    db_manager = create_db()
+    df = pd.DataFrame({
+        'ts_code': pd.Categorical(['000002.SZ', '000001.SZ', '000001.SZ']),
+        'trade_date': [20240103, 20240102, 20240103],
+        'close': np.array([10.5, np.nan, 11.0], dtype='float32'),
+        'vol': [np.inf, 100.0, 200.0],
+        'unknown_col': [1, 2, 3]
+    })
+    original = df.copy()
+
+    writer = BulkWriter(db_manager, chunk_size=2)
+    # 直接从调用方的列取值，不经过整表对齐复制
+    writer.registry.align = None
+    try:
+        assert writer.write('daily_basic', df) == 3
+    finally:
+        del writer.registry.align
+    assert df.equals(original)
+
+    rows = db_manager.execute_query(
+        "SELECT ts_code, trade_date, close, vol, typeof(trade_date), update_time IS NOT NULL "
+        "FROM daily_basic ORDER BY ts_code, trade_date")
+    print(f"  {rows}")
+    assert rows == [
+        ('000001.SZ', '20240102', None, 100.0, 'text', 1),
+        ('000001.SZ', '20240103', 11.0, 200.0, 'text', 1),
+        ('000002.SZ', '20240103', 10.5, None, 'text', 1)
+    ]
+
+    # 变更日志中的日期同样按文本记录
+    changes = db_manager.execute_query(
+        "SELECT start_date, end_date, ts_codes FROM data_change_log WHERE table_name = 'daily_basic'")
+    assert changes == [('20240102', '20240103', '000001.SZ,000002.SZ')]
+    return True
+
+def test_conflict_updates_written_columns():
+    """测试主键冲突时只更新写入的列，未写入的列保持原值"""
+    print("Testing ON CONFLICT update...")
+
+    db_manager = create_db()
+    writer = BulkWriter(db_manager)
+    writer.write('daily_basic', pd.DataFrame({
+        'ts_code': ['000001.SZ'], 'trade_date': ['20240102'], 'close': [10.0], 'pe': [8.5]}))
+    writer.write('daily_basic', pd.DataFrame({
+        'ts_code': ['000001.SZ'], 'trade_date': ['20240102'], 'close': [10.2]}))
+
+    rows = db_manager.execute_query("SELECT close, pe FROM daily_basic")
+    assert rows == [(10.2, 8.5)]
+
+    # 在调用方的事务中写入，不自行提交
+    conn = db_manager.get_connection()
+    try:
+        db_manager.upsert_dataframe(conn, 'daily_basic', pd.DataFrame({
+            'ts_code': ['000002.SZ'], 'trade_date': ['20240102'], 'close': [5.0]}))
+        conn.rollback()
+    finally:
+        conn.close()
+    assert db_manager.execute_query("SELECT COUNT(*) FROM daily_basic")[0][0] == 1
+    return True
+
+def test_large_frame_in_chunks():
+    """测试大数据量分块写入"""
+    print("Testing chunked write...")
+
+    db_manager = create_db()
+    codes = np.repeat([f"{i:06d}.SZ" for i in range(50)], 40)
+    dates = np.tile([f"2024{m:02d}{d:02d}" for m in range(1, 5) for d in range(1, 11)], 50)
+    df = pd.DataFrame({'ts_code': codes, 'trade_date': dates,
+                       'close': np.arange(len(codes), dtype='float64')}).sample(frac=1, random_state=0)
+
+    assert BulkWriter(db_manager, chunk_size=300).write('daily_basic', df) == len(df)
+    stored = db_manager.execute_query("SELECT COUNT(*), SUM(close) FROM daily_basic")[0]
+    assert stored == (len(df), float(df['close'].sum()))
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Bulk Writer Test")
+    print("=" * 50)
+
+    try:
+        test_values_and_types()
+        test_conflict_updates_written_columns()
+        test_large_frame_in_chunks()
+
+        print("\nAll bulk writer tests completed successfully")
+
+    except Exception as e:
+        print(f"Bulk writer test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
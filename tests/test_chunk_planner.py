@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应分块规划测试
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.trade_calendar import TradeCalendar
+from src.data.chunk_planner import ChunkPlanner
+from src.data.providers import ReplayProvider
+
+def create_calendar(provider):
+    """用回放数据源的交易日历建立临时日历"""
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_chunk.db"))
+    db_manager.create_all_tables()
+    db_manager.execute_insert('trade_calendar', provider.trade_cal(exchange='SSE'))
+    return TradeCalendar(db_manager)
+
+def test_plan_by_trading_days():
+    """测试每次请求的股票数随区间交易日数变化"""
+    print("Testing chunk sizing...")
+
+    provider = ReplayProvider(stock_count=10, start_date='20240101', end_date='20241231')
+    planner = ChunkPlanner(create_calendar(provider), row_limits={'daily': 1000}, fill_ratio=1.0)
+    codes = [f"{i:06d}.SZ" for i in range(100)]
+
+    # 全年约262个交易日 -> 每次3只；一周5个交易日 -> 每次200只但受股票总数限制
+    year_chunks = planner.plan('daily', codes, '20240101', '20241231')
+    week_chunks = planner.plan('daily', codes, '20240101', '20240107')
+    print(f"  year: {len(year_chunks)} chunks, week: {len(week_chunks)} chunks")
+    assert all(len(chunk) == 3 for chunk in year_chunks[:-1])
+    assert len(week_chunks) == 1
+
+    # 次新股行数少，可以装入更多股票
+    list_dates = {code: '20241201' for code in codes}
+    assert len(planner.plan('daily', codes, '20240101', '20241231', list_dates)) < len(year_chunks)
+    return True
+
+def test_truncated_chunk_is_split():
+    """测试响应被截断时拆分分块，数据不丢失"""
+    print("Testing truncation split...")
+
+    provider = ReplayProvider(stock_count=8, start_date='20240101', end_date='20240331',
+                              row_limit={'daily': 100})
+    full = ReplayProvider(stock_count=8, start_date='20240101', end_date='20240331')
+    planner = ChunkPlanner(create_calendar(full), row_limits={'daily': 100})
+    codes = full.stock_basic()['ts_code'].tolist()
+
+    def fetch(chunk_codes, start_date, end_date):
+        return provider.daily(ts_code=','.join(chunk_codes), start_date=start_date, end_date=end_date)
+
+    df = planner.fetch_complete('daily', fetch, codes, '20240101', '20240331')
+    expected = full.daily(start_date='20240101', end_date='20240331')
+    print(f"  rows: {len(df)}, stats: {planner.stats}")
+    assert len(df) == len(expected)
+    assert not df.duplicated(['ts_code', 'trade_date']).any()
+    assert planner.stats['splits'] > 0
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Chunk Planner Test")
+    print("=" * 50)
+
+    try:
+        test_plan_by_trading_days()
+        test_truncated_chunk_is_split()
+
+        print("\nAll chunk planner tests completed successfully")
+
+    except Exception as e:
+        print(f"Chunk planner test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
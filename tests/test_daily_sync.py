@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+每日追平同步测试
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.daily_sync import DailySync
+from src.data.chunk_planner import ChunkPlanner
+from src.data.fetch_scheduler import FetchScheduler
+from src.data.ingest_pipeline import IngestPipeline
+from src.data.trade_calendar import get_trade_calendar
+from src.data.providers import ReplayProvider
+from src.data.api_config import CATCHUP_CONFIG
+
+class RecordingReplay(ReplayProvider):
+    """记录每次请求参数的回放数据源"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = []
+
+    def query(self, api_name, **params):
+        self.calls.append((api_name, params))
+        return super().query(api_name, **params)
+
+def create_sync(provider):
+    """创建使用临时数据库、带交易日历的追平同步"""
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_sync.db"))
+    db_manager.create_all_tables()
+    db_manager.execute_insert('trade_calendar', ReplayProvider(start_date='20240101', end_date='20240331')
+                              .trade_cal(exchange='SSE'))
+    calendar = get_trade_calendar(db_manager)
+
+    scheduler = FetchScheduler()
+    for config in CATCHUP_CONFIG['datasets'].values():
+        scheduler.set_api_limit(config['api_name'], 0.001)
+    pipeline = IngestPipeline(db_manager, scheduler)
+    fetch = lambda api_name, **params: scheduler.call(api_name, getattr(provider, api_name), **params)
+    return DailySync(db_manager, pipeline, fetch, calendar), db_manager, calendar
+
+def test_catch_up_from_last_date():
+    """测试从上次同步的交易日之后逐日全市场追平，再次运行不发请求"""
+    print("Testing catch-up sync...")
+
+    provider = RecordingReplay(stock_count=5, start_date='20240101', end_date='20240331')
+    sync, db_manager, calendar = create_sync(provider)
+
+    # 本地日线停在2月底
+    db_manager.execute_insert('daily_basic', provider.daily(end_date='20240229'))
+    provider.calls.clear()
+
+    success, records, message, results = sync.run(['daily', 'daily_indicator', 'index_daily'],
+                                                  end_date='20240315')
+    print(f"  {message}")
+    assert success
+
+    days = calendar.open_days('20240301', '20240315')
+    daily_calls = [params for api_name, params in provider.calls if api_name == 'daily']
+    assert sorted(params['trade_date'] for params in daily_calls) == days
+    assert results['daily']['last_date'] == '20240315'
+
+    # 每日指标此前从未同步：补齐最近 initial_days 个交易日，且不覆盖已有的价格列
+    indicator_days = calendar.open_days('20240101', '20240315')[-CATCHUP_CONFIG['initial_days']:]
+    assert results['daily_indicator']['days'] == len(indicator_days)
+    rows = db_manager.execute_query(
+        "SELECT COUNT(*) FROM daily_basic WHERE trade_date BETWEEN ? AND '20240315' "
+        "AND close IS NOT NULL AND pe IS NOT NULL", (indicator_days[0],))
+    assert rows[0][0] == 5 * len(indicator_days)
+
+    # 指数日线每个代码一次请求覆盖整个区间
+    index_calls = [params for api_name, params in provider.calls if api_name == 'index_daily']
+    assert len(index_calls) == len(CATCHUP_CONFIG['datasets']['index_daily']['codes'])
+
+    provider.calls.clear()
+    assert sync.plan(['daily', 'daily_indicator', 'index_daily'], end_date='20240315') == {}
+    assert sync.run(['daily'], end_date='20240315')[1] == 0
+    assert provider.calls == []
+    return True
+
+def test_watermark_stops_at_missing_day():
+    """测试数据源尚未更新的交易日不推进水位，下次同步重新请求"""
+    print("Testing watermark on empty days...")
+
+    provider = RecordingReplay(stock_count=3, start_date='20240101', end_date='20240308')
+    sync, db_manager, calendar = create_sync(provider)
+    db_manager.execute_insert('adj_factor', provider.adj_factor(end_date='20240301'))
+
+    success, records, message, results = sync.run(['adj_factor'], end_date='20240315')
+    print(f"  {results['adj_factor']['message']}")
+    assert results['adj_factor']['last_date'] == '20240308'
+    assert sync.plan(['adj_factor'], end_date='20240315') == {
+        'adj_factor': calendar.open_days('20240311', '20240315')}
+    return True
+
+def test_truncated_market_day_split():
+    """测试单日全市场响应达到行数上限时按股票拆分重取，数据不丢失"""
+    print("Testing truncated market day...")
+
+    provider = RecordingReplay(stock_count=30, start_date='20240101', end_date='20240331',
+                               row_limit={'adj_factor': 20})
+    full = ReplayProvider(stock_count=30, start_date='20240101', end_date='20240331')
+    sync, db_manager, calendar = create_sync(provider)
+    sync.chunk_planner = ChunkPlanner(calendar, row_limits={'adj_factor': 20})
+    db_manager.execute_insert('stock_basic', full.stock_basic())
+    db_manager.execute_insert('adj_factor', full.adj_factor(end_date='20240301'))
+    provider.calls.clear()
+
+    success, records, message, results = sync.run(['adj_factor'], end_date='20240308')
+    print(f"  {message}, stats: {sync.chunk_planner.stats}")
+    assert success and results['adj_factor']['last_date'] == '20240308'
+    expected = full.adj_factor(start_date='20240304', end_date='20240308')
+    assert records == len(expected)
+    assert db_manager.execute_query(
+        "SELECT COUNT(*) FROM adj_factor WHERE trade_date BETWEEN '20240304' AND '20240308'")[0][0] == len(expected)
+    # 每个交易日一次全市场请求，被截断后按股票分块（每块不超过上限）重取
+    split_calls = [params for api_name, params in provider.calls if 'ts_code' in params]
+    assert split_calls and all(len(params['ts_code'].split(',')) <= 20 for params in split_calls)
+    assert sync.chunk_planner.stats['truncated'] == 5
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Daily Sync Test")
+    print("=" * 50)
+
+    try:
+        test_catch_up_from_last_date()
+        test_watermark_stops_at_missing_day()
+        test_truncated_market_day_split()
+
+        print("\nAll daily sync tests completed successfully")
+
+    except Exception as e:
+        print(f"Daily sync test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据清洗测试
+"""
+
+import sys
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.processors import clean_frame, normalize_frame
+
+def test_dirty_values_become_null():
+    """测试字典、空值文本和无穷大转为空值"""
+    print("Testing dirty value cleaning...")
+
+    df = pd.DataFrame({
+        'ts_code': ['000001.SH', '399001.SZ', 'None'],
+        'trade_date': [20240102, 20240102, 20240103],
+        'pe': [{}, '12.5', float('inf')],
+        'pb': ['None', ' {}', 1.3],
+        'total_mv': [1e13, None, '']
+    }, dtype=object)
+
+    result = clean_frame('index_dailybasic', df)
+    print(result)
+    assert result['trade_date'].tolist() == ['20240102', '20240102', '20240103']
+    assert pd.isna(result['ts_code'].iloc[2])
+    assert result['pe'].dtype == np.float64
+    assert pd.isna(result['pe'].iloc[0]) and result['pe'].iloc[1] == 12.5 and pd.isna(result['pe'].iloc[2])
+    assert result['pb'].isna().tolist() == [True, True, False]
+    assert result['total_mv'].isna().tolist() == [False, True, True]
+
+    # 不修改调用方的数据
+    assert df['pe'].iloc[0] == {}
+    return True
+
+def test_downcast_and_passthrough():
+    """测试整数/分类列压缩以及未定义列原样保留"""
+    print("Testing dtype downcast...")
+
+    df = pd.DataFrame({
+        'cal_date': ['20240101', '20240102'],
+        'is_open': ['0', '1'],
+        'exchange': ['SSE', 'SSE'],
+        'extra': [{'a': 1}, 'x']
+    })
+    result = clean_frame('trade_cal', df)
+
+    assert result['is_open'].dtype == np.int8
+    assert str(result['exchange'].dtype) == 'category'
+    assert result['extra'].iloc[0] == {'a': 1}
+    assert list(result.columns) == list(df.columns)
+    assert normalize_frame(df, {}) is df
+    return True
+
+def test_cleaning_speed():
+    """测试大数据量清洗耗时"""
+    print("Testing cleaning speed...")
+
+    rows = 200000
+    df = pd.DataFrame({
+        'ts_code': ['000001.SZ'] * rows,
+        'trade_date': ['20240102'] * rows,
+        **{col: np.where(np.arange(rows) % 100 == 0, '{}', '1.25').astype(object)
+           for col in ['total_mv', 'float_mv', 'turnover_rate', 'pe', 'pb']}
+    })
+
+    start = time.time()
+    result = clean_frame('index_dailybasic', df)
+    elapsed = time.time() - start
+    print(f"  {rows} rows cleaned in {elapsed:.2f}s")
+    assert result['pe'].isna().sum() == rows // 100
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Data Cleaning Test")
+    print("=" * 50)
+
+    try:
+        test_dirty_values_become_null()
+        test_downcast_and_passthrough()
+        test_cleaning_speed()
+
+        print("\nAll data cleaning tests completed successfully")
+
+    except Exception as e:
+        print(f"Data cleaning test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抓取调度器测试
+"""
+
+import sys
+import os
+import time
+import threading
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.fetch_scheduler import TokenBucket, FetchScheduler
+
+def test_token_bucket_rate():
+    """测试令牌桶限频"""
+    print("Testing token bucket rate limit...")
+
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    elapsed = time.monotonic() - start
+
+    print(f"  11 tokens at 50/s took {elapsed:.3f}s")
+    # 首个令牌立即可用，其余10个至少需要0.2秒
+    assert elapsed >= 0.18
+    return True
+
+def test_scheduler_concurrency():
+    """测试并发执行与结果完整性"""
+    print("Testing scheduler concurrency...")
+
+    scheduler = FetchScheduler(max_workers=4, rate_limit=0.001)
+    active = {'now': 0, 'max': 0}
+    lock = threading.Lock()
+
+    def fetch(task):
+        def slow_call(value):
+            with lock:
+                active['now'] += 1
+                active['max'] = max(active['max'], active['now'])
+            time.sleep(0.05)
+            with lock:
+                active['now'] -= 1
+            return value * 2
+        return scheduler.call('daily', slow_call, task)
+
+    start = time.monotonic()
+    results = {task: result for task, result, error in scheduler.run(range(16), fetch)}
+    elapsed = time.monotonic() - start
+
+    print(f"  16 tasks took {elapsed:.3f}s, max concurrency {active['max']}")
+    assert results == {i: i * 2 for i in range(16)}
+    assert active['max'] > 1
+    assert elapsed < 16 * 0.05
+    assert scheduler.stats['calls'] == 16
+    return True
+
+def test_scheduler_errors():
+    """测试失败任务不影响其他任务"""
+    print("Testing scheduler error handling...")
+
+    scheduler = FetchScheduler(max_workers=2, rate_limit=0.001)
+
+    def fetch(task):
+        if task == 3:
+            raise ValueError("boom")
+        return task
+
+    errors = [task for task, result, error in scheduler.run(range(6), fetch) if error is not None]
+    assert errors == [3]
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Fetch Scheduler Test")
+    print("=" * 50)
+
+    try:
+        test_token_bucket_rate()
+        test_scheduler_concurrency()
+        test_scheduler_errors()
+
+        print("\nAll fetch scheduler tests completed successfully")
+
+    except Exception as e:
+        print(f"Fetch scheduler test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缺口检测测试
+"""
+
+import sys
+import os
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.trade_calendar import TradeCalendar
+from src.data.gap_detector import GapDetector
+from src.data.suspension import SuspensionStore
+from src.data.providers import ReplayProvider
+
+def create_db(provider):
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_gap.db"))
+    db_manager.create_all_tables()
+    db_manager.execute_insert('trade_calendar', provider.trade_cal(exchange='SSE'))
+    return db_manager, TradeCalendar(db_manager)
+
+def execute(db_manager, sql, params=()):
+    conn = db_manager.get_connection()
+    try:
+        conn.execute(sql, params)
+        conn.commit()
+    finally:
+        conn.close()
+
+def test_detect_gaps():
+    """测试按上市、退市日期和停牌区间检测缺失和异常数据，连续缺失合并为区间"""
+    print("Testing gap detection...")
+
+    provider = ReplayProvider(stock_count=20, start_date='20240101', end_date='20240329')
+    db_manager, calendar = create_db(provider)
+    db_manager.execute_insert('stock_basic', provider.stock_basic())
+    db_manager.execute_insert('daily_basic', provider.daily(start_date='20240101', end_date='20240329'))
+    SuspensionStore(db_manager, calendar).merge(provider.suspend_d())
+
+    # 退市股票退市后没有数据，不算缺失
+    execute(db_manager, "UPDATE stock_basic SET delist_date = '20240301' WHERE ts_code = '000005.SZ'")
+    execute(db_manager, "DELETE FROM daily_basic WHERE ts_code = '000005.SZ' AND trade_date >= '20240301'")
+    # 两只股票缺失同一区间，一只缺失单日，一条异常数据
+    execute(db_manager, "DELETE FROM daily_basic WHERE ts_code IN ('000001.SZ', '600002.SH') "
+                        "AND trade_date BETWEEN '20240311' AND '20240315'")
+    execute(db_manager, "DELETE FROM daily_basic WHERE ts_code = '000003.SZ' AND trade_date = '20240320'")
+    execute(db_manager, "UPDATE daily_basic SET close = 0 WHERE ts_code = '000007.SZ' AND trade_date = '20240321'")
+
+    report = GapDetector(db_manager, calendar).detect('daily_basic', '20240101', '20240329')
+    print(f"  {report.counts}")
+    assert report.counts['missing'] == 11 and report.counts['problematic'] == 1
+    # 两只股票各停牌5个交易日，不算缺失
+    assert report.counts['suspended'] == 10
+
+    week = calendar.open_days('20240311', '20240315')
+    assert report.plan() == [('20240311', '20240315', ['000001.SZ', '600002.SH']),
+                             ('20240320', '20240320', ['000003.SZ'])]
+    needs = report.needs()
+    assert needs['20240321'] == ['000007.SZ']
+    assert all(needs[day] == ['000001.SZ', '600002.SH'] for day in week)
+    assert report.needs(include_problematic=False).get('20240321') is None
+
+    summary = report.summary().set_index('trade_date')
+    stored = dict(db_manager.execute_query("SELECT trade_date, COUNT(*) FROM daily_basic GROUP BY trade_date"))
+    assert (summary['actual'] == summary.index.map(lambda day: stored.get(day, 0))).all()
+    assert (summary['expected'] - summary['actual'] == summary['missing']).all()
+    assert summary.loc['20240311', 'missing'] == 2
+    return True
+
+def test_whole_history_speed():
+    """测试整段历史一次检测：500只股票两年数据在数秒内完成"""
+    print("Testing whole history audit...")
+
+    provider = ReplayProvider(stock_count=5, start_date='20220101', end_date='20231231')
+    db_manager, calendar = create_db(provider)
+    days = np.array(calendar.open_days('20220101', '20231231'))
+    codes = np.array([f"{i:06d}.SZ" for i in range(500)])
+    list_dates = np.where(np.arange(500) % 4 == 0, days[np.arange(500) % len(days)], '20000101')
+    db_manager.execute_insert('stock_basic', pd.DataFrame({'ts_code': codes, 'list_date': list_dates}))
+
+    pairs = pd.DataFrame({'ts_code': np.repeat(codes, len(days)), 'trade_date': np.tile(days, len(codes))})
+    pairs = pairs[pairs['trade_date'] >= np.repeat(list_dates, len(days))]
+    lost = pairs.sample(n=500, random_state=1)
+    stored = pairs.drop(lost.index)
+    conn = db_manager.get_connection()
+    conn.executemany("INSERT INTO daily_basic (ts_code, trade_date, close) VALUES (?, ?, 10.0)",
+                     stored.itertuples(index=False, name=None))
+    conn.commit()
+    conn.close()
+
+    start = time.perf_counter()
+    report = GapDetector(db_manager, calendar).detect('daily_basic')
+    elapsed = time.perf_counter() - start
+    print(f"  {len(days)} days, {len(pairs)} expected, {report.counts['missing']} missing in {elapsed:.2f}s")
+    assert report.counts['expected'] == len(pairs)
+    missing = set(zip(report.missing['ts_code'], report.missing['trade_date']))
+    assert missing == set(zip(lost['ts_code'], lost['trade_date']))
+    assert elapsed < 10
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Gap Detector Test")
+    print("=" * 50)
+
+    try:
+        test_detect_gaps()
+        test_whole_history_speed()
+
+        print("\nAll gap detector tests completed successfully")
+
+    except Exception as e:
+        print(f"Gap detector test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量更新覆盖测试
+"""
+
+import sys
+import os
+import sqlite3
+import tempfile
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.trade_calendar import TradeCalendar
+from src.data.incremental_updater import IncrementalUpdater
+from src.data.chunk_planner import ChunkPlanner
+from src.data.gap_detector import GapDetector
+from src.data.integrity_checker import IntegrityChecker
+from src.data.suspension import SuspensionStore
+from src.data.processors import PeriodResampler
+from src.data.providers import ReplayProvider
+
+class LockProbeReplay(ReplayProvider):
+    """请求期间尝试写入数据库的回放数据源，记录写入时是否被锁阻塞"""
+
+    def __init__(self, db_path, **kwargs):
+        super().__init__(**kwargs)
+        self.db_path = db_path
+        self.blocked = []
+        self.fail = False
+
+    def query(self, api_name, **params):
+        conn = sqlite3.connect(self.db_path, timeout=0)
+        try:
+            conn.execute("INSERT OR REPLACE INTO sync_state (dataset, last_date) VALUES ('probe', ?)",
+                         (params.get('trade_date'),))
+            conn.commit()
+            self.blocked.append(False)
+        except sqlite3.OperationalError:
+            self.blocked.append(True)
+        finally:
+            conn.close()
+        if self.fail:
+            raise ConnectionError("模拟网络错误")
+        return super().query(api_name, **params)
+
+def create_updater():
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_override.db"))
+    db_manager.create_all_tables()
+    provider = LockProbeReplay(db_manager.db_path, stock_count=20, start_date='20240101', end_date='20240329')
+    db_manager.execute_insert('trade_calendar', provider.trade_cal(exchange='SSE'))
+    calendar = TradeCalendar(db_manager)
+    db_manager.execute_insert('stock_basic', provider.stock_basic())
+    db_manager.execute_insert('daily_basic', provider.daily(start_date='20240101', end_date='20240329'))
+    SuspensionStore(db_manager, calendar).merge(provider.suspend_d())
+
+    updater = IncrementalUpdater(provider)
+    updater.db_manager = db_manager
+    updater.calendar = calendar
+    updater.resampler = PeriodResampler(db_manager, calendar)
+    updater.gap_detector = GapDetector(db_manager, calendar)
+    updater.integrity_checker = IntegrityChecker(db_manager, calendar, updater.gap_detector)
+    provider.blocked.clear()
+    return updater, provider, db_manager
+
+def execute(db_manager, sql):
+    conn = db_manager.get_connection()
+    try:
+        conn.execute(sql)
+        conn.commit()
+    finally:
+        conn.close()
+
+def test_full_override_swap():
+    """测试全量覆盖在请求期间不持有写锁，修正异常值、删除接口不再返回的行并保留其他列"""
+    print("Testing full override swap...")
+
+    updater, provider, db_manager = create_updater()
+    trade_date = '20240311'
+    execute(db_manager, f"UPDATE daily_basic SET close = 0, pe = 9.9 WHERE trade_date = '{trade_date}' "
+                        "AND ts_code = '000001.SZ'")
+    execute(db_manager, f"INSERT INTO daily_basic (ts_code, trade_date, close) VALUES ('999999.SZ', '{trade_date}', 1.0)")
+
+    success, records, message = updater.ensure_data_override('daily_basic', trade_date, force_override=True)
+    print(f"  {message}, blocked: {provider.blocked}")
+    assert success and provider.blocked == [False]
+    assert message == f"全量覆盖成功：删除1条，新增{records}条"
+
+    expected = provider.daily(trade_date=trade_date)
+    stored = db_manager.execute_query(
+        f"SELECT COUNT(*), SUM(close) FROM daily_basic WHERE trade_date = '{trade_date}'")[0]
+    assert stored[0] == len(expected) == records
+    assert abs(stored[1] - expected['close'].sum()) < 1e-6
+    # 日线接口没有的列（每日指标）保留原值
+    assert db_manager.execute_query(
+        f"SELECT pe FROM daily_basic WHERE trade_date = '{trade_date}' AND ts_code = '000001.SZ'")[0][0] == 9.9
+    return True
+
+def test_full_override_truncated():
+    """测试全量覆盖时全市场响应被截断，按股票拆分重取，不删除被截掉的行"""
+    print("Testing full override with truncated response...")
+
+    updater, provider, db_manager = create_updater()
+    trade_date = '20240311'
+    provider.row_limit = {'daily': 8}
+    updater.repair_planner.chunk_planner = ChunkPlanner(updater.calendar, row_limits={'daily': 8})
+    before = db_manager.execute_query(
+        f"SELECT COUNT(*) FROM daily_basic WHERE trade_date = '{trade_date}'")[0][0]
+
+    success, records, message = updater.ensure_data_override('daily_basic', trade_date, force_override=True)
+    print(f"  {message}, stats: {updater.repair_planner.chunk_planner.stats}")
+    assert success and records == before
+    assert message == f"全量覆盖成功：删除0条，新增{records}条"
+    assert db_manager.execute_query(
+        f"SELECT COUNT(*) FROM daily_basic WHERE trade_date = '{trade_date}'")[0][0] == before
+    return True
+
+def test_failed_fetch_keeps_data():
+    """测试请求失败时已有数据不被修改"""
+    print("Testing failed fetch...")
+
+    updater, provider, db_manager = create_updater()
+    before = db_manager.execute_query("SELECT COUNT(*), SUM(close) FROM daily_basic")[0]
+    provider.fail = True
+
+    success, records, message = updater.ensure_data_override('daily_basic', '20240311', force_override=True)
+    print(f"  {message}")
+    assert not success and records == 0
+    assert db_manager.execute_query("SELECT COUNT(*), SUM(close) FROM daily_basic")[0] == before
+
+    # 部分修复同样先请求后写入
+    execute(db_manager, "DELETE FROM daily_basic WHERE trade_date = '20240312' AND ts_code = '000001.SZ'")
+    results = updater.repair_dates('daily_basic', {'20240312': ['000001.SZ']})
+    assert not results['20240312'][0]
+    assert all(not blocked for blocked in provider.blocked)
+    return True
+
+def test_partial_override_swap():
+    """测试部分覆盖只替换目标股票，接口没有返回的目标行被删除"""
+    print("Testing partial override swap...")
+
+    updater, provider, db_manager = create_updater()
+    trade_date = '20240311'
+    execute(db_manager, f"UPDATE daily_basic SET close = -1 WHERE trade_date = '{trade_date}' "
+                        "AND ts_code IN ('000001.SZ', '600002.SH')")
+    execute(db_manager, f"INSERT INTO daily_basic (ts_code, trade_date, close) VALUES ('999999.SZ', '{trade_date}', -1)")
+    others = db_manager.execute_query(
+        f"SELECT SUM(close) FROM daily_basic WHERE trade_date = '{trade_date}' "
+        "AND ts_code NOT IN ('000001.SZ', '600002.SH', '999999.SZ')")[0][0]
+
+    success, records, message = updater._partial_date_override(
+        'daily_basic', trade_date, ['000001.SZ', '600002.SH', '999999.SZ'])
+    print(f"  {message}")
+    assert success and records == 2 and provider.blocked == [False]
+    assert message == "部分覆盖成功：删除1条，新增2条"
+    assert db_manager.execute_query(
+        f"SELECT COUNT(*) FROM daily_basic WHERE trade_date = '{trade_date}' AND close <= 0")[0][0] == 0
+    assert db_manager.execute_query(
+        f"SELECT SUM(close) FROM daily_basic WHERE trade_date = '{trade_date}' "
+        "AND ts_code NOT IN ('000001.SZ', '600002.SH')")[0][0] == others
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Incremental Updater Override Test")
+    print("=" * 50)
+
+    try:
+        test_full_override_swap()
+        test_full_override_truncated()
+        test_failed_fetch_keeps_data()
+        test_partial_override_swap()
+
+        print("\nAll incremental updater tests completed successfully")
+
+    except Exception as e:
+        print(f"Incremental updater test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
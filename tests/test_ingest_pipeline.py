@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+入库流水线测试
+"""
+
+import sys
+import os
+import sqlite3
+import tempfile
+import threading
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.fetch_scheduler import FetchScheduler
+from src.data.ingest_pipeline import IngestPipeline
+
+def create_pipeline():
+    """创建使用临时数据库的流水线"""
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_pipeline.db"))
+    db_manager.create_all_tables()
+    scheduler = FetchScheduler(max_workers=3, rate_limit=0.001)
+    return db_manager, IngestPipeline(db_manager, scheduler, transform_workers=2,
+                                      queue_size=2, commit_every=3)
+
+def fetch(day):
+    """模拟单日全市场数据"""
+    return pd.DataFrame({
+        'ts_code': ['000001.SZ', '000002.SZ'],
+        'trade_date': [f"202401{day:02d}"] * 2,
+        'close': [10.0, None]
+    })
+
+def test_pipeline_writes_all_chunks():
+    """测试所有分块经流水线写入数据库"""
+    print("Testing pipeline writes...")
+
+    db_manager, pipeline = create_pipeline()
+
+    def transform(day, df):
+        df['close'] = df['close'].fillna(0.0)
+        return df
+
+    def write(conn, day, df):
+        return db_manager.upsert_dataframe(conn, 'daily_basic', df)
+
+    results = list(pipeline.run(range(1, 21), fetch, write, transform))
+
+    assert len(results) == 20
+    assert all(error is None for _, _, error in results)
+    assert sum(records for _, records, _ in results) == 40
+
+    count = db_manager.execute_query("SELECT COUNT(*) FROM daily_basic WHERE close IS NOT NULL")[0][0]
+    print(f"  rows written: {count}")
+    assert count == 40
+    return True
+
+def test_pipeline_isolates_failures():
+    """测试单个分块失败不影响同组其他分块"""
+    print("Testing pipeline failure isolation...")
+
+    db_manager, pipeline = create_pipeline()
+
+    def failing_fetch(day):
+        if day == 2:
+            raise ConnectionError("network down")
+        return fetch(day)
+
+    def write(conn, day, df):
+        records = db_manager.upsert_dataframe(conn, 'daily_basic', df)
+        if day == 4:
+            raise ValueError("bad chunk")
+        return records
+
+    errors = {day: error for day, _, error in pipeline.run(range(1, 7), failing_fetch, write)
+              if error is not None}
+
+    assert sorted(errors) == [2, 4]
+    dates = [row[0] for row in db_manager.execute_query(
+        "SELECT DISTINCT trade_date FROM daily_basic ORDER BY trade_date")]
+    print(f"  committed dates: {dates}")
+    assert dates == ['20240101', '20240103', '20240105', '20240106']
+    return True
+
+def test_pipeline_writer_failure():
+    """测试写入线程异常退出时所有未提交的任务都报告失败，不遗漏队列中的任务"""
+    print("Testing pipeline writer failure...")
+
+    db_manager, pipeline = create_pipeline()
+
+    def write(conn, day, df):
+        records = db_manager.upsert_dataframe(conn, 'daily_basic', df)
+        if day == 3:
+            conn.execute("COMMIT")  # 违反约定自行提交，写入线程无法回滚到保存点而退出
+        return records
+
+    results = list(pipeline.run(range(1, 31), fetch, write))
+    days = sorted(day for day, _, _ in results)
+    failed = [day for day, _, error in results if error is not None]
+    print(f"  {len(results)} results, {len(failed)} failed")
+    assert days == list(range(1, 31))
+    assert 3 in failed and len(failed) > 20
+    return True
+
+def test_pipeline_closes_failed_group():
+    """测试组内首个分块失败时同样结束事务，不长时间占用写锁"""
+    print("Testing pipeline commit after failed first chunk...")
+
+    db_manager, pipeline = create_pipeline()
+    release = threading.Event()
+
+    def slow_fetch(day):
+        if day == 2:
+            release.wait(10)
+        return fetch(day)
+
+    def write(conn, day, df):
+        db_manager.upsert_dataframe(conn, 'daily_basic', df)
+        if day == 1:
+            raise ValueError("bad chunk")
+        return len(df)
+
+    pipeline.fetch_workers = 1
+    results = pipeline.run([1, 2], slow_fetch, write)
+    day, _, error = next(results)
+    assert day == 1 and error is not None
+
+    # 第2个分块尚未到达时，其他连接可以写入
+    conn = sqlite3.connect(db_manager.db_path, timeout=2)
+    try:
+        conn.execute("INSERT INTO trade_calendar (cal_date, is_open) VALUES ('20240101', 1)")
+        conn.commit()
+    finally:
+        conn.close()
+        release.set()
+    assert [day for day, _, error in results if error is None] == [2]
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Ingest Pipeline Test")
+    print("=" * 50)
+
+    try:
+        test_pipeline_writes_all_chunks()
+        test_pipeline_isolates_failures()
+        test_pipeline_writer_failure()
+        test_pipeline_closes_failed_group()
+
+        print("\nAll ingest pipeline tests completed successfully")
+
+    except Exception as e:
+        print(f"Ingest pipeline test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据接入引擎和命令行测试
+"""
+
+import sys
+import os
+import json
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+from io import StringIO
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.ingestion_engine import IngestionEngine
+from src.data.providers import ReplayProvider, MeteredProvider
+from src.data.api_config import CATCHUP_CONFIG
+from src import cli
+
+def test_import_without_qt():
+    """测试导入数据模块和命令行入口不加载PyQt5"""
+    print("Testing Qt-free import...")
+
+    code = "import sys; import src.data, src.cli; print('PyQt5' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=project_root,
+                            capture_output=True, text=True)
+    print(f"  {result.stdout.strip()}")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == 'False'
+    return True
+
+def test_engine_events():
+    """测试回调和迭代器两种方式获取进度"""
+    print("Testing engine events...")
+
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_engine.db"))
+    db_manager.create_all_tables()
+    # 模拟旧版本建的库：没有追平水位、停牌区间和接口用量表
+    conn = db_manager.get_connection()
+    for table_name in ('sync_state', 'stock_suspension', 'api_quota_usage'):
+        conn.execute(f"DROP TABLE {table_name}")
+    conn.commit()
+    conn.close()
+    engine = IngestionEngine(db_manager=db_manager)
+    engine.pro = MeteredProvider(ReplayProvider(stock_count=5, start_date='20240101'), engine.quota_ledger, 'replay')
+    for config in CATCHUP_CONFIG['datasets'].values():
+        engine.scheduler.set_api_limit(config['api_name'], 0.001)
+
+    percents = []
+    engine.subscribe('progress', lambda percent, message: percents.append(percent))
+    events = list(engine.iter_events('update'))
+    print(f"  {events[-1]}")
+
+    assert events[-1][0] == 'result'
+    success, message = events[-1][1][0]
+    assert success and 'stock_basic' in message and '追平同步' in message
+    assert [values[0] for event, values in events if event == 'progress'] == percents
+    assert percents[-1] == 100
+
+    status = engine.status()
+    assert status['tables']['stock_basic']['records'] == 5
+    assert status['tables']['trade_calendar']['records'] > 0
+    print(f"  {status['sync_state']}")
+    assert status['sync_state']
+    assert db_manager.execute_query("SELECT SUM(calls) FROM api_quota_usage")[0][0] > 0
+
+    try:
+        engine.subscribe('unknown', print)
+        assert False, "未知事件应报错"
+    except ValueError:
+        pass
+    return True
+
+class DelistingReplay(ReplayProvider):
+    """第一只股票已退市的回放数据源"""
+
+    def _synthetic_stock_basic(self):
+        df = super()._synthetic_stock_basic()
+        df.loc[0, ['delist_date', 'list_status']] = ['20240301', 'D']
+        return df
+
+def test_update_keeps_delisted():
+    """测试更新股票列表时退市股票不被删除，记录退市日期"""
+    print("Testing delisted stocks kept...")
+
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_engine_delist.db"))
+    db_manager.create_all_tables()
+    provider = DelistingReplay(stock_count=5, start_date='20240101')
+    listed = ReplayProvider(stock_count=5, start_date='20240101').stock_basic()
+    db_manager.execute_insert('stock_basic', listed.drop(columns=['list_status']))
+    engine = IngestionEngine(db_manager=db_manager)
+    engine.pro = provider
+    for config in CATCHUP_CONFIG['datasets'].values():
+        engine.scheduler.set_api_limit(config['api_name'], 0.001)
+
+    success, message = engine.update()
+    code = listed['ts_code'].iloc[0]
+    rows = db_manager.execute_query("SELECT COUNT(*) FROM stock_basic")[0][0]
+    delist_date = db_manager.execute_query(
+        "SELECT delist_date FROM stock_basic WHERE ts_code = ?", (code,))[0][0]
+    print(f"  {rows} stocks, {code} delisted {delist_date}")
+    assert success and rows == 5 and delist_date == '20240301'
+    return True
+
+def test_cli():
+    """测试命令行 status / update"""
+    print("Testing CLI...")
+
+    db_path = os.path.join(tempfile.mkdtemp(), "test_cli.db")
+    output = StringIO()
+    with redirect_stdout(output):
+        assert cli.main(['--db', db_path, 'status', '--json']) == 0
+    assert json.loads(output.getvalue())['exists'] is False
+
+    db_manager = DatabaseManager(db_path)
+    db_manager.create_all_tables()
+    # 行情追平由 test_daily_sync 覆盖，这里标记为已同步以免生成整个合成市场
+    conn = db_manager.get_connection()
+    conn.executemany("INSERT INTO sync_state (dataset, last_date) VALUES (?, '29991231')",
+                     [(name,) for name in CATCHUP_CONFIG['datasets']])
+    conn.commit()
+    conn.close()
+    output = StringIO()
+    with redirect_stdout(output):
+        assert cli.main(['--db', db_path, '--replay', 'update']) == 0
+        assert cli.main(['--db', db_path, 'status']) == 0
+    print(output.getvalue())
+    assert "数据更新完成" in output.getvalue()
+    assert "stock_basic" in output.getvalue()
+
+    # 执行中抛出异常（数据库尚未创建，没有修复队列表）时输出错误并返回非零
+    output = StringIO()
+    with redirect_stdout(output):
+        assert cli.main(['--db', os.path.join(tempfile.mkdtemp(), "test_cli_empty.db"), '--replay', 'repair']) == 1
+    print(output.getvalue())
+    assert "repair 执行失败" in output.getvalue()
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Ingestion Engine Test")
+    print("=" * 50)
+
+    try:
+        test_import_without_qt()
+        test_engine_events()
+        test_update_keeps_delisted()
+        test_cli()
+
+        print("\nAll ingestion engine tests completed successfully")
+
+    except Exception as e:
+        print(f"Ingestion engine test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
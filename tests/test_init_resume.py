@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+初始化断点续传测试
+"""
+
+import sys
+import os
+import tempfile
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.data_initializer import DataInitializer
+from src.data.api_config import BATCH_2_APIS
+
+class FakePro:
+    """模拟的pro接口，记录每次daily请求的股票"""
+
+    def __init__(self, codes):
+        self.codes = codes
+        self.daily_calls = []
+
+    def stock_basic(self, **params):
+        return pd.DataFrame({'ts_code': self.codes})
+
+    def daily(self, ts_code=None, start_date=None, end_date=None, **params):
+        codes = ts_code.split(',')
+        self.daily_calls.append(codes)
+        return pd.DataFrame({
+            'ts_code': codes,
+            'trade_date': [end_date] * len(codes),
+            'close': [10.0] * len(codes)
+        })
+
+def create_initializer(codes):
+    """创建使用临时数据库和模拟接口的初始化器"""
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_resume.db"))
+    db_manager.create_all_tables()
+
+    initializer = DataInitializer(['batch_2'])
+    initializer.db_manager = db_manager
+    initializer.pipeline.db_manager = db_manager
+    initializer.repair_queue.db_manager = db_manager
+    initializer.pro = FakePro(codes)
+    return initializer
+
+def test_fresh_run_writes_checkpoints():
+    """测试首次运行记录分块检查点"""
+    print("Testing checkpoints on fresh run...")
+
+    initializer = create_initializer(['000001.SZ', '000002.SZ'])
+    apis = {'daily': BATCH_2_APIS['daily']}
+    success, message, results = initializer._execute_batch('batch_2', apis)
+
+    checkpoints = initializer.db_manager.execute_query(
+        "SELECT chunk_key, status FROM init_chunk_progress WHERE api_name = 'daily'")
+    print(f"  {message}, checkpoints: {checkpoints}")
+    assert success
+    assert checkpoints == [('000001.SZ,000002.SZ', 'completed')]
+    return True
+
+def test_resume_skips_finished_chunks():
+    """测试中断后续传只下载未完成的股票"""
+    print("Testing resume after interruption...")
+
+    initializer = create_initializer(['000001.SZ', '000002.SZ', '000003.SZ'])
+    db_manager = initializer.db_manager
+
+    # 模拟上次运行在完成第一个分块后被中断
+    conn = db_manager.get_connection()
+    conn.execute("INSERT INTO init_progress (batch_name, api_name, status) VALUES ('batch_2', 'daily', 'running')")
+    conn.execute("""INSERT INTO init_chunk_progress
+                    (batch_name, api_name, chunk_key, start_date, end_date, status, records)
+                    VALUES ('batch_2', 'daily', '000001.SZ', '20230101', '20241231', 'completed', 1)""")
+    conn.execute("INSERT INTO daily_basic (ts_code, trade_date, close) VALUES ('000001.SZ', '20241231', 9.9)")
+    conn.commit()
+    conn.close()
+
+    apis = {'daily': BATCH_2_APIS['daily']}
+    initializer._execute_batch('batch_2', apis)
+
+    print(f"  daily calls: {initializer.pro.daily_calls}")
+    assert initializer.pro.daily_calls == [['000002.SZ', '000003.SZ']]
+
+    rows = db_manager.execute_query("SELECT ts_code, close FROM daily_basic ORDER BY ts_code")
+    assert rows[0] == ('000001.SZ', 9.9)
+    assert len(rows) == 3
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Initialization Resume Test")
+    print("=" * 50)
+
+    try:
+        test_fresh_run_writes_checkpoints()
+        test_resume_skips_finished_chunks()
+
+        print("\nAll resume tests completed successfully")
+
+    except Exception as e:
+        print(f"Resume test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
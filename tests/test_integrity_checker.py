@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据完整性检查测试
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.trade_calendar import TradeCalendar
+from src.data.integrity_checker import IntegrityChecker
+from src.data.incremental_updater import IncrementalUpdater
+from src.data.gap_detector import GapDetector
+from src.data.suspension import SuspensionStore
+from src.data.processors import PeriodResampler
+from src.data.providers import ReplayProvider
+
+class CountingReplay(ReplayProvider):
+    """统计请求次数的回放数据源"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+
+    def query(self, api_name, **params):
+        self.calls += 1
+        return super().query(api_name, **params)
+
+def create_db(provider):
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_integrity.db"))
+    db_manager.create_all_tables()
+    db_manager.execute_insert('trade_calendar', provider.trade_cal(exchange='SSE'))
+    db_manager.execute_insert('stock_basic', provider.stock_basic())
+    db_manager.execute_insert('daily_basic', provider.daily(start_date='20240101', end_date='20240329'))
+    calendar = TradeCalendar(db_manager)
+    SuspensionStore(db_manager, calendar).merge(provider.suspend_d())
+    return db_manager, calendar
+
+def execute(db_manager, sql):
+    conn = db_manager.get_connection()
+    try:
+        conn.execute(sql)
+        conn.commit()
+    finally:
+        conn.close()
+
+def test_check_and_log():
+    """测试逐日统计、按阈值分级并写入日志，重复检查替换原记录"""
+    print("Testing integrity check...")
+
+    provider = ReplayProvider(stock_count=20, start_date='20240101', end_date='20240329')
+    db_manager, calendar = create_db(provider)
+    index_daily = provider.index_daily(start_date='20240101', end_date='20240329')
+    index_codes = sorted(index_daily['ts_code'].unique())[:2]
+    db_manager.execute_insert('index_daily', index_daily[index_daily['ts_code'].isin(index_codes)])
+
+    # 20只股票：缺2只(10%) partial，缺1只(5%) minor，缺10只 full，1条异常数据 minor
+    execute(db_manager, "DELETE FROM daily_basic WHERE trade_date = '20240311' "
+                        "AND ts_code IN ('000001.SZ', '000003.SZ')")
+    execute(db_manager, "DELETE FROM daily_basic WHERE trade_date = '20240312' AND ts_code = '000001.SZ'")
+    execute(db_manager, "DELETE FROM daily_basic WHERE trade_date = '20240313' AND ts_code LIKE '00%'")
+    execute(db_manager, "UPDATE daily_basic SET close = 0 WHERE trade_date = '20240314' AND ts_code = '000001.SZ'")
+    execute(db_manager, f"DELETE FROM index_daily WHERE trade_date = '20240315' AND ts_code = '{index_codes[0]}'")
+
+    checker = IntegrityChecker(db_manager, calendar)
+    results = checker.run()
+    daily = results['daily_basic'].set_index('trade_date')
+    print(f"  {daily['status'].value_counts().to_dict()}")
+    assert daily.loc['20240311', 'status'] == 'partial' and daily.loc['20240311', 'missing_count'] == 2
+    assert daily.loc['20240312', 'status'] == 'minor'
+    assert daily.loc['20240313', 'status'] == 'full'
+    assert daily.loc['20240314', 'status'] == 'minor' and daily.loc['20240314', 'actual_count'] == 19
+    assert (daily.drop(['20240311', '20240312', '20240313', '20240314'])['status'] == 'complete').all()
+
+    index = results['index_daily'].set_index('trade_date')
+    assert index.loc['20240315', 'status'] == 'full'
+    assert (index['expected_count'] == 2).all()
+
+    # 日志中每表每日一条，重复检查替换原记录
+    checker.run()
+    logged = db_manager.execute_query(
+        "SELECT table_name, COUNT(*), COUNT(DISTINCT trade_date) FROM data_integrity_log GROUP BY table_name")
+    assert sorted(logged) == [('daily_basic', len(daily), len(daily)), ('index_daily', len(index), len(index))]
+    assert checker.statuses('daily_basic', ['20240311', '20240313']) == {
+        '20240311': 'partial', '20240312': 'minor', '20240313': 'full'}
+    return True
+
+def test_outside_universe_rows():
+    """测试不在应有集合中的记录（已退市股票）不抵消真正缺失的股票"""
+    print("Testing rows outside the expected universe...")
+
+    provider = ReplayProvider(stock_count=20, start_date='20240101', end_date='20240329')
+    db_manager, calendar = create_db(provider)
+
+    # 已退市股票不在股票列表中（只抓取了上市状态），其历史记录仍在行情表
+    delisted = db_manager.execute_query(
+        "SELECT * FROM daily_basic WHERE trade_date = '20240311' AND ts_code = '000001.SZ'")[0]
+    conn = db_manager.get_connection()
+    conn.execute(f"INSERT INTO daily_basic VALUES ({', '.join('?' * len(delisted))})",
+                 ('999999.SZ',) + tuple(delisted[1:]))
+    conn.commit()
+    conn.close()
+    execute(db_manager, "DELETE FROM daily_basic WHERE trade_date = '20240311' AND ts_code = '000003.SZ'")
+
+    result = IntegrityChecker(db_manager, calendar).check('daily_basic', '20240311', '20240311')
+    row = result.iloc[0]
+    print(f"  expected {row['expected_count']}, actual {row['actual_count']}, {row['status']}")
+    assert row['missing_count'] == 1 and row['status'] != 'complete'
+    assert row['actual_count'] == row['expected_count'] - 1
+    return True
+
+def test_updater_reads_log():
+    """测试增量更新器跳过日志中已完整的交易日，修复后刷新日志"""
+    print("Testing updater with integrity log...")
+
+    provider = CountingReplay(stock_count=20, start_date='20240101', end_date='20240329')
+    db_manager, calendar = create_db(provider)
+    execute(db_manager, "DELETE FROM daily_basic WHERE trade_date = '20240311' AND ts_code = '000001.SZ'")
+
+    updater = IncrementalUpdater(provider)
+    updater.db_manager = db_manager
+    updater.calendar = calendar
+    updater.resampler = PeriodResampler(db_manager, calendar)
+    updater.gap_detector = GapDetector(db_manager, calendar)
+    updater.integrity_checker = IntegrityChecker(db_manager, calendar, updater.gap_detector)
+    updater.repair_planner.chunk_planner.calendar = calendar
+
+    updater.integrity_checker.run(['daily_basic'])
+    provider.calls = 0
+    results = updater.ensure_range_override('daily_basic', '20240301', '20240329')
+    print(f"  {provider.calls} calls, {results['20240311']}")
+    assert provider.calls == 1 and results['20240311'] == (True, 1, results['20240311'][2])
+    assert results['20240312'][2] == "完整性日志显示数据完整，无需更新"
+    assert updater.integrity_checker.statuses('daily_basic', ['20240311']) == {'20240311': 'complete'}
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Integrity Checker Test")
+    print("=" * 50)
+
+    try:
+        test_check_and_log()
+        test_outside_universe_rows()
+        test_updater_reads_log()
+
+        print("\nAll integrity checker tests completed successfully")
+
+    except Exception as e:
+        print(f"Integrity checker test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
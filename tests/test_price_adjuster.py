@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+复权价格引擎测试
+"""
+
+import sys
+import os
+import tempfile
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.processors import PriceAdjuster, get_price_adjuster
+from src.data.storage import sync_reference_table
+from src.data.providers import ReplayProvider
+
+def create_adjuster():
+    """用回放数据源的日线和复权因子建立临时数据库（区间中点除权，因子 1.0 -> 1.1）"""
+    provider = ReplayProvider(stock_count=4, start_date='20240101', end_date='20240331')
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_adjust.db"))
+    db_manager.create_all_tables()
+    db_manager.execute_insert('daily_basic', provider.daily())
+    db_manager.execute_insert('adj_factor', provider.adj_factor())
+    return provider, db_manager, PriceAdjuster(db_manager)
+
+def test_qfq_and_hfq():
+    """测试前复权、后复权价格"""
+    print("Testing qfq/hfq...")
+
+    provider, db_manager, adjuster = create_adjuster()
+    daily = provider.daily().sort_values(['ts_code', 'trade_date'], ignore_index=True)
+    factors = provider.adj_factor()
+    code = daily['ts_code'].iloc[0]
+    raw = daily[daily['ts_code'] == code].set_index('trade_date')['close']
+    factor = factors[factors['ts_code'] == code].set_index('trade_date')['adj_factor'].sort_index()
+
+    qfq = adjuster.close_series(code, adjust='qfq')
+    hfq = adjuster.close_series(code, adjust='hfq')
+    none = adjuster.close_series(code, adjust='none')
+    expected_qfq = raw * factor / factor.iloc[-1]
+    print(f"  {code}: {len(qfq)} days")
+    assert ((qfq - expected_qfq).abs() < 1e-9).all()
+    assert ((hfq - raw * factor).abs() < 1e-9).all()
+    assert ((none - raw).abs() < 1e-9).all()
+    # 前复权最新价格与实际价格一致，除权日之前的价格被下调
+    assert abs(qfq.iloc[-1] - raw.iloc[-1]) < 1e-9
+    assert qfq.iloc[0] < raw.iloc[0]
+
+    # 区间过滤不改变前复权的基准
+    part = adjuster.adjust(code, '20240101', '20240131', 'qfq')
+    assert part['trade_date'].max() <= '20240131'
+    assert ((part.set_index('trade_date')['close'] - expected_qfq[part['trade_date']]).abs() < 1e-9).all()
+
+    # 全市场复权
+    all_stocks = adjuster.adjust(adjust='hfq')
+    assert all_stocks['ts_code'].nunique() == daily['ts_code'].nunique()
+    return True
+
+def test_cache_invalidation():
+    """测试只重新加载复权因子发生变化的股票"""
+    print("Testing cache invalidation...")
+
+    provider, db_manager, adjuster = create_adjuster()
+    codes = sorted(provider.daily()['ts_code'].unique())
+    adjuster.adjust(codes)
+    assert adjuster.stats == {'hits': 0, 'misses': len(codes)}
+
+    adjuster.adjust(codes)
+    assert adjuster.stats['hits'] == len(codes)
+
+    # 修改一只股票最新一天的复权因子（新的除权）
+    latest = db_manager.execute_query("SELECT MAX(trade_date) FROM adj_factor")[0][0]
+    db_manager.execute_insert('adj_factor', pd.DataFrame(
+        {'ts_code': [codes[0]], 'trade_date': [latest], 'adj_factor': [1.21]}))
+    result = adjuster.adjust(codes, adjust='qfq')
+    print(f"  stats: {adjuster.stats}")
+    assert adjuster.stats['misses'] == len(codes) + 1
+    assert adjuster.stats['hits'] == 2 * len(codes) - 1
+
+    # 新因子生效：该股票除权前的前复权价格按新基准计算
+    first = result[result['ts_code'] == codes[0]].iloc[0]
+    raw_close = provider.daily(ts_code=codes[0]).sort_values('trade_date')['close'].iloc[0]
+    assert abs(first['close'] - raw_close * 1.0 / 1.21) < 1e-9
+
+    # 日线写入同样只清除涉及的股票；变更记录被清理后无法判断涉及哪些股票，全部重新加载
+    db_manager.execute_insert('daily_basic', provider.daily(ts_code=codes[1], trade_date=latest))
+    adjuster.adjust(codes)
+    assert adjuster.stats['misses'] == len(codes) + 2
+    db_manager.execute_insert('adj_factor', pd.DataFrame(
+        {'ts_code': [codes[2]], 'trade_date': [latest], 'adj_factor': [1.1]}))
+    conn = db_manager.get_connection()
+    conn.execute("DELETE FROM data_change_log")
+    conn.commit()
+    conn.close()
+    adjuster.adjust(codes)
+    assert adjuster.stats['misses'] == 2 * len(codes) + 2
+    return True
+
+def test_reference_delta_invalidates():
+    """测试股票列表差异同步后，共享复权引擎只清除涉及股票的缓存"""
+    print("Testing stock_basic delta invalidation...")
+
+    provider, db_manager, _ = create_adjuster()
+    adjuster = get_price_adjuster(db_manager)
+    codes = sorted(provider.daily()['ts_code'].unique())
+    stock_basic = provider.stock_basic()
+    sync_reference_table(db_manager, 'stock_basic', stock_basic)
+    adjuster.adjust(codes)
+
+    # 一只股票退市
+    stock_basic.loc[stock_basic['ts_code'] == codes[0], 'delist_date'] = '20240329'
+    delta = sync_reference_table(db_manager, 'stock_basic', stock_basic)
+    assert delta.affected_codes() == {codes[0]}
+    adjuster.adjust(codes)
+    print(f"  stats: {adjuster.stats}")
+    assert adjuster.stats == {'hits': len(codes) - 1, 'misses': len(codes) + 1}
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Price Adjuster Test")
+    print("=" * 50)
+
+    try:
+        test_qfq_and_hfq()
+        test_cache_invalidation()
+        test_reference_delta_invalidates()
+
+        print("\nAll price adjuster tests completed successfully")
+
+    except Exception as e:
+        print(f"Price adjuster test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
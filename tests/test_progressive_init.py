@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+渐进式初始化测试
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.data_initializer import DataInitializer
+from src.data.trade_calendar import get_trade_calendar
+from src.data.providers import ReplayProvider
+from src.data.api_config import BATCH_2_APIS, PROGRESSIVE_CONFIG, get_time_range
+
+class RecordingReplay(ReplayProvider):
+    """记录每次请求参数的回放数据源"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = []
+
+    def query(self, api_name, **params):
+        self.calls.append((api_name, params))
+        return super().query(api_name, **params)
+
+def create_initializer(provider):
+    """创建使用临时数据库、带交易日历的初始化器"""
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_progressive.db"))
+    db_manager.create_all_tables()
+    db_manager.execute_insert('trade_calendar', provider.trade_cal(exchange='SSE'))
+    calendar = get_trade_calendar(db_manager)
+
+    initializer = DataInitializer(['batch_2'], progressive=True)
+    initializer.db_manager = db_manager
+    initializer.pipeline.db_manager = db_manager
+    initializer.repair_queue.db_manager = db_manager
+    initializer.chunk_planner.calendar = calendar
+    initializer.resampler.db_manager = db_manager
+    initializer.resampler.calendar = calendar
+    initializer.pro = provider
+    for api_name in ('daily', 'stock_basic'):
+        initializer.scheduler.set_api_limit(api_name, 0.001)
+    return initializer, calendar
+
+def test_recent_days_first():
+    """测试先逐日取最近交易日，再回填历史，并按顺序通知数据可用"""
+    print("Testing progressive initialization...")
+
+    provider = RecordingReplay(stock_count=5, start_date='20240101')
+    initializer, calendar = create_initializer(provider)
+    available = []
+    initializer.data_available.connect(lambda *args: available.append(args))
+
+    apis = {'daily': BATCH_2_APIS['daily'], 'weekly': BATCH_2_APIS['weekly']}
+    success, message, results = initializer._execute_batch('batch_2', apis)
+    print(f"  {message}")
+    print(f"  signals: {available}")
+    assert success
+
+    start_date, end_date = get_time_range('last_2_years')
+    days = calendar.open_days(start_date, end_date)
+    recent_days = PROGRESSIVE_CONFIG['recent_days']
+
+    # 前 recent_days 次日线请求都是单日全市场，且正好是最近的交易日
+    daily_calls = [params for api_name, params in provider.calls if api_name == 'daily']
+    first_calls = daily_calls[:recent_days]
+    assert all('trade_date' in params for params in first_calls)
+    assert {params['trade_date'] for params in first_calls} == set(days[-recent_days:])
+
+    # 最近交易日可用 -> 周线（部分） -> 历史回填完成 -> 周线重算
+    tables = [args[0] for args in available]
+    assert tables == ['daily_basic', 'weekly_basic', 'daily_basic', 'weekly_basic']
+    assert available[0][1:] == (days[-recent_days], days[-1])
+    assert available[2][1:] == (days[0], days[-recent_days - 1])
+
+    stored = initializer.db_manager.execute_query(
+        "SELECT COUNT(DISTINCT trade_date) FROM daily_basic")[0][0]
+    assert stored == len(days)
+    status = initializer.db_manager.execute_query(
+        "SELECT status FROM init_progress WHERE batch_name = 'batch_2' AND api_name = 'daily'")
+    assert status == [('completed',)]
+    return True
+
+def test_disabled_without_calendar():
+    """测试没有交易日历时按原策略一次完成"""
+    print("Testing fallback without calendar...")
+
+    initializer = DataInitializer(['batch_2'], progressive=True)
+    initializer.db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_no_calendar.db"))
+    initializer.db_manager.create_all_tables()
+    assert initializer._split_progressive(BATCH_2_APIS['daily']) is None
+    assert DataInitializer(['batch_2'], progressive=False)._split_progressive(BATCH_2_APIS['daily']) is None
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Progressive Initialization Test")
+    print("=" * 50)
+
+    try:
+        test_recent_days_first()
+        test_disabled_without_calendar()
+
+        print("\nAll progressive initialization tests completed successfully")
+
+    except Exception as e:
+        print(f"Progressive initialization test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
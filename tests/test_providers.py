@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据源层测试
+"""
+
+import sys
+import os
+import time
+import tempfile
+import threading
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.providers import (ReplayProvider, RecordingProvider, CachedProvider, RetryProvider,
+                                ProviderError, create_provider, load_token_config, shared_flight)
+from src.data.api_config import BATCH_1_APIS
+
+class SlowReplay(ReplayProvider):
+    """请求耗时较长并统计请求次数的回放数据源"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+        self.fail = False
+
+    def query(self, api_name, **params):
+        self.calls += 1
+        time.sleep(0.2)
+        if self.fail:
+            raise ValueError("模拟接口错误")
+        return super().query(api_name, **params)
+
+def test_replay_synthetic_filters():
+    """测试合成数据按参数过滤"""
+    print("Testing replay provider filters...")
+
+    provider = ReplayProvider(stock_count=20, start_date='20240101', end_date='20240131')
+
+    cal = provider.trade_cal(exchange='SSE', start_date='20240101', end_date='20240107', is_open='1')
+    assert list(cal['cal_date']) == ['20240101', '20240102', '20240103', '20240104', '20240105']
+
+    daily = provider.daily(trade_date='20240105')
+    assert set(daily['trade_date']) == {'20240105'}
+    assert len(daily) > 0
+
+    single = provider.daily(ts_code='600000.SH', start_date='20240108', end_date='20240112',
+                            fields='ts_code,trade_date,close')
+    assert list(single.columns) == ['ts_code', 'trade_date', 'close']
+    assert len(single) == 5
+
+    # 相同参数结果确定
+    again = ReplayProvider(stock_count=20, start_date='20240101', end_date='20240131')
+    pd.testing.assert_frame_equal(daily, again.daily(trade_date='20240105'))
+
+    # 第1批的接口都有合成数据，--replay init 可以完整跑通
+    assert all(provider.supports(config['api_name']) for config in BATCH_1_APIS.values())
+    company = provider.stock_company(exchange='SSE', fields='ts_code,com_name')
+    assert len(company) == 10 and company['ts_code'].str.endswith('.SH').all()
+    new_share = provider.new_share()
+    listed = provider.stock_basic()
+    assert set(new_share['ts_code']) == set(listed.loc[listed['list_date'] >= '20240101', 'ts_code'])
+    assert (new_share['ipo_date'] <= new_share['issue_date']).all()
+
+    assert provider.ping()
+    assert not provider.supports('income')
+    return True
+
+def test_replay_rate_limit_and_row_limit():
+    """测试模拟限频错误和单次行数上限"""
+    print("Testing replay rate limit...")
+
+    provider = ReplayProvider(stock_count=50, start_date='20240101', end_date='20240131',
+                              rate_limit_per_minute=3, row_limit={'daily': 10})
+    for _ in range(3):
+        assert len(provider.daily(trade_date='20240105')) == 10
+
+    try:
+        provider.daily(trade_date='20240105')
+        assert False, "应当触发限频"
+    except Exception as e:
+        print(f"  {e}")
+        assert "每分钟最多访问该接口3次" in str(e)
+
+    # 限频按接口独立计数
+    assert len(provider.stock_basic()) == 50
+    assert provider.stats['rate_limited'] == 1
+    return True
+
+def test_recording_roundtrip():
+    """测试录制后离线回放"""
+    print("Testing record and replay...")
+
+    data_dir = tempfile.mkdtemp()
+    source = ReplayProvider(stock_count=5, start_date='20240101', end_date='20240110')
+    recorder = RecordingProvider(source, data_dir)
+    recorded = recorder.daily(trade_date='20240103')
+
+    replay = ReplayProvider(data_dir=data_dir, synthetic=False)
+    replayed = replay.daily(trade_date='20240103')
+    assert len(replayed) == len(recorded)
+    assert not replay.supports('stock_basic')
+    return True
+
+def test_factory():
+    """测试工厂按token类型创建数据源"""
+    print("Testing provider factory...")
+
+    config_file = os.path.join(tempfile.mkdtemp(), "token_config.txt")
+    with open(config_file, 'w', encoding='utf-8') as f:
+        f.write("# 回放配置\ntoken_type=replay\nreplay_rate_limit = 100\n")
+
+    config = load_token_config(config_file)
+    assert config == {'token_type': 'replay', 'replay_rate_limit': '100'}
+    assert load_token_config(config_file + ".missing") is None
+
+    provider = create_provider(config)
+    assert isinstance(provider.inner, ReplayProvider)
+    assert provider.flight is shared_flight
+    assert provider.inner.rate_limit_per_minute == 100
+
+    cached = create_provider(config, use_cache=True)
+    assert isinstance(cached, CachedProvider)
+    assert cached.name == 'replay'
+    cached.cache.close()
+    return True
+
+def run_concurrently(fn, count):
+    results = [None] * count
+
+    def worker(i):
+        try:
+            results[i] = fn(i)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_single_flight():
+    """测试相同请求并发时只发出一次，结果互不影响，异常传给所有等待者"""
+    print("Testing single-flight coalescing...")
+
+    inner = SlowReplay(stock_count=20, start_date='20240101', end_date='20240131')
+    provider = RetryProvider(inner, max_retries=0)
+
+    # 参数顺序、None值不同的相同请求合并为一次
+    results = run_concurrently(lambda i: provider.daily(trade_date='20240105', ts_code=None) if i % 2
+                               else provider.query('daily', trade_date='20240105'), 6)
+    print(f"  {inner.calls} calls, {provider.flight.stats}")
+    assert inner.calls == 1 and provider.flight.stats == {'calls': 1, 'shared': 5}
+    for df in results[1:]:
+        pd.testing.assert_frame_equal(df, results[0])
+    results[0].loc[:, 'close'] = 0
+    assert (results[1]['close'] > 0).all()
+    assert provider.flight.in_flight() == 0
+
+    # 不同参数各自请求
+    inner.calls = 0
+    run_concurrently(lambda i: provider.daily(trade_date=f"2024010{i + 2}"), 4)
+    assert inner.calls == 4
+
+    # 失败时所有等待者拿到同一异常，之后的请求重新发出
+    inner.calls, inner.fail = 0, True
+    results = run_concurrently(lambda i: provider.daily(trade_date='20240108'), 4)
+    assert inner.calls == 1
+    assert all(isinstance(result, ProviderError) for result in results)
+    inner.fail = False
+    assert len(provider.daily(trade_date='20240108')) > 0 and inner.calls == 2
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Provider Layer Test")
+    print("=" * 50)
+
+    try:
+        test_replay_synthetic_filters()
+        test_replay_rate_limit_and_row_limit()
+        test_recording_roundtrip()
+        test_factory()
+        test_single_flight()
+
+        print("\nAll provider tests completed successfully")
+
+    except Exception as e:
+        print(f"Provider test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接口额度台账测试
+"""
+
+import sys
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.trade_calendar import TradeCalendar, get_trade_calendar
+from src.data.quota_ledger import QuotaLedger, QuotaExceeded
+from src.data.fetch_scheduler import FetchScheduler
+from src.data.data_initializer import DataInitializer
+from src.data.incremental_updater import IncrementalUpdater
+from src.data.gap_detector import GapDetector
+from src.data.integrity_checker import IntegrityChecker
+from src.data.suspension import SuspensionStore
+from src.data.processors import PeriodResampler
+from src.data.providers import ReplayProvider, MeteredProvider, create_provider
+from src.data.api_config import BATCH_2_APIS
+
+class Clock:
+    """可手动推进的时钟"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class CountingReplay(ReplayProvider):
+    """统计请求次数的回放数据源"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+
+    def query(self, api_name, **params):
+        self.calls += 1
+        return super().query(api_name, **params)
+
+def quota_config(**overrides):
+    config = {'enabled': True, 'per_minute': None, 'per_day': None, 'api_limits': {},
+              'reserve_ratio': 0.2, 'flush_interval': 5, 'reload_interval': 3600, 'retention_days': 30}
+    config.update(overrides)
+    return config
+
+def create_db(name):
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), name))
+    db_manager.create_all_tables()
+    return db_manager
+
+def test_ledger_budget():
+    """测试分钟、当日额度和保留额度，用量写入数据库后跨实例累计"""
+    print("Testing quota ledger budget...")
+
+    db_manager = create_db("test_quota.db")
+    clock = Clock(datetime(2024, 3, 11, 9, 30, 10))
+    config = quota_config(per_minute=3, per_day=10, api_limits={'stock_basic': {'per_minute': None}})
+    ledger = QuotaLedger(db_manager, config, clock)
+    ledger.register('token')
+
+    for _ in range(3):
+        ledger.record('token', 'daily', rows=100)
+    assert ledger.remaining('daily') == (0, 7)
+    assert ledger.check('daily') == 50.0  # 本分钟额度用完，等到下一分钟
+    assert ledger.remaining('stock_basic') == (None, 10)
+
+    clock.now += timedelta(seconds=50)
+    assert ledger.remaining('daily') == (3, 7) and ledger.check('daily') == 0
+
+    # 低优先级调用不使用保留的 10 x 20% = 2 次
+    for _ in range(2):
+        ledger.record('token', 'daily', rows=100)
+    ledger.record('token', 'daily', error=True)
+    clock.now += timedelta(minutes=1)
+    assert ledger.remaining('daily') == (3, 4)
+    assert ledger.check('daily', calls=2, keep_reserve=True) == 0
+    try:
+        ledger.check('daily', calls=3, keep_reserve=True)
+        assert False, "应拒绝低优先级调用"
+    except QuotaExceeded as e:
+        print(f"  {e}")
+    assert ledger.afford({'daily': 4}) == (True, "接口额度充足")
+    assert not ledger.afford({'daily': 3}, keep_reserve=True)[0]
+
+    # 写入数据库后，新实例（下次运行）加载当日用量，未写入的部分同样计入
+    assert ledger.flush() == 2
+    assert db_manager.execute_query("SELECT SUM(calls), SUM(row_count), SUM(errors) FROM api_quota_usage")[0] == \
+        (6, 500, 1)
+    ledger.record('token', 'daily', rows=50)
+    usage = ledger.usage()
+    assert usage[['token', 'api_name', 'calls', 'rows', 'errors', 'per_day', 'remaining']].values.tolist() == [
+        ['token', 'daily', 7, 550, 1, 10, 3]]
+    print(f"  {ledger.summary()}")
+    assert ledger.summary() == "接口调用 今日 7 次 / 550 行，daily 已用 70%"
+    ledger.flush()
+
+    restarted = QuotaLedger(db_manager, config, clock)
+    assert restarted.remaining('daily') == (2, 3)
+
+    # 另一进程的用量写入数据库后，按 reload_interval 重新加载时计入
+    other = QuotaLedger(db_manager, quota_config(per_minute=3, per_day=10, reload_interval=0), clock)
+    assert other.remaining('daily') == (2, 3)
+    restarted.record('token', 'daily')
+    restarted.flush()
+    assert other.remaining('daily') == (1, 2) and other.afford({'daily': 3})[0] is False
+    assert restarted.remaining('daily') == (1, 2)
+
+    # 次日额度恢复，超过保留天数的记录被清理
+    clock.now += timedelta(days=31)
+    assert restarted.remaining('daily') == (3, 10)
+    restarted.record('token', 'daily')
+    restarted.flush()
+    assert db_manager.execute_query("SELECT COUNT(*), SUM(calls) FROM api_quota_usage")[0] == (1, 1)
+    return True
+
+class CommitHookConnection:
+    """提交后执行回调的连接包装"""
+
+    def __init__(self, conn, on_commit):
+        self._conn = conn
+        self._on_commit = on_commit
+
+    def commit(self):
+        self._conn.commit()
+        self._on_commit()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+def test_reload_during_flush():
+    """测试写入数据库提交后、清空未写入部分前重新加载，用量不被重复计入"""
+    print("Testing reload during flush...")
+
+    db_manager = create_db("test_quota_flush.db")
+    clock = Clock(datetime(2024, 3, 11, 9, 30, 10))
+    ledger = QuotaLedger(db_manager, quota_config(per_day=10), clock)
+    ledger.register('token')
+    for _ in range(3):
+        ledger.record('token', 'daily')
+
+    reloads = []
+
+    def on_commit():
+        # 另一线程在提交后立即重新加载
+        thread = threading.Thread(target=ledger.reload)
+        thread.start()
+        thread.join(0.2)
+        reloads.append(thread)
+
+    get_connection = db_manager.get_connection
+    db_manager.get_connection = lambda: CommitHookConnection(get_connection(), on_commit)
+    try:
+        assert ledger.flush() == 1
+    finally:
+        db_manager.get_connection = get_connection
+    for thread in reloads:
+        thread.join()
+
+    assert ledger.remaining('daily') == (None, 7)
+    return True
+
+def test_metered_provider_and_scheduler():
+    """测试数据源按 token 计量，低优先级调用额度到保留线时让路，前台调用不受影响"""
+    print("Testing metered provider and scheduler...")
+
+    db_manager = create_db("test_quota_scheduler.db")
+    ledger = QuotaLedger(db_manager, quota_config(api_limits={'daily': {'per_day': 5}}))
+    provider = create_provider({'token_type': 'replay'}, ledger=ledger)
+    assert isinstance(provider.inner, MeteredProvider) and ledger.tokens == {'replay'}
+
+    df = provider.daily(trade_date='20240105')
+    usage = ledger.usage()
+    assert usage[['token', 'api_name', 'calls', 'rows']].values.tolist() == [['replay', 'daily', 1, len(df)]]
+
+    scheduler = FetchScheduler(rate_limit=0.001, ledger=ledger)
+    fetch = lambda **params: provider.daily(**params)
+    scheduler.call('daily', fetch, trade_date='20240108')
+    scheduler.call('daily', fetch, trade_date='20240109')
+    assert ledger.remaining('daily')[1] == 2
+
+    # 剩余2次，保留 5 x 20% = 1 次：低优先级还能调用1次
+    scheduler.call('daily', fetch, trade_date='20240110', low_priority=True)
+    try:
+        scheduler.call('daily', fetch, trade_date='20240111', low_priority=True)
+        assert False, "应拒绝低优先级调用"
+    except QuotaExceeded as e:
+        print(f"  {e}")
+
+    # 每日同步可以使用保留额度，用完后同样拒绝
+    scheduler.call('daily', fetch, trade_date='20240111')
+    try:
+        scheduler.call('daily', fetch, trade_date='20240112')
+        assert False, "当日额度已用完"
+    except QuotaExceeded:
+        pass
+    assert ledger.usage()['calls'].sum() == 5
+    return True
+
+def test_backfill_yields():
+    """测试历史回填额度到保留线时推迟，状态保持running以便下次续传"""
+    print("Testing backfill yields to daily sync...")
+
+    provider = CountingReplay(stock_count=5, start_date='20240101')
+    db_manager = create_db("test_quota_backfill.db")
+    db_manager.execute_insert('trade_calendar', provider.trade_cal(exchange='SSE'))
+    db_manager.execute_insert('stock_basic', provider.stock_basic())
+    calendar = get_trade_calendar(db_manager)
+
+    initializer = DataInitializer(['batch_2'], progressive=True)
+    initializer.db_manager = db_manager
+    initializer.pipeline.db_manager = db_manager
+    initializer.repair_queue.db_manager = db_manager
+    initializer.chunk_planner.calendar = calendar
+    initializer.resampler.db_manager = db_manager
+    initializer.resampler.calendar = calendar
+    ledger = QuotaLedger(db_manager, quota_config(api_limits={'daily': {'per_day': 24}}))
+    initializer.quota_ledger = ledger
+    initializer.scheduler.ledger = ledger
+    initializer.pro = MeteredProvider(provider, ledger, 'replay')
+    for api_name in ('daily', 'stock_basic'):
+        initializer.scheduler.set_api_limit(api_name, 0.001)
+
+    # 最近20个交易日用掉20次，剩余4次全部保留给每日同步，回填按预计请求次数不开始
+    success, message, results = initializer._execute_batch('batch_2', {'daily': BATCH_2_APIS['daily']})
+    detail = results['api_details']['daily']
+    print(f"  {detail['message']}")
+    assert not detail['success'] and detail['message'].endswith("历史数据回填推迟到下次运行")
+    assert detail['records'] > 0
+    assert db_manager.execute_query(
+        "SELECT status FROM init_progress WHERE batch_name = 'batch_2' AND api_name = 'daily'")[0][0] == 'running'
+
+    assert ledger.remaining('daily')[1] == 4
+    assert ledger.check('daily') == 0
+    return True
+
+def test_repair_refuses():
+    """测试修复请求超出当日剩余额度时不开始，已有数据不变"""
+    print("Testing repair refuses over budget...")
+
+    provider = CountingReplay(stock_count=20, start_date='20240101', end_date='20240329')
+    db_manager = create_db("test_quota_repair.db")
+    db_manager.execute_insert('trade_calendar', provider.trade_cal(exchange='SSE'))
+    calendar = TradeCalendar(db_manager)
+    db_manager.execute_insert('stock_basic', provider.stock_basic())
+    db_manager.execute_insert('daily_basic', provider.daily(start_date='20240101', end_date='20240329'))
+    SuspensionStore(db_manager, calendar).merge(provider.suspend_d())
+
+    updater = IncrementalUpdater(provider)
+    updater.db_manager = db_manager
+    updater.calendar = calendar
+    updater.resampler = PeriodResampler(db_manager, calendar)
+    updater.gap_detector = GapDetector(db_manager, calendar)
+    updater.integrity_checker = IntegrityChecker(db_manager, calendar, updater.gap_detector)
+    updater.repair_planner.chunk_planner.calendar = calendar
+    updater.quota_ledger = QuotaLedger(db_manager, quota_config(api_limits={'daily': {'per_day': 2}}))
+
+    conn = db_manager.get_connection()
+    conn.execute("DELETE FROM daily_basic WHERE trade_date IN ('20240311', '20240312', '20240313')")
+    conn.execute("DELETE FROM daily_basic WHERE trade_date = '20240318' AND ts_code = '000001.SZ'")
+    conn.commit()
+    conn.close()
+    provider.calls = 0
+
+    results = updater.ensure_range_override('daily_basic', '20240311', '20240318')
+    print(f"  {results['20240311'][2]}")
+    assert provider.calls == 1  # 部分修复只需1次请求，在额度内
+    assert all(not results[day][0] and results[day][2].startswith("接口当日额度不足")
+               for day in ('20240311', '20240312', '20240313'))
+    assert results['20240318'][0]
+    assert db_manager.execute_query(
+        "SELECT COUNT(*) FROM daily_basic WHERE trade_date BETWEEN '20240311' AND '20240313'")[0][0] == 0
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Quota Ledger Test")
+    print("=" * 50)
+
+    try:
+        test_ledger_budget()
+        test_reload_during_flush()
+        test_metered_provider_and_scheduler()
+        test_backfill_yields()
+        test_repair_refuses()
+
+        print("\nAll quota ledger tests completed successfully")
+
+    except Exception as e:
+        print(f"Quota ledger test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
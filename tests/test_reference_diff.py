@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+参考表差异同步测试
+"""
+
+import sys
+import os
+import tempfile
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.storage import sync_reference_table, add_delta_listener, remove_delta_listener
+
+def stock_frame(rows):
+    return pd.DataFrame(rows, columns=['ts_code', 'symbol', 'name', 'industry', 'list_date'])
+
+BASE_ROWS = [
+    ('000001.SZ', '000001', '平安银行', '银行', '19910403'),
+    ('000002.SZ', '000002', '万科A', '全国地产', '19910129'),
+    ('600000.SH', '600000', '浦发银行', '银行', '19991110')
+]
+
+def create_db():
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_diff.db"))
+    db_manager.create_all_tables()
+    return db_manager
+
+def test_diff_counts_equal():
+    """测试记录数不变时仍能发现更名、行业调整、退市和新股"""
+    print("Testing reference diff...")
+
+    db_manager = create_db()
+    first = sync_reference_table(db_manager, 'stock_basic', stock_frame(BASE_ROWS))
+    assert first.counts == {'inserted': 3, 'updated': 0, 'deleted': 0}
+
+    # 同样的数据（接口返回的日期为整数）不产生任何写入
+    same = stock_frame(BASE_ROWS)
+    same['list_date'] = same['list_date'].astype(int)
+    assert sync_reference_table(db_manager, 'stock_basic', same).empty
+
+    deltas = []
+    add_delta_listener(deltas.append)
+    try:
+        # 记录数不变：一只更名、一只退市、一只新股
+        changed = stock_frame([
+            ('000001.SZ', '000001', '平安银行', '银行', '19910403'),
+            ('000002.SZ', '000002', '万科A', '房地产开发', '19910129'),
+            ('601318.SH', '601318', '中国平安', '保险', '20070301')
+        ])
+        delta = sync_reference_table(db_manager, 'stock_basic', changed)
+    finally:
+        remove_delta_listener(deltas.append)
+
+    print(f"  {delta.summary()}")
+    assert delta.counts == {'inserted': 1, 'updated': 1, 'deleted': 1}
+    assert delta.affected_codes() == {'000002.SZ', '600000.SH', '601318.SH'}
+    assert deltas == [delta]
+
+    rows = db_manager.execute_query("SELECT ts_code, industry FROM stock_basic ORDER BY ts_code")
+    assert rows == [('000001.SZ', '银行'), ('000002.SZ', '房地产开发'), ('601318.SH', '保险')]
+
+    # 未变化的记录不被改写
+    untouched = db_manager.execute_query(
+        "SELECT update_time FROM stock_basic WHERE ts_code = '000001.SZ'")[0][0]
+    assert untouched is not None
+    return True
+
+def test_schema_kept_and_empty_input_ignored():
+    """测试同步不改变表结构，空数据不清空表"""
+    print("Testing schema preservation...")
+
+    db_manager = create_db()
+    sync_reference_table(db_manager, 'stock_basic', stock_frame(BASE_ROWS))
+    assert sync_reference_table(db_manager, 'stock_basic', stock_frame([])).empty
+    assert db_manager.execute_query("SELECT COUNT(*) FROM stock_basic")[0][0] == 3
+
+    indexes = {row[0] for row in db_manager.execute_query(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'stock_basic'")}
+    sync_reference_table(db_manager, 'stock_basic', stock_frame(BASE_ROWS[:1]), delete_missing=False)
+    assert db_manager.execute_query("SELECT COUNT(*) FROM stock_basic")[0][0] == 3
+    assert indexes == {row[0] for row in db_manager.execute_query(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'stock_basic'")}
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Reference Diff Test")
+    print("=" * 50)
+
+    try:
+        test_diff_counts_equal()
+        test_schema_kept_and_empty_input_ignored()
+
+        print("\nAll reference diff tests completed successfully")
+
+    except Exception as e:
+        print(f"Reference diff test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
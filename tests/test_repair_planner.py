@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+修复规划测试
+"""
+
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.trade_calendar import TradeCalendar
+from src.data.chunk_planner import ChunkPlanner
+from src.data.repair_planner import RepairPlanner
+from src.data.gap_detector import GapDetector
+from src.data.integrity_checker import IntegrityChecker
+from src.data.incremental_updater import IncrementalUpdater
+from src.data.processors import PeriodResampler
+from src.data.providers import ReplayProvider
+
+class RecordingReplay(ReplayProvider):
+    """记录每次请求参数的回放数据源"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = []
+
+    def query(self, api_name, **params):
+        self.calls.append((api_name, params))
+        return super().query(api_name, **params)
+
+def create_db(provider):
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_repair_plan.db"))
+    db_manager.create_all_tables()
+    db_manager.execute_insert('trade_calendar', provider.trade_cal(exchange='SSE'))
+    return db_manager, TradeCalendar(db_manager)
+
+def test_cheapest_plan_per_date():
+    """测试按成本为单个交易日选择方案"""
+    print("Testing per-date plan...")
+
+    provider = ReplayProvider(stock_count=5, start_date='20240101', end_date='20240331')
+    planner = RepairPlanner(ChunkPlanner(create_db(provider)[1]))
+    codes = [f"{i:06d}.SZ" for i in range(800)]
+
+    few = planner.plan_date('daily', '20240304', codes[:3], market_size=5000)
+    many = planner.plan_date('daily', '20240304', codes, market_size=5000)
+    unknown_market = planner.plan_date('daily', '20240304', codes)
+    print(f"  {few} / {many} / {unknown_market}")
+    assert few.strategy == 'multi_code' and few.calls == 1
+    assert many.strategy == 'full_market' and many.calls == 1
+    assert unknown_market.strategy == 'multi_code' and unknown_market.calls == 2
+    # 全市场行数超过单次上限时一次请求取不全，改为按股票请求
+    assert planner.plan_date('daily', '20240304', codes, market_size=7000).strategy == 'multi_code'
+    # 逐只请求的方案成本最高
+    assert planner.plan_date('daily', '20240304', codes[:1]).calls == 1
+    return True
+
+def test_merge_adjacent_dates():
+    """测试相邻交易日的零散修复合并为多日多股票请求，相距很远的日期不合并"""
+    print("Testing multi-date merge...")
+
+    provider = ReplayProvider(stock_count=5, start_date='20230101', end_date='20241231')
+    calendar = create_db(provider)[1]
+    planner = RepairPlanner(ChunkPlanner(calendar))
+    days = calendar.open_days('20240304', '20240315')
+    codes = [f"{i:06d}.SZ" for i in range(40)]
+    needs = {day: codes[:30] + [codes[30 + i]] for i, day in enumerate(days)}
+    needs['20230105'] = codes[:1]
+
+    plans = planner.plan('daily', needs)
+    print(f"  {plans}")
+    assert len(plans) == 2
+    assert plans[0].strategy in ('per_code', 'multi_code') and plans[0].dates == ['20230105']
+    assert plans[1].strategy == 'multi_date' and plans[1].calls == 1
+    assert plans[1].dates == days
+    return True
+
+def test_truncated_full_market():
+    """测试全市场行数被低估、响应被截断时，按需要修复的股票重取"""
+    print("Testing truncated full-market repair...")
+
+    provider = RecordingReplay(stock_count=30, start_date='20240101', end_date='20240331', row_limit={'daily': 20})
+    full = ReplayProvider(stock_count=30, start_date='20240101', end_date='20240331')
+    planner = RepairPlanner(ChunkPlanner(create_db(provider)[1], row_limits={'daily': 20}))
+    codes = sorted(full.daily(trade_date='20240305')['ts_code'])[:19]
+
+    plans = planner.plan('daily', {'20240305': codes}, {'20240305': 19})
+    print(f"  {plans}")
+    assert [(plan.strategy, plan.calls) for plan in plans] == [('full_market', 1)]
+
+    provider.calls.clear()
+    df = planner.fetch('daily', plans, lambda api_name, **params: provider.query(api_name, **params))
+    assert sorted(df['ts_code']) == codes
+    # 全市场请求被截断后，需要修复的19只股票按每次18只分2次重取
+    assert [sorted(params) for _, params in provider.calls] == [
+        ['trade_date'], ['end_date', 'start_date', 'ts_code'], ['end_date', 'start_date', 'ts_code']]
+    return True
+
+def test_updater_range_repair():
+    """测试增量更新器合并修复多日缺失的股票，请求次数远少于逐只逐日"""
+    print("Testing updater repair...")
+
+    provider = RecordingReplay(stock_count=20, start_date='20240101', end_date='20240329')
+    db_manager, calendar = create_db(provider)
+    db_manager.execute_insert('stock_basic', provider.stock_basic())
+    daily = provider.daily(start_date='20240301', end_date='20240329')
+    db_manager.execute_insert('daily_basic', daily)
+
+    # 删除3只股票在5个交易日的数据
+    lost = ['000001.SZ', '000003.SZ', '600002.SH']
+    lost_days = calendar.open_days('20240311', '20240315')
+    conn = db_manager.get_connection()
+    conn.execute(f"DELETE FROM daily_basic WHERE trade_date BETWEEN '20240311' AND '20240315' "
+                 f"AND ts_code IN ({','.join('?' * len(lost))})", lost)
+    conn.commit()
+    conn.close()
+
+    updater = IncrementalUpdater(provider)
+    updater.db_manager = db_manager
+    updater.calendar = calendar
+    updater.resampler = PeriodResampler(db_manager, calendar)
+    updater.repair_planner = RepairPlanner(ChunkPlanner(calendar))
+    updater.gap_detector = GapDetector(db_manager, calendar)
+    updater.integrity_checker = IntegrityChecker(db_manager, calendar, updater.gap_detector)
+    provider.calls.clear()
+
+    results = updater.ensure_range_override('daily_basic', '20240304', '20240329')
+    daily_calls = [params for api_name, params in provider.calls if api_name == 'daily']
+    print(f"  {len(daily_calls)} calls: {daily_calls}")
+    assert len(daily_calls) == 1
+    assert all(results[day][0] and results[day][1] == len(lost) for day in lost_days)
+
+    restored = db_manager.execute_query(
+        "SELECT COUNT(*), SUM(close) FROM daily_basic WHERE trade_date BETWEEN '20240301' AND '20240329'")[0]
+    assert restored[0] == len(daily)
+    assert abs(restored[1] - daily['close'].sum()) < 1e-6
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Repair Planner Test")
+    print("=" * 50)
+
+    try:
+        test_cheapest_plan_per_date()
+        test_merge_adjacent_dates()
+        test_truncated_full_market()
+        test_updater_range_repair()
+
+        print("\nAll repair planner tests completed successfully")
+
+    except Exception as e:
+        print(f"Repair planner test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
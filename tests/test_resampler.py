@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+周期K线重采样测试
+"""
+
+import sys
+import os
+import tempfile
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.trade_calendar import TradeCalendar
+from src.data.processors import PeriodResampler
+from src.data.providers import ReplayProvider
+
+def create_resampler(provider, end_date):
+    """用回放数据源的日历和日线建立临时数据库"""
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_resample.db"))
+    db_manager.create_all_tables()
+    db_manager.execute_insert('trade_calendar', provider.trade_cal(exchange='SSE'))
+    db_manager.execute_insert('daily_basic', provider.daily(start_date='20240101', end_date=end_date))
+    return db_manager, PeriodResampler(db_manager, TradeCalendar(db_manager))
+
+def load_table(db_manager, table_name):
+    conn = db_manager.get_connection()
+    try:
+        return pd.read_sql_query(f"SELECT * FROM {table_name} ORDER BY ts_code, trade_date", conn)
+    finally:
+        conn.close()
+
+def test_weekly_and_monthly_bars():
+    """测试周线、月线的周期边界与OHLCV聚合"""
+    print("Testing weekly/monthly bars...")
+
+    provider = ReplayProvider(stock_count=5, start_date='20240101', end_date='20240331')
+    db_manager, resampler = create_resampler(provider, '20240331')
+
+    success, records, message = resampler.update('W')
+    print(f"  {message}")
+    assert success and records > 0
+
+    weekly = load_table(db_manager, 'weekly_basic')
+    daily = load_table(db_manager, 'daily_basic')
+    code = daily['ts_code'].iloc[0]
+
+    # 2024-01-08 ~ 2024-01-12 为完整的一周，K线日期为周五
+    week = daily[(daily['ts_code'] == code) & daily['trade_date'].between('20240108', '20240114')]
+    bar = weekly[(weekly['ts_code'] == code) & (weekly['trade_date'] == week['trade_date'].max())]
+    assert len(bar) == 1
+    bar = bar.iloc[0]
+    assert bar['trade_date'] == '20240112'
+    assert bar['open'] == week['open'].iloc[0]
+    assert bar['close'] == week['close'].iloc[-1]
+    assert bar['high'] == week['high'].max() and bar['low'] == week['low'].min()
+    assert abs(bar['vol'] - week['vol'].sum()) < 1e-6
+    assert not weekly.duplicated(['ts_code', 'trade_date']).any()
+
+    success, records, message = resampler.update('M')
+    monthly = load_table(db_manager, 'monthly_basic')
+    print(f"  {message}")
+    assert success
+    assert sorted(monthly['trade_date'].unique()) == ['20240131', '20240229', '20240329']
+    assert len(monthly) == 3 * daily['ts_code'].nunique()
+    return True
+
+def test_incremental_update():
+    """测试只重算有新日线的周期，未结束的周期随日线推进"""
+    print("Testing incremental resample...")
+
+    provider = ReplayProvider(stock_count=3, start_date='20240101', end_date='20240331')
+    db_manager, resampler = create_resampler(provider, '20240110')
+    resampler.update('W')
+    weekly = load_table(db_manager, 'weekly_basic')
+    assert weekly['trade_date'].max() == '20240110'
+
+    # 写入后续日线：本周K线的日期从周三推进到周五，不残留旧记录
+    db_manager.execute_insert('daily_basic', provider.daily(start_date='20240111', end_date='20240119'))
+    success, records, message = resampler.update('W')
+    print(f"  {message}")
+    weekly = load_table(db_manager, 'weekly_basic')
+    assert success
+    assert '20240110' not in set(weekly['trade_date'])
+    assert sorted(weekly['trade_date'].unique()) == ['20240105', '20240112', '20240119']
+
+    # 没有新日线时不重算，结果不变
+    success, records, message = resampler.update('W')
+    assert success and records == 0
+    assert load_table(db_manager, 'weekly_basic')[['ts_code', 'trade_date', 'close']].equals(
+        weekly[['ts_code', 'trade_date', 'close']])
+    return True
+
+def test_partial_rewrite():
+    """测试只重算变更记录涉及的股票和周期，结果与全量重建一致"""
+    print("Testing resample of changed stocks and periods...")
+
+    provider = ReplayProvider(stock_count=10, start_date='20240101', end_date='20240331')
+    db_manager, resampler = create_resampler(provider, '20240329')
+    resampler.update('W')
+    resampler.update('M')
+
+    # 两只股票的全部历史重新写入（修改收盘价）：只重算这两只股票的K线
+    daily = load_table(db_manager, 'daily_basic')
+    codes = sorted(daily['ts_code'].unique())[:2]
+    rewritten = daily[daily['ts_code'].isin(codes)].drop(columns=['update_time']).copy()
+    rewritten['close'] = rewritten['close'] + 1
+    db_manager.execute_insert('daily_basic', rewritten)
+    success, records, message = resampler.update('W')
+    print(f"  {message}")
+    weekly = load_table(db_manager, 'weekly_basic')
+    assert success and records == len(weekly[weekly['ts_code'].isin(codes)]) < len(weekly)
+
+    # 全市场单日写入：只重算该日所在的周
+    day = daily[daily['trade_date'] == '20240313'].drop(columns=['update_time']).copy()
+    day['vol'] = day['vol'] * 2
+    db_manager.execute_insert('daily_basic', day)
+    success, records, message = resampler.update('W')
+    print(f"  {message}")
+    assert success and records == day['ts_code'].nunique()
+
+    resampler.update('M')
+    for period, table_name in (('W', 'weekly_basic'), ('M', 'monthly_basic')):
+        expected = resampler.compute(period, '20240101', '20240329')
+        actual = load_table(db_manager, table_name)
+        assert actual[['ts_code', 'trade_date', 'close', 'vol']].round(4).equals(
+            expected.sort_values(['ts_code', 'trade_date'], ignore_index=True)[
+                ['ts_code', 'trade_date', 'close', 'vol']].round(4))
+
+    # 所有周期表都处理过的变更记录被清理
+    assert db_manager.execute_query("SELECT COUNT(*) FROM data_change_log")[0][0] == 0
+    return True
+
+def test_custom_period():
+    """测试按交易日数划分的自定义周期"""
+    print("Testing custom period...")
+
+    provider = ReplayProvider(stock_count=2, start_date='20240101', end_date='20240331')
+    db_manager, resampler = create_resampler(provider, '20240331')
+
+    bars = resampler.compute('10D', '20240201', '20240229')
+    days = resampler.calendar.open_days('20240101', '20240331')
+    print(f"  {len(bars)} bars")
+    assert not bars.empty
+    # 每根K线的日期都是某个10交易日分段的最后一天（按日历序号划分）
+    ends = {days[i] for i in range(len(days)) if (resampler.calendar.to_ordinal(days[i]) + 1) % 10 == 0}
+    assert set(bars['trade_date']) <= ends | {days[-1]}
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Period Resampler Test")
+    print("=" * 50)
+
+    try:
+        test_weekly_and_monthly_bars()
+        test_incremental_update()
+        test_partial_rewrite()
+        test_custom_period()
+
+        print("\nAll resampler tests completed successfully")
+
+    except Exception as e:
+        print(f"Resampler test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
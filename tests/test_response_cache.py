@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接口响应缓存测试
+"""
+
+import sys
+import os
+import tempfile
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.providers.base_provider import BaseProvider
+from src.data.providers.response_cache import ResponseCache, CachedProvider, make_cache_key
+
+class CountingProvider(BaseProvider):
+    """记录调用次数的模拟数据源"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def query(self, api_name, **params):
+        self.calls += 1
+        return pd.DataFrame({
+            'ts_code': ['000001.SZ', '000002.SZ'],
+            'trade_date': [params.get('trade_date', '20240102')] * 2,
+            'close': [10.5, np.nan]
+        })
+
+def create_cache(max_size_mb=10):
+    """创建临时缓存"""
+    return ResponseCache(os.path.join(tempfile.mkdtemp(), "test_cache.db"), max_size_mb=max_size_mb)
+
+def test_cache_key_normalization():
+    """测试参数规范化"""
+    print("Testing cache key normalization...")
+
+    key1 = make_cache_key('daily', {'ts_code': '600000.SH,000001.SZ', 'start_date': 20240101})
+    key2 = make_cache_key('daily', {'start_date': '20240101', 'ts_code': '000001.SZ, 600000.SH', 'fields': None})
+    assert key1 == key2
+    assert key1 != make_cache_key('weekly', {'ts_code': '600000.SH,000001.SZ', 'start_date': 20240101})
+    return True
+
+def test_historical_ttl():
+    """测试已收盘日期永久缓存，包含今天的请求不缓存"""
+    print("Testing historical TTL rules...")
+
+    cache = create_cache()
+    today = datetime.now().strftime('%Y%m%d')
+
+    assert cache.get_expiry('daily', {'trade_date': '20240102'}) == (True, None)
+    assert cache.get_expiry('daily', {'start_date': '20240101', 'end_date': today})[0] is False
+    assert cache.get_expiry('daily', {'ts_code': '000001.SZ'})[0] is False
+    cacheable, expires = cache.get_expiry('stock_basic', {'list_status': 'L'})
+    assert cacheable and expires is not None
+    assert cache.get_expiry('unknown_api', {})[0] is False
+    return True
+
+def test_cached_client_hits():
+    """测试命中缓存时不再请求接口"""
+    print("Testing cached client...")
+
+    pro = CountingProvider()
+    client = CachedProvider(pro, create_cache())
+
+    df1 = client.daily(trade_date='20240102')
+    df2 = client.daily(trade_date='20240102')
+    client.query('daily', trade_date='20240103')
+
+    assert pro.calls == 2
+    assert list(df2.columns) == list(df1.columns)
+    assert df2['close'].iloc[0] == 10.5
+    assert pd.isna(df2['close'].iloc[1])
+    assert client.cache.stats['hits'] == 1
+    return True
+
+def test_lru_eviction():
+    """测试超出容量时淘汰最久未访问的记录"""
+    print("Testing LRU eviction...")
+
+    cache = create_cache(max_size_mb=0.02)
+    frame = pd.DataFrame({'ts_code': [f"{i:06d}.SZ" for i in range(500)],
+                          'close': np.random.rand(500)})
+    for day in range(1, 10):
+        cache.put('daily', {'trade_date': f"202401{day:02d}"}, frame)
+
+    print(f"  stats: {cache.stats}")
+    assert cache.stats['evictions'] > 0
+    assert cache.get('daily', {'trade_date': '20240101'}) is None
+    assert cache.get('daily', {'trade_date': '20240109'}) is not None
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Response Cache Test")
+    print("=" * 50)
+
+    try:
+        test_cache_key_normalization()
+        test_historical_ttl()
+        test_cached_client_hits()
+        test_lru_eviction()
+
+        print("\nAll response cache tests completed successfully")
+
+    except Exception as e:
+        print(f"Response cache test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
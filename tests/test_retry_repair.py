@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重试、熔断与修复队列测试
+"""
+
+import sys
+import os
+import tempfile
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.data_initializer import DataInitializer
+from src.data.api_config import BATCH_2_APIS
+from src.data.providers import (BaseProvider, RetryProvider, ProviderError, CircuitOpenError,
+                                classify_error)
+from src.data.repair_queue import RepairQueue
+
+class ScriptedProvider(BaseProvider):
+    """按预设顺序抛出异常的模拟数据源"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def query(self, api_name, **params):
+        self.calls += 1
+        if self.errors:
+            error = self.errors.pop(0)
+            if error is not None:
+                raise error
+        return pd.DataFrame({'ts_code': ['000001.SZ'], 'trade_date': ['20240102'], 'close': [10.0]})
+
+def create_retry(inner, **kwargs):
+    """创建不实际等待的重试层"""
+    delays = []
+    provider = RetryProvider(inner, retry_delay=[1, 3, 5], jitter=0.3, rate_limit_delay=20,
+                             sleep=delays.append, **kwargs)
+    return provider, delays
+
+def test_error_classification():
+    """测试错误分类"""
+    print("Testing error classification...")
+
+    assert classify_error(Exception("抱歉，您每分钟最多访问该接口500次")) == 'api_limit'
+    assert classify_error(Exception("抱歉，您没有访问该接口的权限")) == 'permission_denied'
+    assert classify_error(TimeoutError("read timed out")) == 'timeout'
+    assert classify_error(ConnectionError("reset by peer")) == 'network_error'
+    assert classify_error(ValueError("bad field")) == 'other'
+    return True
+
+def test_retry_with_backoff():
+    """测试可重试错误退避后成功，限频错误等待更久"""
+    print("Testing retry with backoff...")
+
+    inner = ScriptedProvider([ConnectionError("reset"), Exception("每分钟最多访问该接口500次"), None])
+    provider, delays = create_retry(inner)
+    df = provider.daily(trade_date='20240102')
+
+    print(f"  delays: {[round(d, 2) for d in delays]}")
+    assert len(df) == 1 and inner.calls == 3
+    assert 0.7 <= delays[0] <= 1.3
+    assert delays[1] >= 14
+    return True
+
+def test_permission_trips_breaker():
+    """测试权限错误不重试并熔断该API，其他API不受影响"""
+    print("Testing permission circuit breaker...")
+
+    inner = ScriptedProvider([Exception("抱歉，您没有访问该接口的权限")])
+    provider, delays = create_retry(inner)
+
+    try:
+        provider.stk_mins(ts_code='000001.SZ')
+        assert False
+    except ProviderError as e:
+        assert e.category == 'permission_denied'
+    try:
+        provider.stk_mins(ts_code='000001.SZ')
+        assert False
+    except CircuitOpenError:
+        pass
+
+    assert inner.calls == 1 and delays == []
+    assert len(provider.daily(trade_date='20240102')) == 1
+    return True
+
+def test_breaker_half_open():
+    """测试连续失败熔断，到期后试探调用成功即恢复"""
+    print("Testing breaker half-open recovery...")
+
+    inner = ScriptedProvider([ValueError("bad"), ValueError("bad"), None])
+    provider, _ = create_retry(inner, breaker_threshold=2, breaker_reset=0)
+    for _ in range(2):
+        try:
+            provider.daily(trade_date='20240102')
+        except ProviderError:
+            pass
+
+    assert provider.get_breaker('daily').state == 'open'
+    assert len(provider.daily(trade_date='20240102')) == 1
+    assert provider.get_breaker('daily').state == 'closed'
+    return True
+
+def test_failed_chunks_are_repaired():
+    """测试失败分块进入修复队列并可补抓"""
+    print("Testing repair queue...")
+
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_repair.db"))
+    db_manager.create_all_tables()
+
+    class FlakyPro:
+        def __init__(self):
+            self.fail = True
+
+        def stock_basic(self, **params):
+            return pd.DataFrame({'ts_code': ['000001.SZ'], 'list_date': ['19910403']})
+
+        def daily(self, ts_code=None, start_date=None, end_date=None, **params):
+            if self.fail:
+                raise ProviderError("network down", 'network_error', 'daily')
+            return pd.DataFrame({'ts_code': [ts_code], 'trade_date': [end_date], 'close': [10.0]})
+
+    initializer = DataInitializer(['batch_2'])
+    initializer.db_manager = db_manager
+    initializer.pipeline.db_manager = db_manager
+    initializer.repair_queue = RepairQueue(db_manager)
+    initializer.pro = FlakyPro()
+
+    success, records, message = initializer._execute_multi_stock_multi_date(
+        BATCH_2_APIS['daily'], '20240101', '20240131')
+    print(f"  {message}")
+    assert success and records == 0
+    assert initializer.repair_queue.counts() == {'pending': 1}
+
+    initializer.pro.fail = False
+    assert initializer.repair_failed_chunks() == (1, 0, 1)
+    assert initializer.repair_queue.counts() == {'done': 1}
+    assert db_manager.execute_query("SELECT COUNT(*) FROM daily_basic")[0][0] == 1
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Retry And Repair Test")
+    print("=" * 50)
+
+    try:
+        test_error_classification()
+        test_retry_with_backoff()
+        test_permission_trips_breaker()
+        test_breaker_half_open()
+        test_failed_chunks_are_repaired()
+
+        print("\nAll retry and repair tests completed successfully")
+
+    except Exception as e:
+        print(f"Retry and repair test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
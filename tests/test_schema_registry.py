@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+表结构注册表测试
+"""
+
+import sys
+import os
+import sqlite3
+import tempfile
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.storage import get_schema_registry
+
+def create_db_manager():
+    """创建临时数据库"""
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_schema.db"))
+    db_manager.create_all_tables()
+    return db_manager
+
+def test_registry_from_ddl():
+    """测试注册表来自建表语句"""
+    print("Testing schema registry...")
+
+    registry = get_schema_registry(create_db_manager())
+    daily = registry.get('daily_basic')
+    assert daily.primary_key == ['ts_code', 'trade_date']
+    assert daily.kinds['close'] == 'float'
+    assert registry.get('trade_calendar').kinds['is_open'] == 'int'
+    assert registry.get('index_weight').key_columns == ['index_code', 'con_code', 'trade_date']
+    assert 'adj_factor' in registry and 'index_dailybasic' in registry
+    return True
+
+def test_align_frame():
+    """测试按表结构对齐列顺序和类型"""
+    print("Testing frame alignment...")
+
+    registry = get_schema_registry(create_db_manager())
+    df = pd.DataFrame({
+        'close': ['10.5', None],
+        'unknown': [1, 2],
+        'trade_date': [20240102, 20240103],
+        'ts_code': ['000001.SZ', '000001.SZ']
+    })
+    aligned = registry.align('daily_basic', df)
+
+    assert list(aligned.columns) == ['ts_code', 'trade_date', 'close']
+    assert aligned['trade_date'].tolist() == ['20240102', '20240103']
+    assert aligned['close'].dtype == np.float64
+    return True
+
+def test_replace_keeps_primary_key():
+    """测试replace写入不丢失主键和索引"""
+    print("Testing replace mode keeps schema...")
+
+    db_manager = create_db_manager()
+    df = pd.DataFrame({'ts_code': ['000001.SZ', '000002.SZ'], 'name': ['平安银行', '万科A'],
+                       'list_status': ['L', 'L']})
+    db_manager.execute_insert('stock_basic', df, mode='replace')
+    db_manager.execute_insert('stock_basic', df.head(1), mode='replace')
+    db_manager.execute_insert('stock_basic', df.head(1))
+
+    conn = db_manager.get_connection()
+    pk = [row[1] for row in conn.execute("PRAGMA table_info(stock_basic)") if row[5]]
+    indexes = [row[1] for row in conn.execute("PRAGMA index_list(stock_basic)")]
+    conn.close()
+
+    assert pk == ['ts_code']
+    assert 'idx_stock_basic_market' in indexes
+    assert db_manager.execute_query("SELECT COUNT(*) FROM stock_basic")[0][0] == 1
+    return True
+
+def test_rebuild_replaced_table():
+    """测试修复曾被to_sql整表替换的表"""
+    print("Testing rebuild of replaced table...")
+
+    db_manager = create_db_manager()
+    conn = sqlite3.connect(db_manager.db_path)
+    conn.execute("DROP TABLE adj_factor")
+    pd.DataFrame({'ts_code': ['000001.SZ', '000001.SZ'], 'trade_date': ['20240102', '20240102'],
+                  'adj_factor': [1.0, 1.1], 'extra': [0, 0]}).to_sql('adj_factor', conn, index=False)
+    conn.commit()
+    conn.close()
+
+    db_manager.create_all_tables()
+    rows = db_manager.execute_query("SELECT ts_code, trade_date, adj_factor FROM adj_factor")
+    conn = db_manager.get_connection()
+    pk = [row[1] for row in conn.execute("PRAGMA table_info(adj_factor)") if row[5]]
+    conn.close()
+
+    print(f"  rows after rebuild: {rows}")
+    assert pk == ['ts_code', 'trade_date']
+    assert rows == [('000001.SZ', '20240102', 1.1)]
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Schema Registry Test")
+    print("=" * 50)
+
+    try:
+        test_registry_from_ddl()
+        test_align_frame()
+        test_replace_keeps_primary_key()
+        test_rebuild_replaced_table()
+
+        print("\nAll schema registry tests completed successfully")
+
+    except Exception as e:
+        print(f"Schema registry test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+停牌区间测试
+"""
+
+import sys
+import os
+import tempfile
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.trade_calendar import TradeCalendar, get_trade_calendar
+from src.data.suspension import SuspensionStore
+from src.data.gap_detector import GapDetector
+from src.data.integrity_checker import IntegrityChecker
+from src.data.incremental_updater import IncrementalUpdater
+from src.data.processors import PeriodResampler
+from src.data.ingestion_engine import IngestionEngine
+from src.data.providers import ReplayProvider
+from src.data.api_config import BATCH_2_APIS
+
+class RecordingReplay(ReplayProvider):
+    """记录每次请求的回放数据源"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = []
+
+    def query(self, api_name, **params):
+        self.calls.append((api_name, params))
+        return super().query(api_name, **params)
+
+def create_db(provider):
+    db_manager = DatabaseManager(os.path.join(tempfile.mkdtemp(), "test_suspension.db"))
+    db_manager.create_all_tables()
+    db_manager.execute_insert('trade_calendar', provider.trade_cal(exchange='SSE'))
+    return db_manager, TradeCalendar(db_manager)
+
+def suspend_rows(code, days, suspend_type='S'):
+    return pd.DataFrame({'ts_code': code, 'trade_date': days, 'suspend_type': suspend_type})
+
+def test_merge_intervals():
+    """测试逐日停牌记录合并为区间，相邻交易日的区间合并，复牌记录忽略"""
+    print("Testing suspension intervals...")
+
+    provider = ReplayProvider(stock_count=5, start_date='20240101', end_date='20240329')
+    db_manager, calendar = create_db(provider)
+    store = SuspensionStore(db_manager, calendar)
+    days = calendar.open_days('20240304', '20240315')
+
+    store.merge(pd.concat([suspend_rows('000001.SZ', days[:3]), suspend_rows('000001.SZ', days[4:5]),
+                           suspend_rows('000001.SZ', days[5:6], 'R'), suspend_rows('600000.SH', days[8:9])]))
+    rows = store.intervals().values.tolist()
+    print(f"  {rows}")
+    assert rows == [['000001.SZ', days[0], days[2]], ['000001.SZ', days[4], days[4]],
+                    ['600000.SH', days[8], days[8]]]
+
+    # 补上中间的交易日后合并为一个区间；周末两侧的交易日也算相邻
+    store.merge(suspend_rows('000001.SZ', days[3:4]))
+    store.merge(suspend_rows('600000.SH', days[4:8]))
+    rows = store.intervals().values.tolist()
+    assert rows == [['000001.SZ', days[0], days[4]], ['600000.SH', days[4], days[8]]]
+    assert store.intervals('20240306', '20240306', codes=['000001.SZ']).values.tolist() == [
+        ['000001.SZ', days[0], days[4]]]
+    return True
+
+def test_sync_and_skip_suspended():
+    """测试同步停牌数据后，停牌股票不算缺失，修复不再请求"""
+    print("Testing suspension-aware repair...")
+
+    provider = RecordingReplay(stock_count=20, start_date='20240101', end_date='20240329')
+    db_manager, calendar = create_db(provider)
+    db_manager.execute_insert('stock_basic', provider.stock_basic())
+    db_manager.execute_insert('daily_basic', provider.daily(start_date='20240101', end_date='20240329'))
+
+    updater = IncrementalUpdater(provider)
+    updater.db_manager = db_manager
+    updater.calendar = calendar
+    updater.resampler = PeriodResampler(db_manager, calendar)
+    updater.gap_detector = GapDetector(db_manager, calendar)
+    updater.integrity_checker = IntegrityChecker(db_manager, calendar, updater.gap_detector)
+
+    # 没有停牌数据时，停牌的股票被当作缺失
+    assert updater.audit('daily_basic').counts['missing'] == 10
+
+    store = SuspensionStore(db_manager, calendar)
+    success, records, message = store.sync(lambda api_name, **params: provider.query(api_name, **params))
+    print(f"  {message}")
+    assert success and records == 10 and store.get_watermark() == '20240329'
+    assert sorted(store.intervals()['ts_code']) == ['000005.SZ', '000015.SZ']
+    assert store.sync(lambda api_name, **params: provider.query(api_name, **params))[1] == 0
+
+    report = updater.audit('daily_basic')
+    assert report.counts['missing'] == 0 and report.counts['suspended'] == 10
+
+    suspended_day = store.intervals()['start_date'].iloc[0]
+    assert updater._find_missing_stocks('daily_basic', suspended_day) == []
+    assert updater.smart_update_decision('daily_basic', suspended_day)[0] == 'none'
+
+    provider.calls.clear()
+    results = updater.ensure_range_override('daily_basic', '20240101', '20240329')
+    assert not provider.calls
+    assert all(result[0] and result[1] == 0 for result in results.values())
+    return True
+
+def test_sync_extends_history():
+    """测试行情历史向前回填后，停牌同步只补取之前的交易日"""
+    print("Testing suspension history backfill...")
+
+    provider = RecordingReplay(stock_count=20, start_date='20240101', end_date='20240329')
+    db_manager, calendar = create_db(provider)
+    db_manager.execute_insert('daily_basic', provider.daily(start_date='20240301', end_date='20240329'))
+    store = SuspensionStore(db_manager, calendar)
+    fetch = lambda api_name, **params: provider.query(api_name, **params)
+
+    assert store.sync(fetch)[0]
+    assert (store.get_start(), store.get_watermark()) == ('20240301', '20240329')
+
+    db_manager.execute_insert('daily_basic', provider.daily(start_date='20240101', end_date='20240229'))
+    provider.calls.clear()
+    success, records, message = store.sync(fetch)
+    print(f"  {message}")
+    assert success and records == 10
+    assert min(params['start_date'] for _, params in provider.calls) == '20240101'
+    assert max(params['end_date'] for _, params in provider.calls) == '20240229'
+    assert (store.get_start(), store.get_watermark()) == ('20240101', '20240329')
+    assert sorted(store.intervals()['ts_code']) == ['000005.SZ', '000015.SZ']
+    assert store.sync(fetch) == (True, 0, "停牌数据已是最新")
+    return True
+
+def test_legacy_database():
+    """测试旧版本建的库没有停牌表时，缺失检测按不排除停牌处理"""
+    print("Testing database without suspension table...")
+
+    provider = ReplayProvider(stock_count=20, start_date='20240101', end_date='20240329')
+    db_manager, calendar = create_db(provider)
+    db_manager.execute_insert('stock_basic', provider.stock_basic())
+    db_manager.execute_insert('daily_basic', provider.daily(start_date='20240101', end_date='20240329'))
+    conn = db_manager.get_connection()
+    conn.execute("DROP TABLE stock_suspension")
+    conn.commit()
+    conn.close()
+
+    updater = IncrementalUpdater(provider)
+    updater.db_manager = db_manager
+    updater.calendar = calendar
+    updater.gap_detector = GapDetector(db_manager, calendar)
+    updater.integrity_checker = IntegrityChecker(db_manager, calendar, updater.gap_detector)
+
+    days = calendar.open_days('20240101', '20240329')
+    suspended_day = days[len(days) // 3 + 5]  # 000005.SZ 停牌的第一天
+    assert updater._find_missing_stocks('daily_basic', suspended_day) == ['000005.SZ']
+    assert len(updater._get_active_stocks(suspended_day)) == 20
+    assert updater.smart_update_decision('daily_basic', suspended_day)[0] != 'none'
+    assert updater.audit('daily_basic').counts['missing'] == 10
+    return True
+
+def test_init_syncs_suspensions():
+    """测试初始化完成后同步行情范围内的停牌区间"""
+    print("Testing suspension sync during init...")
+
+    provider = ReplayProvider(stock_count=20, start_date='20240101')
+    db_manager, calendar = create_db(provider)
+    db_manager.execute_insert('stock_basic', provider.stock_basic())
+
+    engine = IngestionEngine(['batch_2'], progressive=False, db_manager=db_manager)
+    engine.pro = provider
+    engine._init_api_connection = lambda: True
+    engine._get_batch_configs = lambda: {'batch_2': {'daily': BATCH_2_APIS['daily']}}
+    engine.scheduler.set_api_limit('daily', 0.001)
+    engine.scheduler.set_api_limit('suspend_d', 0.001)
+
+    success, message, results = engine.run()
+    print(f"  {message}")
+    assert success
+    store = SuspensionStore(db_manager, get_trade_calendar(db_manager))
+    first_date = db_manager.execute_query("SELECT MIN(trade_date) FROM daily_basic")[0][0]
+    assert store.get_start() == first_date and store.get_watermark() == calendar.latest_open()
+    assert sorted(store.intervals()['ts_code']) == ['000005.SZ', '000015.SZ']
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Suspension Test")
+    print("=" * 50)
+
+    try:
+        test_merge_intervals()
+        test_sync_and_skip_suspended()
+        test_sync_extends_history()
+        test_legacy_database()
+        test_init_syncs_suspensions()
+
+        print("\nAll suspension tests completed successfully")
+
+    except Exception as e:
+        print(f"Suspension test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多token池测试
+"""
+
+import sys
+import os
+import time
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.fetch_scheduler import FetchScheduler
+from src.data.providers import (ReplayProvider, TokenPool, PooledToken,
+                                classify_error, parse_tokens)
+
+class NoPermissionReplay(ReplayProvider):
+    """对指定接口返回权限错误的回放数据源"""
+
+    def __init__(self, denied_apis, **kwargs):
+        super().__init__(**kwargs)
+        self.denied_apis = set(denied_apis)
+
+    def query(self, api_name, **params):
+        if api_name in self.denied_apis:
+            raise Exception("抱歉，您没有接口访问权限，权限的具体详情访问：https://tushare.pro")
+        return super().query(api_name, **params)
+
+def replay():
+    return ReplayProvider(stock_count=3, start_date='20240101', end_date='20240131')
+
+def test_parse_tokens():
+    """测试解析多个token及各自的限频和权限配置"""
+    print("Testing token config parsing...")
+
+    tokens = parse_tokens({
+        'token': 'aaa', 'token_type': 'tudata',
+        'token_2': 'bbb', 'token_2_type': 'tushare', 'token_2_rate': '500',
+        'token_10': 'ccc', 'token_10_apis': 'daily, adj_factor',
+        'token_3': ''
+    })
+    print(f"  {[item['name'] for item in tokens]}")
+    assert [item['name'] for item in tokens] == ['token', 'token_2', 'token_10']
+    assert [item['token_type'] for item in tokens] == ['tudata', 'tushare', 'tudata']
+    assert tokens[1]['rate_limit'] == 60.0 / 500
+    assert tokens[2]['apis'] == ['daily', 'adj_factor']
+    assert tokens[0]['rate_limit'] is None and tokens[0]['apis'] is None
+    return True
+
+def test_throughput_scales_with_tokens():
+    """测试请求均摊到各token，总吞吐随token数增长"""
+    print("Testing pool throughput...")
+
+    interval = 0.05
+    pool = TokenPool([PooledToken(f"token_{i}", replay(), rate_limit=interval) for i in range(3)])
+    calls = 30
+    started = time.monotonic()
+    for _ in range(calls):
+        pool.daily(trade_date='20240102')
+    elapsed = time.monotonic() - started
+    print(f"  {calls} calls in {elapsed:.2f}s, stats: {pool.stats}")
+
+    counts = list(pool.stats.values())
+    assert sum(counts) == calls
+    assert max(counts) - min(counts) <= 2
+    # 单个token至少需要约 (30 - 突发) * 0.05 = 1.4 秒
+    assert elapsed < calls * interval * 0.7
+    return True
+
+def test_permission_and_rate_limit_routing():
+    """测试按权限分派、权限错误和限频时改用其他token"""
+    print("Testing permission-aware dispatch...")
+
+    limited = ReplayProvider(stock_count=3, start_date='20240101', end_date='20240131',
+                             rate_limit_per_minute=1)
+    pool = TokenPool([
+        PooledToken('token', NoPermissionReplay(['adj_factor'], stock_count=3,
+                                                start_date='20240101', end_date='20240131'),
+                    rate_limit=0.001),
+        PooledToken('token_2', limited, rate_limit=0.001),
+        PooledToken('token_3', replay(), rate_limit=0.001, apis=['daily'])
+    ])
+
+    # 只有 token_2 有 adj_factor 权限（token 运行时返回权限错误，token_3 按配置不可用）
+    assert not pool.adj_factor(trade_date='20240102').empty
+    assert 'adj_factor' in pool.tokens[0].denied
+    # token_2 每分钟只能调用1次：第二次触发限频后进入冷却，没有其他token可用时抛出限频错误
+    try:
+        pool.adj_factor(trade_date='20240103')
+        assert False, "应抛出限频错误"
+    except Exception as e:
+        print(f"  {e}")
+        assert classify_error(e) == 'api_limit'
+    assert pool.tokens[1].cooldown.get('adj_factor', 0) > time.monotonic()
+
+    # daily 在其余token间分派
+    for _ in range(4):
+        assert not pool.daily(trade_date='20240102').empty
+    print(f"  stats: {pool.stats}")
+    assert pool.stats['token_3'] >= 1
+
+    # 没有任何token具备权限
+    denied = TokenPool([PooledToken('token', NoPermissionReplay(['daily']), rate_limit=0.001)])
+    try:
+        denied.daily(trade_date='20240102')
+        assert False, "应抛出权限错误"
+    except Exception as e:
+        assert classify_error(e) == 'permission_denied'
+    return True
+
+def test_scheduler_scale():
+    """测试调度器按token数放大限频额度和并发数"""
+    print("Testing scheduler scaling...")
+
+    scheduler = FetchScheduler(max_workers=4, rate_limit=0.2)
+    base_rate = scheduler.get_bucket('daily').rate
+    scheduler.scale(3)
+    assert scheduler.max_workers == 12
+    assert abs(scheduler.get_bucket('daily').rate - base_rate * 3) < 1e-9
+    scheduler.scale(1)
+    assert scheduler.max_workers == 4
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Token Pool Test")
+    print("=" * 50)
+
+    try:
+        test_parse_tokens()
+        test_throughput_scales_with_tokens()
+        test_permission_and_rate_limit_routing()
+        test_scheduler_scale()
+
+        print("\nAll token pool tests completed successfully")
+
+    except Exception as e:
+        print(f"Token pool test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()
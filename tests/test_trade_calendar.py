@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+交易日历服务测试
+"""
+
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.data.database_manager import DatabaseManager
+from src.data.trade_calendar import TradeCalendar
+
+def create_calendar_db():
+    """创建包含2024年1月日历的测试数据库(周末休市)"""
+    db_path = os.path.join(tempfile.mkdtemp(), "test_calendar.db")
+    db_manager = DatabaseManager(db_path)
+    db_manager.create_all_tables()
+
+    conn = db_manager.get_connection()
+    day = datetime(2024, 1, 1)
+    while day <= datetime(2024, 1, 31):
+        is_open = 1 if day.weekday() < 5 else 0
+        conn.execute("INSERT INTO trade_calendar (cal_date, is_open) VALUES (?, ?)",
+                     (day.strftime('%Y%m%d'), is_open))
+        day += timedelta(days=1)
+    conn.commit()
+    conn.close()
+    return db_manager
+
+def test_calendar_lookups():
+    """测试交易日查询"""
+    print("Testing trade calendar lookups...")
+
+    calendar = TradeCalendar(create_calendar_db())
+
+    assert len(calendar) == 23
+    assert calendar.is_open('20240105')
+    assert not calendar.is_open('20240106')
+    assert calendar.prev_open('20240108') == '20240105'
+    assert calendar.next_open('20240105') == '20240108'
+    assert calendar.next_open('20240106') == '20240108'
+    assert calendar.latest_open('20240107') == '20240105'
+    assert calendar.open_days('20240106', '20240110') == ['20240108', '20240109', '20240110']
+    assert calendar.count_open_days('20240101', '20240131') == 23
+    assert calendar.next_open('20240131') is None
+
+    print("Trade calendar lookups are valid")
+    return True
+
+def test_calendar_ordinals():
+    """测试日期与序号互转"""
+    print("Testing trade calendar ordinals...")
+
+    calendar = TradeCalendar(create_calendar_db())
+
+    ordinal = calendar.to_ordinal('20240108')
+    assert ordinal == 5
+    assert calendar.from_ordinal(ordinal) == '20240108'
+    assert calendar.to_ordinal('20240106') is None
+    assert calendar.from_ordinal(100) is None
+    assert calendar.covers('20240101', '20240131')
+    assert not calendar.covers('20231231')
+
+    print("Trade calendar ordinals are valid")
+    return True
+
+def main():
+    """主函数"""
+    print("=" * 50)
+    print("Trade Calendar Test")
+    print("=" * 50)
+
+    try:
+        test_calendar_lookups()
+        test_calendar_ordinals()
+
+        print("\nAll trade calendar tests completed successfully")
+
+    except Exception as e:
+        print(f"Trade calendar test failed: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == '__main__':
+    main()